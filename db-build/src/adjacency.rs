@@ -0,0 +1,563 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Compressed sparse row ("CSR") representation of `x_in_y` tables, which stores for each
+//! key the sorted list of values it is associated with.
+//!
+//! A table is stored in a directory containing:
+//!
+//! * `offsets.ef`: an Elias-Fano sequence of `num_nodes + 1` byte offsets in `values.bin`,
+//!   indexed by key: values of key `k` are between `offsets[k]` and `offsets[k + 1]`,
+//! * `values.bin`: for each key, its values sorted and deduplicated, each encoded as a
+//!   LEB128 varint of the difference with the previous value of the same key (or with 0
+//!   for the first one),
+//! * `meta.json`: [`AdjacencyMetadata`].
+//!
+//! Looking up a key is two Elias-Fano accesses followed by a sequential read of its values,
+//! instead of a scan of the matching Parquet pages.
+
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::path::{Path, PathBuf};
+use std::sync::Mutex;
+
+use anyhow::{anyhow, ensure, Context, Result};
+use arrow::array::{Array, AsArray};
+use arrow::datatypes::UInt64Type;
+use dsi_progress_logger::ProgressLog;
+use epserde::prelude::*;
+use mmap_rs::{Mmap, MmapFlags, MmapOptions};
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use parquet::arrow::ProjectionMask;
+use parquet::file::statistics::Statistics;
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
+use sux::prelude::elias_fano::{EfSeq, EliasFanoBuilder};
+use sux::traits::IndexedSeq;
+
+/// Incremented on every backward-incompatible change to the format
+pub const FORMAT_VERSION: u32 = 1;
+
+const OFFSETS_FILE: &str = "offsets.ef";
+const VALUES_FILE: &str = "values.bin";
+const METADATA_FILE: &str = "meta.json";
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct AdjacencyMetadata {
+    pub format_version: u32,
+    pub swh_graph_provenance_version: String,
+    /// Name of the column of the original table the keys come from
+    pub key_column: String,
+    /// Name of the column of the original table the values come from
+    pub value_column: String,
+    /// Number of keys, ie. number of nodes in the graph
+    pub num_nodes: usize,
+    /// Number of distinct (key, value) pairs
+    pub num_rows: u64,
+}
+
+/// Returns the number of bytes needed to encode `value` as a LEB128 varint
+fn varint_len(value: u64) -> usize {
+    (u64::BITS - value.leading_zeros()).div_ceil(7).max(1) as usize
+}
+
+fn write_varint(buf: &mut Vec<u8>, mut value: u64) {
+    while value >= 0x80 {
+        buf.push((value as u8) | 0x80);
+        value >>= 7;
+    }
+    buf.push(value as u8);
+}
+
+/// Writes a table in CSR format, one key at a time, by increasing order of keys
+pub struct AdjacencyWriter {
+    path: PathBuf,
+    metadata: AdjacencyMetadata,
+    offsets: EliasFanoBuilder,
+    max_offset: usize,
+    values: BufWriter<File>,
+    next_key: usize,
+    offset: usize,
+    buf: Vec<u8>,
+}
+
+impl AdjacencyWriter {
+    /// Creates a new table in the `path` directory, which must not exist yet.
+    ///
+    /// `max_num_rows` is an upper bound on the number of (key, value) pairs that will be
+    /// written, used to size the Elias-Fano sequence of offsets.
+    pub fn new(
+        path: PathBuf,
+        key_column: &str,
+        value_column: &str,
+        num_nodes: usize,
+        max_num_rows: usize,
+    ) -> Result<Self> {
+        std::fs::create_dir(&path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        let values_path = path.join(VALUES_FILE);
+        let values = File::create_new(&values_path)
+            .with_context(|| format!("Could not create {}", values_path.display()))?;
+
+        // Values are node ids, so each delta fits in as many bytes as the largest node id
+        let max_value_len = varint_len(num_nodes.saturating_sub(1) as u64);
+        let max_offset = max_num_rows
+            .checked_mul(max_value_len)
+            .context("Size of values overflowed usize")?;
+
+        Ok(AdjacencyWriter {
+            metadata: AdjacencyMetadata {
+                format_version: FORMAT_VERSION,
+                swh_graph_provenance_version: crate::VERSION.to_owned(),
+                key_column: key_column.to_owned(),
+                value_column: value_column.to_owned(),
+                num_nodes,
+                num_rows: 0,
+            },
+            path,
+            offsets: EliasFanoBuilder::new(num_nodes + 1, max_offset),
+            max_offset,
+            values: BufWriter::new(values),
+            next_key: 0,
+            offset: 0,
+            buf: Vec::new(),
+        })
+    }
+
+    /// Writes the values associated with a key.
+    ///
+    /// Keys must be pushed in strictly increasing order, and `values` must be sorted and
+    /// deduplicated. Keys which are never pushed have no values.
+    pub fn push(&mut self, key: usize, values: &[u64]) -> Result<()> {
+        ensure!(
+            key >= self.next_key,
+            "Keys must be written in increasing order, but got {key} after {}",
+            self.next_key - 1
+        );
+        ensure!(
+            key < self.metadata.num_nodes,
+            "Key {key} is not a node id (there are {} nodes)",
+            self.metadata.num_nodes
+        );
+        for _ in self.next_key..=key {
+            self.offsets.push(self.offset);
+        }
+        self.next_key = key + 1;
+
+        self.buf.clear();
+        let mut previous_value = 0;
+        for (i, &value) in values.iter().enumerate() {
+            ensure!(
+                i == 0 || value > previous_value,
+                "Values of key {key} are not sorted and deduplicated"
+            );
+            write_varint(&mut self.buf, value - previous_value);
+            previous_value = value;
+        }
+        self.values.write_all(&self.buf).with_context(|| {
+            format!(
+                "Could not write to {}",
+                self.path.join(VALUES_FILE).display()
+            )
+        })?;
+        self.offset += self.buf.len();
+        ensure!(
+            self.offset <= self.max_offset,
+            "More rows were written than announced"
+        );
+        self.metadata.num_rows += values.len() as u64;
+        Ok(())
+    }
+
+    /// Writes the offsets and metadata, and returns the latter
+    pub fn finish(mut self) -> Result<AdjacencyMetadata> {
+        // Offsets of keys after the last one, plus the end of the last key's values
+        for _ in self.next_key..=self.metadata.num_nodes {
+            self.offsets.push(self.offset);
+        }
+        self.values
+            .flush()
+            .with_context(|| format!("Could not flush {}", self.path.display()))?;
+
+        let offsets: EfSeq = self.offsets.build_with_seq();
+        let offsets_path = self.path.join(OFFSETS_FILE);
+        let mut offsets_file = BufWriter::new(
+            File::create_new(&offsets_path)
+                .with_context(|| format!("Could not create {}", offsets_path.display()))?,
+        );
+        unsafe { offsets.serialize(&mut offsets_file) }
+            .with_context(|| format!("Could not serialize {}", offsets_path.display()))?;
+        offsets_file
+            .flush()
+            .with_context(|| format!("Could not flush {}", offsets_path.display()))?;
+
+        let metadata_path = self.path.join(METADATA_FILE);
+        let metadata_file = File::create_new(&metadata_path)
+            .with_context(|| format!("Could not create {}", metadata_path.display()))?;
+        serde_json::to_writer_pretty(metadata_file, &self.metadata)
+            .with_context(|| format!("Could not write {}", metadata_path.display()))?;
+
+        Ok(self.metadata)
+    }
+}
+
+/// A table in CSR format, mmapped from disk
+pub struct Adjacency {
+    metadata: AdjacencyMetadata,
+    offsets: MemCase<DeserType<'static, EfSeq>>,
+    /// `None` if the table is empty, as empty files cannot be mmapped
+    values: Option<Mmap>,
+}
+
+impl Adjacency {
+    pub fn load(path: &Path) -> Result<Self> {
+        let metadata_path = path.join(METADATA_FILE);
+        let metadata_file = File::open(&metadata_path)
+            .with_context(|| format!("Could not open {}", metadata_path.display()))?;
+        let metadata: AdjacencyMetadata =
+            serde_json::from_reader(std::io::BufReader::new(metadata_file))
+                .with_context(|| format!("Could not parse {}", metadata_path.display()))?;
+        ensure!(
+            metadata.format_version == FORMAT_VERSION,
+            "{} has format version {}, expected {}",
+            path.display(),
+            metadata.format_version,
+            FORMAT_VERSION
+        );
+
+        let offsets_path = path.join(OFFSETS_FILE);
+        let offsets = unsafe { EfSeq::mmap(&offsets_path, Flags::RANDOM_ACCESS) }
+            .with_context(|| format!("Could not mmap {}", offsets_path.display()))?;
+        ensure!(
+            offsets.uncase().len() == metadata.num_nodes + 1,
+            "{} has {} offsets, expected {}",
+            offsets_path.display(),
+            offsets.uncase().len(),
+            metadata.num_nodes + 1
+        );
+
+        let values_path = path.join(VALUES_FILE);
+        let values_file = File::open(&values_path)
+            .with_context(|| format!("Could not open {}", values_path.display()))?;
+        let values_len = values_file
+            .metadata()
+            .with_context(|| format!("Could not stat {}", values_path.display()))?
+            .len();
+        let values_len = usize::try_from(values_len).context("values file overflowed usize")?;
+        ensure!(
+            offsets.uncase().get(metadata.num_nodes) == values_len,
+            "{} is {} bytes long, expected {}",
+            values_path.display(),
+            values_len,
+            offsets.uncase().get(metadata.num_nodes)
+        );
+        let values = if values_len == 0 {
+            None
+        } else {
+            Some(
+                unsafe {
+                    MmapOptions::new(values_len)
+                        .context("Could not initialize mmap")?
+                        .with_flags(MmapFlags::RANDOM_ACCESS)
+                        .with_file(&values_file, 0)
+                        .map()
+                }
+                .with_context(|| format!("Could not mmap {}", values_path.display()))?,
+            )
+        };
+
+        Ok(Adjacency {
+            metadata,
+            offsets,
+            values,
+        })
+    }
+
+    pub fn metadata(&self) -> &AdjacencyMetadata {
+        &self.metadata
+    }
+
+    /// Returns the values associated with the given key, in increasing order.
+    ///
+    /// Keys which are not node ids have no values.
+    pub fn values(&self, key: usize) -> AdjacencyValues<'_> {
+        let bytes = match &self.values {
+            Some(values) if key < self.metadata.num_nodes => {
+                let offsets = self.offsets.uncase();
+                &values.as_slice()[offsets.get(key)..offsets.get(key + 1)]
+            }
+            _ => &[],
+        };
+        AdjacencyValues {
+            bytes,
+            previous_value: 0,
+        }
+    }
+}
+
+/// Iterator on the values associated with a key, returned by [`Adjacency::values`]
+pub struct AdjacencyValues<'a> {
+    bytes: &'a [u8],
+    previous_value: u64,
+}
+
+impl Iterator for AdjacencyValues<'_> {
+    type Item = u64;
+
+    fn next(&mut self) -> Option<u64> {
+        if self.bytes.is_empty() {
+            return None;
+        }
+        let mut delta = 0u64;
+        let mut shift = 0;
+        loop {
+            let (&byte, rest) = self
+                .bytes
+                .split_first()
+                .expect("Truncated varint in adjacency values");
+            self.bytes = rest;
+            delta |= u64::from(byte & 0x7f) << shift;
+            if byte & 0x80 == 0 {
+                break;
+            }
+            shift += 7;
+        }
+        self.previous_value += delta;
+        Some(self.previous_value)
+    }
+}
+
+pub(crate) fn list_parquet_files(dataset_path: &Path) -> Result<Vec<PathBuf>> {
+    let mut file_paths = Vec::new();
+    for entry in std::fs::read_dir(dataset_path)
+        .with_context(|| format!("Could not list {}", dataset_path.display()))?
+    {
+        let file_path = entry
+            .with_context(|| format!("Could not read {} entry", dataset_path.display()))?
+            .path();
+        if file_path.extension().is_some_and(|ext| ext == "parquet") {
+            file_paths.push(file_path);
+        }
+    }
+    file_paths.sort();
+    Ok(file_paths)
+}
+
+/// Returns one more than the largest value of `key_column` in the Parquet table, from the
+/// statistics of its row groups, for use as `num_nodes` when the graph is not available.
+///
+/// Returns an error if any row group has no statistics for that column.
+pub fn num_keys_from_statistics(dataset_path: &Path, key_column: &str) -> Result<usize> {
+    let mut num_keys = 0;
+    for file_path in list_parquet_files(dataset_path)? {
+        let file = File::open(&file_path)
+            .with_context(|| format!("Could not open {}", file_path.display()))?;
+        let reader_builder = ParquetRecordBatchReaderBuilder::try_new(file)
+            .with_context(|| format!("Could not read {} as Parquet", file_path.display()))?;
+        let metadata = reader_builder.metadata();
+        let key_column_index = metadata
+            .file_metadata()
+            .schema_descr()
+            .columns()
+            .iter()
+            .position(|col| col.name() == key_column)
+            .ok_or_else(|| anyhow!("{} has no '{}' column", file_path.display(), key_column))?;
+        for row_group in metadata.row_groups() {
+            if row_group.num_rows() == 0 {
+                continue;
+            }
+            let max = match row_group.column(key_column_index).statistics() {
+                Some(Statistics::Int64(statistics)) => statistics.max_opt().copied(),
+                _ => None,
+            }
+            .with_context(|| {
+                format!(
+                    "{} has no statistics for '{}'",
+                    file_path.display(),
+                    key_column
+                )
+            })?;
+            // Node ids are stored as INT64 with an unsigned logical type
+            let max = usize::try_from(max as u64).context("key overflowed usize")?;
+            num_keys = num_keys.max(max + 1);
+        }
+    }
+    Ok(num_keys)
+}
+
+/// Converts a Parquet table with (at least) `key_column` and `value_column` columns of
+/// node ids into CSR format, in `output`.
+///
+/// The table does not need to be sorted. It is read `num_chunks` times, each time
+/// keeping only rows whose key is in a given range, so memory usage is proportional to
+/// the size of the table divided by `num_chunks`.
+pub fn build_from_parquet<PL: ProgressLog + Send>(
+    dataset_path: &Path,
+    key_column: &str,
+    value_column: &str,
+    num_nodes: usize,
+    num_chunks: usize,
+    output: PathBuf,
+    pl: &mut PL,
+) -> Result<AdjacencyMetadata> {
+    let file_paths = list_parquet_files(dataset_path)?;
+    let num_rows = count_rows(&file_paths)?;
+
+    let mut writer = AdjacencyWriter::new(output, key_column, value_column, num_nodes, num_rows)?;
+
+    pl.item_name("row");
+    pl.expected_updates(Some(num_rows));
+    pl.start("Converting table to CSR format");
+    let pl = Mutex::new(pl);
+
+    let chunk_size = num_nodes.div_ceil(num_chunks.max(1)).max(1);
+    for chunk_start in (0..num_nodes).step_by(chunk_size) {
+        let keys = (chunk_start as u64)..((chunk_start + chunk_size).min(num_nodes) as u64);
+        let mut rows = file_paths
+            .par_iter()
+            .map(|file_path| {
+                let rows = read_rows_in_range(file_path, key_column, value_column, &keys)?;
+                pl.lock().unwrap().update_with_count(rows.len());
+                Ok(rows)
+            })
+            .collect::<Result<Vec<_>>>()?
+            .concat();
+        rows.par_sort_unstable();
+        rows.dedup();
+
+        let mut values = Vec::new();
+        for chunk in rows.chunk_by(|(key1, _), (key2, _)| key1 == key2) {
+            let key = usize::try_from(chunk[0].0).context("key overflowed usize")?;
+            values.clear();
+            values.extend(chunk.iter().map(|&(_key, value)| value));
+            writer.push(key, &values)?;
+        }
+    }
+
+    pl.into_inner().unwrap().done();
+    writer.finish()
+}
+
+/// Returns the total number of rows in the given Parquet files, from their metadata
+pub(crate) fn count_rows(file_paths: &[PathBuf]) -> Result<usize> {
+    let mut num_rows = 0usize;
+    for file_path in file_paths {
+        let file = File::open(file_path)
+            .with_context(|| format!("Could not open {}", file_path.display()))?;
+        let reader_builder = ParquetRecordBatchReaderBuilder::try_new(file)
+            .with_context(|| format!("Could not read {} as Parquet", file_path.display()))?;
+        let file_num_rows = reader_builder.metadata().file_metadata().num_rows();
+        num_rows += usize::try_from(file_num_rows).with_context(|| {
+            format!(
+                "{} has an invalid number of rows ({})",
+                file_path.display(),
+                file_num_rows
+            )
+        })?;
+    }
+    Ok(num_rows)
+}
+
+/// Returns all (key, value) pairs in the file whose key is in the given range, skipping
+/// row groups whose statistics show they have no such key
+pub(crate) fn read_rows_in_range(
+    file_path: &Path,
+    key_column: &str,
+    value_column: &str,
+    keys: &std::ops::Range<u64>,
+) -> Result<Vec<(u64, u64)>> {
+    let mut rows = Vec::new();
+    for_each_row_in_range(file_path, key_column, value_column, keys, |key, value| {
+        rows.push((key, value))
+    })?;
+    Ok(rows)
+}
+
+/// Calls `f` on all (key, value) pairs in the file whose key is in the given range,
+/// skipping row groups whose statistics show they have no such key
+pub(crate) fn for_each_row_in_range(
+    file_path: &Path,
+    key_column: &str,
+    value_column: &str,
+    keys: &std::ops::Range<u64>,
+    mut f: impl FnMut(u64, u64),
+) -> Result<()> {
+    let file =
+        File::open(file_path).with_context(|| format!("Could not open {}", file_path.display()))?;
+    let reader_builder = ParquetRecordBatchReaderBuilder::try_new(file)
+        .with_context(|| format!("Could not read {} as Parquet", file_path.display()))?;
+    let metadata = reader_builder.metadata().clone();
+    let schema = metadata.file_metadata().schema_descr();
+    let column_index = |name: &str| {
+        schema
+            .columns()
+            .iter()
+            .position(|col| col.name() == name)
+            .ok_or_else(|| anyhow!("{} has no '{}' column", file_path.display(), name))
+    };
+    let key_column_index = column_index(key_column)?;
+    let value_column_index = column_index(value_column)?;
+
+    let row_groups: Vec<_> = metadata
+        .row_groups()
+        .iter()
+        .enumerate()
+        .filter(
+            |(_, row_group)| match row_group.column(key_column_index).statistics() {
+                // Node ids are stored as INT64 with an unsigned logical type
+                Some(Statistics::Int64(statistics)) => {
+                    match (statistics.min_opt(), statistics.max_opt()) {
+                        (Some(&min), Some(&max)) => {
+                            (min as u64) < keys.end && (max as u64) >= keys.start
+                        }
+                        _ => true,
+                    }
+                }
+                _ => true,
+            },
+        )
+        .map(|(i, _)| i)
+        .collect();
+
+    let reader = reader_builder
+        .with_projection(ProjectionMask::leaves(
+            schema,
+            [key_column_index, value_column_index],
+        ))
+        .with_row_groups(row_groups)
+        .build()
+        .with_context(|| {
+            format!(
+                "Could not create Parquet reader for {}",
+                file_path.display()
+            )
+        })?;
+
+    for batch in reader {
+        let batch =
+            batch.with_context(|| format!("Could not read batch from {}", file_path.display()))?;
+        let batch_keys = batch
+            .column_by_name(key_column)
+            .and_then(|column| column.as_primitive_opt::<UInt64Type>())
+            .with_context(|| format!("Invalid '{key_column}' column in {}", file_path.display()))?;
+        let batch_values = batch
+            .column_by_name(value_column)
+            .and_then(|column| column.as_primitive_opt::<UInt64Type>())
+            .with_context(|| {
+                format!("Invalid '{value_column}' column in {}", file_path.display())
+            })?;
+        ensure!(
+            batch_keys.null_count() == 0 && batch_values.null_count() == 0,
+            "Unexpected null key or value in {}",
+            file_path.display()
+        );
+        for (&key, &value) in std::iter::zip(batch_keys.values(), batch_values.values()) {
+            if keys.contains(&key) {
+                f(key, value);
+            }
+        }
+    }
+    Ok(())
+}
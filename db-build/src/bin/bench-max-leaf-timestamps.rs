@@ -0,0 +1,128 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::path::PathBuf;
+use std::sync::atomic::AtomicI64;
+use std::time::{Duration, Instant};
+
+use anyhow::{bail, ensure, Context, Result};
+use clap::Parser;
+use mimalloc::MiMalloc;
+use rayon::prelude::*;
+
+use swh_graph::graph::*;
+use swh_graph::mph::DynMphf;
+use swh_graph::utils::mmap::NumberMmap;
+
+use swh_provenance_db_build::filters::{load_reachable_nodes, NodeFilter};
+use swh_provenance_db_build::max_leaf_timestamps::{
+    propagate_in_topological_order, propagate_through_directories,
+};
+
+#[global_allocator]
+static GLOBAL: MiMalloc = MiMalloc;
+
+#[derive(Parser, Debug)]
+/** Runs both algorithms of list-directory-with-max-leaf-timestamp on the same graph,
+ * reports how long each of them took, and checks they return the same array.
+ */
+struct Args {
+    graph_path: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = NodeFilter::Heads)]
+    /// Subset of revisions and releases to traverse from
+    node_filter: NodeFilter,
+    #[arg(long)]
+    /// Path to the Parquet table with the node ids of all nodes reachable from
+    /// a head revision/release
+    reachable_nodes: PathBuf,
+    #[arg(long)]
+    /// Path to read the array of timestamps from
+    timestamps: PathBuf,
+    #[arg(long, default_value_t = 1)]
+    /// Number of times to run each algorithm
+    runs: usize,
+}
+
+pub fn main() -> Result<()> {
+    let args = Args::parse();
+    ensure!(args.runs > 0, "--runs must be at least 1");
+
+    env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
+
+    log::info!("Loading graph");
+    let graph = swh_graph::graph::SwhBidirectionalGraph::new(args.graph_path)
+        .context("Could not load graph")?
+        .init_properties()
+        .load_properties(|props| props.load_maps::<DynMphf>())
+        .context("Could not load maps")?;
+    log::info!("Graph loaded.");
+
+    let timestamps = NumberMmap::<byteorder::BE, i64, _>::new(&args.timestamps, graph.num_nodes())
+        .with_context(|| format!("Could not mmap {}", args.timestamps.display()))?;
+
+    let reachable_nodes = load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes)?;
+
+    let mut expected: Option<Vec<i64>> = None;
+    for name in ["dfs", "topological"] {
+        let mut durations = Vec::with_capacity(args.runs);
+        for _ in 0..args.runs {
+            let mut max_timestamps = Vec::with_capacity(graph.num_nodes());
+            max_timestamps.resize_with(graph.num_nodes(), || AtomicI64::new(i64::MIN));
+
+            let start = Instant::now();
+            match name {
+                "dfs" => propagate_through_directories(
+                    &graph,
+                    reachable_nodes.as_ref(),
+                    &timestamps,
+                    &mut max_timestamps,
+                )?,
+                _ => propagate_in_topological_order(
+                    &graph,
+                    reachable_nodes.as_ref(),
+                    &timestamps,
+                    &mut max_timestamps,
+                )?,
+            }
+            durations.push(start.elapsed());
+
+            let max_timestamps: Vec<i64> = max_timestamps
+                .into_par_iter()
+                .map(AtomicI64::into_inner)
+                .collect();
+            if expected.is_none() {
+                // First run, the others are compared to it
+                expected = Some(max_timestamps);
+                continue;
+            }
+            let expected = expected.as_ref().unwrap();
+            if let Some(node) = (0..graph.num_nodes())
+                .into_par_iter()
+                .find_first(|&node| max_timestamps[node] != expected[node])
+            {
+                bail!(
+                    "{name} returned {} for {}, expected {}",
+                    max_timestamps[node],
+                    graph.properties().swhid(node),
+                    expected[node],
+                );
+            }
+        }
+
+        durations.sort();
+        let total: Duration = durations.iter().sum();
+        log::info!(
+            "{name}: min {:?}, median {:?}, mean {:?} over {} runs",
+            durations[0],
+            durations[durations.len() / 2],
+            total / u32::try_from(durations.len()).expect("Too many runs"),
+            durations.len(),
+        );
+    }
+    log::info!("Both algorithms returned the same max timestamps.");
+
+    Ok(())
+}
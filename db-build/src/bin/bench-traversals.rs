@@ -0,0 +1,151 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::path::PathBuf;
+use std::time::{Duration, Instant};
+
+use anyhow::{ensure, Context, Result};
+use clap::{Parser, ValueEnum};
+use mimalloc::MiMalloc;
+use rayon::prelude::*;
+
+use swh_graph::graph::*;
+use swh_graph::mph::DynMphf;
+use swh_graph::NodeType;
+
+use swh_provenance_db_build::earliest_revision::find_earliest_revision_with_context;
+use swh_provenance_db_build::frontier::{backward_dfs_with_path, PathParts};
+use swh_provenance_db_build::traversal::TraversalContext;
+
+#[global_allocator]
+static GLOBAL: MiMalloc = MiMalloc;
+
+#[derive(ValueEnum, Debug, Clone, Copy, PartialEq, Eq)]
+enum Traversal {
+    /// Same traversal as find-earliest-revision
+    EarliestRevision,
+    /// Same traversal as contents-in-revisions-without-frontier, without a frontier
+    Paths,
+}
+
+#[derive(Parser, Debug)]
+/** Runs the same traversals from a sample of contents, first allocating buffers for each
+ * traversal, then reusing per-thread buffers; and reports how many traversals per second
+ * each of them ran.
+ */
+struct Args {
+    graph_path: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Traversal::EarliestRevision)]
+    /// Traversal to run from each content
+    traversal: Traversal,
+    #[arg(long, default_value_t = 100_000)]
+    /// Number of contents to traverse from
+    num_roots: usize,
+    #[arg(long, default_value_t = 1)]
+    /// Number of times to run each variant
+    runs: usize,
+}
+
+pub fn main() -> Result<()> {
+    let args = Args::parse();
+    ensure!(args.runs > 0, "--runs must be at least 1");
+
+    env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
+
+    log::info!("Loading graph");
+    let graph = swh_graph::graph::SwhBidirectionalGraph::new(&args.graph_path)
+        .context("Could not load graph")?
+        .load_backward_labels()
+        .context("Could not load labels")?
+        .init_properties()
+        .load_properties(|props| props.load_label_names())
+        .context("Could not load label names")?
+        .load_properties(|props| props.load_maps::<DynMphf>())
+        .context("Could not load maps")?
+        .load_properties(|props| props.load_timestamps())
+        .context("Could not load timestamps")?;
+    log::info!("Graph loaded.");
+
+    // Evenly spread over the graph, so the sample is the same for both variants and
+    // across runs
+    let step = usize::max(1, graph.num_nodes() / args.num_roots);
+    let roots: Vec<NodeId> = (0..graph.num_nodes())
+        .into_par_iter()
+        .step_by(step)
+        .filter(|&node| graph.properties().node_type(node) == NodeType::Content)
+        .collect();
+    log::info!("Traversing from {} contents", roots.len());
+
+    // Returns a value depending on the traversal's result, so both variants can be compared
+    let traverse = |ctx: &mut TraversalContext, root: NodeId| -> Result<u64> {
+        match args.traversal {
+            Traversal::EarliestRevision => {
+                Ok(find_earliest_revision_with_context(&graph, ctx, root)
+                    .map(|earliest| earliest.rev_occurrences)
+                    .unwrap_or(0))
+            }
+            Traversal::Paths => {
+                let mut path_lengths = 0u64;
+                backward_dfs_with_path(
+                    &graph,
+                    ctx,
+                    None,
+                    |_dir, _path_parts: PathParts| Ok(true),
+                    |_revrel, path_parts: PathParts| {
+                        path_lengths += path_parts.build_path(&graph).len() as u64;
+                        Ok(())
+                    },
+                    root,
+                )?;
+                Ok(path_lengths)
+            }
+        }
+    };
+
+    let mut expected: Option<u64> = None;
+    for variant in ["fresh", "reused"] {
+        let mut durations = Vec::with_capacity(args.runs);
+        for _ in 0..args.runs {
+            let start = Instant::now();
+            let checksum: u64 = match variant {
+                "fresh" => roots
+                    .par_iter()
+                    .map(|&root| traverse(&mut TraversalContext::new(graph.num_nodes()), root))
+                    .try_reduce(|| 0, |a, b| Ok(a.wrapping_add(b)))?,
+                _ => roots
+                    .par_iter()
+                    .map_init(
+                        || TraversalContext::new(graph.num_nodes()),
+                        |ctx, &root| traverse(ctx, root),
+                    )
+                    .try_reduce(|| 0, |a, b| Ok(a.wrapping_add(b)))?,
+            };
+            durations.push(start.elapsed());
+
+            match expected {
+                None => expected = Some(checksum),
+                Some(expected) => ensure!(
+                    checksum == expected,
+                    "{variant} traversals returned {checksum}, expected {expected}"
+                ),
+            }
+        }
+
+        durations.sort();
+        let total: Duration = durations.iter().sum();
+        let mean = total / u32::try_from(durations.len()).expect("Too many runs");
+        log::info!(
+            "{variant}: {:.0} roots/s (min {:?}, median {:?}, mean {:?} over {} runs)",
+            roots.len() as f64 / durations[0].as_secs_f64(),
+            durations[0],
+            durations[durations.len() / 2],
+            mean,
+            durations.len(),
+        );
+    }
+
+    Ok(())
+}
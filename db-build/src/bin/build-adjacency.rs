@@ -0,0 +1,64 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::path::PathBuf;
+
+use anyhow::{Context, Result};
+use clap::Parser;
+use dsi_progress_logger::{progress_logger, ProgressLog};
+use mimalloc::MiMalloc;
+use swh_graph::graph::SwhGraph;
+
+#[global_allocator]
+static GLOBAL: MiMalloc = MiMalloc;
+
+#[derive(Parser, Debug)]
+/** Given a Parquet table mapping node ids to node ids (eg. frontier_directories_in_revisions
+ * or revisions_in_origins), writes it in compressed sparse row format, which the server
+ * can mmap and query without scanning Parquet pages.
+ */
+struct Args {
+    graph_path: PathBuf,
+    #[arg(long)]
+    /// Path to the directory of .parquet files to read
+    table: PathBuf,
+    #[arg(long)]
+    /// Name of the column with the keys, eg. 'dir' or 'revrel'
+    key_column: String,
+    #[arg(long)]
+    /// Name of the column with the values, eg. 'revrel' or 'ori'
+    value_column: String,
+    #[arg(long, default_value_t = 1)]
+    /// Number of passes over the table; memory usage is inversely proportional to it.
+    num_chunks: usize,
+    #[arg(long)]
+    /// Path to the directory to create and write the table to
+    out: PathBuf,
+}
+
+pub fn main() -> Result<()> {
+    let args = Args::parse();
+
+    env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
+
+    log::info!("Loading graph");
+    let graph = swh_graph::graph::SwhUnidirectionalGraph::new(args.graph_path)
+        .context("Could not load graph")?;
+    log::info!("Graph loaded.");
+
+    let mut pl = progress_logger!(display_memory = true, local_speed = true);
+    let metadata = swh_provenance_db_build::adjacency::build_from_parquet(
+        &args.table,
+        &args.key_column,
+        &args.value_column,
+        graph.num_nodes(),
+        args.num_chunks,
+        args.out,
+        &mut pl,
+    )?;
+    log::info!("Wrote {} rows", metadata.num_rows);
+
+    Ok(())
+}
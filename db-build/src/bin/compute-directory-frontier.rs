@@ -3,12 +3,13 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
+use std::fs::File;
 use std::path::PathBuf;
 use std::sync::atomic::Ordering;
 use std::sync::Arc;
 
 use anyhow::{Context, Result};
-use clap::Parser;
+use clap::{Parser, ValueEnum};
 use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
 use mimalloc::MiMalloc;
 use rayon::prelude::*;
@@ -21,20 +22,35 @@ use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 use swh_graph::utils::mmap::NumberMmap;
 use swh_graph::NodeType;
-use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
 
 use swh_provenance_db_build::filters::{is_root_revrel, NodeFilter};
+use swh_provenance_db_build::frontier_cost::{
+    estimate_table_sizes, select_frontiers, ContentCounts, TableSizes,
+};
 use swh_provenance_db_build::frontier_set::{schema, to_parquet, writer_properties};
+use swh_provenance_db_build::traversal::TraversalContext;
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
 
+#[derive(ValueEnum, Debug, Clone, Copy, PartialEq, Eq, serde::Serialize)]
+#[serde(rename_all = "lowercase")]
+enum Selection {
+    /// A directory is a frontier if it directly contains a content, and all its contents
+    /// are older than a revision/release containing it
+    Heuristic,
+    /// A directory is a frontier if it saves more rows than it adds, estimated from its
+    /// number of contents and of revisions/releases reaching it
+    Cost,
+}
+
 #[derive(Parser, Debug)]
 /** Given as input a binary file with, for each directory, the newest date of first
  * occurrence of any of the content in its subtree (well, DAG), ie.,
  * max_{for all content} (min_{for all occurrence of content} occurrence).
  * Produces a boolean vector, indicating for each directory if it is part of the
  * "provenance frontier", [as defined in swh-provenance](https://gitlab.softwareheritage.org/swh/devel/swh-provenance/-/blob/ae09086a3bd45c7edbc22691945b9d61200ec3c2/swh/provenance/algos/revision.py#L210)
+ * or, with `--selection cost`, by the cost model of `swh_provenance_db_build::frontier_cost`.
  */
 struct Args {
     graph_path: PathBuf,
@@ -52,6 +68,28 @@ struct Args {
     #[arg(long)]
     /// Path to a directory where to write the bitvec of frontier-ness
     directories_out: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Selection::Heuristic)]
+    /// How to pick frontier directories
+    selection: Selection,
+    #[arg(long, default_value_t = 0.)]
+    /// With `--selection cost`, cost of joining a row of contents_in_frontier_directories
+    /// with frontier_directories_in_revisions, relative to the cost of reading a row.
+    /// 0 minimizes the total number of rows; higher values pick fewer, larger frontiers.
+    join_cost: f64,
+    #[arg(long)]
+    /// Path to a JSON file where to write the estimated number of rows of each table,
+    /// with frontiers picked by both the heuristic and the cost model
+    report_out: Option<PathBuf>,
+}
+
+/// Estimated sizes of tables built from frontiers picked by each [`Selection`]
+#[derive(Debug, serde::Serialize)]
+struct Report {
+    selection: Selection,
+    join_cost: f64,
+    heuristic: TableSizes,
+    cost: TableSizes,
 }
 
 pub fn main() -> Result<()> {
@@ -79,7 +117,55 @@ pub fn main() -> Result<()> {
     )?;
     dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
 
-    let frontiers = find_frontiers(&graph, &max_timestamps, args.node_filter)?;
+    let content_counts = (args.selection == Selection::Cost || args.report_out.is_some())
+        .then(|| ContentCounts::new(&graph));
+    let select = |selection| match selection {
+        Selection::Heuristic => find_frontiers(&graph, &max_timestamps, args.node_filter),
+        Selection::Cost => select_frontiers(
+            &graph,
+            content_counts.as_ref().expect("Contents were not counted"),
+            args.node_filter,
+            args.join_cost,
+        ),
+    };
+    let frontiers = select(args.selection)?;
+
+    if let Some(report_out) = &args.report_out {
+        let content_counts = content_counts.as_ref().expect("Contents were not counted");
+        let other_selection = match args.selection {
+            Selection::Heuristic => Selection::Cost,
+            Selection::Cost => Selection::Heuristic,
+        };
+        let other_frontiers = select(other_selection)?;
+        let sizes = estimate_table_sizes(&graph, content_counts, args.node_filter, &frontiers)?;
+        let other_sizes =
+            estimate_table_sizes(&graph, content_counts, args.node_filter, &other_frontiers)?;
+        let (heuristic, cost) = match args.selection {
+            Selection::Heuristic => (sizes, other_sizes),
+            Selection::Cost => (other_sizes, sizes),
+        };
+        log::info!(
+            "Estimated rows with the heuristic: {} ({:?})",
+            heuristic.total(),
+            heuristic
+        );
+        log::info!(
+            "Estimated rows with the cost model: {} ({:?})",
+            cost.total(),
+            cost
+        );
+        let report = Report {
+            selection: args.selection,
+            join_cost: args.join_cost,
+            heuristic,
+            cost,
+        };
+        let file = File::create(report_out)
+            .with_context(|| format!("Could not create {}", report_out.display()))?;
+        serde_json::to_writer_pretty(file, &report)
+            .with_context(|| format!("Could not write {}", report_out.display()))?;
+    }
+    drop(content_counts);
 
     let mut pl = concurrent_progress_logger!(
         item_name = "node",
@@ -115,9 +201,9 @@ where
         expected_updates = Some(graph.num_nodes()),
     );
     pl.start("[step 1/2] Visiting revisions' directories...");
-    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
-        pl.clone(),
-        |thread_pl, root| -> Result<()> {
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_init(
+        || (TraversalContext::new(graph.num_nodes()), pl.clone()),
+        |(ctx, thread_pl), root| -> Result<()> {
             if is_root_revrel(graph, node_filter, root) {
                 if let Some(root_dir) = swh_graph_stdlib::find_root_dir(graph, root)
                     .context("Could not pick root directory")?
@@ -126,6 +212,7 @@ where
                         graph,
                         max_timestamps,
                         &frontiers,
+                        ctx,
                         root,
                         root_dir,
                     )?;
@@ -147,6 +234,7 @@ fn find_frontiers_in_root_directory<G>(
     graph: &G,
     max_timestamps: impl SliceByValue<Value = i64>,
     frontiers: &AtomicBitVec,
+    ctx: &mut TraversalContext,
     revrel_id: NodeId,
     root_dir_id: NodeId,
 ) -> Result<()>
@@ -179,8 +267,9 @@ where
         false
     };
 
-    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
-    let mut stack = vec![root_dir_id]; // The root dir itself cannot be a frontier
+    ctx.clear();
+    let TraversalContext { visited, stack, .. } = ctx;
+    stack.push(root_dir_id); // The root dir itself cannot be a frontier
 
     while let Some(node) = stack.pop() {
         for succ in graph.successors(node) {
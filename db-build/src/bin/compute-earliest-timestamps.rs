@@ -9,33 +9,40 @@
 //!
 //! 1. Initialize an array of timestamps (as AtomicI64), one for each node, to the maximum
 //!    timestamp
-//! 2. For each revision/release (in parallel):
-//!    1. Get its author date (if none, skip the revision/release)
-//!    2. traverse all contents and directories contained by that revision/release.
-//!       For each content/directory, atomically set the timestamp to the
-//!       current rev/rel's timestamp if it is lower than the existing one
-//! 3. Write the array
+//! 2. With `--algorithm ordered`, list revisions/releases with an author date, and sort
+//!    them by author date
+//! 3. Traverse contents and directories of each revision/release, see
+//!    [`swh_provenance_db_build::earliest_timestamps`]
+//! 4. Write the array
 #![allow(non_snake_case)]
 use std::io::Write;
 use std::path::PathBuf;
 use std::sync::atomic::{AtomicI64, Ordering};
 
 use anyhow::{Context, Result};
-use clap::Parser;
+use clap::{Parser, ValueEnum};
 use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
 use mimalloc::MiMalloc;
 use rayon::prelude::*;
 
 use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
-use swh_graph::NodeType;
-use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
 
-use swh_provenance_db_build::filters::{is_root_revrel, NodeFilter};
+use swh_provenance_db_build::earliest_timestamps::*;
+use swh_provenance_db_build::filters::NodeFilter;
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
 
+#[derive(ValueEnum, Debug, Clone, Copy)]
+enum Algorithm {
+    /// Traverse all contents and directories of every revision/release
+    PerRevision,
+    /// Traverse revisions/releases by increasing author date, and stop at nodes already
+    /// reached by an older one
+    Ordered,
+}
+
 #[derive(Parser, Debug)]
 /// Returns a directory of CSV files with header 'author_date,revrel_SWHID,cntdir_SWHID'
 /// and a row for each of the contents and directories with the earliest revision/release
@@ -49,6 +56,14 @@ struct Args {
     #[arg(long)]
     /// Path to write the array of timestamps to
     timestamps_out: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Algorithm::PerRevision)]
+    /// How to traverse revisions/releases
+    algorithm: Algorithm,
+    #[arg(long, default_value_t = 100_000)]
+    /// With `--algorithm ordered`, number of consecutive revisions/releases traversed in
+    /// parallel. Larger buckets use threads better, but claim more nodes several times.
+    bucket_size: usize,
 }
 
 pub fn main() -> Result<()> {
@@ -74,24 +89,28 @@ pub fn main() -> Result<()> {
     let mut timestamps_file = std::fs::File::create(&args.timestamps_out)
         .with_context(|| format!("Could not create {}", &args.timestamps_out.display()))?;
 
-    let mut pl = concurrent_progress_logger!(
-        item_name = "node",
-        display_memory = true,
-        local_speed = true,
-        expected_updates = Some(graph.num_nodes()),
-    );
-    pl.start("[step 1/3] Computing first occurrence date of each content...");
-
-    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
-        pl.clone(),
-        |thread_pl, revrel| -> Result<_> {
-            mark_reachable_contents(&graph, &timestamps, revrel, args.node_filter)?;
-            thread_pl.light_update();
-            Ok(())
-        },
-    )?;
+    let num_steps = match args.algorithm {
+        Algorithm::PerRevision => 3,
+        Algorithm::Ordered => 4,
+    };
+    let mut step = 0;
+    let mut next_step = || {
+        step += 1;
+        format!("[step {step}/{num_steps}]")
+    };
 
-    pl.done();
+    match args.algorithm {
+        Algorithm::PerRevision => {
+            log::info!("{} Traversing revisions and releases", next_step());
+            mark_all_reachable_contents(&graph, &timestamps, args.node_filter)?;
+        }
+        Algorithm::Ordered => {
+            log::info!("{} Listing and sorting revisions and releases", next_step());
+            let revrels = list_dated_revrels(&graph, args.node_filter);
+            log::info!("{} Traversing revisions and releases by date", next_step());
+            mark_reachable_contents_in_order(&graph, &timestamps, &revrels, args.bucket_size);
+        }
+    }
 
     let mut pl = concurrent_progress_logger!(
         item_name = "node",
@@ -99,7 +118,10 @@ pub fn main() -> Result<()> {
         local_speed = true,
         expected_updates = Some(graph.num_nodes()),
     );
-    pl.start("[step 2/3] Converting timestamps to big-endian");
+    pl.start(format!(
+        "{} Converting timestamps to big-endian",
+        next_step()
+    ));
     let mut timestamps_be = Vec::with_capacity(graph.num_nodes());
     timestamps
         .into_par_iter()
@@ -115,57 +137,10 @@ pub fn main() -> Result<()> {
         .collect_into_vec(&mut timestamps_be);
     pl.done();
 
-    log::info!("[step 3/3] Writing {}", args.timestamps_out.display());
+    log::info!("{} Writing {}", next_step(), args.timestamps_out.display());
     timestamps_file
         .write_all(bytemuck::cast_slice(&timestamps_be))
         .with_context(|| format!("Could not write to {}", args.timestamps_out.display()))?;
 
     Ok(())
 }
-
-/// Mark any content reachable from the root `revrel` as having a first occurrence
-/// older or equal to this revision
-fn mark_reachable_contents<G>(
-    graph: &G,
-    timestamps: &[AtomicI64],
-    revrel: NodeId,
-    node_filter: NodeFilter,
-) -> Result<()>
-where
-    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties,
-    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
-    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
-{
-    if !is_root_revrel(graph, node_filter, revrel) {
-        return Ok(());
-    }
-
-    let Some(revrel_timestamp) = graph.properties().author_timestamp(revrel) else {
-        // Revision/release has no date, ignore it
-        return Ok(());
-    };
-
-    let mut stack = vec![revrel];
-    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
-
-    while let Some(node) = stack.pop() {
-        match graph.properties().node_type(node) {
-            NodeType::Content | NodeType::Directory => {
-                timestamps[node].fetch_min(revrel_timestamp, Ordering::Relaxed);
-            }
-            _ => (),
-        }
-
-        for succ in graph.successors(node) {
-            match graph.properties().node_type(succ) {
-                NodeType::Directory | NodeType::Content if !visited.contains(succ) => {
-                    stack.push(succ);
-                    visited.insert(succ);
-                }
-                _ => (),
-            }
-        }
-    }
-
-    Ok(())
-}
@@ -7,19 +7,40 @@ use std::path::PathBuf;
 use std::sync::Arc;
 
 use anyhow::{Context, Result};
-use clap::Parser;
+use clap::{Parser, ValueEnum};
 use dsi_progress_logger::{progress_logger, ProgressLog};
 use mimalloc::MiMalloc;
 
+use arrow::array::{BinaryBuilder, UInt64Builder};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use sux::prelude::BitVec;
+use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 
+use swh_provenance_db_build::contents_in_directories::{
+    write_contents_from_directories, write_directories_from_contents,
+};
 use swh_provenance_db_build::filters::NodeFilter;
-use swh_provenance_db_build::x_in_y_dataset::{cnt_in_dir_schema, cnt_in_dir_writer_properties};
+use swh_provenance_db_build::key_index::KeyIndexBuilder;
+use swh_provenance_db_build::key_ranges::{key_range_paths, sort_key_ranges, KeyRangeWriters};
+use swh_provenance_db_build::paths::{PathInterner, PathNamespace};
+use swh_provenance_db_build::x_in_y_dataset::{
+    cnt_in_dir_schema, cnt_in_dir_writer_properties, without_bloom_filters, CntInDirTableBuilder,
+    PathColumnBuilder,
+};
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
 
+#[derive(ValueEnum, Debug, Clone, Copy)]
+enum Algorithm {
+    /// Traverse backward from every content reachable from a frontier directory,
+    /// with backward labels
+    Backward,
+    /// Traverse forward from every frontier directory, with forward labels
+    Forward,
+}
+
 #[derive(Parser, Debug)]
 /** Given as input a binary file with, for each directory, the newest date of first
  * occurrence of any of the content in its subtree (well, DAG), ie.,
@@ -33,6 +54,10 @@ struct Args {
     /// Maximum number of bytes in a thread's output Parquet buffer,
     /// before it is flushed to disk
     thread_buffer_size: Option<usize>,
+    #[arg(long)]
+    /// Do not write Parquet Bloom filters, for databases queried through the key filters
+    /// built by swh-provenance-index instead
+    disable_bloom_filters: bool,
     #[arg(value_enum)]
     #[arg(long, default_value_t = NodeFilter::Heads)]
     /// Subset of revisions and releases to traverse from
@@ -40,9 +65,28 @@ struct Args {
     #[arg(long)]
     /// Path to the Parquet table with the node ids of frontier directories
     frontier_directories: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Algorithm::Backward)]
+    /// How to find contents in frontier directories
+    algorithm: Algorithm,
     #[arg(long)]
     /// Path to a directory where to write .parquet results to
     contents_out: PathBuf,
+    #[arg(long)]
+    /// Directory where to write the Elias-Fano index of the 'cnt' column of each
+    /// Parquet file, so swh-provenance-index does not need to read the table to build it.
+    /// This is the table's directory in swh-provenance-index's --indexes.
+    key_indexes_out: Option<PathBuf>,
+    #[arg(long, default_value_t = 0)]
+    /// Number of ranges of 'cnt' values to split the table into, so each Parquet file
+    /// covers a disjoint range and is sorted by 'cnt'. Rows are first written to an
+    /// unsorted dataset per range, next to the output directory, then each range is sorted
+    /// in memory. 0 writes files in traversal order instead.
+    key_ranges: usize,
+    #[arg(long)]
+    /// Directory of the table of paths, where to write the paths of this table. The table
+    /// then has a 'path_id' column, referring to this table, instead of a 'path' column.
+    paths_out: Option<PathBuf>,
 }
 
 pub fn main() -> Result<()> {
@@ -51,17 +95,105 @@ pub fn main() -> Result<()> {
     env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
 
     log::info!("Loading graph");
-    let graph = swh_graph::graph::SwhBidirectionalGraph::new(args.graph_path)
-        .context("Could not load graph")?
-        .load_backward_labels()
-        .context("Could not load labels")?
-        .init_properties()
-        .load_properties(|props| props.load_label_names())
-        .context("Could not load label names")?
-        .load_properties(|props| props.load_maps::<DynMphf>())
-        .context("Could not load maps")?;
-    log::info!("Graph loaded.");
+    match args.algorithm {
+        Algorithm::Backward => {
+            let graph = swh_graph::graph::SwhBidirectionalGraph::new(&args.graph_path)
+                .context("Could not load graph")?
+                .load_backward_labels()
+                .context("Could not load labels")?
+                .init_properties()
+                .load_properties(|props| props.load_label_names())
+                .context("Could not load label names")?
+                .load_properties(|props| props.load_maps::<DynMphf>())
+                .context("Could not load maps")?;
+            log::info!("Graph loaded.");
+            write_tables::<_, Backward>(&args, &graph)
+        }
+        Algorithm::Forward => {
+            let graph = swh_graph::graph::SwhUnidirectionalGraph::new(&args.graph_path)
+                .context("Could not load graph")?
+                .load_labels()
+                .context("Could not load labels")?
+                .init_properties()
+                .load_properties(|props| props.load_label_names())
+                .context("Could not load label names")?
+                .load_properties(|props| props.load_maps::<DynMphf>())
+                .context("Could not load maps")?;
+            log::info!("Graph loaded.");
+            write_tables::<_, Forward>(&args, &graph)
+        }
+    }
+}
+
+/// Writes the rows of the table, with the graph loaded for an [`Algorithm`]
+trait WriteRows<G> {
+    fn write_rows<P: PathColumnBuilder>(
+        graph: &G,
+        frontier_directories: &BitVec,
+        dataset_writers: KeyRangeWriters<
+            ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<P>>>,
+        >,
+        paths: &P::Paths,
+        key_index: Option<&KeyIndexBuilder>,
+    ) -> Result<()>;
+}
+
+struct Backward;
+
+impl<G> WriteRows<G> for Backward
+where
+    G: SwhForwardGraph + SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    fn write_rows<P: PathColumnBuilder>(
+        graph: &G,
+        frontier_directories: &BitVec,
+        dataset_writers: KeyRangeWriters<
+            ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<P>>>,
+        >,
+        paths: &P::Paths,
+        key_index: Option<&KeyIndexBuilder>,
+    ) -> Result<()> {
+        write_directories_from_contents(
+            graph,
+            frontier_directories,
+            dataset_writers,
+            paths,
+            key_index,
+        )
+    }
+}
+
+struct Forward;
 
+impl<G> WriteRows<G> for Forward
+where
+    G: SwhLabeledForwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    fn write_rows<P: PathColumnBuilder>(
+        graph: &G,
+        frontier_directories: &BitVec,
+        dataset_writers: KeyRangeWriters<
+            ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<P>>>,
+        >,
+        paths: &P::Paths,
+        key_index: Option<&KeyIndexBuilder>,
+    ) -> Result<()> {
+        write_contents_from_directories(
+            graph,
+            frontier_directories,
+            dataset_writers,
+            paths,
+            key_index,
+        )
+    }
+}
+
+/// Loads frontier directories, and writes the table and the table of paths
+fn write_tables<G: SwhGraph + Sync, W: WriteRows<G>>(args: &Args, graph: &G) -> Result<()> {
     let mut pl = progress_logger!(
         item_name = "node",
         display_memory = true,
@@ -69,24 +201,104 @@ pub fn main() -> Result<()> {
     );
     pl.start("Loading frontier directories...");
     let frontier_directories = swh_provenance_db_build::frontier_set::from_parquet(
-        &graph,
-        args.frontier_directories,
+        graph,
+        args.frontier_directories.clone(),
         &mut pl,
     )?;
     pl.done();
 
-    let mut dataset_writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(
-        args.contents_out,
-        (
-            Arc::new(cnt_in_dir_schema()),
-            cnt_in_dir_writer_properties(&graph).build(),
-        ),
-    )?;
+    match &args.paths_out {
+        None => write_table::<_, W, BinaryBuilder>(args, graph, &frontier_directories, &()),
+        Some(paths_out) => {
+            let paths = PathInterner::new(PathNamespace::ContentsInFrontierDirectories);
+            write_table::<_, W, UInt64Builder>(args, graph, &frontier_directories, &paths)?;
+            log::info!("Writing {} paths", paths.len());
+            paths
+                .write(graph, paths_out)
+                .context("Could not write paths")?;
+            Ok(())
+        }
+    }
+}
+
+/// Writes the table, with paths written by `P` (see [`PathColumnBuilder`])
+fn write_table<G: SwhGraph, W: WriteRows<G>, P: PathColumnBuilder>(
+    args: &Args,
+    graph: &G,
+    frontier_directories: &BitVec,
+    paths: &P::Paths,
+) -> Result<()> {
+    let schema = Arc::new(P::table_schema(cnt_in_dir_schema()));
+    let mut writer_properties = P::writer_properties(cnt_in_dir_writer_properties(graph));
+    if args.disable_bloom_filters {
+        writer_properties = without_bloom_filters(writer_properties, &schema);
+    }
+    let writer_properties = writer_properties.build();
+
+    if args.key_ranges > 0 {
+        let spill_path = args.contents_out.with_extension("unsorted");
+        let range_paths = key_range_paths(&spill_path, args.key_ranges);
+        let dataset_writers = range_paths
+            .iter()
+            .map(|range_path| {
+                let mut dataset_writer = ParallelDatasetWriter::<
+                    ParquetTableWriter<CntInDirTableBuilder<P>>,
+                >::with_schema(
+                    range_path.clone(),
+                    (schema.clone(), writer_properties.clone()),
+                )?;
+                dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
+                Ok(dataset_writer)
+            })
+            .collect::<Result<Vec<_>>>()?;
+
+        W::write_rows(
+            graph,
+            frontier_directories,
+            KeyRangeWriters::new(dataset_writers, graph.num_nodes()),
+            paths,
+            None, // key index, written by sort_key_ranges instead
+        )?;
+
+        sort_key_ranges(
+            &range_paths,
+            "cnt",
+            schema,
+            &writer_properties,
+            &args.contents_out,
+            args.key_indexes_out.as_deref(),
+        )?;
+        std::fs::remove_dir(&spill_path)
+            .with_context(|| format!("Could not remove {}", spill_path.display()))?;
+        return Ok(());
+    }
+
+    let mut dataset_writer =
+        ParallelDatasetWriter::<ParquetTableWriter<CntInDirTableBuilder<P>>>::with_schema(
+            args.contents_out.clone(),
+            (schema, writer_properties),
+        )?;
     dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
 
-    swh_provenance_db_build::contents_in_directories::write_directories_from_contents(
-        &graph,
-        &frontier_directories,
-        dataset_writer,
-    )
+    let key_index = args
+        .key_indexes_out
+        .as_ref()
+        .map(|_| KeyIndexBuilder::new());
+    W::write_rows(
+        graph,
+        frontier_directories,
+        dataset_writer.into(),
+        paths,
+        key_index.as_ref(),
+    )?;
+
+    if let (Some(key_index), Some(key_indexes_out)) = (key_index, &args.key_indexes_out) {
+        log::info!("Writing key indexes");
+        let num_files = key_index
+            .write(&args.contents_out, "cnt", key_indexes_out)
+            .context("Could not write key indexes")?;
+        log::info!("Wrote key indexes of {num_files} files");
+    }
+
+    Ok(())
 }
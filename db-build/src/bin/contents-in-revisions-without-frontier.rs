@@ -7,21 +7,37 @@ use std::path::PathBuf;
 use std::sync::Arc;
 
 use anyhow::{Context, Result};
-use clap::Parser;
+use clap::{Parser, ValueEnum};
 use dsi_progress_logger::{progress_logger, ProgressLog};
 use mimalloc::MiMalloc;
 
+use arrow::array::{BinaryBuilder, UInt64Builder};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use sux::prelude::BitVec;
+use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 
 use swh_provenance_db_build::filters::{load_reachable_nodes, NodeFilter};
+use swh_provenance_db_build::key_index::KeyIndexBuilder;
+use swh_provenance_db_build::paths::{PathInterner, PathNamespace};
+use swh_provenance_db_build::revrel_sets::RevrelSets;
 use swh_provenance_db_build::x_in_y_dataset::{
-    cnt_in_revrel_schema, cnt_in_revrel_writer_properties,
+    cnt_in_revrel_schema, cnt_in_revrel_writer_properties, without_bloom_filters,
+    CntInRevrelTableBuilder, PathColumnBuilder,
 };
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
 
+#[derive(ValueEnum, Debug, Clone, Copy)]
+enum Algorithm {
+    /// Traverse backward from every content, up to frontier directories
+    Dfs,
+    /// Compute the revisions/releases of each directory once, from those of its parents,
+    /// then those of each content from those of its parents
+    Memoised,
+}
+
 #[derive(Parser, Debug)]
 /** Given a Parquet table with the node ids of every frontier directory.
  * Produces the list of contents reachable from each revision, without any going through
@@ -33,6 +49,10 @@ struct Args {
     /// Maximum number of bytes in a thread's output Parquet buffer,
     /// before it is flushed to disk
     thread_buffer_size: Option<usize>,
+    #[arg(long)]
+    /// Do not write Parquet Bloom filters, for databases queried through the key filters
+    /// built by swh-provenance-index instead
+    disable_bloom_filters: bool,
     #[arg(value_enum)]
     #[arg(long, default_value_t = NodeFilter::Heads)]
     /// Subset of revisions and releases to traverse from
@@ -47,6 +67,23 @@ struct Args {
     #[arg(long)]
     /// Path to a directory where to write .parquet results to
     contents_out: PathBuf,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Algorithm::Dfs)]
+    /// How to find revisions/releases of contents
+    algorithm: Algorithm,
+    #[arg(long, default_value_t = 1 << 34)]
+    /// With --algorithm memoised, maximum number of bytes of sets of revisions/releases
+    /// kept in memory. Larger sets are spilled to a file next to the output directory.
+    revrel_sets_buffer_size: usize,
+    #[arg(long)]
+    /// Directory where to write the Elias-Fano index of the 'cnt' column of each
+    /// Parquet file, so swh-provenance-index does not need to read the table to build it.
+    /// This is the table's directory in swh-provenance-index's --indexes.
+    key_indexes_out: Option<PathBuf>,
+    #[arg(long)]
+    /// Directory of the table of paths, where to write the paths of this table. The table
+    /// then has a 'path_id' column, referring to this table, instead of a 'path' column.
+    paths_out: Option<PathBuf>,
 }
 
 pub fn main() -> Result<()> {
@@ -55,7 +92,7 @@ pub fn main() -> Result<()> {
     env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
 
     log::info!("Loading graph");
-    let graph = swh_graph::graph::SwhBidirectionalGraph::new(args.graph_path)
+    let graph = swh_graph::graph::SwhBidirectionalGraph::new(&args.graph_path)
         .context("Could not load graph")?
         .load_backward_labels()
         .context("Could not load labels")?
@@ -76,27 +113,115 @@ pub fn main() -> Result<()> {
     pl.start("Loading frontier directories...");
     let frontier_directories = swh_provenance_db_build::frontier_set::from_parquet(
         &graph,
-        args.frontier_directories,
+        args.frontier_directories.clone(),
         &mut pl,
     )?;
     pl.done();
 
-    let reachable_nodes = load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes)?;
+    let reachable_nodes =
+        load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes.clone())?;
 
-    let mut dataset_writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(
-        args.contents_out,
-        (
-            Arc::new(cnt_in_revrel_schema()),
-            cnt_in_revrel_writer_properties(&graph).build(),
+    match &args.paths_out {
+        None => write_table::<_, BinaryBuilder>(
+            &args,
+            &graph,
+            reachable_nodes.as_ref(),
+            &frontier_directories,
+            &(),
         ),
-    )?;
+        Some(paths_out) => {
+            let paths = PathInterner::new(PathNamespace::ContentsInRevisionsWithoutFrontiers);
+            write_table::<_, UInt64Builder>(
+                &args,
+                &graph,
+                reachable_nodes.as_ref(),
+                &frontier_directories,
+                &paths,
+            )?;
+            log::info!("Writing {} paths", paths.len());
+            paths
+                .write(&graph, paths_out)
+                .context("Could not write paths")?;
+            Ok(())
+        }
+    }
+}
+
+/// Writes the table, with paths written by `P` (see [`PathColumnBuilder`])
+fn write_table<G, P: PathColumnBuilder>(
+    args: &Args,
+    graph: &G,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    paths: &P::Paths,
+) -> Result<()>
+where
+    G: SwhForwardGraph + SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let schema = Arc::new(P::table_schema(cnt_in_revrel_schema()));
+    let mut writer_properties = P::writer_properties(cnt_in_revrel_writer_properties(graph));
+    if args.disable_bloom_filters {
+        writer_properties = without_bloom_filters(writer_properties, &schema);
+    }
+    let mut dataset_writer =
+        ParallelDatasetWriter::<ParquetTableWriter<CntInRevrelTableBuilder<P>>>::with_schema(
+            args.contents_out.clone(),
+            (schema, writer_properties.build()),
+        )?;
     dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
 
-    swh_provenance_db_build::contents_in_revisions::write_revisions_from_contents(
-        &graph,
-        args.node_filter,
-        reachable_nodes.as_ref(),
-        &frontier_directories,
-        dataset_writer,
-    )
+    let key_index = args
+        .key_indexes_out
+        .as_ref()
+        .map(|_| KeyIndexBuilder::new());
+    match args.algorithm {
+        Algorithm::Dfs => {
+            swh_provenance_db_build::contents_in_revisions::write_revisions_from_contents(
+                graph,
+                args.node_filter,
+                reachable_nodes,
+                frontier_directories,
+                dataset_writer,
+                paths,
+                key_index.as_ref(),
+            )?
+        }
+        Algorithm::Memoised => {
+            let mut revrel_sets = RevrelSets::new(
+                graph.num_nodes(),
+                args.contents_out.with_extension("revrel_sets"),
+                args.revrel_sets_buffer_size,
+            );
+            swh_provenance_db_build::contents_in_revisions::compute_revrel_sets(
+                graph,
+                args.node_filter,
+                reachable_nodes,
+                frontier_directories,
+                &mut revrel_sets,
+            )?;
+            swh_provenance_db_build::contents_in_revisions::write_revisions_from_revrel_sets(
+                graph,
+                args.node_filter,
+                reachable_nodes,
+                frontier_directories,
+                &revrel_sets,
+                dataset_writer,
+                paths,
+                key_index.as_ref(),
+            )?
+        }
+    }
+
+    if let (Some(key_index), Some(key_indexes_out)) = (key_index, &args.key_indexes_out) {
+        log::info!("Writing key indexes");
+        let num_files = key_index
+            .write(&args.contents_out, "cnt", key_indexes_out)
+            .context("Could not write key indexes")?;
+        log::info!("Wrote key indexes of {num_files} files");
+    }
+
+    Ok(())
 }
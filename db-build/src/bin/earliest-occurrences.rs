@@ -0,0 +1,90 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::path::PathBuf;
+use std::sync::Arc;
+
+use anyhow::{Context, Result};
+use clap::Parser;
+use mimalloc::MiMalloc;
+
+use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use swh_graph::graph::*;
+use swh_graph::mph::DynMphf;
+use swh_graph::utils::mmap::NumberMmap;
+
+use swh_provenance_db_build::filters::NodeFilter;
+use swh_provenance_db_build::x_in_y_dataset::{
+    earliest_occurrences_schema, earliest_occurrences_writer_properties, without_bloom_filters,
+};
+
+#[global_allocator]
+static GLOBAL: MiMalloc = MiMalloc;
+
+#[derive(Parser, Debug)]
+/** Given as input the binary file written by compute-earliest-timestamps, with the date
+ * of first occurrence of each content.
+ * Produces the earliest revision/release containing each content, with its author date
+ * and an origin containing it.
+ */
+struct Args {
+    graph_path: PathBuf,
+    #[arg(long)]
+    /// Maximum number of bytes in a thread's output Parquet buffer,
+    /// before it is flushed to disk
+    thread_buffer_size: Option<usize>,
+    #[arg(long)]
+    /// Do not write Parquet Bloom filters, for databases queried through the key filters
+    /// built by swh-provenance-index instead
+    disable_bloom_filters: bool,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = NodeFilter::Heads)]
+    /// Subset of revisions and releases to traverse from. Must be the same as passed to
+    /// compute-earliest-timestamps.
+    node_filter: NodeFilter,
+    #[arg(long)]
+    /// Path to read the array of timestamps from
+    timestamps: PathBuf,
+    #[arg(long)]
+    /// Path to a directory where to write .parquet results to
+    earliest_occurrences_out: PathBuf,
+}
+
+pub fn main() -> Result<()> {
+    let args = Args::parse();
+
+    env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
+
+    log::info!("Loading graph");
+    let graph = swh_graph::graph::SwhBidirectionalGraph::new(args.graph_path)
+        .context("Could not load graph")?
+        .init_properties()
+        .load_properties(|props| props.load_maps::<DynMphf>())
+        .context("Could not load maps")?
+        .load_properties(|props| props.load_timestamps())
+        .context("Could not load timestamps")?;
+    log::info!("Graph loaded.");
+
+    let timestamps = NumberMmap::<byteorder::BE, i64, _>::new(&args.timestamps, graph.num_nodes())
+        .with_context(|| format!("Could not mmap {}", args.timestamps.display()))?;
+
+    let schema = Arc::new(earliest_occurrences_schema());
+    let mut writer_properties = earliest_occurrences_writer_properties(&graph);
+    if args.disable_bloom_filters {
+        writer_properties = without_bloom_filters(writer_properties, &schema);
+    }
+    let mut dataset_writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(
+        args.earliest_occurrences_out,
+        (schema, writer_properties.build()),
+    )?;
+    dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
+
+    swh_provenance_db_build::earliest_occurrences::write_earliest_occurrences(
+        &graph,
+        &timestamps,
+        args.node_filter,
+        dataset_writer,
+    )
+}
@@ -18,7 +18,10 @@ use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 use swh_graph::SWHID;
 
-use swh_provenance_db_build::earliest_revision::{find_earliest_revision, EarliestRevision};
+use swh_provenance_db_build::earliest_revision::{
+    find_earliest_revision_with_context, EarliestRevision,
+};
+use swh_provenance_db_build::traversal::TraversalContext;
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
@@ -82,34 +85,37 @@ pub fn main() -> Result<()> {
         "Input has no 'swhid' header"
     );
 
-    reader.deserialize().par_bridge().try_for_each(|record| {
-        let InputRecord { swhid } = record.context("Could not deserialize input")?;
-
-        let node = graph.properties().node_id_from_string_swhid(&swhid)?;
-        match find_earliest_revision(&graph, node) {
-            Some(EarliestRevision {
-                node: earliest_rev_id,
-                ts: earliest_ts,
-                rev_occurrences,
-            }) => {
-                let earliest_swhid = graph.properties().swhid(earliest_rev_id);
-                let record = OutputRecord {
-                    swhid,
-                    earliest_swhid,
-                    earliest_ts,
+    reader.deserialize().par_bridge().try_for_each_init(
+        || TraversalContext::new(graph.num_nodes()),
+        |ctx, record| {
+            let InputRecord { swhid } = record.context("Could not deserialize input")?;
+
+            let node = graph.properties().node_id_from_string_swhid(&swhid)?;
+            match find_earliest_revision_with_context(&graph, ctx, node) {
+                Some(EarliestRevision {
+                    node: earliest_rev_id,
+                    ts: earliest_ts,
                     rev_occurrences,
-                };
-                writer
-                    .lock()
-                    .unwrap()
-                    .serialize(record)
-                    .context("Could not write record")?
+                }) => {
+                    let earliest_swhid = graph.properties().swhid(earliest_rev_id);
+                    let record = OutputRecord {
+                        swhid,
+                        earliest_swhid,
+                        earliest_ts,
+                        rev_occurrences,
+                    };
+                    writer
+                        .lock()
+                        .unwrap()
+                        .serialize(record)
+                        .context("Could not write record")?
+                }
+                None => log::debug!("no revision found containing {swhid}"),
             }
-            None => log::debug!("no revision found containing {swhid}"),
-        }
-        pl.lock().unwrap().light_update();
-        Ok::<(), anyhow::Error>(())
-    })?;
+            pl.lock().unwrap().light_update();
+            Ok::<(), anyhow::Error>(())
+        },
+    )?;
     pl.lock().unwrap().done();
 
     Ok(())
@@ -11,14 +11,21 @@ use clap::Parser;
 use dsi_progress_logger::{progress_logger, ProgressLog};
 use mimalloc::MiMalloc;
 
+use arrow::array::{BinaryBuilder, UInt64Builder};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use sux::prelude::BitVec;
 use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 use swh_graph::utils::mmap::NumberMmap;
+use value_traits::slices::SliceByValue;
 
 use swh_provenance_db_build::filters::{load_reachable_nodes, NodeFilter};
+use swh_provenance_db_build::key_index::KeyIndexBuilder;
+use swh_provenance_db_build::key_ranges::{key_range_paths, sort_key_ranges, KeyRangeWriters};
+use swh_provenance_db_build::paths::{PathInterner, PathNamespace};
 use swh_provenance_db_build::x_in_y_dataset::{
-    dir_in_revrel_schema, dir_in_revrel_writer_properties,
+    dir_in_revrel_schema, dir_in_revrel_writer_properties, without_bloom_filters,
+    DirInRevrelTableBuilder, PathColumnBuilder,
 };
 
 #[global_allocator]
@@ -38,6 +45,10 @@ struct Args {
     /// Maximum number of bytes in a thread's output Parquet buffer,
     /// before it is flushed to disk
     thread_buffer_size: Option<usize>,
+    #[arg(long)]
+    /// Do not write Parquet Bloom filters, for databases queried through the key filters
+    /// built by swh-provenance-index instead
+    disable_bloom_filters: bool,
     #[arg(value_enum)]
     #[arg(long, default_value_t = NodeFilter::Heads)]
     /// Subset of revisions and releases to traverse from
@@ -55,6 +66,21 @@ struct Args {
     #[arg(long)]
     /// Path to a directory where to write .csv.zst results to
     directories_out: PathBuf,
+    #[arg(long)]
+    /// Directory where to write the Elias-Fano index of the 'dir' column of each
+    /// Parquet file, so swh-provenance-index does not need to read the table to build it.
+    /// This is the table's directory in swh-provenance-index's --indexes.
+    key_indexes_out: Option<PathBuf>,
+    #[arg(long, default_value_t = 0)]
+    /// Number of ranges of 'dir' values to split the table into, so each Parquet file
+    /// covers a disjoint range and is sorted by 'dir'. Rows are first written to an
+    /// unsorted dataset per range, next to the output directory, then each range is sorted
+    /// in memory. 0 writes files in traversal order instead.
+    key_ranges: usize,
+    #[arg(long)]
+    /// Directory of the table of paths, where to write the paths of this table. The table
+    /// then has a 'path_id' column, referring to this table, instead of a 'path' column.
+    paths_out: Option<PathBuf>,
 }
 
 pub fn main() -> Result<()> {
@@ -63,7 +89,7 @@ pub fn main() -> Result<()> {
     env_logger::Builder::from_env(env_logger::Env::default().default_filter_or("info")).init();
 
     log::info!("Loading graph");
-    let graph = swh_graph::graph::SwhBidirectionalGraph::new(args.graph_path)
+    let graph = swh_graph::graph::SwhBidirectionalGraph::new(&args.graph_path)
         .context("Could not load graph")?
         .load_backward_labels()
         .context("Could not load labels")?
@@ -88,28 +114,134 @@ pub fn main() -> Result<()> {
     pl.start("Loading frontier directories...");
     let frontier_directories = swh_provenance_db_build::frontier_set::from_parquet(
         &graph,
-        args.frontier_directories,
+        args.frontier_directories.clone(),
         &mut pl,
     )?;
     pl.done();
 
-    let reachable_nodes = load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes)?;
+    let reachable_nodes =
+        load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes.clone())?;
 
-    let mut dataset_writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(
-        args.directories_out,
-        (
-            Arc::new(dir_in_revrel_schema()),
-            dir_in_revrel_writer_properties(&graph).build(),
+    match &args.paths_out {
+        None => write_table::<_, BinaryBuilder>(
+            &args,
+            &graph,
+            &max_timestamps,
+            reachable_nodes.as_ref(),
+            &frontier_directories,
+            &(),
         ),
-    )?;
+        Some(paths_out) => {
+            let paths = PathInterner::new(PathNamespace::FrontierDirectoriesInRevisions);
+            write_table::<_, UInt64Builder>(
+                &args,
+                &graph,
+                &max_timestamps,
+                reachable_nodes.as_ref(),
+                &frontier_directories,
+                &paths,
+            )?;
+            log::info!("Writing {} paths", paths.len());
+            paths
+                .write(&graph, paths_out)
+                .context("Could not write paths")?;
+            Ok(())
+        }
+    }
+}
+
+/// Writes the table, with paths written by `P` (see [`PathColumnBuilder`])
+fn write_table<G, P: PathColumnBuilder>(
+    args: &Args,
+    graph: &G,
+    max_timestamps: impl SliceByValue<Value = i64> + Sync + Copy,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    paths: &P::Paths,
+) -> Result<()>
+where
+    G: SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let schema = Arc::new(P::table_schema(dir_in_revrel_schema()));
+    let mut writer_properties = P::writer_properties(dir_in_revrel_writer_properties(graph));
+    if args.disable_bloom_filters {
+        writer_properties = without_bloom_filters(writer_properties, &schema);
+    }
+    let writer_properties = writer_properties.build();
+
+    if args.key_ranges > 0 {
+        let spill_path = args.directories_out.with_extension("unsorted");
+        let range_paths = key_range_paths(&spill_path, args.key_ranges);
+        let dataset_writers = range_paths
+            .iter()
+            .map(|range_path| {
+                let mut dataset_writer = ParallelDatasetWriter::<
+                    ParquetTableWriter<DirInRevrelTableBuilder<P>>,
+                >::with_schema(
+                    range_path.clone(),
+                    (schema.clone(), writer_properties.clone()),
+                )?;
+                dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
+                Ok(dataset_writer)
+            })
+            .collect::<Result<Vec<_>>>()?;
+
+        swh_provenance_db_build::directories_in_revisions::write_revisions_from_frontier_directories(
+            graph,
+            max_timestamps,
+            args.node_filter,
+            reachable_nodes,
+            frontier_directories,
+            KeyRangeWriters::new(dataset_writers, graph.num_nodes()),
+            paths,
+            None, // key index, written by sort_key_ranges instead
+        )?;
+
+        sort_key_ranges(
+            &range_paths,
+            "dir",
+            schema,
+            &writer_properties,
+            &args.directories_out,
+            args.key_indexes_out.as_deref(),
+        )?;
+        std::fs::remove_dir(&spill_path)
+            .with_context(|| format!("Could not remove {}", spill_path.display()))?;
+        return Ok(());
+    }
+
+    let mut dataset_writer =
+        ParallelDatasetWriter::<ParquetTableWriter<DirInRevrelTableBuilder<P>>>::with_schema(
+            args.directories_out.clone(),
+            (schema, writer_properties),
+        )?;
     dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
 
+    let key_index = args
+        .key_indexes_out
+        .as_ref()
+        .map(|_| KeyIndexBuilder::new());
     swh_provenance_db_build::directories_in_revisions::write_revisions_from_frontier_directories(
-        &graph,
-        &max_timestamps,
+        graph,
+        max_timestamps,
         args.node_filter,
-        reachable_nodes.as_ref(),
-        &frontier_directories,
+        reachable_nodes,
+        frontier_directories,
         dataset_writer,
-    )
+        paths,
+        key_index.as_ref(),
+    )?;
+
+    if let (Some(key_index), Some(key_indexes_out)) = (key_index, &args.key_indexes_out) {
+        log::info!("Writing key indexes");
+        let num_files = key_index
+            .write(&args.directories_out, "dir", key_indexes_out)
+            .context("Could not write key indexes")?;
+        log::info!("Wrote key indexes of {num_files} files");
+    }
+
+    Ok(())
 }
@@ -5,28 +5,34 @@
 
 use std::io::Write;
 use std::path::PathBuf;
-use std::sync::atomic::{AtomicI64, Ordering};
+use std::sync::atomic::AtomicI64;
 
-use anyhow::{bail, Context, Result};
-use clap::Parser;
-use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use anyhow::{Context, Result};
+use clap::{Parser, ValueEnum};
 use mimalloc::MiMalloc;
 use rayon::prelude::*;
-use sux::prelude::BitVec;
-use sux::traits::BitVecOps;
-use value_traits::slices::SliceByValue;
 
 use swh_graph::graph::*;
 use swh_graph::mph::DynMphf;
 use swh_graph::utils::mmap::NumberMmap;
-use swh_graph::utils::shuffle::par_iter_shuffled_range;
-use swh_graph::NodeType;
 
 use swh_provenance_db_build::filters::{load_reachable_nodes, NodeFilter};
+use swh_provenance_db_build::max_leaf_timestamps::{
+    propagate_in_topological_order, propagate_through_directories,
+};
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc;
 
+#[derive(ValueEnum, Debug, Clone, Copy)]
+enum Algorithm {
+    /// Traverse backward from every content, up to directories already reached from a
+    /// newer content
+    Dfs,
+    /// Compute each directory from its subdirectories, bottom-up, level by level
+    Topological,
+}
+
 #[derive(Parser, Debug)]
 /** Given as argument a binary file containing an array of timestamps which is,
  * for every content, the date of first occurrence of that content in a revision,
@@ -54,6 +60,10 @@ struct Args {
     #[arg(long)]
     /// Path to write the array of max timestamps to
     max_timestamps_out: Option<PathBuf>,
+    #[arg(value_enum)]
+    #[arg(long, default_value_t = Algorithm::Dfs)]
+    /// How to propagate timestamps to directories. Both produce the same output.
+    algorithm: Algorithm,
 }
 
 pub fn main() -> Result<()> {
@@ -86,12 +96,20 @@ pub fn main() -> Result<()> {
     };
 
     let reachable_nodes = load_reachable_nodes(&graph, args.node_filter, args.reachable_nodes)?;
-    propagate_through_directories(
-        &graph,
-        reachable_nodes.as_ref(),
-        &timestamps,
-        &mut max_timestamps,
-    )?;
+    match args.algorithm {
+        Algorithm::Dfs => propagate_through_directories(
+            &graph,
+            reachable_nodes.as_ref(),
+            &timestamps,
+            &mut max_timestamps,
+        )?,
+        Algorithm::Topological => propagate_in_topological_order(
+            &graph,
+            reachable_nodes.as_ref(),
+            &timestamps,
+            &mut max_timestamps,
+        )?,
+    }
 
     if let Some(mut max_timestamps_file) = max_timestamps_file {
         let max_timestamps_path = args.max_timestamps_out.unwrap();
@@ -110,76 +128,3 @@ pub fn main() -> Result<()> {
 
     Ok(())
 }
-
-/// Propagate maximum of timestamps from contents to any directory containing them
-fn propagate_through_directories<G>(
-    graph: &G,
-    reachable_nodes: Option<&BitVec>,
-    timestamps: &(impl SliceByValue<Value = i64> + Sync),
-    max_timestamps: &mut [AtomicI64],
-) -> Result<()>
-where
-    G: SwhBackwardGraph + SwhGraphWithProperties + Sync,
-    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
-{
-    let mut pl = concurrent_progress_logger!(
-        item_name = "node",
-        display_memory = true,
-        local_speed = true,
-        expected_updates = Some(graph.num_nodes()),
-    );
-    pl.start("Propagating through directories...");
-
-    let reachable = |node| match reachable_nodes {
-        Some(reachable_nodes) => reachable_nodes.get(node),
-        None => true, // All nodes are reachable
-    };
-
-    par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
-        pl.clone(),
-        |thread_pl, cnt| {
-            if reachable(cnt) && graph.properties().node_type(cnt) == NodeType::Content {
-                let cnt_timestamp = timestamps.get_value(cnt).unwrap();
-                if cnt_timestamp == i64::MIN {
-                    // Content is not in any timestamped revrel, ignore it.
-                } else {
-                    let mut stack = vec![cnt];
-
-                    while let Some(node) = stack.pop() {
-                        for pred in graph.predecessors(node) {
-                            if !reachable(pred) {
-                                continue;
-                            }
-                            match graph.properties().node_type(pred) {
-                                NodeType::Directory => {
-                                    let previous_max = max_timestamps[pred]
-                                        .fetch_max(cnt_timestamp, Ordering::Relaxed);
-                                    if previous_max >= cnt_timestamp {
-                                        // Already traversed from a content with a newer timestamp
-                                        // than this one (or already from this one), so every
-                                        // directory we would find from now on would too.
-                                        // No need to recurse further.
-                                    } else {
-                                        stack.push(pred);
-                                    }
-                                }
-                                NodeType::Content => bail!(
-                                    "{} is predecessor of {}",
-                                    graph.properties().swhid(pred),
-                                    graph.properties().swhid(node)
-                                ),
-                                _ => (),
-                            }
-                        }
-                    }
-                }
-            }
-            thread_pl.light_update();
-            Ok(())
-        },
-    )?;
-
-    pl.done();
-
-    Ok(())
-}
@@ -14,8 +14,9 @@ use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
 use swh_graph::mph::DynMphf;
 
 use swh_provenance_db_build::filters::NodeFilter;
+use swh_provenance_db_build::key_index::KeyIndexBuilder;
 use swh_provenance_db_build::x_in_y_dataset::{
-    revrel_in_ori_schema, revrel_in_ori_writer_properties,
+    revrel_in_ori_schema, revrel_in_ori_writer_properties, without_bloom_filters,
 };
 
 #[global_allocator]
@@ -32,6 +33,10 @@ struct Args {
     /// Maximum number of bytes in a thread's output Parquet buffer,
     /// before it is flushed to disk
     thread_buffer_size: Option<usize>,
+    #[arg(long)]
+    /// Do not write Parquet Bloom filters, for databases queried through the key filters
+    /// built by swh-provenance-index instead
+    disable_bloom_filters: bool,
     #[arg(value_enum)]
     #[arg(long, default_value_t = NodeFilter::Heads)]
     /// Subset of revisions and releases to traverse from
@@ -40,6 +45,11 @@ struct Args {
     #[arg(long)]
     /// Path to a directory where to write .parquet results to
     revisions_out: PathBuf,
+    #[arg(long)]
+    /// Directory where to write the Elias-Fano index of the 'revrel' column of each
+    /// Parquet file, so swh-provenance-index does not need to read the table to build it.
+    /// This is the table's directory in swh-provenance-index's --indexes.
+    key_indexes_out: Option<PathBuf>,
 }
 
 pub fn main() -> Result<()> {
@@ -57,14 +67,35 @@ pub fn main() -> Result<()> {
         .context("Could not load timestamps")?;
     log::info!("Graph loaded.");
 
+    let schema = Arc::new(revrel_in_ori_schema());
+    let mut writer_properties = revrel_in_ori_writer_properties(&graph);
+    if args.disable_bloom_filters {
+        writer_properties = without_bloom_filters(writer_properties, &schema);
+    }
     let mut dataset_writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(
-        args.revisions_out,
-        (
-            Arc::new(revrel_in_ori_schema()),
-            revrel_in_ori_writer_properties(&graph).build(),
-        ),
+        args.revisions_out.clone(),
+        (schema, writer_properties.build()),
     )?;
     dataset_writer.config.autoflush_buffer_size = args.thread_buffer_size;
 
-    swh_provenance_db_build::revisions_in_origins::main(&graph, args.node_filter, dataset_writer)
+    let key_index = args
+        .key_indexes_out
+        .as_ref()
+        .map(|_| KeyIndexBuilder::new());
+    swh_provenance_db_build::revisions_in_origins::main(
+        &graph,
+        args.node_filter,
+        dataset_writer,
+        key_index.as_ref(),
+    )?;
+
+    if let (Some(key_index), Some(key_indexes_out)) = (key_index, args.key_indexes_out) {
+        log::info!("Writing key indexes");
+        let num_files = key_index
+            .write(&args.revisions_out, "revrel", &key_indexes_out)
+            .context("Could not write key indexes")?;
+        log::info!("Wrote key indexes of {num_files} files");
+    }
+
+    Ok(())
 }
@@ -5,7 +5,7 @@
 
 use std::sync::atomic::Ordering;
 
-use anyhow::Result;
+use anyhow::{bail, ensure, Result};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
 use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
 use rayon::prelude::*;
@@ -15,18 +15,39 @@ use swh_graph::graph::*;
 use swh_graph::NodeType;
 
 use crate::frontier::PathParts;
-use crate::x_in_y_dataset::CntInDirTableBuilder;
+use crate::key_index::{KeyIndexBuilder, ThreadKeysBuffer};
+use crate::key_ranges::KeyRangeWriters;
+use crate::traversal::TraversalContext;
+use crate::x_in_y_dataset::{CntInDirTableBuilder, PathColumnBuilder};
 
-pub fn write_directories_from_contents<G>(
+/// Writes the frontier directories containing each content, with the path from the
+/// directory to the content, by traversing backward from each content.
+///
+/// Rows are written to the writer of the range of their content (see
+/// [`KeyRangeWriters`]). `key_index` can only be given with a single writer.
+///
+/// See [`write_contents_from_directories`] for a forward traversal writing the same rows.
+pub fn write_directories_from_contents<G, P>(
     graph: &G,
     frontier_directories: &BitVec,
-    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder>>,
+    dataset_writer: impl Into<
+        KeyRangeWriters<ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<P>>>>,
+    >,
+    paths: &P::Paths,
+    key_index: Option<&KeyIndexBuilder>,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhForwardGraph + SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
 {
+    let dataset_writers: KeyRangeWriters<_> = dataset_writer.into();
+    ensure!(
+        key_index.is_none() || dataset_writers.writers().len() == 1,
+        "Key indexes can't be built while writing several ranges of keys"
+    );
+
     // List all directories (and contents) forward-reachable from a frontier directories.
     // So when walking backward from a content, if the walk ever sees a directory
     // not in this set then it can safely be ignored as walking further backward
@@ -74,16 +95,30 @@ where
     pl.start("Listing contents in directories...");
 
     swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_init(
-        || (dataset_writer.get_thread_writer().unwrap(), pl.clone()),
-        |(writer, thread_pl), node| -> Result<()> {
+        || {
+            (
+                dataset_writers
+                    .writers()
+                    .iter()
+                    .map(|dataset_writer| dataset_writer.get_thread_writer().unwrap())
+                    .collect::<Vec<_>>(),
+                key_index.map(KeyIndexBuilder::thread_keys),
+                TraversalContext::new(graph.num_nodes()),
+                pl.clone(),
+            )
+        },
+        |(writers, thread_keys, ctx, thread_pl), node| -> Result<()> {
             if reachable_nodes_from_frontier.get(node)
                 && graph.properties().node_type(node) == NodeType::Content
             {
                 write_frontier_directories_from_content(
                     &graph,
-                    writer,
+                    &mut writers[dataset_writers.range_of(node)],
+                    paths,
+                    thread_keys,
                     &reachable_nodes_from_frontier,
                     frontier_directories,
+                    ctx,
                     node,
                 )?;
             }
@@ -96,14 +131,18 @@ where
     Ok(())
 }
 
-fn write_frontier_directories_from_content<G>(
+fn write_frontier_directories_from_content<G, P>(
     graph: &G,
-    writer: &mut ParquetTableWriter<CntInDirTableBuilder>,
+    writer: &mut ParquetTableWriter<CntInDirTableBuilder<P>>,
+    paths: &P::Paths,
+    thread_keys: &mut Option<ThreadKeysBuffer>,
     reachable_nodes_from_frontier: &BitVec,
     frontier_directories: &BitVec,
+    ctx: &mut TraversalContext,
     cnt: NodeId,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhLabeledBackwardGraph + SwhGraphWithProperties,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
@@ -121,7 +160,12 @@ where
             builder
                 .dir
                 .append_value(dir.try_into().expect("NodeId overflowed u64"));
-            builder.path.append_value(path_parts.build_path(graph));
+            builder
+                .path
+                .append_path(paths, &path_parts.build_path(graph));
+            if let Some(thread_keys) = thread_keys {
+                thread_keys.push(cnt.try_into().expect("NodeId overflowed u64"));
+            }
         }
         Ok(true) // always recurse
     };
@@ -130,9 +174,157 @@ where
 
     crate::frontier::backward_dfs_with_path(
         graph,
+        ctx,
         Some(reachable_nodes_from_frontier),
         on_directory,
         on_revrel,
         cnt,
     )
 }
+
+/// Same as [`write_directories_from_contents`], but traverses forward from each frontier
+/// directory, so it only needs forward labels.
+///
+/// Each directory's subtree is traversed once, including nested frontier directories,
+/// and each content in it is written with the first path found to it. Paths may differ
+/// from those written by [`write_directories_from_contents`] when a content has several
+/// paths in a directory.
+pub fn write_contents_from_directories<G, P>(
+    graph: &G,
+    frontier_directories: &BitVec,
+    dataset_writer: impl Into<
+        KeyRangeWriters<ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<P>>>>,
+    >,
+    paths: &P::Paths,
+    key_index: Option<&KeyIndexBuilder>,
+) -> Result<()>
+where
+    P: PathColumnBuilder,
+    G: SwhLabeledForwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let dataset_writers: KeyRangeWriters<_> = dataset_writer.into();
+    ensure!(
+        key_index.is_none() || dataset_writers.writers().len() == 1,
+        "Key indexes can't be built while writing several ranges of keys"
+    );
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Listing contents in directories...");
+
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_init(
+        || {
+            (
+                dataset_writers
+                    .writers()
+                    .iter()
+                    .map(|dataset_writer| dataset_writer.get_thread_writer().unwrap())
+                    .collect::<Vec<_>>(),
+                key_index.map(KeyIndexBuilder::thread_keys),
+                TraversalContext::new(graph.num_nodes()),
+                pl.clone(),
+            )
+        },
+        |(writers, thread_keys, ctx, thread_pl), node| -> Result<()> {
+            if frontier_directories.get(node) {
+                write_contents_from_frontier_directory(
+                    graph,
+                    |cnt| dataset_writers.range_of(cnt),
+                    writers,
+                    paths,
+                    thread_keys,
+                    ctx,
+                    node,
+                )?;
+            }
+            thread_pl.light_update();
+            Ok(())
+        },
+    )?;
+    pl.done();
+
+    Ok(())
+}
+
+fn write_contents_from_frontier_directory<G, P>(
+    graph: &G,
+    range_of: impl Fn(NodeId) -> usize,
+    writers: &mut [ParquetTableWriter<CntInDirTableBuilder<P>>],
+    paths: &P::Paths,
+    thread_keys: &mut Option<ThreadKeysBuffer>,
+    ctx: &mut TraversalContext,
+    dir: NodeId,
+) -> Result<()>
+where
+    P: PathColumnBuilder,
+    G: SwhLabeledForwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    ctx.clear();
+    let TraversalContext {
+        visited,
+        path_stack,
+        ..
+    } = ctx;
+
+    path_stack.push_root(dir);
+    visited.insert(dir);
+
+    while let Some((node, path)) = path_stack.pop() {
+        if graph.properties().node_type(node) == NodeType::Content {
+            let builder = writers[range_of(node)].builder()?;
+            builder
+                .cnt
+                .append_value(node.try_into().expect("NodeId overflowed u64"));
+            builder
+                .dir
+                .append_value(dir.try_into().expect("NodeId overflowed u64"));
+            let path_parts = PathParts {
+                parts: path_stack.path(path),
+                path_to_directory: false,
+            };
+            builder
+                .path
+                .append_path(paths, &path_parts.build_path(graph));
+            if let Some(thread_keys) = thread_keys {
+                thread_keys.push(node.try_into().expect("NodeId overflowed u64"));
+            }
+            continue;
+        }
+
+        for (succ, labels) in graph.untyped_labeled_successors(node) {
+            if visited.contains(succ) {
+                continue;
+            }
+            match graph.properties().node_type(succ) {
+                NodeType::Directory | NodeType::Content => {
+                    visited.insert(succ);
+                    // If the same subdir/file is present in a directory twice under the same
+                    // name, pick any name to represent both.
+                    let Some(first_label) = labels.into_iter().next() else {
+                        bail!(
+                            "{} -> {} has no labels",
+                            graph.properties().swhid(node),
+                            graph.properties().swhid(succ),
+                        )
+                    };
+
+                    // This is a dir->* arc, so its label is necessarily a DirEntry
+                    let first_label: swh_graph::labels::DirEntry = first_label.into();
+
+                    path_stack.push_child(succ, path.clone(), first_label.label_name_id());
+                }
+                _ => (), // revision (submodule)
+            }
+        }
+    }
+
+    Ok(())
+}
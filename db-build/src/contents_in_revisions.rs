@@ -3,27 +3,38 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
-use anyhow::Result;
+use std::collections::hash_map::Entry;
+use std::sync::atomic::{AtomicU32, Ordering};
+
+use anyhow::{bail, Result};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
 use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use rapidhash::RapidHashMap;
 use rayon::prelude::*;
 use sux::bits::bit_vec::BitVec;
 use sux::traits::BitVecOps;
 use swh_graph::graph::*;
+use swh_graph::labels::LabelNameId;
 use swh_graph::NodeType;
 
 use crate::filters::NodeFilter;
 use crate::frontier::PathParts;
-use crate::x_in_y_dataset::CntInRevrelTableBuilder;
+use crate::key_index::{KeyIndexBuilder, ThreadKeysBuffer};
+use crate::revrel_sets::RevrelSets;
+use crate::traversal::TraversalContext;
+use crate::x_in_y_dataset::{CntInRevrelTableBuilder, PathColumnBuilder};
 
-pub fn write_revisions_from_contents<G>(
+pub fn write_revisions_from_contents<G, P>(
     graph: &G,
     node_filter: NodeFilter,
     reachable_nodes: Option<&BitVec>,
     frontier_directories: &BitVec,
-    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<CntInRevrelTableBuilder>>,
+    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<CntInRevrelTableBuilder<P>>>,
+    paths: &P::Paths,
+    key_index: Option<&KeyIndexBuilder>,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
@@ -38,8 +49,15 @@ where
     pl.start("Visiting revisions' directories...");
 
     (0..graph.num_nodes()).into_par_iter().try_for_each_init(
-        || (dataset_writer.get_thread_writer().unwrap(), pl.clone()),
-        |(writer, thread_pl), node| -> Result<()> {
+        || {
+            (
+                dataset_writer.get_thread_writer().unwrap(),
+                key_index.map(KeyIndexBuilder::thread_keys),
+                TraversalContext::new(graph.num_nodes()),
+                pl.clone(),
+            )
+        },
+        |(writer, thread_keys, ctx, thread_pl), node| -> Result<()> {
             let is_reachable = match reachable_nodes {
                 None => true,
                 Some(reachable_nodes) => reachable_nodes.get(node),
@@ -51,6 +69,9 @@ where
                     reachable_nodes,
                     frontier_directories,
                     writer,
+                    paths,
+                    thread_keys,
+                    ctx,
                     node,
                 )?;
             }
@@ -66,15 +87,19 @@ where
     Ok(())
 }
 
-fn find_revisions_from_content<G>(
+fn find_revisions_from_content<G, P>(
     graph: &G,
     node_filter: NodeFilter,
     reachable_nodes: Option<&BitVec>,
     frontier_directories: &BitVec,
-    writer: &mut ParquetTableWriter<CntInRevrelTableBuilder>,
+    writer: &mut ParquetTableWriter<CntInRevrelTableBuilder<P>>,
+    paths: &P::Paths,
+    thread_keys: &mut Option<ThreadKeysBuffer>,
+    ctx: &mut TraversalContext,
     cnt: NodeId,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhLabeledBackwardGraph + SwhGraphWithProperties,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
@@ -106,9 +131,400 @@ where
         builder
             .revrel
             .append_value(revrel.try_into().expect("NodeId overflowed u64"));
-        builder.path.append_value(path_parts.build_path(graph));
+        builder
+            .path
+            .append_path(paths, &path_parts.build_path(graph));
+        if let Some(thread_keys) = thread_keys {
+            thread_keys.push(cnt.try_into().expect("NodeId overflowed u64"));
+        }
         Ok(())
     };
 
-    crate::frontier::backward_dfs_with_path(graph, reachable_nodes, on_directory, on_revrel, cnt)
+    crate::frontier::backward_dfs_with_path(
+        graph,
+        ctx,
+        reachable_nodes,
+        on_directory,
+        on_revrel,
+        cnt,
+    )
+}
+
+/// Appends to `revrels` the root revisions/releases with an author date which are
+/// predecessors of `node`, or releases of a revision which is a predecessor of `node`.
+///
+/// These are the revisions/releases [`find_revisions_from_content`] writes when visiting
+/// `node`.
+fn direct_revrels<G>(
+    graph: &G,
+    node_filter: NodeFilter,
+    reachable_nodes: Option<&BitVec>,
+    node: NodeId,
+    revrels: &mut Vec<NodeId>,
+) where
+    G: SwhBackwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let mut push_if_root = |revrel| {
+        if graph.properties().author_timestamp(revrel).is_some()
+            && crate::filters::is_root_revrel(graph, node_filter, revrel)
+        {
+            revrels.push(revrel);
+        }
+    };
+    for pred in graph.predecessors(node) {
+        if let Some(reachable_nodes) = reachable_nodes {
+            if !reachable_nodes.get(pred) {
+                continue;
+            }
+        }
+        match graph.properties().node_type(pred) {
+            NodeType::Revision => {
+                push_if_root(pred);
+                for predpred in graph.predecessors(pred) {
+                    if graph.properties().node_type(predpred) == NodeType::Release {
+                        push_if_root(predpred);
+                    }
+                }
+            }
+            NodeType::Release => push_if_root(pred),
+            _ => (),
+        }
+    }
+}
+
+/// Returns whether `node` is a reachable directory, which is not a frontier directory
+fn is_memoised_directory<G>(
+    graph: &G,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    node: NodeId,
+) -> bool
+where
+    G: SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    reachable_nodes.is_none_or(|reachable_nodes| reachable_nodes.get(node))
+        && !frontier_directories.get(node)
+        && graph.properties().node_type(node) == NodeType::Directory
+}
+
+/// Computes, for each reachable directory which is not a frontier directory, the set of
+/// root revisions/releases [`find_revisions_from_content`] would write from a content in
+/// that directory, and inserts it in `revrel_sets`.
+///
+/// The set of a directory is made of its [`direct_revrels`] and the sets of its parents
+/// (except frontier directories, whose predecessors are not traversed), so sets are
+/// computed top-down: directories whose parents all have their set are computed in
+/// parallel, level by level. Levels are computed in chunks, whose size is adjusted so the
+/// sets of a chunk take about [`RevrelSets::max_buffer_size`] bytes before being encoded.
+pub fn compute_revrel_sets<G>(
+    graph: &G,
+    node_filter: NodeFilter,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    revrel_sets: &mut RevrelSets,
+) -> Result<()>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let is_memoised =
+        |node| is_memoised_directory(graph, reachable_nodes, frontier_directories, node);
+
+    // Number of parents of each directory whose set is not computed yet
+    let mut pending_parents = Vec::with_capacity(graph.num_nodes());
+    pending_parents.resize_with(graph.num_nodes(), || AtomicU32::new(0));
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Counting parents of directories...");
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).for_each_with(
+        pl.clone(),
+        |thread_pl, node| {
+            if is_memoised(node) {
+                for succ in graph.successors(node) {
+                    if is_memoised(succ) {
+                        pending_parents[succ].fetch_add(1, Ordering::Relaxed);
+                    }
+                }
+            }
+            thread_pl.light_update();
+        },
+    );
+    pl.done();
+
+    let mut level: Vec<NodeId> = (0..graph.num_nodes())
+        .into_par_iter()
+        .filter(|&node| is_memoised(node) && pending_parents[node].load(Ordering::Relaxed) == 0)
+        .collect();
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "directory",
+        display_memory = true,
+        local_speed = true,
+    );
+    pl.start("Computing revision/release sets of directories, top-down...");
+    let is_memoised = &is_memoised;
+    let pending_parents = &pending_parents;
+    let mut num_levels = 0usize;
+    let mut chunk_size = rayon::current_num_threads();
+    while !level.is_empty() {
+        num_levels += 1;
+        let num_directories = level.len();
+        // Sets are computed in parallel a chunk at a time, then encoded in revrel_sets,
+        // so decoded sets of a level are never all in memory at once.
+        let mut remaining = level.as_slice();
+        while !remaining.is_empty() {
+            let (chunk, rest) = remaining.split_at(usize::min(chunk_size, remaining.len()));
+            remaining = rest;
+            let sets = chunk
+                .par_iter()
+                .map(|&dir| -> Result<_> {
+                    let mut revrels = Vec::new();
+                    direct_revrels(graph, node_filter, reachable_nodes, dir, &mut revrels);
+                    for pred in graph.predecessors(dir) {
+                        if is_memoised(pred) {
+                            revrel_sets.get(pred, &mut revrels)?;
+                        }
+                    }
+                    revrels.sort_unstable();
+                    revrels.dedup();
+                    Ok((dir, revrels))
+                })
+                .collect::<Result<Vec<_>>>()?;
+            let decoded_size: usize = sets
+                .iter()
+                .map(|(_, revrels)| revrels.len() * std::mem::size_of::<NodeId>())
+                .sum();
+            for (dir, revrels) in sets {
+                revrel_sets.insert(dir, &revrels)?;
+            }
+            // Aim for chunks whose decoded sets are about the size of the buffer
+            if decoded_size > revrel_sets.max_buffer_size() {
+                chunk_size = usize::max(1, chunk_size / 2);
+            } else if decoded_size < revrel_sets.max_buffer_size() / 2 {
+                chunk_size = chunk_size.saturating_mul(2);
+            }
+        }
+
+        // The last parent to be computed adds its child to the next level
+        level = level
+            .into_par_iter()
+            .flat_map_iter(|dir| {
+                graph.successors(dir).into_iter().filter(move |&succ| {
+                    is_memoised(succ) && pending_parents[succ].fetch_sub(1, Ordering::Relaxed) == 1
+                })
+            })
+            .collect();
+        pl.update_with_count(num_directories);
+    }
+    pl.done();
+    log::info!(
+        "Directories have {num_levels} levels, their sets take {} bytes",
+        revrel_sets.size()
+    );
+
+    Ok(())
+}
+
+/// Same as [`write_revisions_from_contents`], but reads the root revisions/releases of
+/// each content from the sets of its parents, computed by [`compute_revrel_sets`],
+/// instead of traversing backward from it.
+///
+/// The path of each row is rebuilt by walking up from the content through parents whose
+/// set contains the revision/release.
+#[allow(clippy::too_many_arguments)]
+pub fn write_revisions_from_revrel_sets<G, P>(
+    graph: &G,
+    node_filter: NodeFilter,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    revrel_sets: &RevrelSets,
+    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<CntInRevrelTableBuilder<P>>>,
+    paths: &P::Paths,
+    key_index: Option<&KeyIndexBuilder>,
+) -> Result<()>
+where
+    P: PathColumnBuilder,
+    G: SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Listing revisions of contents...");
+
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_init(
+        || {
+            (
+                dataset_writer.get_thread_writer().unwrap(),
+                key_index.map(KeyIndexBuilder::thread_keys),
+                RapidHashMap::default(),
+                RapidHashMap::default(),
+                pl.clone(),
+            )
+        },
+        |(writer, thread_keys, ancestor_sets, direct_sets, thread_pl), node| -> Result<()> {
+            let is_reachable =
+                reachable_nodes.is_none_or(|reachable_nodes| reachable_nodes.get(node));
+            if is_reachable && graph.properties().node_type(node) == NodeType::Content {
+                write_revisions_of_content(
+                    graph,
+                    node_filter,
+                    reachable_nodes,
+                    frontier_directories,
+                    revrel_sets,
+                    writer,
+                    paths,
+                    thread_keys,
+                    ancestor_sets,
+                    direct_sets,
+                    node,
+                )?;
+            }
+            thread_pl.light_update();
+            Ok(())
+        },
+    )?;
+
+    pl.done();
+
+    Ok(())
+}
+
+#[allow(clippy::too_many_arguments)]
+fn write_revisions_of_content<G, P>(
+    graph: &G,
+    node_filter: NodeFilter,
+    reachable_nodes: Option<&BitVec>,
+    frontier_directories: &BitVec,
+    revrel_sets: &RevrelSets,
+    writer: &mut ParquetTableWriter<CntInRevrelTableBuilder<P>>,
+    paths: &P::Paths,
+    thread_keys: &mut Option<ThreadKeysBuffer>,
+    ancestor_sets: &mut RapidHashMap<NodeId, Vec<NodeId>>,
+    direct_sets: &mut RapidHashMap<NodeId, Vec<NodeId>>,
+    cnt: NodeId,
+) -> Result<()>
+where
+    P: PathColumnBuilder,
+    G: SwhLabeledBackwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let is_memoised =
+        |node| is_memoised_directory(graph, reachable_nodes, frontier_directories, node);
+
+    let mut revrels = Vec::new();
+    direct_revrels(graph, node_filter, reachable_nodes, cnt, &mut revrels);
+    for pred in graph.predecessors(cnt) {
+        if is_memoised(pred) {
+            revrel_sets.get(pred, &mut revrels)?;
+        }
+    }
+    revrels.sort_unstable();
+    revrels.dedup();
+
+    // Sets and sorted direct revisions/releases of ancestors of this content, computed
+    // once while rebuilding paths, as walks from the content to each revrel share most
+    // of their nodes
+    ancestor_sets.clear();
+    direct_sets.clear();
+    let mut parts: Vec<LabelNameId> = Vec::new();
+    for revrel in revrels {
+        // Walk up from the content, through parents whose set contains the revrel, until
+        // a node the revrel points to
+        parts.clear();
+        let mut node = cnt;
+        loop {
+            let direct = match direct_sets.entry(node) {
+                Entry::Occupied(entry) => entry.into_mut(),
+                Entry::Vacant(entry) => {
+                    let mut direct = Vec::new();
+                    direct_revrels(graph, node_filter, reachable_nodes, node, &mut direct);
+                    direct.sort_unstable();
+                    entry.insert(direct)
+                }
+            };
+            if direct.binary_search(&revrel).is_ok() {
+                break;
+            }
+            let mut parent = None;
+            for (pred, labels) in graph.untyped_labeled_predecessors(node) {
+                if !is_memoised(pred) {
+                    continue;
+                }
+                let pred_set = match ancestor_sets.entry(pred) {
+                    Entry::Occupied(entry) => entry.into_mut(),
+                    Entry::Vacant(entry) => {
+                        let mut pred_set = Vec::new();
+                        revrel_sets.get(pred, &mut pred_set)?;
+                        entry.insert(pred_set)
+                    }
+                };
+                if pred_set.binary_search(&revrel).is_ok() {
+                    // If the same subdir/file is present in a directory twice under the
+                    // same name, pick any name to represent both.
+                    let Some(first_label) = labels.into_iter().next() else {
+                        bail!(
+                            "{} <- {} has no labels",
+                            graph.properties().swhid(node),
+                            graph.properties().swhid(pred),
+                        )
+                    };
+                    // This is a dir->* arc, so its label is necessarily a DirEntry
+                    let first_label: swh_graph::labels::DirEntry = first_label.into();
+                    parent = Some((pred, first_label.label_name_id()));
+                    break;
+                }
+            }
+            let Some((pred, label)) = parent else {
+                bail!(
+                    "{} is in the set of {}, but not of its parents",
+                    graph.properties().swhid(revrel),
+                    graph.properties().swhid(node),
+                );
+            };
+            parts.push(label);
+            node = pred;
+        }
+        parts.reverse(); // from the root directory to the content
+
+        let Some(revrel_timestamp) = graph.properties().author_timestamp(revrel) else {
+            bail!("{} has no author date", graph.properties().swhid(revrel));
+        };
+        let builder = writer.builder()?;
+        builder
+            .cnt
+            .append_value(cnt.try_into().expect("NodeId overflowed u64"));
+        builder.revrel_author_date.append_value(revrel_timestamp);
+        builder
+            .revrel
+            .append_value(revrel.try_into().expect("NodeId overflowed u64"));
+        let path_parts = PathParts {
+            parts: &parts,
+            path_to_directory: false,
+        };
+        builder
+            .path
+            .append_path(paths, &path_parts.build_path(graph));
+        if let Some(thread_keys) = thread_keys {
+            thread_keys.push(cnt.try_into().expect("NodeId overflowed u64"));
+        }
+    }
+
+    Ok(())
 }
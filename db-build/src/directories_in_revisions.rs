@@ -3,7 +3,7 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
-use anyhow::Result;
+use anyhow::{ensure, Result};
 use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
 use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
 use rayon::prelude::*;
@@ -14,22 +14,41 @@ use value_traits::slices::SliceByValue;
 
 use crate::filters::NodeFilter;
 use crate::frontier::PathParts;
-use crate::x_in_y_dataset::DirInRevrelTableBuilder;
+use crate::key_index::{KeyIndexBuilder, ThreadKeysBuffer};
+use crate::key_ranges::KeyRangeWriters;
+use crate::traversal::TraversalContext;
+use crate::x_in_y_dataset::{DirInRevrelTableBuilder, PathColumnBuilder};
 
-pub fn write_revisions_from_frontier_directories<G>(
+/// Writes the revisions/releases containing each frontier directory, with the path from
+/// the revision/release to the directory.
+///
+/// Rows are written to the writer of the range of their directory (see
+/// [`KeyRangeWriters`]). `key_index` can only be given with a single writer.
+pub fn write_revisions_from_frontier_directories<G, P>(
     graph: &G,
     max_timestamps: impl SliceByValue<Value = i64> + Sync + Copy,
     node_filter: NodeFilter,
     reachable_nodes: Option<&BitVec>,
     frontier_directories: &BitVec,
-    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<DirInRevrelTableBuilder>>,
+    dataset_writer: impl Into<
+        KeyRangeWriters<ParallelDatasetWriter<ParquetTableWriter<DirInRevrelTableBuilder<P>>>>,
+    >,
+    paths: &P::Paths,
+    key_index: Option<&KeyIndexBuilder>,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhLabeledBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
     <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
 {
+    let dataset_writers: KeyRangeWriters<_> = dataset_writer.into();
+    ensure!(
+        key_index.is_none() || dataset_writers.writers().len() == 1,
+        "Key indexes can't be built while writing several ranges of keys"
+    );
+
     let mut pl = concurrent_progress_logger!(
         item_name = "node",
         display_memory = true,
@@ -41,8 +60,19 @@ where
     swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes())
         .into_par_iter()
         .try_for_each_init(
-            || (dataset_writer.get_thread_writer().unwrap(), pl.clone()),
-            |(writer, thread_pl), node| -> Result<()> {
+            || {
+                (
+                    dataset_writers
+                        .writers()
+                        .iter()
+                        .map(|dataset_writer| dataset_writer.get_thread_writer().unwrap())
+                        .collect::<Vec<_>>(),
+                    key_index.map(KeyIndexBuilder::thread_keys),
+                    TraversalContext::new(graph.num_nodes()),
+                    pl.clone(),
+                )
+            },
+            |(writers, thread_keys, ctx, thread_pl), node| -> Result<()> {
                 if frontier_directories.get(node) {
                     write_revisions_from_frontier_directory(
                         graph,
@@ -50,7 +80,10 @@ where
                         node_filter,
                         reachable_nodes,
                         frontier_directories,
-                        writer,
+                        &mut writers[dataset_writers.range_of(node)],
+                        paths,
+                        thread_keys,
+                        ctx,
                         node,
                     )?;
                 }
@@ -66,16 +99,20 @@ where
     Ok(())
 }
 
-fn write_revisions_from_frontier_directory<G>(
+fn write_revisions_from_frontier_directory<G, P>(
     graph: &G,
     max_timestamps: impl SliceByValue<Value = i64>,
     node_filter: NodeFilter,
     reachable_nodes: Option<&BitVec>,
     frontier_directories: &BitVec,
-    writer: &mut ParquetTableWriter<DirInRevrelTableBuilder>,
+    writer: &mut ParquetTableWriter<DirInRevrelTableBuilder<P>>,
+    paths: &P::Paths,
+    thread_keys: &mut Option<ThreadKeysBuffer>,
+    ctx: &mut TraversalContext,
     dir: NodeId,
 ) -> Result<()>
 where
+    P: PathColumnBuilder,
     G: SwhLabeledBackwardGraph + SwhGraphWithProperties,
     <G as SwhGraphWithProperties>::LabelNames: swh_graph::properties::LabelNames,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
@@ -119,9 +156,21 @@ where
             .revrel
             .append_value(revrel.try_into().expect("NodeId overflowed u64"));
         builder.revrel_author_date.append_value(revrel_timestamp);
-        builder.path.append_value(path_parts.build_path(graph));
+        builder
+            .path
+            .append_path(paths, &path_parts.build_path(graph));
+        if let Some(thread_keys) = thread_keys {
+            thread_keys.push(dir.try_into().expect("NodeId overflowed u64"));
+        }
 
         Ok(())
     };
-    crate::frontier::backward_dfs_with_path(graph, reachable_nodes, on_directory, on_revrel, dir)
+    crate::frontier::backward_dfs_with_path(
+        graph,
+        ctx,
+        reachable_nodes,
+        on_directory,
+        on_revrel,
+        dir,
+    )
 }
@@ -0,0 +1,248 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Table of the earliest revision/release containing each content, with an origin
+//! containing it, to find the oldest occurrence of a content with a single lookup.
+//!
+//! It is built from the array of timestamps written by `compute-earliest-timestamps`:
+//!
+//! 1. For each revision/release (in parallel), traverse the contents it contains, and for
+//!    each content whose timestamp is the revision/release's author date, atomically set
+//!    its earliest revision/release to the one with the lowest node id. Directories with
+//!    an earlier timestamp are skipped, as all contents they contain are earlier too.
+//! 2. For each origin (in parallel), traverse its snapshots, releases and revisions, and
+//!    atomically set their origin if none is set yet.
+//! 3. Write a row for each content with an earliest revision/release.
+
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use anyhow::Result;
+use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use rayon::prelude::*;
+use swh_graph::graph::*;
+use swh_graph::NodeType;
+use value_traits::slices::SliceByValue;
+
+use crate::filters::{is_root_revrel, NodeFilter};
+use crate::traversal::TraversalContext;
+use crate::x_in_y_dataset::EarliestOccurrencesTableBuilder;
+
+/// Returns, for each content, the revision/release with the lowest node id among those
+/// authored at the content's earliest `timestamp`, or `usize::MAX` for other nodes.
+///
+/// `timestamps` is the array written by `compute-earliest-timestamps`, with `i64::MIN`
+/// for nodes in no revision/release.
+pub fn compute_earliest_revrels<G>(
+    graph: &G,
+    timestamps: impl SliceByValue<Value = i64> + Sync + Copy,
+    node_filter: NodeFilter,
+) -> Vec<usize>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let earliest_revrels: Vec<_> = (0..graph.num_nodes())
+        .into_par_iter()
+        .map(|_| AtomicUsize::new(usize::MAX))
+        .collect();
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Finding earliest revision/release of each content...");
+    (0..graph.num_nodes()).into_par_iter().for_each_init(
+        || (TraversalContext::new(graph.num_nodes()), pl.clone()),
+        |(ctx, thread_pl), revrel| {
+            mark_earliest_contents(
+                graph,
+                ctx,
+                timestamps,
+                &earliest_revrels,
+                node_filter,
+                revrel,
+            );
+            thread_pl.light_update();
+        },
+    );
+    pl.done();
+
+    earliest_revrels
+        .into_par_iter()
+        .map(AtomicUsize::into_inner)
+        .collect()
+}
+
+/// Sets `revrel` as the earliest revision/release of the contents it contains which have
+/// its author date as timestamp, unless they already have one with a lower node id
+///
+/// Only descends into directories which have its author date as timestamp too, as those
+/// with an earlier one only contain earlier contents.
+fn mark_earliest_contents<G>(
+    graph: &G,
+    ctx: &mut TraversalContext,
+    timestamps: impl SliceByValue<Value = i64>,
+    earliest_revrels: &[AtomicUsize],
+    node_filter: NodeFilter,
+    revrel: NodeId,
+) where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    if !is_root_revrel(graph, node_filter, revrel) {
+        return;
+    }
+    let Some(revrel_timestamp) = graph.properties().author_timestamp(revrel) else {
+        // Revision/release has no date, so it is the earliest of nothing
+        return;
+    };
+
+    ctx.clear();
+    let TraversalContext { visited, stack, .. } = ctx;
+    stack.push(revrel);
+    while let Some(node) = stack.pop() {
+        for succ in graph.successors(node) {
+            let succ_type = graph.properties().node_type(succ);
+            if (succ_type != NodeType::Directory && succ_type != NodeType::Content)
+                || visited.contains(succ)
+            {
+                continue;
+            }
+            visited.insert(succ);
+            let timestamp = timestamps.get_value(succ).expect("timestamps too small");
+            if timestamp != revrel_timestamp {
+                // Contained in an earlier revision/release, and so is everything below it
+                continue;
+            }
+            if succ_type == NodeType::Content {
+                earliest_revrels[succ].fetch_min(revrel, Ordering::Relaxed);
+            } else {
+                stack.push(succ);
+            }
+        }
+    }
+}
+
+/// Returns, for each snapshot, revision and release, one of the origins containing it, or
+/// `usize::MAX` for other nodes and those in no origin.
+///
+/// Each origin's traversal stops at nodes which already have an origin, so every node is
+/// only visited once.
+pub fn compute_any_origins<G>(graph: &G) -> Vec<usize>
+where
+    G: SwhForwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let origins: Vec<_> = (0..graph.num_nodes())
+        .into_par_iter()
+        .map(|_| AtomicUsize::new(usize::MAX))
+        .collect();
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Finding an origin of each revision/release...");
+    (0..graph.num_nodes()).into_par_iter().for_each_init(
+        || pl.clone(),
+        |thread_pl, ori| {
+            thread_pl.light_update();
+            if graph.properties().node_type(ori) != NodeType::Origin {
+                return;
+            }
+            let mut stack = vec![ori];
+            while let Some(node) = stack.pop() {
+                for succ in graph.successors(node) {
+                    match graph.properties().node_type(succ) {
+                        NodeType::Snapshot | NodeType::Revision | NodeType::Release => {
+                            // If another origin got there first, it traverses the
+                            // successors itself
+                            if origins[succ]
+                                .compare_exchange(
+                                    usize::MAX,
+                                    ori,
+                                    Ordering::Relaxed,
+                                    Ordering::Relaxed,
+                                )
+                                .is_ok()
+                            {
+                                stack.push(succ);
+                            }
+                        }
+                        _ => (),
+                    }
+                }
+            }
+        },
+    );
+    pl.done();
+
+    origins
+        .into_par_iter()
+        .map(AtomicUsize::into_inner)
+        .collect()
+}
+
+/// Writes the earliest revision/release of each content, with its author date and one of
+/// its origins, see the [module documentation](self)
+pub fn write_earliest_occurrences<G>(
+    graph: &G,
+    timestamps: impl SliceByValue<Value = i64> + Sync + Copy,
+    node_filter: NodeFilter,
+    dataset_writer: ParallelDatasetWriter<ParquetTableWriter<EarliestOccurrencesTableBuilder>>,
+) -> Result<()>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let earliest_revrels = compute_earliest_revrels(graph, timestamps, node_filter);
+    let origins = compute_any_origins(graph);
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Writing earliest occurrences...");
+    (0..graph.num_nodes()).into_par_iter().try_for_each_init(
+        || (dataset_writer.get_thread_writer().unwrap(), pl.clone()),
+        |(writer, thread_pl), cnt| -> Result<()> {
+            thread_pl.light_update();
+            let revrel = earliest_revrels[cnt];
+            if revrel == usize::MAX {
+                return Ok(());
+            }
+            let ori = origins[revrel];
+            let builder = writer.builder()?;
+            builder
+                .cnt
+                .append_value(cnt.try_into().expect("NodeId overflowed u64"));
+            builder
+                .revrel
+                .append_value(revrel.try_into().expect("NodeId overflowed u64"));
+            builder
+                .revrel_author_date
+                .append_value(timestamps.get_value(cnt).expect("timestamps too small"));
+            builder.ori.append_option(
+                (ori != usize::MAX).then(|| ori.try_into().expect("NodeId overflowed u64")),
+            );
+            Ok(())
+        },
+    )?;
+    pl.done();
+
+    log::info!("Earliest occurrences written, finishing output");
+
+    Ok(())
+}
@@ -5,7 +5,8 @@
 
 use swh_graph::graph::*;
 use swh_graph::NodeType;
-use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
+
+use crate::traversal::TraversalContext;
 
 #[derive(Debug, PartialEq, Eq)]
 pub struct EarliestRevision {
@@ -16,14 +17,29 @@ pub struct EarliestRevision {
 
 /// Given a content/directory id, returns the id of the oldest revision that contains it
 pub fn find_earliest_revision<G>(graph: &G, src: usize) -> Option<EarliestRevision>
+where
+    G: SwhBackwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    find_earliest_revision_with_context(graph, &mut TraversalContext::new(graph.num_nodes()), src)
+}
+
+/// Same as [`find_earliest_revision`], but reuses the buffers of `ctx` instead of
+/// allocating new ones, which is faster when called on many nodes from the same thread
+pub fn find_earliest_revision_with_context<G>(
+    graph: &G,
+    ctx: &mut TraversalContext,
+    src: usize,
+) -> Option<EarliestRevision>
 where
     G: SwhBackwardGraph + SwhGraphWithProperties,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
     <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
 {
     // Initialize the DFS
-    let mut stack = Vec::new();
-    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
+    ctx.clear();
+    let TraversalContext { visited, stack, .. } = ctx;
     stack.push(src);
     visited.insert(src);
 
@@ -0,0 +1,199 @@
+// Copyright (C) 2024-2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Traversals computing, for any content or directory, the author date of the first
+//! revision or release that contains it.
+//!
+//! Timestamps are an array of `AtomicI64`, one for each node, initialized to `i64::MAX`.
+//! [`mark_all_reachable_contents`] traverses all contents and directories of every
+//! revision/release (in parallel), and atomically sets the timestamp of each of them to the
+//! current revision/release's author date if it is lower than the existing one.
+//!
+//! This traverses shared subtrees once per revision/release containing them.
+//! [`mark_reachable_contents_in_order`] instead traverses revisions/releases listed by
+//! [`list_dated_revrels`], in buckets of consecutive revisions/releases (in order, each
+//! bucket in parallel), and only descends into contents and directories whose timestamp
+//! it lowered.
+//!
+//! A node whose timestamp is not lowered was claimed by a revision/release at least as
+//! old, which descends (or already descended) into all its successors, so the result is
+//! the same. As revisions/releases are processed in order, each node is only claimed
+//! again by revisions/releases of the bucket which first reached it, instead of by every
+//! revision/release containing it.
+
+use std::sync::atomic::{AtomicI64, Ordering};
+
+use anyhow::Result;
+use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use rayon::prelude::*;
+
+use swh_graph::graph::*;
+use swh_graph::NodeType;
+use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
+
+use crate::filters::{is_root_revrel, NodeFilter};
+
+/// Calls [`mark_reachable_contents`] on all nodes, in parallel
+pub fn mark_all_reachable_contents<G>(
+    graph: &G,
+    timestamps: &[AtomicI64],
+    node_filter: NodeFilter,
+) -> Result<()>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Computing first occurrence date of each content...");
+
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
+        pl.clone(),
+        |thread_pl, revrel| -> Result<_> {
+            mark_reachable_contents(graph, timestamps, revrel, node_filter)?;
+            thread_pl.light_update();
+            Ok(())
+        },
+    )?;
+
+    pl.done();
+
+    Ok(())
+}
+
+/// Mark any content reachable from the root `revrel` as having a first occurrence
+/// older or equal to this revision
+pub fn mark_reachable_contents<G>(
+    graph: &G,
+    timestamps: &[AtomicI64],
+    revrel: NodeId,
+    node_filter: NodeFilter,
+) -> Result<()>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    if !is_root_revrel(graph, node_filter, revrel) {
+        return Ok(());
+    }
+
+    let Some(revrel_timestamp) = graph.properties().author_timestamp(revrel) else {
+        // Revision/release has no date, ignore it
+        return Ok(());
+    };
+
+    let mut stack = vec![revrel];
+    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
+
+    while let Some(node) = stack.pop() {
+        match graph.properties().node_type(node) {
+            NodeType::Content | NodeType::Directory => {
+                timestamps[node].fetch_min(revrel_timestamp, Ordering::Relaxed);
+            }
+            _ => (),
+        }
+
+        for succ in graph.successors(node) {
+            match graph.properties().node_type(succ) {
+                NodeType::Directory | NodeType::Content if !visited.contains(succ) => {
+                    stack.push(succ);
+                    visited.insert(succ);
+                }
+                _ => (),
+            }
+        }
+    }
+
+    Ok(())
+}
+
+/// Returns `(author_timestamp, node)` for each root revision/release with an author date,
+/// sorted by author date
+pub fn list_dated_revrels<G>(graph: &G, node_filter: NodeFilter) -> Vec<(i64, NodeId)>
+where
+    G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    <G as SwhGraphWithProperties>::Timestamps: swh_graph::properties::Timestamps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Listing dated revisions and releases...");
+    let mut revrels: Vec<(i64, NodeId)> = (0..graph.num_nodes())
+        .into_par_iter()
+        .filter_map_with(pl.clone(), |thread_pl, node| {
+            thread_pl.light_update();
+            if !is_root_revrel(graph, node_filter, node) {
+                return None;
+            }
+            // Revisions/releases without a date are ignored
+            let timestamp = graph.properties().author_timestamp(node)?;
+            Some((timestamp, node))
+        })
+        .collect();
+    pl.done();
+    log::info!(
+        "Sorting {} revisions and releases by date...",
+        revrels.len()
+    );
+    revrels.par_sort_unstable();
+    revrels
+}
+
+/// Same as [`mark_all_reachable_contents`], but traverses `revrels` (as returned by
+/// [`list_dated_revrels`]) by increasing author date, `bucket_size` at a time, and only
+/// descends into nodes whose timestamp was lowered by the current revision/release
+pub fn mark_reachable_contents_in_order<G>(
+    graph: &G,
+    timestamps: &[AtomicI64],
+    revrels: &[(i64, NodeId)],
+    bucket_size: usize,
+) where
+    G: SwhForwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "revrel",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(revrels.len()),
+    );
+    pl.start("Computing first occurrence date of each content, by date...");
+    for bucket in revrels.chunks(bucket_size.max(1)) {
+        bucket
+            .par_iter()
+            .for_each_with(pl.clone(), |thread_pl, &(revrel_timestamp, revrel)| {
+                let mut stack = vec![revrel];
+                while let Some(node) = stack.pop() {
+                    for succ in graph.successors(node) {
+                        let succ_type = graph.properties().node_type(succ);
+                        if succ_type != NodeType::Directory && succ_type != NodeType::Content {
+                            continue;
+                        }
+                        let previous_timestamp =
+                            timestamps[succ].fetch_min(revrel_timestamp, Ordering::Relaxed);
+                        // If not lowered, it was already claimed by a revision/release at least
+                        // as old, which takes care of its successors. This also prevents
+                        // visiting it twice from this revision/release.
+                        if revrel_timestamp < previous_timestamp && succ_type == NodeType::Directory
+                        {
+                            stack.push(succ);
+                        }
+                    }
+                }
+                thread_pl.light_update();
+            });
+    }
+    pl.done();
+}
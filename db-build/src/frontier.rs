@@ -10,13 +10,13 @@ use sux::traits::BitVecOps;
 use swh_graph::graph::*;
 use swh_graph::labels::LabelNameId;
 use swh_graph::NodeType;
-use swh_graph_stdlib::collections::PathStack;
-use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
+
+use crate::traversal::TraversalContext;
 
 /// Yielded by `dfs_with_path` to allow building a path as a `Vec<u8>` only when needed
 pub struct PathParts<'a> {
-    parts: &'a [LabelNameId],
-    path_to_directory: bool,
+    pub(crate) parts: &'a [LabelNameId],
+    pub(crate) path_to_directory: bool,
 }
 
 impl PathParts<'_> {
@@ -45,9 +45,12 @@ impl PathParts<'_> {
 ///
 /// If `on_directory` returns `false`, the directory's predecessors are ignored.
 ///
+/// `ctx` is cleared, then used for the traversal's buffers.
+///
 /// FIXME: `on_directory` is always called on the `root`, even if the `root` is a content
 pub fn backward_dfs_with_path<G>(
     graph: &G,
+    ctx: &mut TraversalContext,
     reachable_nodes: Option<&BitVec>,
     mut on_directory: impl FnMut(NodeId, PathParts) -> Result<bool>,
     mut on_revrel: impl FnMut(NodeId, PathParts) -> Result<()>,
@@ -66,9 +69,12 @@ where
         return Ok(());
     }
 
-    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
-    let mut stack = Vec::new();
-    let mut path_stack = PathStack::new();
+    ctx.clear();
+    let TraversalContext {
+        visited,
+        path_stack,
+        ..
+    } = ctx;
 
     let root_is_directory = match graph.properties().node_type(root) {
         NodeType::Content => false,
@@ -79,17 +85,14 @@ where
         ),
     };
 
-    stack.push(root);
-    path_stack.push([]);
+    path_stack.push_root(root);
     visited.insert(root);
 
-    while let Some(node) = stack.pop() {
-        let path_parts: Vec<_> = path_stack.pop().unwrap().collect();
-
+    while let Some((node, path)) = path_stack.pop() {
         let should_recurse = on_directory(
             node,
             PathParts {
-                parts: &path_parts,
+                parts: path_stack.path(path.clone()),
                 path_to_directory: root_is_directory,
             },
         )?;
@@ -118,16 +121,14 @@ where
                         // This is a dir->* arc, so its label is necessarily a DirEntry
                         let first_label: swh_graph::labels::DirEntry = first_label.into();
 
-                        stack.push(pred);
-                        path_stack.push(path_parts.iter().copied());
-                        path_stack.push_filename(first_label.label_name_id());
+                        path_stack.push_parent(pred, path.clone(), first_label.label_name_id());
                     }
 
                     NodeType::Revision | NodeType::Release => {
                         on_revrel(
                             pred,
                             PathParts {
-                                parts: &path_parts,
+                                parts: path_stack.path(path.clone()),
                                 path_to_directory: root_is_directory,
                             },
                         )?;
@@ -138,7 +139,7 @@ where
                                     on_revrel(
                                         predpred,
                                         PathParts {
-                                            parts: &path_parts,
+                                            parts: path_stack.path(path.clone()),
                                             path_to_directory: root_is_directory,
                                         },
                                     )?;
@@ -0,0 +1,295 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Selection of frontier directories from the number of rows they add to, and save from,
+//! each table, instead of the timestamp-based rule of the original algorithm.
+//!
+//! Making a directory `D` a frontier adds a row to `contents_in_frontier_directories` for
+//! each of the `n` contents it contains, and a row to `frontier_directories_in_revisions`
+//! for each of the `r` revisions/releases reaching it without going through another
+//! frontier; and saves the `r × n` rows these contents would have in
+//! `contents_in_revisions_without_frontiers`. `n` is known before traversing revisions,
+//! so `D` is worth being a frontier as soon as `r` reaches [`frontier_threshold`] of `n`.
+//!
+//! [`select_frontiers`] counts `r` while traversing revisions/releases in parallel, and
+//! makes directories frontiers as soon as they reach their threshold, so later traversals
+//! stop there. As the decision for a directory is made with a partial `r`, this is greedy:
+//! the outcome depends on the traversal order, but every frontier pays for itself.
+//!
+//! Contents are counted with the multiplicity of the paths leading to them (subdirectories
+//! shared by several paths are counted once per path), so `n` is an upper bound of the
+//! number of distinct contents. This makes all numbers here estimates.
+
+use std::sync::atomic::{AtomicU32, Ordering};
+
+use anyhow::{Context, Result};
+use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
+use sux::prelude::{AtomicBitVec, BitVec};
+use sux::traits::{AtomicBitVecOps, BitVecOps};
+
+use swh_graph::graph::*;
+use swh_graph::NodeType;
+use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
+
+use crate::filters::{is_root_revrel, NodeFilter};
+
+/// Value of [`ContentCounts`] for nodes which are not counted yet
+const UNKNOWN: u32 = u32::MAX;
+
+/// Estimated number of contents in each directory, recursively
+pub struct ContentCounts(Vec<AtomicU32>);
+
+impl ContentCounts {
+    /// Counts the contents of every directory, bottom-up, memoizing the count of each
+    /// subdirectory
+    pub fn new<G>(graph: &G) -> Self
+    where
+        G: SwhForwardGraph + SwhGraphWithProperties + Sync,
+        <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    {
+        let counts = ContentCounts(
+            (0..graph.num_nodes())
+                .map(|_| AtomicU32::new(UNKNOWN))
+                .collect(),
+        );
+
+        let mut pl = concurrent_progress_logger!(
+            item_name = "node",
+            display_memory = true,
+            local_speed = true,
+            expected_updates = Some(graph.num_nodes()),
+        );
+        pl.start("Counting contents of directories...");
+        swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).for_each_with(
+            pl.clone(),
+            |thread_pl, node| {
+                if graph.properties().node_type(node) == NodeType::Directory {
+                    counts.count_directory(graph, node);
+                }
+                thread_pl.light_update();
+            },
+        );
+        pl.done();
+
+        counts
+    }
+
+    fn count_directory<G>(&self, graph: &G, root_dir: NodeId)
+    where
+        G: SwhForwardGraph + SwhGraphWithProperties,
+        <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+    {
+        // Post-order traversal: a directory is counted when popped the second time, after
+        // all its subdirectories
+        let mut stack = vec![(root_dir, false)];
+        while let Some((dir, subdirs_counted)) = stack.pop() {
+            if self.0[dir].load(Ordering::Relaxed) != UNKNOWN {
+                continue; // counted by another path, or by another thread
+            }
+            if subdirs_counted {
+                let mut count = 0u32;
+                for succ in graph.successors(dir) {
+                    count = count.saturating_add(match graph.properties().node_type(succ) {
+                        NodeType::Content => 1,
+                        NodeType::Directory => self.0[succ].load(Ordering::Relaxed),
+                        _ => 0,
+                    });
+                }
+                self.0[dir].store(count.min(UNKNOWN - 1), Ordering::Relaxed);
+            } else {
+                stack.push((dir, true));
+                for succ in graph.successors(dir) {
+                    if graph.properties().node_type(succ) == NodeType::Directory
+                        && self.0[succ].load(Ordering::Relaxed) == UNKNOWN
+                    {
+                        stack.push((succ, false));
+                    }
+                }
+            }
+        }
+    }
+
+    /// Returns the estimated number of contents in the directory, or 0 for other nodes
+    pub fn get(&self, node: NodeId) -> u32 {
+        match self.0[node].load(Ordering::Relaxed) {
+            UNKNOWN => 0,
+            count => count,
+        }
+    }
+}
+
+/// Returns the number of revisions/releases which must reach a directory containing
+/// `num_contents` contents for it to be worth a frontier, ie. the smallest `r` such that
+/// `r × num_contents > num_contents × (1 + join_cost) + r`; or `u32::MAX` if there is none.
+///
+/// `join_cost` is the cost of the join with `frontier_directories_in_revisions` per row of
+/// `contents_in_frontier_directories`, relative to the cost of a row of any table. 0
+/// minimizes the total number of rows, higher values trade table size for faster queries.
+pub fn frontier_threshold(num_contents: u32, join_cost: f64) -> u32 {
+    if num_contents <= 1 {
+        // A single content is never cheaper through a frontier
+        return u32::MAX;
+    }
+    let num_contents = f64::from(num_contents);
+    let threshold = (num_contents * (1. + join_cost) / (num_contents - 1.)).floor() + 1.;
+    if threshold >= f64::from(u32::MAX) {
+        u32::MAX
+    } else {
+        threshold as u32
+    }
+}
+
+/// Returns the set of frontier directories picked by the cost model described in the
+/// [module documentation](self)
+pub fn select_frontiers<G>(
+    graph: &G,
+    content_counts: &ContentCounts,
+    node_filter: NodeFilter,
+    join_cost: f64,
+) -> Result<BitVec>
+where
+    G: SwhBackwardGraph + SwhForwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let frontiers = AtomicBitVec::new(graph.num_nodes());
+    // Number of revisions/releases reaching each directory without going through a frontier
+    let revrel_counts: Vec<AtomicU32> = (0..graph.num_nodes()).map(|_| AtomicU32::new(0)).collect();
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Selecting frontiers from revisions' directories...");
+    swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
+        pl.clone(),
+        |thread_pl, root| -> Result<()> {
+            if is_root_revrel(graph, node_filter, root) {
+                if let Some(root_dir) = swh_graph_stdlib::find_root_dir(graph, root)
+                    .context("Could not pick root directory")?
+                {
+                    let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
+                    let mut stack = vec![root_dir]; // The root dir itself cannot be a frontier
+                    while let Some(node) = stack.pop() {
+                        for succ in graph.successors(node) {
+                            if graph.properties().node_type(succ) != NodeType::Directory
+                                || visited.contains(succ)
+                                || frontiers.get(succ, Ordering::Relaxed)
+                            {
+                                continue;
+                            }
+                            visited.insert(succ);
+                            let num_contents = content_counts.get(succ);
+                            if num_contents == 0 {
+                                continue;
+                            }
+                            let num_revrels =
+                                revrel_counts[succ].fetch_add(1, Ordering::Relaxed) + 1;
+                            if num_revrels >= frontier_threshold(num_contents, join_cost) {
+                                frontiers.set(succ, true, Ordering::Relaxed);
+                            } else {
+                                stack.push(succ);
+                            }
+                        }
+                    }
+                }
+            }
+            thread_pl.light_update();
+            Ok(())
+        },
+    )?;
+    pl.done();
+
+    Ok(frontiers.into())
+}
+
+/// Estimated number of rows of each table built from a set of frontier directories
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq, Serialize, Deserialize)]
+pub struct TableSizes {
+    pub contents_in_revisions_without_frontiers: u64,
+    pub contents_in_frontier_directories: u64,
+    pub frontier_directories_in_revisions: u64,
+}
+
+impl TableSizes {
+    pub fn total(&self) -> u64 {
+        self.contents_in_revisions_without_frontiers
+            + self.contents_in_frontier_directories
+            + self.frontier_directories_in_revisions
+    }
+}
+
+/// Estimates the number of rows of each table built with the given `frontiers`, by
+/// traversing each revision/release's directories down to frontiers
+pub fn estimate_table_sizes<G>(
+    graph: &G,
+    content_counts: &ContentCounts,
+    node_filter: NodeFilter,
+    frontiers: &BitVec,
+) -> Result<TableSizes>
+where
+    G: SwhBackwardGraph + SwhForwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Estimating table sizes...");
+    let sizes = swh_graph::utils::shuffle::par_iter_shuffled_range(0..graph.num_nodes())
+        .map_with(pl.clone(), |thread_pl, node| -> Result<TableSizes> {
+            thread_pl.light_update();
+            let mut sizes = TableSizes::default();
+            if frontiers.get(node) {
+                sizes.contents_in_frontier_directories = content_counts.get(node).into();
+            }
+            if !is_root_revrel(graph, node_filter, node) {
+                return Ok(sizes);
+            }
+            let Some(root_dir) = swh_graph_stdlib::find_root_dir(graph, node)
+                .context("Could not pick root directory")?
+            else {
+                return Ok(sizes);
+            };
+            let mut visited = AdaptiveNodeSet::new(graph.num_nodes());
+            let mut stack = vec![root_dir];
+            visited.insert(root_dir);
+            while let Some(dir) = stack.pop() {
+                for succ in graph.successors(dir) {
+                    match graph.properties().node_type(succ) {
+                        NodeType::Content => sizes.contents_in_revisions_without_frontiers += 1,
+                        NodeType::Directory if !visited.contains(succ) => {
+                            visited.insert(succ);
+                            if frontiers.get(succ) {
+                                sizes.frontier_directories_in_revisions += 1;
+                            } else {
+                                stack.push(succ);
+                            }
+                        }
+                        _ => (),
+                    }
+                }
+            }
+            Ok(sizes)
+        })
+        .try_reduce(TableSizes::default, |a, b| {
+            Ok(TableSizes {
+                contents_in_revisions_without_frontiers: a.contents_in_revisions_without_frontiers
+                    + b.contents_in_revisions_without_frontiers,
+                contents_in_frontier_directories: a.contents_in_frontier_directories
+                    + b.contents_in_frontier_directories,
+                frontier_directories_in_revisions: a.frontier_directories_in_revisions
+                    + b.frontier_directories_in_revisions,
+            })
+        })?;
+    pl.done();
+
+    Ok(sizes)
+}
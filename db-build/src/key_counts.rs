@@ -0,0 +1,377 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Number of distinct values associated with each key of `x_in_y` tables, to answer
+//! cardinality queries without reading the tables.
+//!
+//! Counts are stored in a directory containing:
+//!
+//! * `counts.ef`: an Elias-Fano sequence of `num_nodes + 1` cumulative counts, indexed by
+//!   key: key `k` has `counts[k + 1] - counts[k]` values,
+//! * `meta.json`: [`KeyCountsMetadata`].
+
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::path::{Path, PathBuf};
+use std::sync::Mutex;
+
+use anyhow::{ensure, Context, Result};
+use dsi_progress_logger::ProgressLog;
+use epserde::prelude::*;
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
+use sux::prelude::elias_fano::{EfSeq, EliasFanoBuilder};
+use sux::traits::IndexedSeq;
+
+use crate::adjacency::{count_rows, list_parquet_files, read_rows_in_range};
+
+/// Incremented on every backward-incompatible change to the format
+pub const FORMAT_VERSION: u32 = 1;
+
+const COUNTS_FILE: &str = "counts.ef";
+const METADATA_FILE: &str = "meta.json";
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct KeyCountsMetadata {
+    pub format_version: u32,
+    pub swh_graph_provenance_version: String,
+    /// Name of the column of the original table the keys come from
+    pub key_column: String,
+    /// What is counted for each key, eg. the name of the column of the original table
+    /// whose distinct values are counted
+    pub value_column: String,
+    /// Number of keys, ie. number of nodes in the graph
+    pub num_nodes: usize,
+    /// Sum of the counts of all keys
+    pub total: u64,
+    /// Number of keys with a count in `[2^(i-1), 2^i)` at index `i`, and with a count of
+    /// zero at index 0, to tell heavy hitters apart from other keys
+    #[serde(default)]
+    pub histogram: Vec<u64>,
+}
+
+impl KeyCountsMetadata {
+    /// Returns an upper bound of the count of a fraction `q` (between 0 and 1) of the
+    /// keys with a non-zero count, or 0 if there is no such key or no histogram
+    pub fn quantile(&self, q: f64) -> u64 {
+        let num_keys: u64 = self.histogram.iter().skip(1).sum();
+        let rank = (q.clamp(0., 1.) * num_keys as f64).ceil() as u64;
+        let mut seen = 0;
+        for (i, &bucket) in self.histogram.iter().enumerate().skip(1) {
+            seen += bucket;
+            if bucket > 0 && seen >= rank {
+                return u64::MAX >> (u64::BITS as usize - i);
+            }
+        }
+        0
+    }
+}
+
+/// Returns the index of `count` in [`KeyCountsMetadata::histogram`]
+fn histogram_bucket(count: usize) -> usize {
+    (usize::BITS - count.leading_zeros()) as usize
+}
+
+/// Writes counts one key at a time, by increasing order of keys
+pub struct KeyCountsWriter {
+    path: PathBuf,
+    metadata: KeyCountsMetadata,
+    counts: EliasFanoBuilder,
+    max_total: usize,
+    next_key: usize,
+    total: usize,
+}
+
+impl KeyCountsWriter {
+    /// Creates new counts in the `path` directory, which must not exist yet.
+    ///
+    /// `max_total` is an upper bound on the sum of all counts, used to size the
+    /// Elias-Fano sequence.
+    pub fn new(
+        path: PathBuf,
+        key_column: &str,
+        value_column: &str,
+        num_nodes: usize,
+        max_total: usize,
+    ) -> Result<Self> {
+        std::fs::create_dir(&path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        Ok(KeyCountsWriter {
+            metadata: KeyCountsMetadata {
+                format_version: FORMAT_VERSION,
+                swh_graph_provenance_version: crate::VERSION.to_owned(),
+                key_column: key_column.to_owned(),
+                value_column: value_column.to_owned(),
+                num_nodes,
+                total: 0,
+                histogram: Vec::new(),
+            },
+            path,
+            counts: EliasFanoBuilder::new(num_nodes + 1, max_total),
+            max_total,
+            next_key: 0,
+            total: 0,
+        })
+    }
+
+    /// Writes the count of a key.
+    ///
+    /// Keys must be pushed in strictly increasing order. Keys which are never pushed have
+    /// a count of zero.
+    pub fn push(&mut self, key: usize, count: usize) -> Result<()> {
+        ensure!(
+            key >= self.next_key,
+            "Keys must be written in increasing order, but got {key} after {}",
+            self.next_key - 1
+        );
+        ensure!(
+            key < self.metadata.num_nodes,
+            "Key {key} is not a node id (there are {} nodes)",
+            self.metadata.num_nodes
+        );
+        for _ in self.next_key..=key {
+            self.counts.push(self.total);
+        }
+        self.count_in_histogram(count, 1);
+        self.count_in_histogram(0, key - self.next_key);
+        self.next_key = key + 1;
+        self.total += count;
+        ensure!(
+            self.total <= self.max_total,
+            "Counts add up to more than announced"
+        );
+        Ok(())
+    }
+
+    fn count_in_histogram(&mut self, count: usize, num_keys: usize) {
+        if num_keys == 0 {
+            return;
+        }
+        let bucket = histogram_bucket(count);
+        if self.metadata.histogram.len() <= bucket {
+            self.metadata.histogram.resize(bucket + 1, 0);
+        }
+        self.metadata.histogram[bucket] += num_keys as u64;
+    }
+
+    /// Writes the counts and metadata, and returns the latter
+    pub fn finish(mut self) -> Result<KeyCountsMetadata> {
+        for _ in self.next_key..=self.metadata.num_nodes {
+            self.counts.push(self.total);
+        }
+        self.count_in_histogram(0, self.metadata.num_nodes - self.next_key);
+        self.metadata.total = self.total as u64;
+
+        let counts: EfSeq = self.counts.build_with_seq();
+        let counts_path = self.path.join(COUNTS_FILE);
+        let mut counts_file = BufWriter::new(
+            File::create_new(&counts_path)
+                .with_context(|| format!("Could not create {}", counts_path.display()))?,
+        );
+        unsafe { counts.serialize(&mut counts_file) }
+            .with_context(|| format!("Could not serialize {}", counts_path.display()))?;
+        counts_file
+            .flush()
+            .with_context(|| format!("Could not flush {}", counts_path.display()))?;
+
+        let metadata_path = self.path.join(METADATA_FILE);
+        let metadata_file = File::create_new(&metadata_path)
+            .with_context(|| format!("Could not create {}", metadata_path.display()))?;
+        serde_json::to_writer_pretty(metadata_file, &self.metadata)
+            .with_context(|| format!("Could not write {}", metadata_path.display()))?;
+
+        Ok(self.metadata)
+    }
+}
+
+/// Counts of each key, mmapped from disk
+pub struct KeyCounts {
+    metadata: KeyCountsMetadata,
+    counts: MemCase<DeserType<'static, EfSeq>>,
+}
+
+impl KeyCounts {
+    pub fn load(path: &Path) -> Result<Self> {
+        let metadata_path = path.join(METADATA_FILE);
+        let metadata_file = File::open(&metadata_path)
+            .with_context(|| format!("Could not open {}", metadata_path.display()))?;
+        let metadata: KeyCountsMetadata =
+            serde_json::from_reader(std::io::BufReader::new(metadata_file))
+                .with_context(|| format!("Could not parse {}", metadata_path.display()))?;
+        ensure!(
+            metadata.format_version == FORMAT_VERSION,
+            "{} has format version {}, expected {}",
+            path.display(),
+            metadata.format_version,
+            FORMAT_VERSION
+        );
+
+        let counts_path = path.join(COUNTS_FILE);
+        let counts = unsafe { EfSeq::mmap(&counts_path, Flags::RANDOM_ACCESS) }
+            .with_context(|| format!("Could not mmap {}", counts_path.display()))?;
+        ensure!(
+            counts.uncase().len() == metadata.num_nodes + 1,
+            "{} has {} counts, expected {}",
+            counts_path.display(),
+            counts.uncase().len(),
+            metadata.num_nodes + 1
+        );
+
+        Ok(KeyCounts { metadata, counts })
+    }
+
+    pub fn metadata(&self) -> &KeyCountsMetadata {
+        &self.metadata
+    }
+
+    /// Returns the count of the given key, which is zero for keys which are not node ids
+    pub fn count(&self, key: usize) -> u64 {
+        if key >= self.metadata.num_nodes {
+            return 0;
+        }
+        let counts = self.counts.uncase();
+        (counts.get(key + 1) - counts.get(key)) as u64
+    }
+}
+
+/// Counts the distinct values of `value_column` associated with each key of `key_column`
+/// in a Parquet table, and writes them in `output`.
+///
+/// Like [`build_from_parquet`](crate::adjacency::build_from_parquet), the table is read
+/// `num_chunks` times, so memory usage is proportional to its size divided by `num_chunks`.
+pub fn count_from_parquet<PL: ProgressLog + Send>(
+    dataset_path: &Path,
+    key_column: &str,
+    value_column: &str,
+    num_nodes: usize,
+    num_chunks: usize,
+    output: PathBuf,
+    pl: &mut PL,
+) -> Result<KeyCountsMetadata> {
+    let file_paths = list_parquet_files(dataset_path)?;
+    let num_rows = count_rows(&file_paths)?;
+
+    let mut writer = KeyCountsWriter::new(output, key_column, value_column, num_nodes, num_rows)?;
+
+    pl.item_name("row");
+    pl.expected_updates(Some(num_rows));
+    pl.start("Counting values of each key");
+    let pl = Mutex::new(pl);
+
+    let chunk_size = num_nodes.div_ceil(num_chunks.max(1)).max(1);
+    for chunk_start in (0..num_nodes).step_by(chunk_size) {
+        let keys = (chunk_start as u64)..((chunk_start + chunk_size).min(num_nodes) as u64);
+        let mut rows = file_paths
+            .par_iter()
+            .map(|file_path| {
+                let rows = read_rows_in_range(file_path, key_column, value_column, &keys)?;
+                pl.lock().unwrap().update_with_count(rows.len());
+                Ok(rows)
+            })
+            .collect::<Result<Vec<_>>>()?
+            .concat();
+        rows.par_sort_unstable();
+        rows.dedup();
+
+        for chunk in rows.chunk_by(|(key1, _), (key2, _)| key1 == key2) {
+            let key = usize::try_from(chunk[0].0).context("key overflowed usize")?;
+            writer.push(key, chunk.len())?;
+        }
+    }
+
+    pl.into_inner().unwrap().done();
+    writer.finish()
+}
+
+/// Given a Parquet table mapping keys to `join_column`, and the counts of the values of
+/// each `join_column` value, writes in `output` the sum of counts of the distinct
+/// `join_column` values associated with each key.
+///
+/// For example, given contents_in_frontier_directories and the number of
+/// revisions/releases each frontier directory is in, this computes for each content the
+/// number of (frontier directory, revision/release) pairs it is in through a frontier
+/// directory, which is an upper bound of the number of revisions/releases it is in that
+/// way.
+///
+/// As the sum is needed to size the output, the table is read twice `num_chunks` times.
+#[allow(clippy::too_many_arguments)]
+pub fn count_join_from_parquet<PL: ProgressLog + Send>(
+    dataset_path: &Path,
+    key_column: &str,
+    join_column: &str,
+    join_counts: &KeyCounts,
+    num_nodes: usize,
+    num_chunks: usize,
+    output: PathBuf,
+    pl: &mut PL,
+) -> Result<KeyCountsMetadata> {
+    let file_paths = list_parquet_files(dataset_path)?;
+    let num_rows = count_rows(&file_paths)?;
+
+    pl.item_name("row");
+    pl.expected_updates(Some(num_rows * 2));
+    pl.start("Counting values of each key through a join");
+    let pl = Mutex::new(pl);
+
+    let chunk_size = num_nodes.div_ceil(num_chunks.max(1)).max(1);
+    let chunk_counts = |chunk_start: usize| -> Result<Vec<(usize, usize)>> {
+        let keys = (chunk_start as u64)..((chunk_start + chunk_size).min(num_nodes) as u64);
+        let mut rows = file_paths
+            .par_iter()
+            .map(|file_path| {
+                let rows = read_rows_in_range(file_path, key_column, join_column, &keys)?;
+                pl.lock().unwrap().update_with_count(rows.len());
+                Ok(rows)
+            })
+            .collect::<Result<Vec<_>>>()?
+            .concat();
+        rows.par_sort_unstable();
+        rows.dedup();
+
+        rows.chunk_by(|(key1, _), (key2, _)| key1 == key2)
+            .map(|chunk| -> Result<(usize, usize)> {
+                let key = usize::try_from(chunk[0].0).context("key overflowed usize")?;
+                let count: u64 = chunk
+                    .iter()
+                    .map(|&(_key, joined)| {
+                        join_counts
+                            .count(usize::try_from(joined).expect("node id overflowed usize"))
+                    })
+                    .sum();
+                Ok((
+                    key,
+                    usize::try_from(count).context("count overflowed usize")?,
+                ))
+            })
+            .collect()
+    };
+
+    // First pass to compute the sum of counts...
+    let mut max_total = 0usize;
+    for chunk_start in (0..num_nodes).step_by(chunk_size) {
+        for (_key, count) in chunk_counts(chunk_start)? {
+            max_total = max_total
+                .checked_add(count)
+                .context("Sum of counts overflowed usize")?;
+        }
+    }
+
+    // ... then a second pass to write them
+    let mut writer = KeyCountsWriter::new(
+        output,
+        key_column,
+        &join_counts.metadata().value_column,
+        num_nodes,
+        max_total,
+    )?;
+    for chunk_start in (0..num_nodes).step_by(chunk_size) {
+        for (key, count) in chunk_counts(chunk_start)? {
+            writer.push(key, count)?;
+        }
+    }
+
+    pl.into_inner().unwrap().done();
+    writer.finish()
+}
@@ -0,0 +1,302 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Elias-Fano indexes of the keys of each Parquet file of a table, built from the keys
+//! written to it, so `swh-provenance-index` does not need to read the table again.
+//!
+//! [`ParallelDatasetWriter`](dataset_writer::ParallelDatasetWriter) writes the rows of
+//! each thread to a file of its own, but does not tell which. So keys are collected per
+//! thread, and matched to the file with the same number of rows, smallest and largest
+//! key, read from the footers of the table's files once it is written. Files which can't
+//! be matched unambiguously are left for `swh-provenance-index` to index.
+//!
+//! The names of indexed files are listed in [`WRITTEN_KEY_INDEXES_FILE`], for
+//! `swh-provenance-index` to use their index instead of building it.
+
+use std::collections::HashMap;
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::path::{Path, PathBuf};
+use std::thread::ThreadId;
+
+use anyhow::{anyhow, Context, Result};
+use dashmap::DashMap;
+use epserde::prelude::*;
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use parquet::file::statistics::Statistics;
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
+use sux::prelude::elias_fano::{EfDict, EliasFanoBuilder};
+
+use crate::adjacency::list_parquet_files;
+
+/// Elias-Fano index of the distinct keys of a Parquet file, as mmapped by the server
+pub type KeyIndex = EfDict;
+
+/// Returns the path of the index of `key_column` in the Parquet file named `file_name`,
+/// in the directory of Elias-Fano indexes of its table
+pub fn key_index_path(ef_indexes_path: &Path, file_name: &str, key_column: &str) -> PathBuf {
+    ef_indexes_path.join(format!("{file_name}.{key_column}.ef"))
+}
+
+/// Name of the file containing [`WrittenKeyIndexes`], in the directory of Elias-Fano
+/// indexes of a table
+pub const WRITTEN_KEY_INDEXES_FILE: &str = "key_indexes.json";
+
+/// Files of a table whose key index was written by [`KeyIndexBuilder`]
+#[derive(Debug, Clone, Default, PartialEq, Eq, Serialize, Deserialize)]
+pub struct WrittenKeyIndexes {
+    pub key_column: String,
+    /// Names of the Parquet files, relative to the table's directory
+    pub files: Vec<String>,
+}
+
+impl WrittenKeyIndexes {
+    /// Reads the list in `ef_indexes_path`, or returns an empty one if there is none
+    pub fn load_or_default(ef_indexes_path: &Path) -> Result<Self> {
+        let path = ef_indexes_path.join(WRITTEN_KEY_INDEXES_FILE);
+        if !path.exists() {
+            return Ok(Self::default());
+        }
+        let file =
+            File::open(&path).with_context(|| format!("Could not open {}", path.display()))?;
+        serde_json::from_reader(std::io::BufReader::new(file))
+            .with_context(|| format!("Could not parse {}", path.display()))
+    }
+
+    pub(crate) fn write(&self, ef_indexes_path: &Path) -> Result<()> {
+        let path = ef_indexes_path.join(WRITTEN_KEY_INDEXES_FILE);
+        let file = File::create_new(&path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        serde_json::to_writer_pretty(file, self)
+            .with_context(|| format!("Could not write {}", path.display()))
+    }
+
+    /// Returns whether the key index of `key_column` in the file named `file_name` was
+    /// written by [`KeyIndexBuilder`]
+    pub fn contains(&self, file_name: &str, key_column: &str) -> bool {
+        self.key_column == key_column && self.files.iter().any(|file| file == file_name)
+    }
+}
+
+/// Number of rows, smallest and largest key of a file
+type FileIdentity = (u64, u64, u64);
+
+#[derive(Default)]
+struct ThreadKeys {
+    /// Unsorted, without consecutive duplicates
+    keys: Vec<u64>,
+    num_rows: u64,
+    min: Option<u64>,
+    max: Option<u64>,
+}
+
+impl ThreadKeys {
+    fn extend(&mut self, other: ThreadKeys) {
+        self.keys.extend(other.keys);
+        self.num_rows += other.num_rows;
+        self.min = self.min.into_iter().chain(other.min).min();
+        self.max = self.max.into_iter().chain(other.max).max();
+    }
+}
+
+/// Collects the keys written by each thread to a
+/// [`ParallelDatasetWriter`](dataset_writer::ParallelDatasetWriter), then writes their
+/// indexes
+pub struct KeyIndexBuilder {
+    threads: DashMap<ThreadId, ThreadKeys>,
+}
+
+impl Default for KeyIndexBuilder {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl KeyIndexBuilder {
+    pub fn new() -> Self {
+        KeyIndexBuilder {
+            threads: DashMap::new(),
+        }
+    }
+
+    /// Returns a buffer of the keys written by the current thread, which must be used
+    /// alongside the writer returned by `get_thread_writer()` in the same thread
+    pub fn thread_keys(&self) -> ThreadKeysBuffer<'_> {
+        ThreadKeysBuffer {
+            builder: self,
+            thread_id: std::thread::current().id(),
+            keys: ThreadKeys::default(),
+        }
+    }
+
+    /// Matches the keys of each thread to the files in `dataset_path`, which must be
+    /// fully written, and writes an index of each matched file to `ef_indexes_path`.
+    ///
+    /// Returns the number of files indexed.
+    pub fn write(
+        self,
+        dataset_path: &Path,
+        key_column: &str,
+        ef_indexes_path: &Path,
+    ) -> Result<usize> {
+        std::fs::create_dir_all(ef_indexes_path)
+            .with_context(|| format!("Could not create {}", ef_indexes_path.display()))?;
+
+        let mut files: HashMap<FileIdentity, Vec<PathBuf>> = HashMap::new();
+        for file_path in list_parquet_files(dataset_path)? {
+            if let Some(identity) = file_identity(&file_path, key_column)? {
+                files.entry(identity).or_default().push(file_path);
+            }
+        }
+        let mut threads: HashMap<FileIdentity, Vec<Vec<u64>>> = HashMap::new();
+        for (_, thread_keys) in self.threads {
+            if let (Some(min), Some(max)) = (thread_keys.min, thread_keys.max) {
+                threads
+                    .entry((thread_keys.num_rows, min, max))
+                    .or_default()
+                    .push(thread_keys.keys);
+            }
+        }
+
+        let mut matches = Vec::new();
+        for (identity, file_paths) in files {
+            let mut thread_keys = threads.remove(&identity).unwrap_or_default();
+            if let ([file_path], 1) = (file_paths.as_slice(), thread_keys.len()) {
+                matches.push((file_path.clone(), thread_keys.pop().unwrap()));
+            } else {
+                let (num_rows, min, max) = identity;
+                log::warn!(
+                    "{} files and {} threads have {num_rows} rows with keys from {min} to \
+                    {max}, leaving them to swh-provenance-index",
+                    file_paths.len(),
+                    thread_keys.len(),
+                );
+            }
+        }
+
+        let mut file_names = matches
+            .into_par_iter()
+            .map(|(file_path, keys)| {
+                let file_name = file_path
+                    .file_name()
+                    .expect("Parquet file has no name")
+                    .to_string_lossy()
+                    .into_owned();
+                write_key_index(
+                    keys,
+                    &key_index_path(ef_indexes_path, &file_name, key_column),
+                )?;
+                Ok(file_name)
+            })
+            .collect::<Result<Vec<_>>>()?;
+        file_names.sort();
+
+        let written = WrittenKeyIndexes {
+            key_column: key_column.to_owned(),
+            files: file_names,
+        };
+        written.write(ef_indexes_path)?;
+
+        Ok(written.files.len())
+    }
+}
+
+/// Keys written by a thread, added to its [`KeyIndexBuilder`] when dropped
+pub struct ThreadKeysBuffer<'a> {
+    builder: &'a KeyIndexBuilder,
+    thread_id: ThreadId,
+    keys: ThreadKeys,
+}
+
+impl ThreadKeysBuffer<'_> {
+    /// Records a row with the given key
+    pub fn push(&mut self, key: u64) {
+        // Rows are usually written grouped by key
+        if self.keys.keys.last() != Some(&key) {
+            self.keys.keys.push(key);
+        }
+        self.keys.num_rows += 1;
+        self.keys.min = Some(self.keys.min.map_or(key, |min| min.min(key)));
+        self.keys.max = Some(self.keys.max.map_or(key, |max| max.max(key)));
+    }
+}
+
+impl Drop for ThreadKeysBuffer<'_> {
+    fn drop(&mut self) {
+        let keys = std::mem::take(&mut self.keys);
+        self.builder
+            .threads
+            .entry(self.thread_id)
+            .or_default()
+            .extend(keys);
+    }
+}
+
+/// Returns the number of rows, smallest and largest value of `key_column` of a Parquet
+/// file, from its footer, or `None` if it is empty
+fn file_identity(file_path: &Path, key_column: &str) -> Result<Option<FileIdentity>> {
+    let file =
+        File::open(file_path).with_context(|| format!("Could not open {}", file_path.display()))?;
+    let reader_builder = ParquetRecordBatchReaderBuilder::try_new(file)
+        .with_context(|| format!("Could not read {} as Parquet", file_path.display()))?;
+    let metadata = reader_builder.metadata();
+    let key_column_index = metadata
+        .file_metadata()
+        .schema_descr()
+        .columns()
+        .iter()
+        .position(|col| col.name() == key_column)
+        .ok_or_else(|| anyhow!("{} has no '{}' column", file_path.display(), key_column))?;
+    let mut identity: Option<FileIdentity> = None;
+    for row_group in metadata.row_groups() {
+        if row_group.num_rows() == 0 {
+            continue;
+        }
+        let (min, max) = match row_group.column(key_column_index).statistics() {
+            Some(Statistics::Int64(statistics)) => statistics
+                .min_opt()
+                .copied()
+                .zip(statistics.max_opt().copied()),
+            _ => None,
+        }
+        .with_context(|| {
+            format!(
+                "{} has no statistics for '{}'",
+                file_path.display(),
+                key_column
+            )
+        })?;
+        // Node ids are stored as INT64 with an unsigned logical type
+        let (min, max) = (min as u64, max as u64);
+        let num_rows = row_group.num_rows() as u64;
+        identity = Some(match identity {
+            Some((total, total_min, total_max)) => {
+                (total + num_rows, total_min.min(min), total_max.max(max))
+            }
+            None => (num_rows, min, max),
+        });
+    }
+    Ok(identity)
+}
+
+/// Writes the index of the given keys, which may be unsorted and contain duplicates
+pub(crate) fn write_key_index(mut keys: Vec<u64>, path: &Path) -> Result<()> {
+    keys.sort_unstable();
+    keys.dedup();
+    let mut builder = EliasFanoBuilder::new(keys.len(), keys.last().copied().unwrap_or(0) as usize);
+    for key in keys {
+        builder.push(key as usize);
+    }
+    let index: KeyIndex = builder.build_with_dict();
+
+    let mut file = BufWriter::new(
+        File::create_new(path).with_context(|| format!("Could not create {}", path.display()))?,
+    );
+    unsafe { index.serialize(&mut file) }
+        .with_context(|| format!("Could not serialize {}", path.display()))?;
+    file.flush()
+        .with_context(|| format!("Could not flush {}", path.display()))
+}
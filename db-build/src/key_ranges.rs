@@ -0,0 +1,215 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Tables whose files each cover a disjoint range of keys, sorted by key, so statistics of
+//! files and row groups exclude all but one of them for any given key.
+//!
+//! Traversals write each row to the unsorted dataset of its range of keys, with one
+//! [`ParallelDatasetWriter`](dataset_writer::ParallelDatasetWriter) per range (see
+//! [`KeyRangeWriters`]). Then [`sort_key_ranges`] reads each of these datasets, sorts
+//! its rows by key, and writes them to a single file of the final table.
+//!
+//! Memory usage of the second step is proportional to the size of the table, divided by
+//! the number of ranges, times the number of threads.
+
+use std::fs::File;
+use std::path::{Path, PathBuf};
+use std::sync::Arc;
+
+use anyhow::{anyhow, Context, Result};
+use arrow::array::{AsArray, RecordBatch};
+use arrow::compute::{concat_batches, sort_to_indices, take_record_batch};
+use arrow::datatypes::{SchemaRef, UInt64Type};
+use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use parquet::arrow::ArrowWriter;
+use parquet::file::properties::WriterProperties;
+use rayon::prelude::*;
+
+use crate::adjacency::list_parquet_files;
+use crate::key_index::{key_index_path, write_key_index, WrittenKeyIndexes};
+
+/// Writers of each range of keys of a table; or of the whole table, for unsorted tables
+pub struct KeyRangeWriters<W> {
+    writers: Vec<W>,
+    keys_per_range: usize,
+}
+
+impl<W> From<W> for KeyRangeWriters<W> {
+    /// Writes all rows to the same writer
+    fn from(writer: W) -> Self {
+        KeyRangeWriters {
+            writers: vec![writer],
+            keys_per_range: usize::MAX,
+        }
+    }
+}
+
+impl<W> KeyRangeWriters<W> {
+    /// Splits keys in `0..num_keys` into as many ranges of consecutive keys as there are
+    /// `writers`
+    pub fn new(writers: Vec<W>, num_keys: usize) -> Self {
+        assert!(!writers.is_empty(), "No key range writer");
+        KeyRangeWriters {
+            keys_per_range: num_keys.div_ceil(writers.len()).max(1),
+            writers,
+        }
+    }
+
+    pub fn writers(&self) -> &[W] {
+        &self.writers
+    }
+
+    /// Returns the index of the writer of rows with the given key
+    pub fn range_of(&self, key: usize) -> usize {
+        (key / self.keys_per_range).min(self.writers.len() - 1)
+    }
+}
+
+/// Returns the path of the unsorted dataset of each of the `num_ranges` ranges of keys
+/// written to `spill_path`
+pub fn key_range_paths(spill_path: &Path, num_ranges: usize) -> Vec<PathBuf> {
+    (0..num_ranges)
+        .map(|range| spill_path.join(format!("{range:06}")))
+        .collect()
+}
+
+/// Sorts the rows of each dataset in `key_range_paths` by `key_column`, writes them to a
+/// file of `output_path`, then removes the dataset.
+///
+/// Files are named after the position of their range, so they are also sorted by name.
+/// If `key_indexes_out` is given, the Elias-Fano index of the keys of each file is
+/// written there (see [`crate::key_index`]).
+pub fn sort_key_ranges(
+    key_range_paths: &[PathBuf],
+    key_column: &str,
+    schema: SchemaRef,
+    writer_properties: &WriterProperties,
+    output_path: &Path,
+    key_indexes_out: Option<&Path>,
+) -> Result<()> {
+    std::fs::create_dir_all(output_path)
+        .with_context(|| format!("Could not create {}", output_path.display()))?;
+    if let Some(key_indexes_out) = key_indexes_out {
+        std::fs::create_dir_all(key_indexes_out)
+            .with_context(|| format!("Could not create {}", key_indexes_out.display()))?;
+    }
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "range",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(key_range_paths.len()),
+    );
+    pl.start("Sorting key ranges...");
+    let mut file_names = key_range_paths
+        .par_iter()
+        .enumerate()
+        .map_with(pl.clone(), |thread_pl, (range, range_path)| {
+            let file_name = format!("{range:06}.parquet");
+            let file_path = output_path.join(&file_name);
+            let keys = sort_key_range(
+                range_path,
+                key_column,
+                schema.clone(),
+                writer_properties.clone(),
+                &file_path,
+            )
+            .with_context(|| format!("Could not sort {}", range_path.display()))?;
+            if range_path.exists() {
+                std::fs::remove_dir_all(range_path)
+                    .with_context(|| format!("Could not remove {}", range_path.display()))?;
+            }
+            thread_pl.update();
+            let Some(keys) = keys else {
+                return Ok(None); // empty range
+            };
+            if let Some(key_indexes_out) = key_indexes_out {
+                write_key_index(
+                    keys,
+                    &key_index_path(key_indexes_out, &file_name, key_column),
+                )?;
+            }
+            Ok(Some(file_name))
+        })
+        .filter_map(Result::transpose)
+        .collect::<Result<Vec<_>>>()?;
+    pl.done();
+
+    if let Some(key_indexes_out) = key_indexes_out {
+        file_names.sort();
+        WrittenKeyIndexes {
+            key_column: key_column.to_owned(),
+            files: file_names,
+        }
+        .write(key_indexes_out)?;
+    }
+
+    Ok(())
+}
+
+/// Writes all rows of the dataset in `range_path` to `file_path`, sorted by key, and
+/// returns their keys; or does not write anything and returns `None` if it is empty
+fn sort_key_range(
+    range_path: &Path,
+    key_column: &str,
+    schema: SchemaRef,
+    writer_properties: WriterProperties,
+    file_path: &Path,
+) -> Result<Option<Vec<u64>>> {
+    if !range_path.exists() {
+        return Ok(None);
+    }
+    let batches = list_parquet_files(range_path)?
+        .into_iter()
+        .map(|file_path| {
+            let file = File::open(&file_path)
+                .with_context(|| format!("Could not open {}", file_path.display()))?;
+            ParquetRecordBatchReaderBuilder::try_new(file)
+                .with_context(|| format!("Could not read {} as Parquet", file_path.display()))?
+                .build()
+                .with_context(|| format!("Could not read {}", file_path.display()))?
+                .map(|batch| {
+                    batch.with_context(|| {
+                        format!("Could not read batch from {}", file_path.display())
+                    })
+                })
+                .collect::<Result<Vec<RecordBatch>>>()
+        })
+        .collect::<Result<Vec<_>>>()?;
+    let batch = concat_batches(&schema, batches.iter().flatten())
+        .context("Could not concatenate batches")?;
+    if batch.num_rows() == 0 {
+        return Ok(None);
+    }
+
+    let key_column_values = batch
+        .column_by_name(key_column)
+        .ok_or_else(|| anyhow!("No '{key_column}' column"))?;
+    let indices = sort_to_indices(key_column_values, None, None).context("Could not sort keys")?;
+    let batch = take_record_batch(&batch, &indices).context("Could not reorder rows")?;
+    drop(indices);
+    let mut keys = batch
+        .column_by_name(key_column)
+        .ok_or_else(|| anyhow!("No '{key_column}' column"))?
+        .as_primitive_opt::<UInt64Type>()
+        .ok_or_else(|| anyhow!("'{key_column}' column is not UInt64Array"))?
+        .values()
+        .to_vec();
+    keys.dedup();
+
+    let file = File::create_new(file_path)
+        .with_context(|| format!("Could not create {}", file_path.display()))?;
+    let mut writer = ArrowWriter::try_new(file, Arc::clone(&schema), Some(writer_properties))
+        .with_context(|| format!("Could not create writer for {}", file_path.display()))?;
+    writer
+        .write(&batch)
+        .with_context(|| format!("Could not write {}", file_path.display()))?;
+    writer
+        .close()
+        .with_context(|| format!("Could not close {}", file_path.display()))?;
+
+    Ok(Some(keys))
+}
@@ -3,15 +3,28 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
+pub mod adjacency;
 pub mod contents_in_directories;
 pub mod contents_in_revisions;
 pub mod directories_in_revisions;
+pub mod earliest_occurrences;
 pub mod earliest_revision;
+pub mod earliest_timestamps;
 pub mod filters;
 pub mod frontier;
+pub mod frontier_cost;
 pub mod frontier_set;
+pub mod key_counts;
+pub mod key_index;
+pub mod key_ranges;
+pub mod manifest;
+pub mod max_leaf_timestamps;
 pub mod node_dataset;
+pub mod paths;
 pub mod revisions_in_origins;
+pub mod revrel_sets;
+pub mod sketches;
+pub mod traversal;
 pub mod x_in_y_dataset;
 
 /// The current version of swh-graph-provenance.
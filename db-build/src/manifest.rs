@@ -0,0 +1,108 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Number of rows in each file of a Parquet table, read from file footers once at index
+//! build time so the server can plan queries without opening every file.
+//!
+//! A manifest is stored as a JSON file containing a [`TableManifest`].
+
+use std::fs::File;
+use std::path::Path;
+
+use anyhow::{ensure, Context, Result};
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use serde::{Deserialize, Serialize};
+
+use crate::adjacency::list_parquet_files;
+
+/// Incremented on every backward-incompatible change to the format
+pub const FORMAT_VERSION: u32 = 1;
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct FileManifest {
+    /// Name of the file, relative to the table's directory
+    pub file_name: String,
+    pub num_rows: u64,
+    pub num_row_groups: usize,
+}
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct TableManifest {
+    pub format_version: u32,
+    pub swh_graph_provenance_version: String,
+    /// Files of the table, sorted by name
+    pub files: Vec<FileManifest>,
+}
+
+impl TableManifest {
+    /// Reads the footer of every file of the Parquet table in `dataset_path`
+    pub fn from_parquet(dataset_path: &Path) -> Result<Self> {
+        let files = list_parquet_files(dataset_path)?
+            .into_iter()
+            .map(|file_path| {
+                let file = File::open(&file_path)
+                    .with_context(|| format!("Could not open {}", file_path.display()))?;
+                let reader_builder =
+                    ParquetRecordBatchReaderBuilder::try_new(file).with_context(|| {
+                        format!("Could not read {} as Parquet", file_path.display())
+                    })?;
+                let metadata = reader_builder.metadata();
+                let num_rows = metadata.file_metadata().num_rows();
+                Ok(FileManifest {
+                    file_name: file_path
+                        .file_name()
+                        .expect("Parquet file has no name")
+                        .to_string_lossy()
+                        .into_owned(),
+                    num_rows: u64::try_from(num_rows).with_context(|| {
+                        format!(
+                            "{} has an invalid number of rows ({})",
+                            file_path.display(),
+                            num_rows
+                        )
+                    })?,
+                    num_row_groups: metadata.num_row_groups(),
+                })
+            })
+            .collect::<Result<_>>()?;
+        Ok(TableManifest {
+            format_version: FORMAT_VERSION,
+            swh_graph_provenance_version: crate::VERSION.to_owned(),
+            files,
+        })
+    }
+
+    pub fn write(&self, path: &Path) -> Result<()> {
+        let file = File::create_new(path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        serde_json::to_writer_pretty(file, self)
+            .with_context(|| format!("Could not write {}", path.display()))
+    }
+
+    pub fn load(path: &Path) -> Result<Self> {
+        let file =
+            File::open(path).with_context(|| format!("Could not open {}", path.display()))?;
+        let manifest: TableManifest = serde_json::from_reader(std::io::BufReader::new(file))
+            .with_context(|| format!("Could not parse {}", path.display()))?;
+        ensure!(
+            manifest.format_version == FORMAT_VERSION,
+            "{} has format version {}, expected {}",
+            path.display(),
+            manifest.format_version,
+            FORMAT_VERSION
+        );
+        Ok(manifest)
+    }
+
+    /// Total number of rows in the table
+    pub fn num_rows(&self) -> u64 {
+        self.files.iter().map(|file| file.num_rows).sum()
+    }
+
+    /// Number of files with at least one row
+    pub fn num_nonempty_files(&self) -> usize {
+        self.files.iter().filter(|file| file.num_rows > 0).count()
+    }
+}
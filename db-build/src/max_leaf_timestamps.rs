@@ -0,0 +1,226 @@
+// Copyright (C) 2024-2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Computes, for each directory, the maximum timestamp of all contents it contains,
+//! recursively.
+//!
+//! [`propagate_through_directories`] traverses backward from every content, and stops at
+//! directories already reached from a content with a newer timestamp.
+//! [`propagate_in_topological_order`] instead finalizes directories bottom-up, level by
+//! level: a directory is finalized once all its subdirectories are, then pushes its
+//! maximum to its parents. Each arc is read a constant number of times, regardless of the
+//! order in which contents are visited.
+//!
+//! Both only propagate through reachable directories, and return the same array.
+
+use std::sync::atomic::{AtomicI64, AtomicU32, Ordering};
+
+use anyhow::{bail, Result};
+use dsi_progress_logger::{concurrent_progress_logger, ProgressLog};
+use rayon::prelude::*;
+use sux::prelude::BitVec;
+use sux::traits::BitVecOps;
+use value_traits::slices::SliceByValue;
+
+use swh_graph::graph::*;
+use swh_graph::utils::shuffle::par_iter_shuffled_range;
+use swh_graph::NodeType;
+
+/// Propagate maximum of timestamps from contents to any directory containing them
+pub fn propagate_through_directories<G>(
+    graph: &G,
+    reachable_nodes: Option<&BitVec>,
+    timestamps: &(impl SliceByValue<Value = i64> + Sync),
+    max_timestamps: &mut [AtomicI64],
+) -> Result<()>
+where
+    G: SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Propagating through directories...");
+
+    let reachable = |node| match reachable_nodes {
+        Some(reachable_nodes) => reachable_nodes.get(node),
+        None => true, // All nodes are reachable
+    };
+
+    par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
+        pl.clone(),
+        |thread_pl, cnt| {
+            if reachable(cnt) && graph.properties().node_type(cnt) == NodeType::Content {
+                let cnt_timestamp = timestamps.get_value(cnt).unwrap();
+                if cnt_timestamp == i64::MIN {
+                    // Content is not in any timestamped revrel, ignore it.
+                } else {
+                    let mut stack = vec![cnt];
+
+                    while let Some(node) = stack.pop() {
+                        for pred in graph.predecessors(node) {
+                            if !reachable(pred) {
+                                continue;
+                            }
+                            match graph.properties().node_type(pred) {
+                                NodeType::Directory => {
+                                    let previous_max = max_timestamps[pred]
+                                        .fetch_max(cnt_timestamp, Ordering::Relaxed);
+                                    if previous_max >= cnt_timestamp {
+                                        // Already traversed from a content with a newer timestamp
+                                        // than this one (or already from this one), so every
+                                        // directory we would find from now on would too.
+                                        // No need to recurse further.
+                                    } else {
+                                        stack.push(pred);
+                                    }
+                                }
+                                NodeType::Content => bail!(
+                                    "{} is predecessor of {}",
+                                    graph.properties().swhid(pred),
+                                    graph.properties().swhid(node)
+                                ),
+                                _ => (),
+                            }
+                        }
+                    }
+                }
+            }
+            thread_pl.light_update();
+            Ok(())
+        },
+    )?;
+
+    pl.done();
+
+    Ok(())
+}
+
+/// Same as [`propagate_through_directories`], but computes the maximum of each directory
+/// from those of its subdirectories, in reverse topological order.
+///
+/// Directories of each level (those whose subdirectories are all finalized) are processed
+/// in parallel, and levels are processed one after the other.
+pub fn propagate_in_topological_order<G>(
+    graph: &G,
+    reachable_nodes: Option<&BitVec>,
+    timestamps: &(impl SliceByValue<Value = i64> + Sync),
+    max_timestamps: &mut [AtomicI64],
+) -> Result<()>
+where
+    G: SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let reachable = |node| match reachable_nodes {
+        Some(reachable_nodes) => reachable_nodes.get(node),
+        None => true, // All nodes are reachable
+    };
+    // Returns the reachable directories containing the node
+    let parent_directories = |node| {
+        graph.predecessors(node).into_iter().filter(move |&pred| {
+            reachable(pred) && graph.properties().node_type(pred) == NodeType::Directory
+        })
+    };
+
+    // Number of subdirectories of each directory which are not finalized yet
+    let mut pending_subdirectories = Vec::with_capacity(graph.num_nodes());
+    pending_subdirectories.resize_with(graph.num_nodes(), || AtomicU32::new(0));
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "node",
+        display_memory = true,
+        local_speed = true,
+        expected_updates = Some(graph.num_nodes()),
+    );
+    pl.start("Propagating from contents and counting subdirectories...");
+    par_iter_shuffled_range(0..graph.num_nodes()).try_for_each_with(
+        pl.clone(),
+        |thread_pl, node| -> Result<()> {
+            thread_pl.light_update();
+            if !reachable(node) {
+                return Ok(());
+            }
+            match graph.properties().node_type(node) {
+                NodeType::Content => {
+                    let cnt_timestamp = timestamps.get_value(node).unwrap();
+                    if cnt_timestamp == i64::MIN {
+                        // Content is not in any timestamped revrel, ignore it.
+                        return Ok(());
+                    }
+                    for pred in graph.predecessors(node) {
+                        if !reachable(pred) {
+                            continue;
+                        }
+                        match graph.properties().node_type(pred) {
+                            NodeType::Directory => {
+                                max_timestamps[pred].fetch_max(cnt_timestamp, Ordering::Relaxed);
+                            }
+                            NodeType::Content => bail!(
+                                "{} is predecessor of {}",
+                                graph.properties().swhid(pred),
+                                graph.properties().swhid(node)
+                            ),
+                            _ => (),
+                        }
+                    }
+                }
+                NodeType::Directory => {
+                    for dir in parent_directories(node) {
+                        pending_subdirectories[dir].fetch_add(1, Ordering::Relaxed);
+                    }
+                }
+                _ => (),
+            }
+            Ok(())
+        },
+    )?;
+    pl.done();
+
+    let mut level: Vec<NodeId> = (0..graph.num_nodes())
+        .into_par_iter()
+        .filter(|&node| {
+            reachable(node)
+                && graph.properties().node_type(node) == NodeType::Directory
+                && pending_subdirectories[node].load(Ordering::Relaxed) == 0
+        })
+        .collect();
+
+    let mut pl = concurrent_progress_logger!(
+        item_name = "directory",
+        display_memory = true,
+        local_speed = true,
+    );
+    pl.start("Propagating through directories, bottom-up...");
+    let max_timestamps = &*max_timestamps;
+    let pending_subdirectories = &pending_subdirectories;
+    let mut num_levels = 0usize;
+    while !level.is_empty() {
+        num_levels += 1;
+        let num_directories = level.len();
+        // All subdirectories of directories in this level were finalized in previous
+        // levels, whose updates are visible since rayon joined their threads.
+        level = level
+            .into_par_iter()
+            .flat_map_iter(|dir| {
+                let dir_max_timestamp = max_timestamps[dir].load(Ordering::Relaxed);
+                parent_directories(dir).filter(move |&parent| {
+                    if dir_max_timestamp != i64::MIN {
+                        max_timestamps[parent].fetch_max(dir_max_timestamp, Ordering::Relaxed);
+                    }
+                    // The last subdirectory to be finalized adds its parent to the next level
+                    pending_subdirectories[parent].fetch_sub(1, Ordering::Relaxed) == 1
+                })
+            })
+            .collect();
+        pl.update_with_count(num_directories);
+    }
+    pl.done();
+    log::info!("Directories have {num_levels} levels");
+
+    Ok(())
+}
@@ -0,0 +1,176 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Table of paths, so `*_in_*` tables can store a 'path_id' column instead of repeating
+//! common paths (`src/`, `lib/`, `node_modules/...`) in billions of rows.
+//!
+//! Each `*_in_*` table interns its paths in its own [`PathNamespace`], stored in the 8
+//! most significant bits of its ids. This way, binaries writing different tables can run
+//! concurrently, and still write their paths to the same `paths` table, in files named
+//! after their namespace.
+//!
+//! Interned paths are kept in memory until they are written, so memory usage is
+//! proportional to the total size of distinct paths in the table.
+
+use std::fs::File;
+use std::path::Path;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+
+use anyhow::{Context, Result};
+use arrow::array::{ArrayRef, BinaryArray, RecordBatch, UInt64Array};
+use dashmap::DashMap;
+use parquet::arrow::ArrowWriter;
+use rayon::prelude::*;
+use swh_graph::graph::SwhGraph;
+
+use crate::adjacency::list_parquet_files;
+use crate::x_in_y_dataset::{paths_schema, paths_writer_properties};
+
+/// Number of bits of path ids below their [`PathNamespace`]
+pub const NAMESPACE_SHIFT: u32 = 56;
+
+/// Number of paths in each file of the table of paths
+const PATHS_PER_FILE: usize = 10_000_000;
+/// Number of paths in each batch written to a file
+const PATHS_PER_BATCH: usize = 1_000_000;
+
+/// Set of path ids allocated to the paths of a `*_in_*` table
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+#[repr(u8)]
+pub enum PathNamespace {
+    ContentsInRevisionsWithoutFrontiers = 0,
+    ContentsInFrontierDirectories = 1,
+    FrontierDirectoriesInRevisions = 2,
+}
+
+impl PathNamespace {
+    /// Name of the table whose paths are in this namespace, which prefixes the names of
+    /// its files in the table of paths
+    pub fn table_name(self) -> &'static str {
+        match self {
+            PathNamespace::ContentsInRevisionsWithoutFrontiers => {
+                "contents_in_revisions_without_frontiers"
+            }
+            PathNamespace::ContentsInFrontierDirectories => "contents_in_frontier_directories",
+            PathNamespace::FrontierDirectoriesInRevisions => "frontier_directories_in_revisions",
+        }
+    }
+
+    /// Returns the smallest path id in this namespace
+    pub fn first_id(self) -> u64 {
+        (self as u64) << NAMESPACE_SHIFT
+    }
+}
+
+/// Assigns an id to each distinct path written to a table, in a [`PathNamespace`]
+pub struct PathInterner {
+    namespace: PathNamespace,
+    ids: DashMap<Box<[u8]>, u64>,
+    next_id: AtomicU64,
+}
+
+impl PathInterner {
+    pub fn new(namespace: PathNamespace) -> Self {
+        PathInterner {
+            namespace,
+            ids: DashMap::new(),
+            next_id: AtomicU64::new(0),
+        }
+    }
+
+    /// Number of distinct paths interned so far
+    pub fn len(&self) -> usize {
+        self.ids.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.ids.is_empty()
+    }
+
+    /// Returns the id of the path, assigning it the next free id if it is new
+    pub fn intern(&self, path: &[u8]) -> u64 {
+        if let Some(id) = self.ids.get(path) {
+            return *id;
+        }
+        *self.ids.entry(path.into()).or_insert_with(|| {
+            let id = self.next_id.fetch_add(1, Ordering::Relaxed);
+            assert!(
+                id < 1 << NAMESPACE_SHIFT,
+                "Too many paths in {:?}",
+                self.namespace
+            );
+            self.namespace.first_id() | id
+        })
+    }
+
+    /// Writes all interned paths to `paths_path`, sorted by id, replacing files previously
+    /// written there for the same namespace.
+    ///
+    /// Returns the number of paths written.
+    pub fn write<G: SwhGraph>(self, graph: &G, paths_path: &Path) -> Result<usize> {
+        let table_name = self.namespace.table_name();
+        std::fs::create_dir_all(paths_path)
+            .with_context(|| format!("Could not create {}", paths_path.display()))?;
+        for file_path in list_parquet_files(paths_path)? {
+            let is_stale = file_path
+                .file_name()
+                .and_then(|file_name| file_name.to_str())
+                .is_some_and(|file_name| file_name.starts_with(&format!("{table_name}.")));
+            if is_stale {
+                std::fs::remove_file(&file_path)
+                    .with_context(|| format!("Could not remove {}", file_path.display()))?;
+            }
+        }
+
+        // Ids are allocated consecutively, so each path's position is its id
+        let first_id = self.namespace.first_id();
+        let mut paths: Vec<Option<Box<[u8]>>> = (0..self.ids.len()).map(|_| None).collect();
+        for (path, id) in self.ids {
+            paths[usize::try_from(id - first_id).expect("path id overflowed usize")] = Some(path);
+        }
+        let paths = paths
+            .into_iter()
+            .collect::<Option<Vec<_>>>()
+            .context("Path ids are not consecutive")?;
+
+        let schema = Arc::new(paths_schema());
+        let properties = paths_writer_properties(graph).build();
+        paths.par_chunks(PATHS_PER_FILE).enumerate().try_for_each(
+            |(file_index, file_paths)| -> Result<()> {
+                let file_path = paths_path.join(format!("{table_name}.{file_index:06}.parquet"));
+                let file = File::create_new(&file_path)
+                    .with_context(|| format!("Could not create {}", file_path.display()))?;
+                let mut writer =
+                    ArrowWriter::try_new(file, Arc::clone(&schema), Some(properties.clone()))
+                        .with_context(|| {
+                            format!("Could not create writer for {}", file_path.display())
+                        })?;
+                let mut next_id = first_id + (file_index * PATHS_PER_FILE) as u64;
+                for batch_paths in file_paths.chunks(PATHS_PER_BATCH) {
+                    let path_ids = next_id..next_id + batch_paths.len() as u64;
+                    next_id = path_ids.end;
+                    let batch = RecordBatch::try_new(
+                        Arc::clone(&schema),
+                        vec![
+                            Arc::new(UInt64Array::from_iter_values(path_ids)) as ArrayRef,
+                            Arc::new(BinaryArray::from_iter_values(batch_paths)),
+                        ],
+                    )
+                    .context("Could not build batch of paths")?;
+                    writer
+                        .write(&batch)
+                        .with_context(|| format!("Could not write {}", file_path.display()))?;
+                }
+                writer
+                    .close()
+                    .with_context(|| format!("Could not close {}", file_path.display()))?;
+                Ok(())
+            },
+        )?;
+
+        Ok(paths.len())
+    }
+}
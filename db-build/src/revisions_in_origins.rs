@@ -17,15 +17,17 @@ use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
 use swh_graph::graph::*;
 use swh_graph::views::Subgraph;
 use swh_graph::NodeType;
-use swh_graph_stdlib::collections::{AdaptiveNodeSet, NodeSet, ReadNodeSet};
 
 use crate::filters::NodeFilter;
+use crate::key_index::KeyIndexBuilder;
+use crate::traversal::TraversalContext;
 use crate::x_in_y_dataset::RevrelInOriTableBuilder;
 
 pub fn main<G>(
     graph: &G,
     node_filter: NodeFilter,
     dataset_writer: ParallelDatasetWriter<ParquetTableWriter<RevrelInOriTableBuilder>>,
+    key_index: Option<&KeyIndexBuilder>,
 ) -> Result<()>
 where
     G: SwhForwardGraph + SwhBackwardGraph + SwhGraphWithProperties + Send + Sync + 'static,
@@ -45,9 +47,9 @@ where
     pl.start("Computing origin sets for revision/release representatives...");
     let representative_to_origin_set = DashMap::new();
     unique_representatives.into_par_iter().try_for_each_init(
-        || pl.clone(),
-        |pl, node| -> Result<_> {
-            find_origins_from_revrel(&graph, node, &representative_to_origin_set)?;
+        || (TraversalContext::new(graph.num_nodes()), pl.clone()),
+        |(ctx, pl), node| -> Result<_> {
+            find_origins_from_revrel(&graph, ctx, node, &representative_to_origin_set)?;
             pl.light_update();
             Ok(())
         },
@@ -58,7 +60,7 @@ where
     let representative_to_origin_set: RapidHashMap<_, _> =
         representative_to_origin_set.into_iter().collect();
 
-    write_origins_from_revrels(graph, node_filter, dataset_writer, |node| {
+    write_origins_from_revrels(graph, node_filter, dataset_writer, key_index, |node| {
         let representative = revrel_to_representative[node];
         anyhow::ensure!(
             representative != usize::MAX,
@@ -265,6 +267,7 @@ pub fn write_origins_from_revrels<'a, G>(
     graph: &G,
     node_filter: NodeFilter,
     dataset_writer: ParallelDatasetWriter<ParquetTableWriter<RevrelInOriTableBuilder>>,
+    key_index: Option<&KeyIndexBuilder>,
     get_origins: impl Fn(NodeId) -> Result<&'a Option<elias_fano::EliasFano>> + Sync,
 ) -> Result<()>
 where
@@ -280,8 +283,14 @@ where
     pl.start("Writing revisions' origins...");
 
     (0..graph.num_nodes()).into_par_iter().try_for_each_init(
-        || (dataset_writer.get_thread_writer().unwrap(), pl.clone()),
-        |(writer, thread_pl), node| -> Result<()> {
+        || {
+            (
+                dataset_writer.get_thread_writer().unwrap(),
+                key_index.map(KeyIndexBuilder::thread_keys),
+                pl.clone(),
+            )
+        },
+        |(writer, thread_keys, thread_pl), node| -> Result<()> {
             if crate::filters::is_root_revrel(graph, node_filter, node) {
                 if let Some(origins) = get_origins(node)? {
                     for origin in origins {
@@ -294,6 +303,9 @@ where
                         builder
                             .ori
                             .append_value(origin.try_into().expect("NodeId overflowed u64"));
+                        if let Some(thread_keys) = thread_keys {
+                            thread_keys.push(node.try_into().expect("NodeId overflowed u64"));
+                        }
                     }
                 }
             }
@@ -309,8 +321,12 @@ where
     Ok(())
 }
 
+/// Lists origins reachable from `revrel`, and inserts them in `revrel_to_origin`.
+///
+/// `ctx` is cleared, then used for the traversal's buffers.
 pub fn find_origins_from_revrel<G>(
     graph: &G,
+    ctx: &mut TraversalContext,
     revrel: NodeId,
     revrel_to_origin: &DashMap<NodeId, Option<elias_fano::EliasFano>>,
 ) -> Result<()>
@@ -318,8 +334,13 @@ where
     G: SwhBackwardGraph + SwhGraphWithProperties,
     <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
 {
-    let mut seen = AdaptiveNodeSet::new(graph.num_nodes());
-    let mut stack = vec![revrel];
+    ctx.clear();
+    let TraversalContext {
+        visited: seen,
+        stack,
+        ..
+    } = ctx;
+    stack.push(revrel);
 
     let mut origins: RapidHashSet<NodeId> = RapidHashSet::default();
 
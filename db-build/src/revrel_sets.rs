@@ -0,0 +1,175 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Sets of revisions/releases of each directory, for traversals which compute them once
+//! per directory instead of once per content.
+//!
+//! Sets are sorted lists of node ids, stored as the varint-encoded difference between
+//! consecutive ids, one after the other in a single buffer. When the buffer grows larger
+//! than a given size, it is appended to a file and cleared; sets written to the file are
+//! then read back with positional reads, which are mostly served by the page cache.
+
+use std::fs::File;
+use std::io::Write;
+use std::os::unix::fs::FileExt;
+use std::path::PathBuf;
+
+use anyhow::{ensure, Context, Result};
+
+use swh_graph::graph::NodeId;
+
+/// Offset of nodes without a set (or with an empty one)
+const NO_SET: u64 = u64::MAX;
+
+/// Sets of node ids, indexed by node id, and spilled to a file when they don't fit in
+/// memory
+pub struct RevrelSets {
+    /// Offset of each node's set, in the file followed by the buffer
+    offsets: Vec<u64>,
+    /// Sets written after the end of the file
+    buffer: Vec<u8>,
+    max_buffer_size: usize,
+    spill_path: PathBuf,
+    /// Created the first time the buffer is spilled
+    spill_file: Option<File>,
+    spilled_bytes: u64,
+}
+
+impl RevrelSets {
+    /// Returns an empty set for every node. Sets are kept in memory until they take more
+    /// than `max_buffer_size` bytes, then appended to a new file at `spill_path`.
+    pub fn new(num_nodes: usize, spill_path: PathBuf, max_buffer_size: usize) -> Self {
+        RevrelSets {
+            offsets: vec![NO_SET; num_nodes],
+            buffer: Vec::new(),
+            max_buffer_size,
+            spill_path,
+            spill_file: None,
+            spilled_bytes: 0,
+        }
+    }
+
+    /// Sets the set of a node, which must be sorted and deduplicated, and must not have
+    /// been set before
+    pub fn insert(&mut self, node: NodeId, revrels: &[NodeId]) -> Result<()> {
+        ensure!(
+            self.offsets[node] == NO_SET,
+            "Set of node {node} was already inserted"
+        );
+        if revrels.is_empty() {
+            return Ok(());
+        }
+        self.offsets[node] = self.spilled_bytes + self.buffer.len() as u64;
+        encode(revrels, &mut self.buffer);
+        if self.buffer.len() > self.max_buffer_size {
+            self.spill()?;
+        }
+        Ok(())
+    }
+
+    fn spill(&mut self) -> Result<()> {
+        if self.spill_file.is_none() {
+            self.spill_file = Some(
+                File::create_new(&self.spill_path)
+                    .with_context(|| format!("Could not create {}", self.spill_path.display()))?,
+            );
+        }
+        self.spill_file
+            .as_mut()
+            .expect("spill file is not open")
+            .write_all(&self.buffer)
+            .with_context(|| format!("Could not write to {}", self.spill_path.display()))?;
+        self.spilled_bytes += self.buffer.len() as u64;
+        self.buffer.clear();
+        Ok(())
+    }
+
+    /// Appends the set of a node to `revrels`
+    pub fn get(&self, node: NodeId, revrels: &mut Vec<NodeId>) -> Result<()> {
+        let offset = self.offsets[node];
+        if offset == NO_SET {
+            return Ok(());
+        }
+        if let Some(buffer_offset) = offset.checked_sub(self.spilled_bytes) {
+            let buffer_offset =
+                usize::try_from(buffer_offset).expect("Buffer offset overflowed usize");
+            decode(&self.buffer[buffer_offset..], revrels);
+            return Ok(());
+        }
+
+        let spill_file = self
+            .spill_file
+            .as_ref()
+            .expect("Set is spilled, but there is no spill file");
+        let mut len = [0u8; 4];
+        spill_file
+            .read_exact_at(&mut len, offset)
+            .with_context(|| format!("Could not read {}", self.spill_path.display()))?;
+        let mut bytes = vec![0u8; 4 + u32::from_le_bytes(len) as usize];
+        spill_file
+            .read_exact_at(&mut bytes, offset)
+            .with_context(|| format!("Could not read {}", self.spill_path.display()))?;
+        decode(&bytes, revrels);
+        Ok(())
+    }
+
+    /// Returns the number of bytes of sets kept in memory before they are spilled
+    pub fn max_buffer_size(&self) -> usize {
+        self.max_buffer_size
+    }
+
+    /// Returns the number of bytes taken by sets, in memory and in the spill file
+    pub fn size(&self) -> u64 {
+        self.spilled_bytes + self.buffer.len() as u64
+    }
+}
+
+impl Drop for RevrelSets {
+    fn drop(&mut self) {
+        if self.spill_file.take().is_some() {
+            if let Err(e) = std::fs::remove_file(&self.spill_path) {
+                log::warn!("Could not remove {}: {e}", self.spill_path.display());
+            }
+        }
+    }
+}
+
+/// Appends the number of bytes of the encoded set, then the set
+fn encode(revrels: &[NodeId], out: &mut Vec<u8>) {
+    let len_offset = out.len();
+    out.extend([0u8; 4]);
+    let mut previous = 0u64;
+    for &revrel in revrels {
+        let revrel = u64::try_from(revrel).expect("NodeId overflowed u64");
+        let mut delta = revrel - previous;
+        previous = revrel;
+        while delta >= 0x80 {
+            out.push((delta as u8) | 0x80);
+            delta >>= 7;
+        }
+        out.push(delta as u8);
+    }
+    let len = u32::try_from(out.len() - len_offset - 4).expect("Set overflowed u32 bytes");
+    out[len_offset..len_offset + 4].copy_from_slice(&len.to_le_bytes());
+}
+
+/// Decodes a set written by [`encode`] at the start of `bytes`, and appends it to `out`
+fn decode(bytes: &[u8], out: &mut Vec<NodeId>) {
+    let len = u32::from_le_bytes(bytes[0..4].try_into().unwrap()) as usize;
+    let mut previous = 0u64;
+    let mut delta = 0u64;
+    let mut shift = 0;
+    for &byte in &bytes[4..4 + len] {
+        delta |= u64::from(byte & 0x7f) << shift;
+        if byte & 0x80 == 0 {
+            previous += delta;
+            out.push(usize::try_from(previous).expect("Node id overflowed usize"));
+            delta = 0;
+            shift = 0;
+        } else {
+            shift += 7;
+        }
+    }
+}
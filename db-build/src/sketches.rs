@@ -0,0 +1,407 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! HyperLogLog sketches of the revisions/releases and origins of the most frequent
+//! contents, to estimate how many there are without reading millions of rows.
+//!
+//! Sketches are stored in a directory containing:
+//!
+//! * `keys.bin`: the sorted node ids of the contents which have a sketch, as little-endian
+//!   64-bit integers,
+//! * `registers.bin`: the registers of their sketches, in the same order,
+//! * `meta.json`: [`SketchesMetadata`].
+
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::path::Path;
+use std::sync::Mutex;
+
+use anyhow::{ensure, Context, Result};
+use dsi_progress_logger::ProgressLog;
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize};
+
+use crate::adjacency::{for_each_row_in_range, list_parquet_files, Adjacency};
+use crate::key_counts::KeyCounts;
+
+/// Incremented on every backward-incompatible change to the format
+pub const FORMAT_VERSION: u32 = 1;
+
+/// Number of bits of hashes used to select a register. Sketches have `2^PRECISION`
+/// one-byte registers, and a standard error of `1.04 / sqrt(2^PRECISION)` (3.25%).
+pub const PRECISION: u32 = 10;
+const NUM_REGISTERS: usize = 1 << PRECISION;
+
+const KEYS_FILE: &str = "keys.bin";
+const REGISTERS_FILE: &str = "registers.bin";
+const METADATA_FILE: &str = "meta.json";
+
+/// Mixes the bits of a node id (with the finalizer of SplitMix64), as consecutive node
+/// ids are not random enough to be used as hashes directly
+fn hash(value: u64) -> u64 {
+    let mut z = value.wrapping_add(0x9e3779b97f4a7c15);
+    z = (z ^ (z >> 30)).wrapping_mul(0xbf58476d1ce4e5b9);
+    z = (z ^ (z >> 27)).wrapping_mul(0x94d049bb133111eb);
+    z ^ (z >> 31)
+}
+
+/// Estimator of the number of distinct node ids inserted in it
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct HyperLogLog {
+    registers: Box<[u8]>,
+}
+
+impl Default for HyperLogLog {
+    fn default() -> Self {
+        HyperLogLog {
+            registers: vec![0; NUM_REGISTERS].into_boxed_slice(),
+        }
+    }
+}
+
+impl HyperLogLog {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn from_registers(registers: &[u8]) -> Result<Self> {
+        ensure!(
+            registers.len() == NUM_REGISTERS,
+            "Sketch has {} registers, expected {}",
+            registers.len(),
+            NUM_REGISTERS
+        );
+        Ok(HyperLogLog {
+            registers: registers.into(),
+        })
+    }
+
+    pub fn registers(&self) -> &[u8] {
+        &self.registers
+    }
+
+    pub fn insert(&mut self, value: u64) {
+        let hash = hash(value);
+        let index = (hash >> (u64::BITS - PRECISION)) as usize;
+        // Position of the first 1 bit in the remaining bits, capped by a sentinel bit
+        let rank = ((hash << PRECISION) | (1 << (PRECISION - 1))).leading_zeros() + 1;
+        self.registers[index] = self.registers[index].max(rank as u8);
+    }
+
+    /// Adds all values inserted in `other` to this sketch
+    pub fn merge(&mut self, other: &HyperLogLog) {
+        for (register, &other_register) in self.registers.iter_mut().zip(other.registers.iter()) {
+            *register = (*register).max(other_register);
+        }
+    }
+
+    /// Returns the estimated number of distinct values inserted in this sketch
+    pub fn estimate(&self) -> f64 {
+        let num_registers = NUM_REGISTERS as f64;
+        let alpha = 0.7213 / (1.0 + 1.079 / num_registers);
+        let sum: f64 = self
+            .registers
+            .iter()
+            .map(|&register| (-f64::from(register)).exp2())
+            .sum();
+        let estimate = alpha * num_registers * num_registers / sum;
+        let num_zeros = self
+            .registers
+            .iter()
+            .filter(|&&register| register == 0)
+            .count();
+        if estimate <= 2.5 * num_registers && num_zeros > 0 {
+            // Linear counting is more accurate for small cardinalities
+            num_registers * (num_registers / num_zeros as f64).ln()
+        } else {
+            estimate
+        }
+    }
+}
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct SketchesMetadata {
+    pub format_version: u32,
+    pub swh_graph_provenance_version: String,
+    pub precision: u32,
+    /// What the keys are, eg. 'cnt'
+    pub key_column: String,
+    /// What is counted for each key, eg. 'revrel' or 'ori'
+    pub value_column: String,
+    /// Number of keys with a sketch
+    pub num_keys: usize,
+}
+
+/// Writes [`HyperLogLog`] sketches of some keys, in increasing order of keys, in the
+/// `path` directory, which must not exist yet
+pub fn write_sketches<'a>(
+    path: &Path,
+    key_column: &str,
+    value_column: &str,
+    sketches: impl IntoIterator<Item = (u64, &'a HyperLogLog)>,
+) -> Result<SketchesMetadata> {
+    std::fs::create_dir(path).with_context(|| format!("Could not create {}", path.display()))?;
+    let create = |file_name: &str| -> Result<BufWriter<File>> {
+        let file_path = path.join(file_name);
+        Ok(BufWriter::new(File::create_new(&file_path).with_context(
+            || format!("Could not create {}", file_path.display()),
+        )?))
+    };
+    let mut keys_file = create(KEYS_FILE)?;
+    let mut registers_file = create(REGISTERS_FILE)?;
+
+    let mut num_keys = 0;
+    let mut previous_key = None;
+    for (key, sketch) in sketches {
+        ensure!(
+            previous_key < Some(key),
+            "Sketches must be written in increasing order of keys"
+        );
+        previous_key = Some(key);
+        keys_file
+            .write_all(&key.to_le_bytes())
+            .and_then(|()| registers_file.write_all(sketch.registers()))
+            .with_context(|| format!("Could not write to {}", path.display()))?;
+        num_keys += 1;
+    }
+    keys_file
+        .flush()
+        .and_then(|()| registers_file.flush())
+        .with_context(|| format!("Could not flush {}", path.display()))?;
+
+    let metadata = SketchesMetadata {
+        format_version: FORMAT_VERSION,
+        swh_graph_provenance_version: crate::VERSION.to_owned(),
+        precision: PRECISION,
+        key_column: key_column.to_owned(),
+        value_column: value_column.to_owned(),
+        num_keys,
+    };
+    let metadata_path = path.join(METADATA_FILE);
+    let metadata_file = File::create_new(&metadata_path)
+        .with_context(|| format!("Could not create {}", metadata_path.display()))?;
+    serde_json::to_writer_pretty(metadata_file, &metadata)
+        .with_context(|| format!("Could not write {}", metadata_path.display()))?;
+    Ok(metadata)
+}
+
+/// Sketches of some keys, loaded in RAM
+pub struct Sketches {
+    metadata: SketchesMetadata,
+    keys: Vec<u64>,
+    registers: Vec<u8>,
+}
+
+impl Sketches {
+    pub fn load(path: &Path) -> Result<Self> {
+        let metadata_path = path.join(METADATA_FILE);
+        let metadata_file = File::open(&metadata_path)
+            .with_context(|| format!("Could not open {}", metadata_path.display()))?;
+        let metadata: SketchesMetadata =
+            serde_json::from_reader(std::io::BufReader::new(metadata_file))
+                .with_context(|| format!("Could not parse {}", metadata_path.display()))?;
+        ensure!(
+            metadata.format_version == FORMAT_VERSION && metadata.precision == PRECISION,
+            "{} has format version {} and precision {}, expected {} and {}",
+            path.display(),
+            metadata.format_version,
+            metadata.precision,
+            FORMAT_VERSION,
+            PRECISION
+        );
+
+        let keys_path = path.join(KEYS_FILE);
+        let keys: Vec<u64> = std::fs::read(&keys_path)
+            .with_context(|| format!("Could not read {}", keys_path.display()))?
+            .chunks_exact(8)
+            .map(|key| u64::from_le_bytes(key.try_into().unwrap()))
+            .collect();
+        let registers_path = path.join(REGISTERS_FILE);
+        let registers = std::fs::read(&registers_path)
+            .with_context(|| format!("Could not read {}", registers_path.display()))?;
+        ensure!(
+            keys.len() == metadata.num_keys && registers.len() == keys.len() * NUM_REGISTERS,
+            "{} has {} keys and {} bytes of registers, expected {} keys",
+            path.display(),
+            keys.len(),
+            registers.len(),
+            metadata.num_keys
+        );
+
+        Ok(Sketches {
+            metadata,
+            keys,
+            registers,
+        })
+    }
+
+    pub fn metadata(&self) -> &SketchesMetadata {
+        &self.metadata
+    }
+
+    /// Returns the sketch of the given key, if it has one
+    pub fn get(&self, key: u64) -> Option<HyperLogLog> {
+        let index = self.keys.binary_search(&key).ok()?;
+        Some(
+            HyperLogLog::from_registers(
+                &self.registers[index * NUM_REGISTERS..(index + 1) * NUM_REGISTERS],
+            )
+            .expect("Unexpected number of registers"),
+        )
+    }
+}
+
+/// Returns contents which are in at least `threshold` revisions/releases (counting those
+/// reached through several frontier directories several times), in increasing order
+pub fn hot_contents(
+    c_in_r_counts: &KeyCounts,
+    c_in_d_in_r_counts: &KeyCounts,
+    threshold: u64,
+) -> Vec<u64> {
+    let num_nodes = c_in_r_counts
+        .metadata()
+        .num_nodes
+        .max(c_in_d_in_r_counts.metadata().num_nodes);
+    (0..num_nodes)
+        .into_par_iter()
+        .filter(|&cnt| c_in_r_counts.count(cnt) + c_in_d_in_r_counts.count(cnt) >= threshold)
+        .map(|cnt| cnt as u64)
+        .collect()
+}
+
+/// Builds sketches of the revisions/releases (and origins, if `r_in_o` is given) of each
+/// of the `contents`, which must be sorted, and writes them in `anchors_output` (and
+/// `origins_output`).
+///
+/// Revisions/releases are read from contents_in_revisions_without_frontiers, and from
+/// frontier_directories_in_revisions for frontier directories containing the contents
+/// (read from contents_in_frontier_directories). Memory usage is proportional to the
+/// number of contents, plus the number of frontier directories containing them.
+#[allow(clippy::too_many_arguments)]
+pub fn build_content_sketches<PL: ProgressLog + Send>(
+    c_in_r_path: &Path,
+    c_in_d_path: &Path,
+    d_in_r_path: &Path,
+    r_in_o: Option<&Adjacency>,
+    contents: &[u64],
+    anchors_output: &Path,
+    origins_output: Option<&Path>,
+    pl: &mut PL,
+) -> Result<()> {
+    ensure!(
+        contents.is_sorted(),
+        "Contents to build sketches for must be sorted"
+    );
+    let (Some(&first_content), Some(&last_content)) = (contents.first(), contents.last()) else {
+        write_sketches(anchors_output, "cnt", "revrel", Vec::new())?;
+        if let Some(origins_output) = origins_output {
+            write_sketches(origins_output, "cnt", "ori", Vec::new())?;
+        }
+        return Ok(());
+    };
+    let content_range = first_content..(last_content + 1);
+    let content_index = |cnt: u64| contents.binary_search(&cnt).ok();
+
+    let anchor_sketches: Vec<_> = contents
+        .iter()
+        .map(|_| Mutex::new(HyperLogLog::new()))
+        .collect();
+    let origin_sketches: Vec<_> = contents
+        .iter()
+        .map(|_| Mutex::new(HyperLogLog::new()))
+        .collect();
+    let insert_anchor = |index: usize, revrel: u64| {
+        anchor_sketches[index].lock().unwrap().insert(revrel);
+        if let Some(r_in_o) = r_in_o {
+            let mut origin_sketch = origin_sketches[index].lock().unwrap();
+            for ori in r_in_o.values(usize::try_from(revrel).expect("node id overflowed usize")) {
+                origin_sketch.insert(ori);
+            }
+        }
+    };
+
+    pl.item_name("file");
+    pl.start("Building sketches");
+    let pl = Mutex::new(pl);
+
+    // Revisions/releases containing the contents outside frontier directories
+    list_parquet_files(c_in_r_path)?
+        .par_iter()
+        .try_for_each(|file_path| -> Result<()> {
+            for_each_row_in_range(file_path, "cnt", "revrel", &content_range, |cnt, revrel| {
+                if let Some(index) = content_index(cnt) {
+                    insert_anchor(index, revrel);
+                }
+            })?;
+            pl.lock().unwrap().light_update();
+            Ok(())
+        })?;
+
+    // Frontier directories containing the contents
+    let mut dir_contents = list_parquet_files(c_in_d_path)?
+        .par_iter()
+        .map(|file_path| -> Result<Vec<(u64, usize)>> {
+            let mut dir_contents = Vec::new();
+            for_each_row_in_range(file_path, "cnt", "dir", &content_range, |cnt, dir| {
+                if let Some(index) = content_index(cnt) {
+                    dir_contents.push((dir, index));
+                }
+            })?;
+            pl.lock().unwrap().light_update();
+            Ok(dir_contents)
+        })
+        .collect::<Result<Vec<_>>>()?
+        .concat();
+    dir_contents.par_sort_unstable();
+    dir_contents.dedup();
+
+    // Revisions/releases containing these frontier directories
+    if let (Some(&(first_dir, _)), Some(&(last_dir, _))) =
+        (dir_contents.first(), dir_contents.last())
+    {
+        let dir_range = first_dir..(last_dir + 1);
+        list_parquet_files(d_in_r_path)?
+            .par_iter()
+            .try_for_each(|file_path| -> Result<()> {
+                for_each_row_in_range(file_path, "dir", "revrel", &dir_range, |dir, revrel| {
+                    let start = dir_contents.partition_point(|&(dir2, _)| dir2 < dir);
+                    for &(_dir, index) in dir_contents[start..]
+                        .iter()
+                        .take_while(|&&(dir2, _)| dir2 == dir)
+                    {
+                        insert_anchor(index, revrel);
+                    }
+                })?;
+                pl.lock().unwrap().light_update();
+                Ok(())
+            })?;
+    }
+
+    pl.into_inner().unwrap().done();
+
+    let anchor_sketches: Vec<_> = anchor_sketches
+        .into_iter()
+        .map(|sketch| sketch.into_inner().unwrap())
+        .collect();
+    write_sketches(
+        anchors_output,
+        "cnt",
+        "revrel",
+        contents.iter().copied().zip(&anchor_sketches),
+    )?;
+    if let Some(origins_output) = origins_output {
+        let origin_sketches: Vec<_> = origin_sketches
+            .into_iter()
+            .map(|sketch| sketch.into_inner().unwrap())
+            .collect();
+        write_sketches(
+            origins_output,
+            "cnt",
+            "ori",
+            contents.iter().copied().zip(&origin_sketches),
+        )?;
+    }
+    Ok(())
+}
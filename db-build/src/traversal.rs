@@ -0,0 +1,179 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Buffers reused by the traversals of a thread, so traversing from billions of roots
+//! does not allocate a new set of visited nodes, stack and path stack for each of them.
+//!
+//! Each thread creates a [`TraversalContext`] (eg. in `for_each_init`), and passes it to
+//! every traversal it runs. Clearing the context only resets what the previous traversal
+//! used, so it costs as much as that traversal did, not as much as the size of the graph.
+
+use std::ops::Range;
+
+use rapidhash::RapidHashSet;
+use sux::prelude::BitVec;
+use sux::traits::{BitVecOps, BitVecOpsMut};
+
+use swh_graph::graph::NodeId;
+use swh_graph::labels::LabelNameId;
+
+/// Ratio of the number of nodes of the graph to the number of visited nodes, above which
+/// a [`VisitedSet`] switches from a hash set to a bit vector, which is smaller from then on
+const DENSE_RATIO: usize = 64;
+
+/// Set of visited nodes, which is a hash set for small traversals and switches to a bit
+/// vector for large ones, like [`AdaptiveNodeSet`](swh_graph_stdlib::collections::AdaptiveNodeSet).
+///
+/// Unlike `AdaptiveNodeSet`, it keeps both its hash set and bit vector when cleared.
+/// The bit vector is only reset if it was used since the last clear, which means the
+/// traversal visited more than `num_nodes / 64` nodes, ie. more than there are words
+/// in the bit vector.
+pub struct VisitedSet {
+    num_nodes: usize,
+    sparse: RapidHashSet<NodeId>,
+    /// Allocated the first time a traversal grows too large for `sparse`
+    dense: Option<BitVec>,
+    is_dense: bool,
+}
+
+impl VisitedSet {
+    pub fn new(num_nodes: usize) -> Self {
+        VisitedSet {
+            num_nodes,
+            sparse: RapidHashSet::default(),
+            dense: None,
+            is_dense: false,
+        }
+    }
+
+    pub fn contains(&self, node: NodeId) -> bool {
+        if self.is_dense {
+            self.dense
+                .as_ref()
+                .expect("dense set is not allocated")
+                .get(node)
+        } else {
+            self.sparse.contains(&node)
+        }
+    }
+
+    /// Adds the node to the set
+    pub fn insert(&mut self, node: NodeId) {
+        if !self.is_dense {
+            self.sparse.insert(node);
+            if self.sparse.len() <= self.num_nodes / DENSE_RATIO {
+                return;
+            }
+            // Switch to the bit vector
+            self.is_dense = true;
+            let num_nodes = self.num_nodes;
+            let dense = self.dense.get_or_insert_with(|| BitVec::new(num_nodes));
+            for node in self.sparse.drain() {
+                dense.set(node, true);
+            }
+        } else {
+            self.dense
+                .as_mut()
+                .expect("dense set is not allocated")
+                .set(node, true);
+        }
+    }
+
+    /// Removes all nodes from the set, keeping its allocations
+    pub fn clear(&mut self) {
+        if self.is_dense {
+            self.dense
+                .as_mut()
+                .expect("dense set is not allocated")
+                .fill(false);
+            self.is_dense = false;
+        } else {
+            self.sparse.clear();
+        }
+    }
+}
+
+/// Stack of nodes with the path to each of them, as a list of labels. Paths are stored
+/// consecutively in a single buffer, instead of a buffer per node.
+///
+/// Paths of nodes are stored in the same order as the nodes in the stack, so popping a
+/// node truncates the buffer to the end of its path.
+#[derive(Debug, Default)]
+pub struct PathArena {
+    nodes: Vec<(NodeId, Range<usize>)>,
+    parts: Vec<LabelNameId>,
+}
+
+impl PathArena {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Pushes a node with an empty path
+    pub fn push_root(&mut self, node: NodeId) {
+        self.nodes.push((node, self.parts.len()..self.parts.len()));
+    }
+
+    /// Pushes a node, whose path is the path of its parent (as returned by [`Self::pop`])
+    /// followed by `label`, for forward traversals
+    pub fn push_child(&mut self, node: NodeId, parent_path: Range<usize>, label: LabelNameId) {
+        let start = self.parts.len();
+        self.parts.extend_from_within(parent_path);
+        self.parts.push(label);
+        self.nodes.push((node, start..self.parts.len()));
+    }
+
+    /// Pushes a node, whose path is `label` followed by the path of its child (as returned
+    /// by [`Self::pop`]), for backward traversals
+    pub fn push_parent(&mut self, node: NodeId, child_path: Range<usize>, label: LabelNameId) {
+        let start = self.parts.len();
+        self.parts.push(label);
+        self.parts.extend_from_within(child_path);
+        self.nodes.push((node, start..self.parts.len()));
+    }
+
+    /// Pops a node, and returns it with the range of its path, valid until the next call
+    /// to `pop`
+    pub fn pop(&mut self) -> Option<(NodeId, Range<usize>)> {
+        let (node, path) = self.nodes.pop()?;
+        // Paths of nodes pushed after this one are after its own path, and were popped
+        self.parts.truncate(path.end);
+        Some((node, path))
+    }
+
+    /// Returns the labels of the path of a node returned by [`Self::pop`]
+    pub fn path(&self, path: Range<usize>) -> &[LabelNameId] {
+        &self.parts[path]
+    }
+
+    pub fn clear(&mut self) {
+        self.nodes.clear();
+        self.parts.clear();
+    }
+}
+
+/// Buffers of a thread, reused by its traversals
+pub struct TraversalContext {
+    pub visited: VisitedSet,
+    pub stack: Vec<NodeId>,
+    pub path_stack: PathArena,
+}
+
+impl TraversalContext {
+    pub fn new(num_nodes: usize) -> Self {
+        TraversalContext {
+            visited: VisitedSet::new(num_nodes),
+            stack: Vec::new(),
+            path_stack: PathArena::new(),
+        }
+    }
+
+    /// Clears all buffers, for a new traversal
+    pub fn clear(&mut self) {
+        self.visited.clear();
+        self.stack.clear();
+        self.path_stack.clear();
+    }
+}
@@ -17,6 +17,8 @@ use swh_graph::graph::SwhGraph;
 
 use dataset_writer::StructArrayBuilder;
 
+use crate::paths::PathInterner;
+
 #[derive(Debug)]
 pub struct UtcTimestampSecondBuilder(pub TimestampSecondBuilder);
 
@@ -46,6 +48,83 @@ impl std::ops::DerefMut for UtcTimestampSecondBuilder {
     }
 }
 
+/// Column of the paths of a `*_in_*` table: either the paths themselves, in a 'path'
+/// column ([`BinaryBuilder`]), or their id in the table of paths, in a 'path_id' column
+/// ([`UInt64Builder`], see [`crate::paths`])
+pub trait PathColumnBuilder: ArrayBuilder + Default + std::fmt::Debug {
+    /// What is needed to append paths besides the builder
+    type Paths: Sync;
+
+    /// Returns the `schema` of a table, with its 'path' field replaced by this column's
+    fn table_schema(schema: Schema) -> Schema;
+
+    /// Sets the properties of this column, if it is not 'path'
+    fn writer_properties(properties: WriterPropertiesBuilder) -> WriterPropertiesBuilder;
+
+    fn append_path(&mut self, paths: &Self::Paths, path: &[u8]);
+
+    /// Number of bytes buffered by this builder, for [`StructArrayBuilder::buffer_size`]
+    fn buffer_size(&self) -> usize;
+}
+
+impl PathColumnBuilder for BinaryBuilder {
+    type Paths = ();
+
+    fn table_schema(schema: Schema) -> Schema {
+        schema
+    }
+
+    fn writer_properties(properties: WriterPropertiesBuilder) -> WriterPropertiesBuilder {
+        properties
+    }
+
+    fn append_path(&mut self, _paths: &(), path: &[u8]) {
+        self.append_value(path)
+    }
+
+    fn buffer_size(&self) -> usize {
+        self.values_slice().len()
+         + self.offsets_slice().len() * 4 // BinaryBuilder uses i32 indices
+         + self.validity_slice().map(|s| s.len()).unwrap_or(0)
+    }
+}
+
+impl PathColumnBuilder for UInt64Builder {
+    type Paths = PathInterner;
+
+    fn table_schema(schema: Schema) -> Schema {
+        Schema::new_with_metadata(
+            schema
+                .fields()
+                .iter()
+                .map(|field| {
+                    if field.name() == "path" {
+                        Arc::new(Field::new("path_id", UInt64, false))
+                    } else {
+                        Arc::clone(field)
+                    }
+                })
+                .collect::<Vec<_>>(),
+            schema.metadata().clone(),
+        )
+    }
+
+    fn writer_properties(properties: WriterPropertiesBuilder) -> WriterPropertiesBuilder {
+        properties.set_column_compression(
+            "path_id".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+    }
+
+    fn append_path(&mut self, paths: &PathInterner, path: &[u8]) {
+        self.append_value(paths.intern(path))
+    }
+
+    fn buffer_size(&self) -> usize {
+        self.len() * 8 + self.validity_slice().map(|s| s.len()).unwrap_or(0)
+    }
+}
+
 pub fn cnt_in_revrel_schema() -> Schema {
     Schema::new(vec![
         Field::new("cnt", UInt64, false),
@@ -92,6 +171,30 @@ pub fn revrel_in_ori_schema() -> Schema {
     ])
 }
 
+/// Schema of the table of the earliest revision/release containing each content, with an
+/// origin containing that revision/release (if any)
+pub fn earliest_occurrences_schema() -> Schema {
+    Schema::new(vec![
+        Field::new("cnt", UInt64, false),
+        Field::new("revrel", UInt64, false),
+        Field::new(
+            "revrel_author_date",
+            Timestamp(TimeUnit::Second, Some("UTC".into())),
+            false,
+        ),
+        Field::new("ori", UInt64, true),
+    ])
+}
+
+/// Schema of the table of paths referred to by the 'path_id' column of `*_in_*` tables
+/// written with a [`PathInterner`]
+pub fn paths_schema() -> Schema {
+    Schema::new(vec![
+        Field::new("path_id", UInt64, false),
+        Field::new("path", Binary, false),
+    ])
+}
+
 pub fn cnt_in_revrel_writer_properties<G: SwhGraph>(graph: &G) -> WriterPropertiesBuilder {
     WriterProperties::builder()
         // Main request key. Monotonic, and with long sequences of equal values
@@ -114,6 +217,8 @@ pub fn cnt_in_revrel_writer_properties<G: SwhGraph>(graph: &G) -> WriterProperti
             "revrel_author_date".into(),
             Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
         )
+        // Queries may be bounded by date
+        .set_column_statistics_enabled("revrel_author_date".into(), EnabledStatistics::Page)
         // Textual data
         .set_column_compression(
             "path".into(),
@@ -144,6 +249,9 @@ pub fn dir_in_revrel_writer_properties<G: SwhGraph>(graph: &G) -> WriterProperti
             "dir_max_author_date".into(),
             Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
         )
+        // Lower bound of revrel_author_date, constant for each directory, so its page
+        // statistics allow skipping directories when queries are bounded by date
+        .set_column_statistics_enabled("dir_max_author_date".into(), EnabledStatistics::Page)
         // May make sense to query, too
         .set_column_compression(
             "revrel".into(),
@@ -156,6 +264,8 @@ pub fn dir_in_revrel_writer_properties<G: SwhGraph>(graph: &G) -> WriterProperti
             "revrel_author_date".into(),
             Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
         )
+        // Queries may be bounded by date
+        .set_column_statistics_enabled("revrel_author_date".into(), EnabledStatistics::Page)
         // Textual data
         .set_column_compression(
             "path".into(),
@@ -231,15 +341,76 @@ pub fn revrel_in_ori_writer_properties<G: SwhGraph>(graph: &G) -> WriterProperti
         .set_max_row_group_size(10 * 1024 * 1024)
 }
 
+pub fn earliest_occurrences_writer_properties<G: SwhGraph>(graph: &G) -> WriterPropertiesBuilder {
+    WriterProperties::builder()
+        // Main request key. Monotonic, and unique
+        .set_column_encoding("cnt".into(), Encoding::DELTA_BINARY_PACKED)
+        .set_column_statistics_enabled("cnt".into(), EnabledStatistics::Page)
+        .set_column_bloom_filter_enabled("cnt".into(), true)
+        .set_column_compression(
+            "cnt".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        .set_column_compression(
+            "revrel".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        .set_column_compression(
+            "revrel_author_date".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        .set_column_statistics_enabled("revrel_author_date".into(), EnabledStatistics::Page)
+        .set_column_compression(
+            "ori".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        .set_key_value_metadata(Some(crate::parquet_metadata(graph)))
+        // 10× the default value, for consistency with other tables
+        .set_max_row_group_size(10 * 1024 * 1024)
+}
+
+pub fn paths_writer_properties<G: SwhGraph>(graph: &G) -> WriterPropertiesBuilder {
+    WriterProperties::builder()
+        // Main request key. Sorted and unique
+        .set_column_encoding("path_id".into(), Encoding::DELTA_BINARY_PACKED)
+        .set_column_statistics_enabled("path_id".into(), EnabledStatistics::Page)
+        .set_column_bloom_filter_enabled("path_id".into(), true)
+        .set_column_compression(
+            "path_id".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        // Textual data
+        .set_column_compression(
+            "path".into(),
+            Compression::ZSTD(ZstdLevel::try_new(3).unwrap()),
+        )
+        .set_key_value_metadata(Some(crate::parquet_metadata(graph)))
+    // Not increasing max_row_group_size, for the same reason as in
+    // cnt_in_dir_writer_properties
+}
+
+/// Disables Parquet Bloom filters on all columns of the `schema`, for databases queried
+/// through the key filters built by `swh-provenance-index` instead
+pub fn without_bloom_filters(
+    mut properties: WriterPropertiesBuilder,
+    schema: &Schema,
+) -> WriterPropertiesBuilder {
+    for field in schema.fields() {
+        properties =
+            properties.set_column_bloom_filter_enabled(field.name().as_str().into(), false);
+    }
+    properties
+}
+
 #[derive(Debug)]
-pub struct CntInRevrelTableBuilder {
+pub struct CntInRevrelTableBuilder<P: PathColumnBuilder = BinaryBuilder> {
     pub cnt: UInt64Builder,
     pub revrel: UInt64Builder,
     pub revrel_author_date: UtcTimestampSecondBuilder,
-    pub path: BinaryBuilder,
+    pub path: P,
 }
 
-impl Default for CntInRevrelTableBuilder {
+impl<P: PathColumnBuilder> Default for CntInRevrelTableBuilder<P> {
     fn default() -> Self {
         CntInRevrelTableBuilder {
             cnt: UInt64Builder::new_from_buffer(
@@ -251,21 +422,19 @@ impl Default for CntInRevrelTableBuilder {
                 None, // ditto
             ),
             revrel_author_date: Default::default(),
-            path: BinaryBuilder::default(), // TODO: don't use validity buffer
+            path: P::default(), // TODO: don't use validity buffer
         }
     }
 }
 
-impl StructArrayBuilder for CntInRevrelTableBuilder {
+impl<P: PathColumnBuilder> StructArrayBuilder for CntInRevrelTableBuilder<P> {
     fn len(&self) -> usize {
         self.cnt.len()
     }
 
     fn buffer_size(&self) -> usize {
         self.len() * (8 + 8 + 8) // u64 + u64 + u64
-         + self.path.values_slice().len()
-         + self.path.offsets_slice().len() * 4 // BinaryBuilder uses i32 indices
-         + self.path.validity_slice().map(|s| s.len()).unwrap_or(0)
+         + self.path.buffer_size()
     }
 
     fn finish(&mut self) -> Result<StructArray> {
@@ -273,11 +442,11 @@ impl StructArrayBuilder for CntInRevrelTableBuilder {
             Arc::new(self.cnt.finish()),
             Arc::new(self.revrel.finish()),
             Arc::new(self.revrel_author_date.finish()),
-            Arc::new(self.path.finish()),
+            self.path.finish(),
         ];
 
         Ok(StructArray::new(
-            cnt_in_revrel_schema().fields().clone(),
+            P::table_schema(cnt_in_revrel_schema()).fields().clone(),
             columns,
             None, // nulls
         ))
@@ -285,15 +454,15 @@ impl StructArrayBuilder for CntInRevrelTableBuilder {
 }
 
 #[derive(Debug)]
-pub struct DirInRevrelTableBuilder {
+pub struct DirInRevrelTableBuilder<P: PathColumnBuilder = BinaryBuilder> {
     pub dir: UInt64Builder,
     pub dir_max_author_date: UtcTimestampSecondBuilder,
     pub revrel: UInt64Builder,
     pub revrel_author_date: UtcTimestampSecondBuilder,
-    pub path: BinaryBuilder,
+    pub path: P,
 }
 
-impl Default for DirInRevrelTableBuilder {
+impl<P: PathColumnBuilder> Default for DirInRevrelTableBuilder<P> {
     fn default() -> Self {
         DirInRevrelTableBuilder {
             dir: UInt64Builder::new_from_buffer(
@@ -306,21 +475,19 @@ impl Default for DirInRevrelTableBuilder {
                 None, // ditto
             ),
             revrel_author_date: Default::default(),
-            path: BinaryBuilder::default(), // TODO: don't use validity buffer
+            path: P::default(), // TODO: don't use validity buffer
         }
     }
 }
 
-impl StructArrayBuilder for DirInRevrelTableBuilder {
+impl<P: PathColumnBuilder> StructArrayBuilder for DirInRevrelTableBuilder<P> {
     fn len(&self) -> usize {
         self.dir.len()
     }
 
     fn buffer_size(&self) -> usize {
         self.len() * (8 + 8 + 8 + 8) // u64 + u64 + u64 + u64
-         + self.path.values_slice().len()
-         + self.path.offsets_slice().len() * 4 // BinaryBuilder uses i32 indices
-         + self.path.validity_slice().map(|s| s.len()).unwrap_or(0)
+         + self.path.buffer_size()
     }
 
     fn finish(&mut self) -> Result<StructArray> {
@@ -329,11 +496,11 @@ impl StructArrayBuilder for DirInRevrelTableBuilder {
             Arc::new(self.dir_max_author_date.finish()),
             Arc::new(self.revrel.finish()),
             Arc::new(self.revrel_author_date.finish()),
-            Arc::new(self.path.finish()),
+            self.path.finish(),
         ];
 
         Ok(StructArray::new(
-            dir_in_revrel_schema().fields().clone(),
+            P::table_schema(dir_in_revrel_schema()).fields().clone(),
             columns,
             None, // nulls
         ))
@@ -341,13 +508,13 @@ impl StructArrayBuilder for DirInRevrelTableBuilder {
 }
 
 #[derive(Debug)]
-pub struct CntInDirTableBuilder {
+pub struct CntInDirTableBuilder<P: PathColumnBuilder = BinaryBuilder> {
     pub cnt: UInt64Builder,
     pub dir: UInt64Builder,
-    pub path: BinaryBuilder,
+    pub path: P,
 }
 
-impl Default for CntInDirTableBuilder {
+impl<P: PathColumnBuilder> Default for CntInDirTableBuilder<P> {
     fn default() -> Self {
         CntInDirTableBuilder {
             cnt: UInt64Builder::new_from_buffer(
@@ -358,32 +525,30 @@ impl Default for CntInDirTableBuilder {
                 Default::default(),
                 None, // ditto
             ),
-            path: BinaryBuilder::default(), // TODO: don't use validity buffer
+            path: P::default(), // TODO: don't use validity buffer
         }
     }
 }
 
-impl StructArrayBuilder for CntInDirTableBuilder {
+impl<P: PathColumnBuilder> StructArrayBuilder for CntInDirTableBuilder<P> {
     fn len(&self) -> usize {
         self.cnt.len()
     }
 
     fn buffer_size(&self) -> usize {
         self.len() * (8 + 8) // u64 + u64
-         + self.path.values_slice().len()
-         + self.path.offsets_slice().len() * 4 // BinaryBuilder uses i32 indices
-         + self.path.validity_slice().map(|s| s.len()).unwrap_or(0)
+         + self.path.buffer_size()
     }
 
     fn finish(&mut self) -> Result<StructArray> {
         let columns: Vec<Arc<dyn Array>> = vec![
             Arc::new(self.cnt.finish()),
             Arc::new(self.dir.finish()),
-            Arc::new(self.path.finish()),
+            self.path.finish(),
         ];
 
         Ok(StructArray::new(
-            cnt_in_dir_schema().fields().clone(),
+            P::table_schema(cnt_in_dir_schema()).fields().clone(),
             columns,
             None, // nulls
         ))
@@ -431,3 +596,54 @@ impl StructArrayBuilder for RevrelInOriTableBuilder {
         ))
     }
 }
+
+#[derive(Debug)]
+pub struct EarliestOccurrencesTableBuilder {
+    pub cnt: UInt64Builder,
+    pub revrel: UInt64Builder,
+    pub revrel_author_date: UtcTimestampSecondBuilder,
+    pub ori: UInt64Builder,
+}
+
+impl Default for EarliestOccurrencesTableBuilder {
+    fn default() -> Self {
+        EarliestOccurrencesTableBuilder {
+            cnt: UInt64Builder::new_from_buffer(
+                Default::default(),
+                None, // Values are not nullable -> validity buffer not needed
+            ),
+            revrel: UInt64Builder::new_from_buffer(
+                Default::default(),
+                None, // ditto
+            ),
+            revrel_author_date: Default::default(),
+            ori: UInt64Builder::default(), // Nullable, for revisions/releases in no origin
+        }
+    }
+}
+
+impl StructArrayBuilder for EarliestOccurrencesTableBuilder {
+    fn len(&self) -> usize {
+        self.cnt.len()
+    }
+
+    fn buffer_size(&self) -> usize {
+        self.len() * (8 + 8 + 8 + 8) // u64 + u64 + u64 + u64
+         + self.ori.validity_slice().map(|s| s.len()).unwrap_or(0)
+    }
+
+    fn finish(&mut self) -> Result<StructArray> {
+        let columns: Vec<Arc<dyn Array>> = vec![
+            Arc::new(self.cnt.finish()),
+            Arc::new(self.revrel.finish()),
+            Arc::new(self.revrel_author_date.finish()),
+            Arc::new(self.ori.finish()),
+        ];
+
+        Ok(StructArray::new(
+            earliest_occurrences_schema().fields().clone(),
+            columns,
+            None, // nulls
+        ))
+    }
+}
@@ -0,0 +1,75 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+
+use swh_provenance_db_build::adjacency::*;
+
+#[test]
+fn test_adjacency_roundtrip() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let path = tmpdir.path().join("table.csr");
+
+    let mut writer = AdjacencyWriter::new(path.clone(), "dir", "revrel", 1000, 7)?;
+    writer.push(1, &[2, 5, 300, 999])?;
+    writer.push(4, &[0])?;
+    writer.push(998, &[7, 8])?;
+    let metadata = writer.finish()?;
+    assert_eq!(metadata.num_rows, 7);
+    assert_eq!(metadata.num_nodes, 1000);
+
+    let adjacency = Adjacency::load(&path)?;
+    assert_eq!(adjacency.metadata(), &metadata);
+    for key in 0..1000 {
+        let expected: Vec<u64> = match key {
+            1 => vec![2, 5, 300, 999],
+            4 => vec![0],
+            998 => vec![7, 8],
+            _ => vec![],
+        };
+        assert_eq!(
+            adjacency.values(key).collect::<Vec<_>>(),
+            expected,
+            "key {key}"
+        );
+    }
+    assert_eq!(
+        adjacency.values(1000).collect::<Vec<_>>(),
+        Vec::<u64>::new()
+    );
+
+    Ok(())
+}
+
+#[test]
+fn test_adjacency_empty() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let path = tmpdir.path().join("table.csr");
+
+    let metadata = AdjacencyWriter::new(path.clone(), "revrel", "ori", 10, 0)?.finish()?;
+    assert_eq!(metadata.num_rows, 0);
+
+    let adjacency = Adjacency::load(&path)?;
+    for key in 0..11 {
+        assert_eq!(adjacency.values(key).count(), 0);
+    }
+
+    Ok(())
+}
+
+#[test]
+fn test_adjacency_unsorted() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+
+    let mut writer = AdjacencyWriter::new(tmpdir.path().join("keys.csr"), "dir", "revrel", 10, 10)?;
+    writer.push(5, &[1])?;
+    assert!(writer.push(3, &[1]).is_err());
+
+    let mut writer =
+        AdjacencyWriter::new(tmpdir.path().join("values.csr"), "dir", "revrel", 10, 10)?;
+    assert!(writer.push(5, &[3, 1]).is_err());
+
+    Ok(())
+}
@@ -0,0 +1,139 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::path::Path;
+use std::sync::Arc;
+
+use anyhow::Result;
+use arrow::array::{AsArray, BinaryBuilder};
+use arrow::datatypes::UInt64Type;
+use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use pretty_assertions::assert_eq;
+use sux::bits::bit_vec::BitVec;
+use sux::traits::BitVecOpsMut;
+
+use swh_graph::graph::*;
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::labels::Permission;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::contents_in_directories::*;
+use swh_provenance_db_build::x_in_y_dataset::{
+    cnt_in_dir_schema, cnt_in_dir_writer_properties, CntInDirTableBuilder, PathColumnBuilder,
+};
+
+fn dataset_writer<G: SwhGraph>(
+    graph: &G,
+    path: &Path,
+) -> Result<ParallelDatasetWriter<ParquetTableWriter<CntInDirTableBuilder<BinaryBuilder>>>> {
+    let schema = Arc::new(BinaryBuilder::table_schema(cnt_in_dir_schema()));
+    let writer_properties = BinaryBuilder::writer_properties(cnt_in_dir_writer_properties(graph));
+    ParallelDatasetWriter::with_schema(path.to_owned(), (schema, writer_properties.build()))
+}
+
+/// Returns all (cnt, dir, path) rows of the dataset, sorted
+fn read_dataset(path: &Path) -> Result<Vec<(u64, u64, String)>> {
+    let mut rows = Vec::new();
+    for entry in std::fs::read_dir(path)? {
+        let file_path = entry?.path();
+        if file_path
+            .extension()
+            .is_none_or(|extension| extension != "parquet")
+        {
+            continue;
+        }
+        for batch in ParquetRecordBatchReaderBuilder::try_new(File::open(&file_path)?)?.build()? {
+            let batch = batch?;
+            let cnts = batch
+                .column_by_name("cnt")
+                .unwrap()
+                .as_primitive::<UInt64Type>();
+            let dirs = batch
+                .column_by_name("dir")
+                .unwrap()
+                .as_primitive::<UInt64Type>();
+            let paths = batch.column_by_name("path").unwrap().as_binary::<i32>();
+            for ((cnt, dir), path) in cnts.values().iter().zip(dirs.values()).zip(paths.iter()) {
+                rows.push((*cnt, *dir, String::from_utf8(path.unwrap().to_vec())?));
+            }
+        }
+    }
+    rows.sort();
+    Ok(rows)
+}
+
+#[test]
+fn test_contents_in_directories() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let dir0 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000000))?
+        .done();
+    let dir1 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000001))?
+        .done();
+    let dir2 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000002))?
+        .done();
+    let cnt3 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000003))?
+        .done();
+    let cnt4 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000004))?
+        .done();
+    let cnt5 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000005))?
+        .done();
+    /*
+     * dir0 --(subdir1)--> dir1 --(subdir2)--> dir2 --(content3)--> cnt3
+     *  \                   \
+     *   \                   +--(content4)--> cnt4
+     *    \
+     *     +--(content5)--> cnt5
+     *
+     * dir1 and dir2 are frontier directories
+     */
+    builder.dir_arc(dir0, dir1, Permission::Directory, b"subdir1");
+    builder.dir_arc(dir1, dir2, Permission::Directory, b"subdir2");
+    builder.dir_arc(dir1, cnt4, Permission::Content, b"content4");
+    builder.dir_arc(dir2, cnt3, Permission::Content, b"content3");
+    builder.dir_arc(dir0, cnt5, Permission::Content, b"content5");
+    let graph = builder.done()?;
+
+    let mut frontier_directories = BitVec::new(graph.num_nodes());
+    frontier_directories.set(dir1, true);
+    frontier_directories.set(dir2, true);
+
+    let tmpdir = tempfile::tempdir()?;
+    let backward_path = tmpdir.path().join("backward");
+    let forward_path = tmpdir.path().join("forward");
+
+    write_directories_from_contents(
+        &graph,
+        &frontier_directories,
+        dataset_writer(&graph, &backward_path)?,
+        &(),
+        None,
+    )?;
+    write_contents_from_directories(
+        &graph,
+        &frontier_directories,
+        dataset_writer(&graph, &forward_path)?,
+        &(),
+        None,
+    )?;
+
+    // Contents of nested frontier directories are in their parent frontier directory too
+    let expected = vec![
+        (cnt3 as u64, dir1 as u64, "subdir2/content3".to_owned()),
+        (cnt3 as u64, dir2 as u64, "content3".to_owned()),
+        (cnt4 as u64, dir1 as u64, "content4".to_owned()),
+    ];
+    assert_eq!(read_dataset(&backward_path)?, expected);
+    assert_eq!(read_dataset(&forward_path)?, expected);
+
+    Ok(())
+}
@@ -0,0 +1,176 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::path::Path;
+use std::sync::Arc;
+
+use anyhow::Result;
+use arrow::array::{AsArray, BinaryBuilder};
+use arrow::datatypes::UInt64Type;
+use dataset_writer::{ParallelDatasetWriter, ParquetTableWriter};
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use pretty_assertions::assert_eq;
+use sux::bits::bit_vec::BitVec;
+use sux::traits::BitVecOpsMut;
+
+use swh_graph::graph::*;
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::labels::Permission;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::contents_in_revisions::*;
+use swh_provenance_db_build::filters::NodeFilter;
+use swh_provenance_db_build::revrel_sets::RevrelSets;
+use swh_provenance_db_build::x_in_y_dataset::{
+    cnt_in_revrel_schema, cnt_in_revrel_writer_properties, CntInRevrelTableBuilder,
+    PathColumnBuilder,
+};
+
+fn dataset_writer<G: SwhGraph>(
+    graph: &G,
+    path: &Path,
+) -> Result<ParallelDatasetWriter<ParquetTableWriter<CntInRevrelTableBuilder<BinaryBuilder>>>> {
+    let schema = Arc::new(BinaryBuilder::table_schema(cnt_in_revrel_schema()));
+    let writer_properties =
+        BinaryBuilder::writer_properties(cnt_in_revrel_writer_properties(graph));
+    ParallelDatasetWriter::with_schema(path.to_owned(), (schema, writer_properties.build()))
+}
+
+/// Returns all (cnt, revrel, path) rows of the dataset, sorted
+fn read_dataset(path: &Path) -> Result<Vec<(u64, u64, String)>> {
+    let mut rows = Vec::new();
+    for entry in std::fs::read_dir(path)? {
+        let file_path = entry?.path();
+        if file_path
+            .extension()
+            .is_none_or(|extension| extension != "parquet")
+        {
+            continue;
+        }
+        for batch in ParquetRecordBatchReaderBuilder::try_new(File::open(&file_path)?)?.build()? {
+            let batch = batch?;
+            let cnts = batch
+                .column_by_name("cnt")
+                .unwrap()
+                .as_primitive::<UInt64Type>();
+            let revrels = batch
+                .column_by_name("revrel")
+                .unwrap()
+                .as_primitive::<UInt64Type>();
+            let paths = batch.column_by_name("path").unwrap().as_binary::<i32>();
+            for ((cnt, revrel), path) in
+                cnts.values().iter().zip(revrels.values()).zip(paths.iter())
+            {
+                rows.push((*cnt, *revrel, String::from_utf8(path.unwrap().to_vec())?));
+            }
+        }
+    }
+    rows.sort();
+    Ok(rows)
+}
+
+#[test]
+fn test_contents_in_revisions() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let rev0 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000000))?
+        .author_timestamp(1708451441, 0)
+        .done();
+    let rev1 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000001))?
+        .author_timestamp(1708453970, 0)
+        .done();
+    let rel2 = builder
+        .node(swhid!(swh:1:rel:0000000000000000000000000000000000000002))?
+        .author_timestamp(1708453971, 0)
+        .done();
+    let dir3 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000003))?
+        .done();
+    let dir4 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000004))?
+        .done();
+    let dir5 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000005))?
+        .done();
+    let cnt6 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000006))?
+        .done();
+    let cnt7 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000007))?
+        .done();
+    /*
+     * rel2 -> rev1 -> dir4
+     * rev0 -> dir3 --(subdir4)--> dir4 --(content6)--> cnt6
+     *          \                   \
+     *           \                   +--(frontier5)--> dir5 --(content7)--> cnt7
+     *            \
+     *             +--(content7)--> cnt7
+     *
+     * dir5 is a frontier directory
+     */
+    builder.arc(rel2, rev1);
+    builder.arc(rev1, dir4);
+    builder.arc(rev0, dir3);
+    builder.dir_arc(dir3, dir4, Permission::Directory, b"subdir4");
+    builder.dir_arc(dir3, cnt7, Permission::Content, b"content7");
+    builder.dir_arc(dir4, cnt6, Permission::Content, b"content6");
+    builder.dir_arc(dir4, dir5, Permission::Directory, b"frontier5");
+    builder.dir_arc(dir5, cnt7, Permission::Content, b"content7");
+    let graph = builder.done()?;
+
+    let mut frontier_directories = BitVec::new(graph.num_nodes());
+    frontier_directories.set(dir5, true);
+
+    let tmpdir = tempfile::tempdir()?;
+    let dfs_path = tmpdir.path().join("dfs");
+    let memoised_path = tmpdir.path().join("memoised");
+
+    write_revisions_from_contents(
+        &graph,
+        NodeFilter::All,
+        None,
+        &frontier_directories,
+        dataset_writer(&graph, &dfs_path)?,
+        &(),
+        None,
+    )?;
+
+    let mut revrel_sets = RevrelSets::new(
+        graph.num_nodes(),
+        tmpdir.path().join("revrel_sets"),
+        usize::MAX,
+    );
+    compute_revrel_sets(
+        &graph,
+        NodeFilter::All,
+        None,
+        &frontier_directories,
+        &mut revrel_sets,
+    )?;
+    write_revisions_from_revrel_sets(
+        &graph,
+        NodeFilter::All,
+        None,
+        &frontier_directories,
+        &revrel_sets,
+        dataset_writer(&graph, &memoised_path)?,
+        &(),
+        None,
+    )?;
+
+    // cnt7 is only reachable from rev1 and rel2 through a frontier directory
+    let expected = vec![
+        (cnt6 as u64, rev0 as u64, "subdir4/content6".to_owned()),
+        (cnt6 as u64, rev1 as u64, "content6".to_owned()),
+        (cnt6 as u64, rel2 as u64, "content6".to_owned()),
+        (cnt7 as u64, rev0 as u64, "content7".to_owned()),
+    ];
+    assert_eq!(read_dataset(&dfs_path)?, expected);
+    assert_eq!(read_dataset(&memoised_path)?, expected);
+
+    Ok(())
+}
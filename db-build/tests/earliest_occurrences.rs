@@ -0,0 +1,94 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::labels::{VisitStatus, VisitType};
+use swh_graph::swhid;
+
+use swh_provenance_db_build::earliest_occurrences::*;
+use swh_provenance_db_build::filters::NodeFilter;
+
+#[test]
+fn test_earliest_occurrences() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let ori0 = builder
+        .node(swhid!(swh:1:ori:0000000000000000000000000000000000000000))?
+        .done();
+    let snp1 = builder
+        .node(swhid!(swh:1:snp:0000000000000000000000000000000000000001))?
+        .done();
+    let rev2 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000002))?
+        .author_timestamp(1708451441, 0)
+        .committer_timestamp(1708451441, 0)
+        .done();
+    let rev3 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000003))?
+        .author_timestamp(1708453970, 0)
+        .committer_timestamp(1708453970, 0)
+        .done();
+    let rev4 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000004))?
+        .author_timestamp(1708451441, 0)
+        .committer_timestamp(1708451441, 0)
+        .done();
+    let dir5 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000005))?
+        .done();
+    let dir6 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000006))?
+        .done();
+    let cnt7 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000007))?
+        .done();
+    let cnt8 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000008))?
+        .done();
+    let cnt9 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000009))?
+        .done();
+    builder.ori_arc(
+        ori0,
+        snp1,
+        VisitStatus::Full,
+        1708460000,
+        VisitType::Unknown,
+    );
+    builder.snp_arc(snp1, rev3, b"refs/heads/main".to_vec());
+    builder.arc(rev3, rev2);
+    builder.arc(rev2, dir5);
+    builder.arc(rev3, dir6);
+    builder.arc(rev4, dir5);
+    builder.arc(dir5, cnt7);
+    builder.arc(dir6, cnt7);
+    builder.arc(dir6, cnt8);
+
+    let graph = builder.done()?;
+
+    // As computed by compute-earliest-timestamps
+    let mut timestamps = vec![i64::MIN; 10];
+    timestamps[dir5] = 1708451441;
+    timestamps[dir6] = 1708453970;
+    timestamps[cnt7] = 1708451441;
+    timestamps[cnt8] = 1708453970;
+
+    let earliest_revrels = compute_earliest_revrels(&graph, &timestamps[..], NodeFilter::All);
+    let mut expected = vec![usize::MAX; 10];
+    expected[cnt7] = rev2; // rev4 has the same date, but a larger node id
+    expected[cnt8] = rev3;
+    assert_eq!(earliest_revrels, expected);
+    assert_eq!(earliest_revrels[cnt9], usize::MAX);
+
+    let origins = compute_any_origins(&graph);
+    let mut expected = vec![usize::MAX; 10];
+    expected[snp1] = ori0;
+    expected[rev2] = ori0;
+    expected[rev3] = ori0;
+    assert_eq!(origins, expected);
+
+    Ok(())
+}
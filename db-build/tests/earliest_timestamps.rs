@@ -0,0 +1,134 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::sync::atomic::AtomicI64;
+
+use anyhow::Result;
+use pretty_assertions::assert_eq;
+
+use swh_graph::graph::*;
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::earliest_timestamps::*;
+use swh_provenance_db_build::filters::NodeFilter;
+
+fn new_timestamps(num_nodes: usize) -> Vec<AtomicI64> {
+    (0..num_nodes).map(|_| AtomicI64::new(i64::MAX)).collect()
+}
+
+fn into_timestamps(timestamps: Vec<AtomicI64>) -> Vec<i64> {
+    timestamps.into_iter().map(AtomicI64::into_inner).collect()
+}
+
+#[test]
+fn test_earliest_timestamps_ordered() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let rev0 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000000))?
+        .author_timestamp(300, 0)
+        .committer_timestamp(300, 0)
+        .done();
+    let rev1 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000001))?
+        .author_timestamp(100, 0)
+        .committer_timestamp(100, 0)
+        .done();
+    let rev2 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000002))?
+        .author_timestamp(200, 0)
+        .committer_timestamp(200, 0)
+        .done();
+    let rev3 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000003))?
+        .author_timestamp(100, 0)
+        .committer_timestamp(100, 0)
+        .done();
+    let dir4 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000004))?
+        .done();
+    let dir5 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000005))?
+        .done();
+    let dir6 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000006))?
+        .done();
+    let dir7 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000007))?
+        .done();
+    let dir8 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000008))?
+        .done();
+    let cnt9 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000009))?
+        .done();
+    let cnt10 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000010))?
+        .done();
+    let cnt11 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000011))?
+        .done();
+    let rev12 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000012))?
+        .done();
+    /*
+     * rev0 (300) --> dir4 --> cnt9 <-- rev12 (no date)
+     *               ^    \
+     * rev2 (200) --+      v
+     * rev1 (100) --> dir5 --> dir7 --> cnt11
+     *                         ^  \
+     * rev3 (100) --> dir6 ---+    v
+     *                   \------> dir8 --> cnt10
+     */
+    builder.arc(rev0, dir4);
+    builder.arc(rev2, dir4);
+    builder.arc(rev1, dir5);
+    builder.arc(rev3, dir6);
+    builder.arc(dir4, cnt9);
+    builder.arc(dir4, dir7);
+    builder.arc(dir5, dir7);
+    builder.arc(dir6, dir7);
+    builder.arc(dir6, dir8);
+    builder.arc(dir7, cnt11);
+    builder.arc(dir7, dir8);
+    builder.arc(dir8, cnt10);
+    builder.arc(rev12, cnt9);
+    let graph = builder.done()?;
+
+    let timestamps = new_timestamps(graph.num_nodes());
+    mark_all_reachable_contents(&graph, &timestamps, NodeFilter::All)?;
+    let expected = into_timestamps(timestamps);
+
+    let mut manual = vec![i64::MAX; graph.num_nodes()];
+    manual[dir4] = 200;
+    manual[dir5] = 100;
+    manual[dir6] = 100;
+    manual[dir7] = 100;
+    manual[dir8] = 100;
+    manual[cnt9] = 200;
+    manual[cnt10] = 100;
+    manual[cnt11] = 100;
+    assert_eq!(expected, manual);
+
+    let revrels = list_dated_revrels(&graph, NodeFilter::All);
+    assert_eq!(
+        revrels
+            .iter()
+            .map(|&(timestamp, _)| timestamp)
+            .collect::<Vec<_>>(),
+        vec![100, 100, 200, 300]
+    );
+    for bucket_size in [1, 2, 3, revrels.len() + 1] {
+        let timestamps = new_timestamps(graph.num_nodes());
+        mark_reachable_contents_in_order(&graph, &timestamps, &revrels, bucket_size);
+        assert_eq!(
+            into_timestamps(timestamps),
+            expected,
+            "bucket size {bucket_size}"
+        );
+    }
+
+    Ok(())
+}
@@ -14,6 +14,7 @@ use swh_graph::labels::Permission;
 use swh_graph::swhid;
 
 use swh_provenance_db_build::frontier::*;
+use swh_provenance_db_build::traversal::TraversalContext;
 
 #[test]
 fn test_dfs_with_path() -> Result<()> {
@@ -97,6 +98,7 @@ fn test_dfs_with_path() -> Result<()> {
 
     backward_dfs_with_path(
         &graph,
+        &mut TraversalContext::new(graph.num_nodes()),
         Some(&reachable_nodes),
         on_directory,
         on_revrel,
@@ -0,0 +1,142 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+use pretty_assertions::assert_eq;
+use sux::bits::bit_vec::BitVec;
+use sux::traits::{BitVecOps, BitVecOpsMut};
+
+use swh_graph::graph::*;
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::labels::Permission;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::filters::NodeFilter;
+use swh_provenance_db_build::frontier_cost::*;
+
+#[test]
+fn test_frontier_threshold() {
+    assert_eq!(frontier_threshold(0, 0.), u32::MAX);
+    assert_eq!(frontier_threshold(1, 0.), u32::MAX);
+    // 3 × 2 > 2 + 3, but 2 × 2 = 2 + 2
+    assert_eq!(frontier_threshold(2, 0.), 3);
+    // 2 × 3 > 3 + 2
+    assert_eq!(frontier_threshold(3, 0.), 2);
+    assert_eq!(frontier_threshold(1000, 0.), 2);
+    // 2 × 1000 < 1000 × 2 + 2, but 3 × 1000 > 1000 × 2 + 3
+    assert_eq!(frontier_threshold(1000, 1.), 3);
+}
+
+#[test]
+fn test_select_frontiers() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let rev0 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000000))?
+        .done();
+    let rev1 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000001))?
+        .done();
+    let rev2 = builder
+        .node(swhid!(swh:1:rev:0000000000000000000000000000000000000002))?
+        .done();
+    let dir3 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000003))?
+        .done();
+    let dir4 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000004))?
+        .done();
+    let dir5 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000005))?
+        .done();
+    let dir6 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000006))?
+        .done();
+    let dir7 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000007))?
+        .done();
+    let cnt8 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000008))?
+        .done();
+    let cnt9 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000009))?
+        .done();
+    let cnt10 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000010))?
+        .done();
+    let cnt11 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000011))?
+        .done();
+    let cnt12 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000012))?
+        .done();
+    /*
+     * rev0 -> dir3    rev1 -> dir4    rev2 -> dir5
+     *
+     * Each of dir3, dir4 and dir5 contains:
+     * - shared/ (dir6), with file8 (cnt8), file9 (cnt9) and file10 (cnt10)
+     * - single/ (dir7), with file11 (cnt11)
+     *
+     * and dir3 also contains file12 (cnt12)
+     */
+    for root_dir in [dir3, dir4, dir5] {
+        builder.dir_arc(root_dir, dir6, Permission::Directory, b"shared");
+        builder.dir_arc(root_dir, dir7, Permission::Directory, b"single");
+    }
+    builder.dir_arc(dir3, cnt12, Permission::Content, b"file12");
+    builder.dir_arc(dir6, cnt8, Permission::Content, b"file8");
+    builder.dir_arc(dir6, cnt9, Permission::Content, b"file9");
+    builder.dir_arc(dir6, cnt10, Permission::Content, b"file10");
+    builder.dir_arc(dir7, cnt11, Permission::Content, b"file11");
+    builder.arc(rev0, dir3);
+    builder.arc(rev1, dir4);
+    builder.arc(rev2, dir5);
+    let graph = builder.done()?;
+
+    let content_counts = ContentCounts::new(&graph);
+    assert_eq!(
+        [dir3, dir4, dir5, dir6, dir7, cnt8].map(|node| content_counts.get(node)),
+        [5, 4, 4, 3, 1, 0]
+    );
+
+    // dir6 saves 3 rows per revision for 3 rows in c_in_d and 1 per revision in d_in_r,
+    // dir7 is never worth it
+    let frontiers = select_frontiers(&graph, &content_counts, NodeFilter::All, 0.)?;
+    assert_eq!(
+        (0..graph.num_nodes())
+            .filter(|&node| frontiers.get(node))
+            .collect::<Vec<_>>(),
+        vec![dir6]
+    );
+
+    assert_eq!(
+        estimate_table_sizes(&graph, &content_counts, NodeFilter::All, &frontiers)?,
+        TableSizes {
+            contents_in_revisions_without_frontiers: 4,
+            contents_in_frontier_directories: 3,
+            frontier_directories_in_revisions: 3,
+        }
+    );
+
+    let no_frontiers = BitVec::new(graph.num_nodes());
+    assert_eq!(
+        estimate_table_sizes(&graph, &content_counts, NodeFilter::All, &no_frontiers)?,
+        TableSizes {
+            contents_in_revisions_without_frontiers: 13,
+            contents_in_frontier_directories: 0,
+            frontier_directories_in_revisions: 0,
+        }
+    );
+
+    // Making dir7 a frontier too adds more rows than it saves
+    let mut more_frontiers = BitVec::new(graph.num_nodes());
+    more_frontiers.set(dir6, true);
+    more_frontiers.set(dir7, true);
+    assert_eq!(
+        estimate_table_sizes(&graph, &content_counts, NodeFilter::All, &more_frontiers)?.total(),
+        1 + (3 + 1) + 3 * 2
+    );
+
+    Ok(())
+}
@@ -0,0 +1,58 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+
+use swh_provenance_db_build::key_counts::*;
+
+#[test]
+fn test_key_counts_roundtrip() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let path = tmpdir.path().join("table.counts");
+
+    let mut writer = KeyCountsWriter::new(path.clone(), "cnt", "revrel", 100, 1000)?;
+    writer.push(1, 4)?;
+    writer.push(2, 0)?;
+    writer.push(50, 900)?;
+    writer.push(99, 1)?;
+    let metadata = writer.finish()?;
+    assert_eq!(metadata.total, 905);
+    assert_eq!(metadata.num_nodes, 100);
+    assert_eq!(metadata.histogram, vec![97, 1, 0, 1, 0, 0, 0, 0, 0, 0, 1]);
+    assert_eq!(metadata.quantile(0.), 1);
+    assert_eq!(metadata.quantile(0.5), 7);
+    assert_eq!(metadata.quantile(1.), 1023);
+
+    let key_counts = KeyCounts::load(&path)?;
+    assert_eq!(key_counts.metadata(), &metadata);
+    for key in 0..100 {
+        let expected = match key {
+            1 => 4,
+            50 => 900,
+            99 => 1,
+            _ => 0,
+        };
+        assert_eq!(key_counts.count(key), expected, "key {key}");
+    }
+    assert_eq!(key_counts.count(100), 0);
+
+    Ok(())
+}
+
+#[test]
+fn test_key_counts_invalid() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+
+    let mut writer =
+        KeyCountsWriter::new(tmpdir.path().join("order.counts"), "cnt", "revrel", 10, 10)?;
+    writer.push(5, 1)?;
+    assert!(writer.push(3, 1).is_err());
+
+    let mut writer =
+        KeyCountsWriter::new(tmpdir.path().join("total.counts"), "cnt", "revrel", 10, 10)?;
+    assert!(writer.push(5, 11).is_err());
+
+    Ok(())
+}
@@ -0,0 +1,116 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::sync::Arc;
+
+use anyhow::Result;
+use arrow::array::{ArrayRef, RecordBatch, UInt64Array};
+use epserde::prelude::*;
+use parquet::arrow::ArrowWriter;
+use parquet::file::properties::{EnabledStatistics, WriterProperties};
+use sux::traits::IndexedSeq;
+
+use swh_provenance_db_build::key_index::*;
+
+fn write_file(path: &std::path::Path, keys: &[u64]) -> Result<()> {
+    let batch = RecordBatch::try_from_iter([(
+        "cnt",
+        Arc::new(UInt64Array::from(keys.to_vec())) as ArrayRef,
+    )])?;
+    let properties = WriterProperties::builder()
+        .set_max_row_group_size(2)
+        .set_statistics_enabled(EnabledStatistics::Chunk)
+        .build();
+    let mut writer = ArrowWriter::try_new(File::create(path)?, batch.schema(), Some(properties))?;
+    writer.write(&batch)?;
+    writer.close()?;
+    Ok(())
+}
+
+#[test]
+fn test_key_index_write() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let table_path = tmpdir.path().join("table");
+    let indexes_path = tmpdir.path().join("indexes");
+    std::fs::create_dir(&table_path)?;
+
+    // Rows written by each thread, as ParallelDatasetWriter would write them to a file of
+    // its own
+    let files: [(&str, &[u64]); 3] = [
+        ("0.parquet", &[5, 5, 3, 9, 3]),
+        ("1.parquet", &[1, 2, 2]),
+        ("2.parquet", &[]),
+    ];
+    let builder = KeyIndexBuilder::new();
+    std::thread::scope(|scope| {
+        for (_, keys) in files {
+            let builder = &builder;
+            scope.spawn(move || {
+                let mut thread_keys = builder.thread_keys();
+                for &key in keys {
+                    thread_keys.push(key);
+                }
+            });
+        }
+    });
+    for (file_name, keys) in files {
+        write_file(&table_path.join(file_name), keys)?;
+    }
+
+    assert_eq!(builder.write(&table_path, "cnt", &indexes_path)?, 2);
+
+    for (file_name, expected) in [("0.parquet", vec![3, 5, 9]), ("1.parquet", vec![1, 2])] {
+        let index = <KeyIndex>::load_full(&key_index_path(&indexes_path, file_name, "cnt"))?;
+        assert_eq!(
+            (0..index.len()).map(|i| index.get(i)).collect::<Vec<_>>(),
+            expected,
+            "{file_name}"
+        );
+    }
+    assert!(!key_index_path(&indexes_path, "2.parquet", "cnt").exists());
+
+    let written = WrittenKeyIndexes::load_or_default(&indexes_path)?;
+    assert_eq!(written.files, vec!["0.parquet", "1.parquet"]);
+    assert!(written.contains("0.parquet", "cnt"));
+    assert!(!written.contains("0.parquet", "dir"));
+    assert!(!written.contains("2.parquet", "cnt"));
+
+    Ok(())
+}
+
+#[test]
+fn test_key_index_ambiguous_files() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let table_path = tmpdir.path().join("table");
+    let indexes_path = tmpdir.path().join("indexes");
+    std::fs::create_dir(&table_path)?;
+
+    // Same number of rows, smallest and largest key: the files can't be told apart
+    let files: [(&str, &[u64]); 2] = [("0.parquet", &[1, 2, 3]), ("1.parquet", &[1, 1, 3])];
+    let builder = KeyIndexBuilder::new();
+    std::thread::scope(|scope| {
+        for (_, keys) in files {
+            let builder = &builder;
+            scope.spawn(move || {
+                let mut thread_keys = builder.thread_keys();
+                for &key in keys {
+                    thread_keys.push(key);
+                }
+            });
+        }
+    });
+    for (file_name, keys) in files {
+        write_file(&table_path.join(file_name), keys)?;
+    }
+
+    assert_eq!(builder.write(&table_path, "cnt", &indexes_path)?, 0);
+    assert_eq!(
+        WrittenKeyIndexes::load_or_default(&indexes_path)?.files,
+        Vec::<String>::new()
+    );
+
+    Ok(())
+}
@@ -0,0 +1,137 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::path::Path;
+use std::sync::Arc;
+
+use anyhow::Result;
+use arrow::array::{ArrayRef, AsArray, RecordBatch, UInt64Array};
+use arrow::datatypes::UInt64Type;
+use epserde::prelude::*;
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+use parquet::arrow::ArrowWriter;
+use parquet::file::properties::WriterProperties;
+use sux::traits::IndexedSeq;
+
+use swh_provenance_db_build::key_index::*;
+use swh_provenance_db_build::key_ranges::*;
+
+fn batch(cnt: &[u64], dir: &[u64]) -> Result<RecordBatch> {
+    Ok(RecordBatch::try_from_iter([
+        ("cnt", Arc::new(UInt64Array::from(cnt.to_vec())) as ArrayRef),
+        ("dir", Arc::new(UInt64Array::from(dir.to_vec())) as ArrayRef),
+    ])?)
+}
+
+fn write_file(path: &Path, batch: &RecordBatch) -> Result<()> {
+    let mut writer = ArrowWriter::try_new(File::create_new(path)?, batch.schema(), None)?;
+    writer.write(batch)?;
+    writer.close()?;
+    Ok(())
+}
+
+fn read_file(path: &Path) -> Result<Vec<(u64, u64)>> {
+    let mut rows = Vec::new();
+    for batch in ParquetRecordBatchReaderBuilder::try_new(File::open(path)?)?.build()? {
+        let batch = batch?;
+        let cnt = batch
+            .column_by_name("cnt")
+            .unwrap()
+            .as_primitive::<UInt64Type>();
+        let dir = batch
+            .column_by_name("dir")
+            .unwrap()
+            .as_primitive::<UInt64Type>();
+        rows.extend(
+            cnt.values()
+                .iter()
+                .copied()
+                .zip(dir.values().iter().copied()),
+        );
+    }
+    Ok(rows)
+}
+
+#[test]
+fn test_key_range_writers_range_of() {
+    let writers = KeyRangeWriters::new(vec!["a", "b", "c"], 10);
+    assert_eq!(
+        (0..10).map(|key| writers.range_of(key)).collect::<Vec<_>>(),
+        vec![0, 0, 0, 0, 1, 1, 1, 1, 2, 2]
+    );
+
+    let writers = KeyRangeWriters::from("a");
+    assert_eq!(writers.writers(), &["a"]);
+    assert_eq!(writers.range_of(0), 0);
+    assert_eq!(writers.range_of(usize::MAX), 0);
+}
+
+#[test]
+fn test_sort_key_ranges() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let spill_path = tmpdir.path().join("table.unsorted");
+    let table_path = tmpdir.path().join("table");
+    let indexes_path = tmpdir.path().join("indexes");
+
+    let range_paths = key_range_paths(&spill_path, 3);
+    // Written by two threads to the first range, and by none to the last one
+    std::fs::create_dir_all(&range_paths[0])?;
+    write_file(
+        &range_paths[0].join("0.parquet"),
+        &batch(&[3, 1, 3], &[10, 11, 12])?,
+    )?;
+    write_file(
+        &range_paths[0].join("1.parquet"),
+        &batch(&[2, 1], &[13, 14])?,
+    )?;
+    std::fs::create_dir_all(&range_paths[1])?;
+    write_file(
+        &range_paths[1].join("0.parquet"),
+        &batch(&[5, 4, 4], &[15, 16, 17])?,
+    )?;
+
+    let schema = batch(&[], &[])?.schema();
+    sort_key_ranges(
+        &range_paths,
+        "cnt",
+        schema,
+        &WriterProperties::builder().build(),
+        &table_path,
+        Some(&indexes_path),
+    )?;
+
+    let mut first_range = read_file(&table_path.join("000000.parquet"))?;
+    assert!(first_range.is_sorted_by_key(|&(cnt, _)| cnt));
+    first_range.sort();
+    assert_eq!(
+        first_range,
+        vec![(1, 11), (1, 14), (2, 13), (3, 10), (3, 12)]
+    );
+    let mut second_range = read_file(&table_path.join("000001.parquet"))?;
+    assert!(second_range.is_sorted_by_key(|&(cnt, _)| cnt));
+    second_range.sort();
+    assert_eq!(second_range, vec![(4, 16), (4, 17), (5, 15)]);
+    assert!(!table_path.join("000002.parquet").exists());
+    assert!(range_paths.iter().all(|range_path| !range_path.exists()));
+
+    for (file_name, expected) in [
+        ("000000.parquet", vec![1, 2, 3]),
+        ("000001.parquet", vec![4, 5]),
+    ] {
+        let index = <KeyIndex>::load_full(&key_index_path(&indexes_path, file_name, "cnt"))?;
+        assert_eq!(
+            (0..index.len()).map(|i| index.get(i)).collect::<Vec<_>>(),
+            expected,
+            "{file_name}"
+        );
+    }
+    assert_eq!(
+        WrittenKeyIndexes::load_or_default(&indexes_path)?.files,
+        vec!["000000.parquet", "000001.parquet"]
+    );
+
+    Ok(())
+}
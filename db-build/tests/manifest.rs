@@ -0,0 +1,61 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::sync::Arc;
+
+use anyhow::Result;
+use arrow::array::{ArrayRef, RecordBatch, UInt64Array};
+use parquet::arrow::ArrowWriter;
+use parquet::file::properties::WriterProperties;
+
+use swh_provenance_db_build::manifest::*;
+
+fn write_file(path: &std::path::Path, keys: &[u64], row_group_size: usize) -> Result<()> {
+    let batch = RecordBatch::try_from_iter([(
+        "cnt",
+        Arc::new(UInt64Array::from(keys.to_vec())) as ArrayRef,
+    )])?;
+    let properties = WriterProperties::builder()
+        .set_max_row_group_size(row_group_size)
+        .build();
+    let mut writer = ArrowWriter::try_new(File::create(path)?, batch.schema(), Some(properties))?;
+    writer.write(&batch)?;
+    writer.close()?;
+    Ok(())
+}
+
+#[test]
+fn test_manifest_roundtrip() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let table_path = tmpdir.path().join("table");
+    std::fs::create_dir(&table_path)?;
+    write_file(&table_path.join("1.parquet"), &[1, 2, 3, 4, 5], 2)?;
+    write_file(&table_path.join("0.parquet"), &[], 2)?;
+    std::fs::write(table_path.join("README"), "not a Parquet file")?;
+
+    let manifest = TableManifest::from_parquet(&table_path)?;
+    assert_eq!(
+        manifest
+            .files
+            .iter()
+            .map(|file| (file.file_name.as_str(), file.num_rows))
+            .collect::<Vec<_>>(),
+        vec![("0.parquet", 0), ("1.parquet", 5)]
+    );
+    assert_eq!(manifest.files[1].num_row_groups, 3);
+    assert_eq!(manifest.num_rows(), 5);
+    assert_eq!(manifest.num_nonempty_files(), 1);
+
+    let path = tmpdir.path().join("table.manifest.json");
+    manifest.write(&path)?;
+    assert_eq!(TableManifest::load(&path)?, manifest);
+    assert!(
+        manifest.write(&path).is_err(),
+        "Overwrote existing manifest"
+    );
+
+    Ok(())
+}
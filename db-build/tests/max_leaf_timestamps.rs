@@ -0,0 +1,136 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::sync::atomic::AtomicI64;
+
+use anyhow::Result;
+use pretty_assertions::assert_eq;
+use sux::bits::bit_vec::BitVec;
+use sux::traits::BitVecOpsMut;
+
+use swh_graph::graph::*;
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::labels::Permission;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::max_leaf_timestamps::*;
+
+const UNSET: i64 = i64::MIN;
+
+fn run_both<G>(
+    graph: &G,
+    reachable_nodes: Option<&BitVec>,
+    timestamps: &Vec<i64>,
+) -> Result<Vec<i64>>
+where
+    G: SwhBackwardGraph + SwhGraphWithProperties + Sync,
+    <G as SwhGraphWithProperties>::Maps: swh_graph::properties::Maps,
+{
+    let new_max_timestamps = || {
+        (0..graph.num_nodes())
+            .map(|_| AtomicI64::new(UNSET))
+            .collect::<Vec<_>>()
+    };
+    let mut dfs = new_max_timestamps();
+    propagate_through_directories(graph, reachable_nodes, timestamps, &mut dfs)?;
+    let mut topological = new_max_timestamps();
+    propagate_in_topological_order(graph, reachable_nodes, timestamps, &mut topological)?;
+
+    let dfs: Vec<i64> = dfs.into_iter().map(AtomicI64::into_inner).collect();
+    let topological: Vec<i64> = topological.into_iter().map(AtomicI64::into_inner).collect();
+    assert_eq!(dfs, topological);
+    Ok(dfs)
+}
+
+#[test]
+fn test_max_leaf_timestamps() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    let cnt0 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000000))?
+        .done();
+    let cnt1 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000001))?
+        .done();
+    let cnt2 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000002))?
+        .done();
+    let cnt3 = builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000003))?
+        .done();
+    let dir4 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000004))?
+        .done();
+    let dir5 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000005))?
+        .done();
+    let dir6 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000006))?
+        .done();
+    let dir7 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000007))?
+        .done();
+    let dir8 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000008))?
+        .done();
+    let dir9 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000009))?
+        .done();
+    let dir10 = builder
+        .node(swhid!(swh:1:dir:0000000000000000000000000000000000000010))?
+        .done();
+    /*
+     * dir7 -> dir5 -> dir4 -> cnt0 (10)
+     *  |       |       \
+     *  |       |        +--> cnt1 (30)
+     *  |       +--> cnt3 (20)
+     *  +--> dir6 -> dir4
+     *  |      \
+     *  |       +--> cnt2 (no timestamp)
+     *  +--> dir9 -> cnt2
+     *         \
+     *          +--> cnt3
+     *
+     * dir10 -> dir9, and is unreachable
+     * dir8 -> cnt3, and is unreachable
+     */
+    builder.dir_arc(dir4, cnt0, Permission::Content, b"cnt0");
+    builder.dir_arc(dir4, cnt1, Permission::Content, b"cnt1");
+    builder.dir_arc(dir5, dir4, Permission::Directory, b"dir4");
+    builder.dir_arc(dir5, cnt3, Permission::Content, b"cnt3");
+    builder.dir_arc(dir6, dir4, Permission::Directory, b"dir4");
+    builder.dir_arc(dir6, cnt2, Permission::Content, b"cnt2");
+    builder.dir_arc(dir9, cnt2, Permission::Content, b"cnt2");
+    builder.dir_arc(dir9, cnt3, Permission::Content, b"cnt3");
+    builder.dir_arc(dir7, dir5, Permission::Directory, b"dir5");
+    builder.dir_arc(dir7, dir6, Permission::Directory, b"dir6");
+    builder.dir_arc(dir7, dir9, Permission::Directory, b"dir9");
+    builder.dir_arc(dir8, cnt3, Permission::Content, b"cnt3");
+    builder.dir_arc(dir10, dir9, Permission::Directory, b"dir9");
+    let graph = builder.done()?;
+
+    let mut timestamps = vec![UNSET; graph.num_nodes()];
+    timestamps[cnt0] = 10;
+    timestamps[cnt1] = 30;
+    timestamps[cnt3] = 20;
+
+    let mut reachable_nodes = BitVec::new(graph.num_nodes());
+    for node in [cnt0, cnt1, cnt2, cnt3, dir4, dir5, dir6, dir7, dir9] {
+        reachable_nodes.set(node, true);
+    }
+
+    let max_timestamps = run_both(&graph, Some(&reachable_nodes), &timestamps)?;
+    assert_eq!(
+        max_timestamps,
+        vec![UNSET, UNSET, UNSET, UNSET, 30, 30, 30, 30, UNSET, 20, UNSET]
+    );
+
+    let max_timestamps = run_both(&graph, None, &timestamps)?;
+    assert_eq!(
+        max_timestamps,
+        vec![UNSET, UNSET, UNSET, UNSET, 30, 30, 30, 30, 20, 20, 20]
+    );
+
+    Ok(())
+}
@@ -0,0 +1,101 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::fs::File;
+use std::path::Path;
+
+use anyhow::Result;
+use arrow::array::AsArray;
+use arrow::datatypes::UInt64Type;
+use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+
+use swh_graph::graph_builder::GraphBuilder;
+use swh_graph::swhid;
+
+use swh_provenance_db_build::paths::*;
+
+fn read_file(path: &Path) -> Result<Vec<(u64, Vec<u8>)>> {
+    let mut rows = Vec::new();
+    for batch in ParquetRecordBatchReaderBuilder::try_new(File::open(path)?)?.build()? {
+        let batch = batch?;
+        let path_ids = batch
+            .column_by_name("path_id")
+            .unwrap()
+            .as_primitive::<UInt64Type>();
+        let paths = batch.column_by_name("path").unwrap().as_binary::<i32>();
+        rows.extend(
+            path_ids
+                .values()
+                .iter()
+                .copied()
+                .zip(paths.iter().map(|path| path.unwrap().to_vec())),
+        );
+    }
+    Ok(rows)
+}
+
+#[test]
+fn test_path_interner_intern() {
+    let paths = PathInterner::new(PathNamespace::ContentsInFrontierDirectories);
+    assert!(paths.is_empty());
+
+    let first_id = PathNamespace::ContentsInFrontierDirectories.first_id();
+    assert_eq!(first_id, 1 << NAMESPACE_SHIFT);
+    assert_eq!(paths.intern(b"src/main.rs"), first_id);
+    assert_eq!(paths.intern(b"README.md"), first_id + 1);
+    assert_eq!(paths.intern(b"src/main.rs"), first_id);
+    assert_eq!(paths.intern(b""), first_id + 2);
+    assert_eq!(paths.len(), 3);
+}
+
+#[test]
+fn test_path_interner_write() -> Result<()> {
+    let mut builder = GraphBuilder::default();
+    builder
+        .node(swhid!(swh:1:cnt:0000000000000000000000000000000000000000))?
+        .done();
+    let graph = builder.done()?;
+
+    let tmpdir = tempfile::tempdir()?;
+    let paths_path = tmpdir.path().join("paths");
+    let namespace = PathNamespace::FrontierDirectoriesInRevisions;
+    let first_id = namespace.first_id();
+
+    // Left over from a previous run, for this namespace and another one
+    std::fs::create_dir(&paths_path)?;
+    let stale_path = paths_path.join("frontier_directories_in_revisions.000003.parquet");
+    let other_path = paths_path.join("contents_in_frontier_directories.000000.parquet");
+    File::create_new(&stale_path)?;
+    File::create_new(&other_path)?;
+
+    let paths = PathInterner::new(namespace);
+    std::thread::scope(|scope| {
+        for thread_paths in [&[b"a/b".as_slice(), b"c"], &[b"c".as_slice(), b"d/e/f"]] {
+            let paths = &paths;
+            scope.spawn(move || {
+                for path in thread_paths {
+                    paths.intern(path);
+                }
+            });
+        }
+    });
+    let ids = [b"a/b".as_slice(), b"c", b"d/e/f"].map(|path| paths.intern(path));
+
+    assert_eq!(paths.write(&graph, &paths_path)?, 3);
+
+    assert!(!stale_path.exists());
+    assert!(other_path.exists());
+    let rows = read_file(&paths_path.join("frontier_directories_in_revisions.000000.parquet"))?;
+    assert!(rows.is_sorted_by_key(|(path_id, _)| *path_id));
+    assert_eq!(
+        rows.iter().map(|(path_id, _)| *path_id).collect::<Vec<_>>(),
+        vec![first_id, first_id + 1, first_id + 2]
+    );
+    for (path, id) in [b"a/b".as_slice(), b"c", b"d/e/f"].into_iter().zip(ids) {
+        assert!(rows.contains(&(id, path.to_vec())), "{path:?}");
+    }
+
+    Ok(())
+}
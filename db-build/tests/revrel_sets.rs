@@ -0,0 +1,40 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+use pretty_assertions::assert_eq;
+
+use swh_provenance_db_build::revrel_sets::*;
+
+#[test]
+fn test_revrel_sets() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let spill_path = tmpdir.path().join("sets");
+
+    // The first set is spilled, the others are kept in memory
+    let mut sets = RevrelSets::new(10, spill_path.clone(), 12);
+    sets.insert(1, &[0, 5, 200, 100_000, 1 << 40])?;
+    sets.insert(3, &[])?;
+    sets.insert(4, &[7])?;
+    sets.insert(6, &[2, 3])?;
+    assert!(spill_path.exists());
+    assert!(sets.insert(1, &[1]).is_err());
+
+    let get = |node| -> Result<Vec<usize>> {
+        let mut revrels = vec![42];
+        sets.get(node, &mut revrels)?;
+        Ok(revrels)
+    };
+    assert_eq!(get(0)?, vec![42]);
+    assert_eq!(get(1)?, vec![42, 0, 5, 200, 100_000, 1 << 40]);
+    assert_eq!(get(3)?, vec![42]);
+    assert_eq!(get(4)?, vec![42, 7]);
+    assert_eq!(get(6)?, vec![42, 2, 3]);
+
+    drop(sets);
+    assert!(!spill_path.exists());
+
+    Ok(())
+}
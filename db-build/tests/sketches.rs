@@ -0,0 +1,74 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use anyhow::Result;
+
+use swh_provenance_db_build::sketches::*;
+
+#[test]
+fn test_hyperloglog_estimate() {
+    for num_values in [0u64, 1, 10, 1000, 100_000] {
+        let mut sketch = HyperLogLog::new();
+        for value in 0..num_values {
+            // Duplicates must not be counted
+            sketch.insert(value);
+            sketch.insert(value);
+        }
+        let estimate = sketch.estimate();
+        let error = (estimate - num_values as f64).abs() / (num_values as f64).max(1.);
+        assert!(
+            error < 0.1,
+            "estimated {estimate} distinct values instead of {num_values}"
+        );
+    }
+}
+
+#[test]
+fn test_hyperloglog_merge() {
+    let mut sketch1 = HyperLogLog::new();
+    let mut sketch2 = HyperLogLog::new();
+    let mut expected = HyperLogLog::new();
+    for value in 0..10_000 {
+        sketch1.insert(value);
+        expected.insert(value);
+    }
+    for value in 5_000..20_000 {
+        sketch2.insert(value);
+        expected.insert(value);
+    }
+    sketch1.merge(&sketch2);
+    assert_eq!(sketch1, expected);
+}
+
+#[test]
+fn test_sketches_roundtrip() -> Result<()> {
+    let tmpdir = tempfile::tempdir()?;
+    let path = tmpdir.path().join("sketches.hll");
+
+    let mut sketch1 = HyperLogLog::new();
+    sketch1.insert(42);
+    let mut sketch2 = HyperLogLog::new();
+    for value in 0..1000 {
+        sketch2.insert(value);
+    }
+    let metadata = write_sketches(&path, "cnt", "revrel", [(3, &sketch1), (10, &sketch2)])?;
+    assert_eq!(metadata.num_keys, 2);
+
+    let sketches = Sketches::load(&path)?;
+    assert_eq!(sketches.metadata(), &metadata);
+    assert_eq!(sketches.get(3), Some(sketch1));
+    assert_eq!(sketches.get(10), Some(sketch2));
+    assert_eq!(sketches.get(4), None);
+
+    assert!(write_sketches(
+        &tmpdir.path().join("unsorted.hll"),
+        "cnt",
+        "revrel",
+        [(10, &HyperLogLog::new()), (3, &HyperLogLog::new())]
+    )
+    .is_err());
+
+    Ok(())
+}
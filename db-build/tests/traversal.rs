@@ -0,0 +1,100 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use pretty_assertions::assert_eq;
+
+use swh_graph::labels::LabelNameId;
+
+use swh_provenance_db_build::traversal::*;
+
+#[test]
+fn test_visited_set_sparse() {
+    let mut visited = VisitedSet::new(1000);
+    visited.insert(3);
+    visited.insert(500);
+    assert!(visited.contains(3));
+    assert!(visited.contains(500));
+    assert!(!visited.contains(4));
+
+    visited.clear();
+    assert!(!visited.contains(3));
+    assert!(!visited.contains(500));
+}
+
+#[test]
+fn test_visited_set_dense() {
+    // Switches to a bit vector after 1000 / 64 = 15 nodes
+    let mut visited = VisitedSet::new(1000);
+    for node in (0..100).map(|i| i * 7) {
+        visited.insert(node);
+    }
+    assert_eq!(
+        (0..1000).filter(|&node| visited.contains(node)).count(),
+        100
+    );
+    assert!(visited.contains(693));
+    assert!(!visited.contains(694));
+
+    visited.clear();
+    assert_eq!((0..1000).filter(|&node| visited.contains(node)).count(), 0);
+
+    // Reuses the bit vector
+    for node in 0..20 {
+        visited.insert(node);
+    }
+    assert!(visited.contains(19));
+    assert!(!visited.contains(20));
+    visited.clear();
+    assert_eq!((0..1000).filter(|&node| visited.contains(node)).count(), 0);
+
+    // Back to the hash set
+    visited.insert(42);
+    assert!(visited.contains(42));
+    assert!(!visited.contains(0));
+}
+
+#[test]
+fn test_path_arena() {
+    let mut arena = PathArena::new();
+    arena.push_root(0);
+
+    let (node, root_path) = arena.pop().unwrap();
+    assert_eq!(node, 0);
+    assert!(arena.path(root_path.clone()).is_empty());
+    arena.push_child(1, root_path.clone(), LabelNameId(10));
+    arena.push_child(2, root_path, LabelNameId(20));
+
+    let (node, path2) = arena.pop().unwrap();
+    assert_eq!(node, 2);
+    assert_eq!(arena.path(path2.clone()), &[LabelNameId(20)]);
+    arena.push_child(3, path2, LabelNameId(30));
+
+    let (node, path3) = arena.pop().unwrap();
+    assert_eq!(node, 3);
+    assert_eq!(arena.path(path3), &[LabelNameId(20), LabelNameId(30)]);
+
+    let (node, path1) = arena.pop().unwrap();
+    assert_eq!(node, 1);
+    assert_eq!(arena.path(path1), &[LabelNameId(10)]);
+
+    assert_eq!(arena.pop(), None);
+}
+
+#[test]
+fn test_path_arena_backward() {
+    let mut arena = PathArena::new();
+    arena.push_root(0);
+
+    let (_, root_path) = arena.pop().unwrap();
+    arena.push_parent(1, root_path, LabelNameId(10));
+    let (node, path1) = arena.pop().unwrap();
+    assert_eq!(node, 1);
+    arena.push_parent(2, path1, LabelNameId(20));
+
+    let (node, path2) = arena.pop().unwrap();
+    assert_eq!(node, 2);
+    assert_eq!(arena.path(path2), &[LabelNameId(20), LabelNameId(10)]);
+    assert_eq!(arena.pop(), None);
+}
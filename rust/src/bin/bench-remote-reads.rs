@@ -0,0 +1,175 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+use std::io::BufRead;
+use std::path::PathBuf;
+use std::sync::Arc;
+use std::time::{Duration, Instant};
+
+use anyhow::{ensure, Context, Result};
+use clap::Parser;
+use mimalloc::MiMalloc;
+use object_store::ObjectStore;
+
+use swh_provenance::database::latency_store::LatencyObjectStore;
+use swh_provenance::database::read_planner::ReadPlannerConfig;
+use swh_provenance::database::ProvenanceDatabase;
+use swh_provenance::queries::{AuthorDateRange, ProvenanceService, QueryConfig};
+
+#[global_allocator]
+static GLOBAL: MiMalloc = MiMalloc; // Allocator recommended by Datafusion
+
+#[derive(Parser, Debug)]
+#[command(about = "Benchmarks point queries on a local provenance database, with latency injected into every read to emulate a remote store", long_about = None)]
+struct Args {
+    #[arg(long)]
+    /// Path to the graph prefix
+    graph: PathBuf,
+    #[arg(long)]
+    /// URL to the provenance database (which should be a file:// URL)
+    database: url::Url,
+    #[arg(long)]
+    /// Path to Elias-Fano indexes, default to `--database` (when it is a file:// URL)
+    indexes: Option<PathBuf>,
+    #[arg(long)]
+    /// Path to a file containing one content SWHID per line, to query with `WhereIsOne`
+    swhids: PathBuf,
+    #[arg(long, default_value_t = 20)]
+    /// Latency (in milliseconds) added to each read from the database
+    latency_ms: u64,
+    #[arg(long, default_value_t = 1)]
+    /// Number of times to run the whole list of queries
+    runs: usize,
+    #[arg(long)]
+    /// Read directly from the latency-injected store instead of through the read planner
+    baseline: bool,
+    #[command(flatten)]
+    read_planner: ReadPlannerConfig,
+}
+
+/// Returns the `q`-quantile of the sorted list of durations
+fn quantile(sorted_durations: &[Duration], q: f64) -> Duration {
+    let index = ((sorted_durations.len() - 1) as f64 * q).round() as usize;
+    sorted_durations[index]
+}
+
+pub fn main() -> Result<()> {
+    let args = Args::parse();
+
+    let indexes = args
+        .indexes
+        .or_else(|| args.database.to_file_path().ok())
+        .context("--indexes must be provided when --database is not a file:// URL")?;
+
+    tracing_subscriber::fmt()
+        .with_env_filter(
+            tracing_subscriber::EnvFilter::try_from_default_env()
+                .or_else(|_| tracing_subscriber::EnvFilter::try_new("info"))
+                .unwrap(),
+        )
+        .try_init()
+        .map_err(|e| anyhow::anyhow!("Could not initialize logging: {e}"))?;
+
+    let swhids = std::io::BufReader::new(
+        std::fs::File::open(&args.swhids)
+            .with_context(|| format!("Could not open {}", args.swhids.display()))?,
+    )
+    .lines()
+    .collect::<Result<Vec<_>, _>>()
+    .with_context(|| format!("Could not read {}", args.swhids.display()))?;
+    let swhids: Vec<_> = swhids
+        .into_iter()
+        .map(|line| line.trim().to_owned())
+        .filter(|line| !line.is_empty())
+        .collect();
+    ensure!(!swhids.is_empty(), "{} is empty", args.swhids.display());
+
+    log::info!("Loading graph properties");
+    let graph = swh_provenance::utils::load_graph_properties(args.graph)?;
+
+    let Args {
+        database,
+        latency_ms,
+        runs,
+        baseline,
+        read_planner: read_planner_config,
+        ..
+    } = args;
+
+    tokio::runtime::Builder::new_multi_thread()
+        .enable_all()
+        .build()
+        .unwrap()
+        .block_on(async move {
+            let (local_store, path) = object_store::parse_url(&database)
+                .with_context(|| format!("Invalid provenance database URL: {}", database))?;
+            let latency_store = Arc::new(LatencyObjectStore::new(
+                local_store.into(),
+                Duration::from_millis(latency_ms),
+            ));
+            let read_planner = (!baseline).then(|| {
+                Arc::new(swh_provenance::database::with_read_planner(
+                    latency_store.clone(),
+                    &path,
+                    read_planner_config.clone(),
+                ))
+            });
+            let store: Arc<dyn ObjectStore> = match &read_planner {
+                Some(read_planner) => read_planner.clone(),
+                None => latency_store.clone(),
+            };
+
+            log::info!("Loading database");
+            let db = ProvenanceDatabase::from_store(database.clone(), store, path, &indexes)
+                .await
+                .context("Could not initialize provenance database")?;
+            db.mmap_ef_indexes()
+                .context("Could not mmap Elias-Fano indexes")?;
+            let service = ProvenanceService {
+                db,
+                graph: Arc::new(graph),
+                config: QueryConfig::default(),
+            };
+
+            let requests_before = latency_store.requests();
+            let mut durations = Vec::with_capacity(swhids.len() * runs);
+            for _ in 0..runs {
+                for swhid in &swhids {
+                    let start = Instant::now();
+                    service
+                        .where_is_one(swhid, AuthorDateRange::default())
+                        .await
+                        .with_context(|| format!("Could not query {swhid}"))?;
+                    durations.push(start.elapsed());
+                }
+            }
+            let requests = latency_store.requests() - requests_before;
+
+            durations.sort_unstable();
+            let total: Duration = durations.iter().sum();
+            println!(
+                "queries: {}, read planner: {}, latency: {}ms",
+                durations.len(),
+                if baseline { "off" } else { "on" },
+                latency_ms
+            );
+            println!(
+                "p50: {:?}, p99: {:?}, max: {:?}, mean: {:?}",
+                quantile(&durations, 0.5),
+                quantile(&durations, 0.99),
+                durations.last().expect("no queries"),
+                total / u32::try_from(durations.len()).expect("too many queries"),
+            );
+            println!(
+                "store requests per query: {:.2}",
+                requests as f64 / durations.len() as f64
+            );
+            if let Some(read_planner) = read_planner {
+                println!("{:#?}", read_planner.metrics());
+            }
+
+            Ok(())
+        })
+}
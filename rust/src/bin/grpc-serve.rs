@@ -5,8 +5,11 @@
 
 use std::io::BufReader;
 use std::path::PathBuf;
+use std::str::FromStr;
+use std::sync::Arc;
+use std::time::Duration;
 
-use anyhow::{anyhow, Context, Result};
+use anyhow::{anyhow, bail, ensure, Context, Result};
 use clap::{Parser, ValueEnum};
 use mimalloc::MiMalloc;
 use tracing_subscriber::layer::SubscriberExt;
@@ -15,6 +18,10 @@ use tracing_subscriber::util::SubscriberInitExt;
 use swh_graph::graph::SwhBidirectionalGraph;
 use swh_graph::properties;
 use swh_graph::SwhGraphProperties;
+use swh_provenance::database::read_planner::ReadPlannerConfig;
+use swh_provenance::database::tiers::TierConfig;
+use swh_provenance::database::ProvenanceDatabase;
+use swh_provenance::queries::QueryConfig;
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc; // Allocator recommended by Datafusion
@@ -34,27 +41,178 @@ struct Args {
     #[arg(long)]
     /// Path to the graph prefix
     graph: PathBuf,
+    #[arg(long, required = true)]
+    /// URL to the provenance database (which may be a file:// URL), optionally prefixed
+    /// with `NAME=`. May be given several times to serve several databases over the same
+    /// graph, which must then all be named; requests which do not name one query the first.
+    database: Vec<Named<url::Url>>,
     #[arg(long)]
-    /// URL to the provenance database (which may be a file:// URL)
-    database: url::Url,
-    #[arg(long)]
-    /// Path to Elias-Fano indexes, default to `--database` (when it is a file:// URL)
-    indexes: Option<PathBuf>,
+    /// Path to Elias-Fano indexes, default to `--database` (when it is a file:// URL).
+    /// Prefixed with `NAME=` to set the indexes of a named database.
+    indexes: Vec<Named<PathBuf>>,
     #[arg(long, default_value = "[::]:50141")]
     bind: std::net::SocketAddr,
     #[arg(long)]
     /// Defaults to `localhost:8125` (or whatever is configured by the `STATSD_HOST`
     /// and `STATSD_PORT` environment variables).
     statsd_host: Option<String>,
+    #[command(flatten)]
+    read_planner: ReadPlannerConfig,
+    #[command(flatten)]
+    queries: QueryConfig,
+    #[arg(long)]
+    /// Path to a JSON file configuring how each table is read (resident in RAM, mmapped,
+    /// through the object store API, or from a CSR file), see `swh_provenance::database::tiers::TierConfig`
+    table_tiers: Option<PathBuf>,
+    #[arg(long)]
+    /// Path to a JSON file to periodically write the number of accesses to each table to,
+    /// for use as `access_frequencies` in `--table-tiers`. When serving several databases,
+    /// the name of each database is inserted before the extension.
+    table_accesses_output: Option<PathBuf>,
+}
+
+/// Value of a command-line argument, optionally prefixed with `NAME=`
+#[derive(Clone, Debug)]
+struct Named<T> {
+    name: Option<String>,
+    value: T,
+}
+
+impl<T: FromStr<Err: std::fmt::Display>> FromStr for Named<T> {
+    type Err = String;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        // Names can't contain ':' nor '/', so URLs and paths with a '=' are not mistaken
+        // for named values
+        let (name, value) = match s.split_once('=') {
+            Some((name, value)) if !name.is_empty() && !name.contains([':', '/']) => {
+                (Some(name.to_owned()), value)
+            }
+            _ => (None, s),
+        };
+        Ok(Named {
+            name,
+            value: value.parse().map_err(|e| format!("{e}"))?,
+        })
+    }
+}
+
+/// Returns the name, URL, and indexes path of each database to serve
+fn databases_to_serve(
+    databases: Vec<Named<url::Url>>,
+    indexes: Vec<Named<PathBuf>>,
+) -> Result<Vec<(String, url::Url, PathBuf)>> {
+    if databases.len() > 1 {
+        ensure!(
+            databases.iter().all(|database| database.name.is_some()),
+            "--database must be prefixed with a name when given several times"
+        );
+        ensure!(
+            indexes.iter().all(|indexes| indexes.name.is_some()),
+            "--indexes must be prefixed with a name when serving several databases"
+        );
+    }
+    let mut databases_to_serve: Vec<(String, url::Url, PathBuf)> = Vec::new();
+    for Named { name, value: url } in databases {
+        let name = name.unwrap_or_else(|| "default".to_owned());
+        ensure!(
+            databases_to_serve
+                .iter()
+                .all(|(other, _, _)| *other != name),
+            "Database {name} is given several times"
+        );
+        let indexes = indexes
+            .iter()
+            .find(|indexes| indexes.name.as_ref().map_or(true, |other| *other == name))
+            .map(|indexes| indexes.value.clone())
+            .or_else(|| url.to_file_path().ok())
+            .with_context(|| {
+                format!(
+                    "--indexes must be provided for {name} as its --database is not a file:// URL"
+                )
+            })?;
+        databases_to_serve.push((name, url, indexes));
+    }
+    for Named { name, .. } in &indexes {
+        if let Some(name) = name {
+            if databases_to_serve.iter().all(|(other, _, _)| other != name) {
+                bail!("--indexes is given for unknown database {name}");
+            }
+        }
+    }
+    Ok(databases_to_serve)
+}
+
+/// Loads all databases to serve, concurrently
+async fn load_databases(
+    databases: Vec<(String, url::Url, PathBuf)>,
+    read_planner_config: ReadPlannerConfig,
+    tier_config: TierConfig,
+) -> Result<Vec<(String, ProvenanceDatabase)>> {
+    let tasks: Vec<_> = databases
+        .into_iter()
+        .map(|(name, url, indexes)| {
+            let read_planner_config = read_planner_config.clone();
+            let tier_config = tier_config.clone();
+            tokio::task::spawn(async move {
+                let db = swh_provenance::utils::load_database(
+                    url,
+                    indexes,
+                    read_planner_config,
+                    tier_config,
+                )
+                .await
+                .with_context(|| format!("Could not load database {name}"))?;
+                Ok::<_, anyhow::Error>((name, db))
+            })
+        })
+        .collect();
+    let mut dbs = Vec::with_capacity(tasks.len());
+    for task in tasks {
+        dbs.push(task.await.expect("Could not join database load task")?);
+    }
+    Ok(dbs)
+}
+
+/// Periodically writes the number of accesses to each table of each database to the given
+/// path, or to the path with the name of each database inserted before the extension if
+/// there are several
+fn spawn_table_accesses_writers(dbs: &[(String, ProvenanceDatabase)], path: Option<PathBuf>) {
+    let Some(path) = path else {
+        return;
+    };
+    for (name, db) in dbs {
+        let path = if dbs.len() > 1 {
+            let extension = path
+                .extension()
+                .map(|extension| extension.to_string_lossy().into_owned())
+                .unwrap_or_else(|| "json".to_owned());
+            path.with_extension(format!("{name}.{extension}"))
+        } else {
+            path.clone()
+        };
+        spawn_table_accesses_writer(db, path);
+    }
+}
+
+/// Periodically writes the number of accesses to each table to the given path
+fn spawn_table_accesses_writer(db: &ProvenanceDatabase, path: PathBuf) {
+    let accesses = Arc::clone(&db.accesses);
+    tokio::spawn(async move {
+        let mut interval = tokio::time::interval(Duration::from_secs(60));
+        loop {
+            interval.tick().await;
+            if let Err(e) = accesses.write_json(&path) {
+                log::error!("{e:#}");
+            }
+        }
+    });
 }
 
 pub fn main() -> Result<()> {
     let args = Args::parse();
 
-    let indexes = args
-        .indexes
-        .or_else(|| args.database.to_file_path().ok())
-        .context("--indexes must be provided when --database is not a file:// URL")?;
+    let databases = databases_to_serve(args.database, args.indexes)?;
 
     let fmt_layer = tracing_subscriber::fmt::layer();
     let filter_layer = tracing_subscriber::EnvFilter::try_from_default_env()
@@ -77,6 +235,11 @@ pub fn main() -> Result<()> {
 
     let statsd_client = swh_provenance::statsd::statsd_client(args.statsd_host)?;
 
+    let tier_config = match &args.table_tiers {
+        Some(path) => TierConfig::from_path(path)?,
+        None => TierConfig::default(),
+    };
+
     // can't use #[tokio::main] because Sentry must be initialized before we start the tokio runtime
     tokio::runtime::Builder::new_multi_thread()
         .enable_all()
@@ -86,24 +249,30 @@ pub fn main() -> Result<()> {
             log::info!("Loading graph properties and database");
             match args.graph_format {
                 GraphFormat::Webgraph => {
-                    let (graph, db) = tokio::join!(
+                    let (graph, dbs) = tokio::join!(
                         tokio::task::spawn_blocking(|| {
                             swh_provenance::utils::load_graph_properties(args.graph)
                         }),
-                        tokio::task::spawn(swh_provenance::utils::load_database(
-                            args.database,
-                            indexes
-                        )),
+                        load_databases(databases, args.read_planner, tier_config),
                     );
 
                     let graph = graph.expect("Could not join graph load task")?;
-                    let db = db.expect("Could not join graph load task")?;
+                    let dbs = dbs?;
+
+                    spawn_table_accesses_writers(&dbs, args.table_accesses_output);
 
                     log::info!("Starting server");
-                    swh_provenance::grpc_server::serve(db, graph, args.bind, statsd_client).await?;
+                    swh_provenance::grpc_server::serve(
+                        dbs,
+                        graph,
+                        args.queries,
+                        args.bind,
+                        statsd_client,
+                    )
+                    .await?;
                 }
                 GraphFormat::Json => {
-                    let (graph, db) = tokio::join!(
+                    let (graph, dbs) = tokio::join!(
                         tokio::task::spawn_blocking(move || -> Result<_> {
                             let file = std::fs::File::open(&args.graph).with_context(|| {
                                 format!("Could not open {}", args.graph.display())
@@ -116,10 +285,7 @@ pub fn main() -> Result<()> {
                             )
                             .map_err(|e| anyhow!("Could not read JSON graph: {e}"))
                         }),
-                        tokio::task::spawn(swh_provenance::utils::load_database(
-                            args.database,
-                            indexes
-                        )),
+                        load_databases(databases, args.read_planner, tier_config),
                     );
 
                     let graph: SwhBidirectionalGraph<
@@ -134,10 +300,19 @@ pub fn main() -> Result<()> {
                         _,
                         _,
                     > = graph.expect("Could not join graph load task")?;
-                    let db = db.expect("Could not join graph load task")?;
+                    let dbs = dbs?;
+
+                    spawn_table_accesses_writers(&dbs, args.table_accesses_output);
 
                     log::info!("Starting server");
-                    swh_provenance::grpc_server::serve(db, graph, args.bind, statsd_client).await?;
+                    swh_provenance::grpc_server::serve(
+                        dbs,
+                        graph,
+                        args.queries,
+                        args.bind,
+                        statsd_client,
+                    )
+                    .await?;
                 }
             }
 
@@ -3,23 +3,46 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
-use std::path::PathBuf;
-use std::sync::{Arc, Mutex};
+use std::collections::HashSet;
+use std::path::{Path, PathBuf};
+use std::sync::Arc;
+use std::time::{Duration, Instant, SystemTime};
 
 use anyhow::{Context, Result};
 use clap::Parser;
 use dsi_progress_logger::{progress_logger, ProgressLog};
 use epserde::ser::Serialize;
+use futures::StreamExt;
 use mimalloc::MiMalloc;
-use tokio::task::JoinSet;
+use object_store::{ObjectMeta, ObjectStore};
+use parquet_aramid::parquet::arrow::async_reader::ParquetObjectReader;
+use parquet_aramid::parquet::arrow::ParquetRecordBatchStreamBuilder;
+use swh_provenance::database::cardinality::{
+    anchor_sketches_path, joined_key_counts_path, key_counts_path, manifest_path,
+    origin_sketches_path, KEY_COUNTS, MANIFEST_TABLES,
+};
+use swh_provenance::database::index_manifest::{
+    index_manifest_path, write_atomically, IndexManifest, IndexedFile,
+};
+use swh_provenance::database::key_filters::{key_filters_path, FileKeyFilters};
+use swh_provenance::database::reverse_indexes::{reverse_index_path, REVERSE_INDEXES};
+use swh_provenance_db_build::key_index::{KeyIndex, WrittenKeyIndexes};
+use tokio::sync::Semaphore;
 use tracing_subscriber::layer::SubscriberExt;
 use tracing_subscriber::util::SubscriberInitExt;
 
 #[global_allocator]
 static GLOBAL: MiMalloc = MiMalloc; // Allocator recommended by Datafusion
 
+/// Upper bound of the memory needed to build the indexes of a file, per row: its keys are
+/// decoded to build the Elias-Fano index, then again for the key filters of each row group
+const ESTIMATED_INDEX_BYTES_PER_ROW: u64 = 16;
+
+/// How often the manifest of indexes is written while they are being built
+const MANIFEST_WRITE_INTERVAL: Duration = Duration::from_secs(60);
+
 #[derive(Parser, Debug)]
-#[command(about = "Builds .ef indexes for extra quick querying of the Software Heritage Provenance Index", long_about = None)]
+#[command(about = "Builds .ef indexes and key filters for extra quick querying of the Software Heritage Provenance Index", long_about = None)]
 struct Args {
     #[arg(long)]
     /// URL to the provenance database (which may be a file:// URL)
@@ -31,6 +54,34 @@ struct Args {
     /// Defaults to `localhost:8125` (or whatever is configured by the `STATSD_HOST`
     /// and `STATSD_PORT` environment variables).
     statsd_host: Option<String>,
+    #[arg(long)]
+    /// Do not build filters of keys in each row group, which allow the server to skip
+    /// reading row groups without the requested keys
+    no_key_filters: bool,
+    #[arg(long)]
+    /// Number of files whose Elias-Fano index and key filters are built concurrently.
+    /// Defaults to the number of CPUs.
+    index_jobs: Option<usize>,
+    #[arg(long, default_value_t = 16_000_000_000)]
+    /// Number of bytes of memory to use for building Elias-Fano indexes and key filters;
+    /// files whose estimated memory use does not fit wait for others to finish.
+    index_memory_budget: u64,
+    #[arg(long)]
+    /// Also build indexes of tables by origin, revision/release, and frontier directory,
+    /// to list their contents (only for file:// databases)
+    reverse_indexes: bool,
+    #[arg(long, default_value_t = 1)]
+    /// Number of passes over each table when building reverse or cardinality indexes;
+    /// memory usage is inversely proportional to it.
+    reverse_index_chunks: usize,
+    #[arg(long)]
+    /// Also build counts of values of each key of tables, and sketches of the
+    /// revisions/releases and origins of frequent contents, to count them without reading
+    /// tables (only for file:// databases)
+    cardinality_indexes: bool,
+    #[arg(long, default_value_t = 100_000)]
+    /// Minimum number of revisions/releases a content must be in to get sketches
+    sketch_threshold: u64,
 }
 
 pub fn main() -> Result<()> {
@@ -40,6 +91,13 @@ pub fn main() -> Result<()> {
         .indexes
         .or_else(|| args.database.to_file_path().ok())
         .context("--indexes must be provided when --database is not a file:// URL")?;
+    let database_path = if args.reverse_indexes || args.cardinality_indexes {
+        Some(args.database.to_file_path().ok().context(
+            "--reverse-indexes and --cardinality-indexes require --database to be a file:// URL",
+        )?)
+    } else {
+        None
+    };
 
     let fmt_layer = tracing_subscriber::fmt::layer();
     let filter_layer = tracing_subscriber::EnvFilter::try_from_default_env()
@@ -68,28 +126,33 @@ pub fn main() -> Result<()> {
         .build()
         .unwrap()
         .block_on(async move {
+            let (store, _path) = object_store::parse_url(&args.database)
+                .with_context(|| format!("Invalid provenance database URL: {}", args.database))?;
+            let store: Arc<dyn ObjectStore> = store.into();
+            let build_key_filters = !args.no_key_filters;
+
             log::info!("Loading database...");
             let db = swh_provenance::database::ProvenanceDatabase::new(args.database, &indexes)
                 .await
                 .context("Could not initialize provenance database")?;
             log::info!("Database loaded.");
 
-            let tables = [
+            let mut tables = vec![
                 (db.c_in_d, "cnt"),
                 (db.d_in_r, "dir"),
                 (db.c_in_r, "cnt"),
                 (db.r_in_o, "revrel"),
             ];
-            let mut pl = progress_logger!(
-                item_name = "index",
-                display_memory = true,
-                local_speed = true,
-                expected_updates = Some(tables.iter().map(|(table, _col)| table.files.len()).sum()),
-            );
-            pl.start("Building and writing indexes...");
-            let shared_pl = Arc::new(Mutex::new(pl));
-
-            let mut tasks = Vec::new();
+            if let Some(earliest_occurrences) = db.earliest_occurrences {
+                tables.push((earliest_occurrences, "cnt"));
+            }
+            if let Some(paths) = db.paths {
+                tables.push((paths, "path_id"));
+            }
+            let manifest_path = index_manifest_path(&indexes);
+            let mut manifest = IndexManifest::load_or_default(&manifest_path)?;
+            let mut locations = HashSet::new();
+            let mut jobs = Vec::new();
             for (table, key_column) in tables {
                 let ef_index_path = table
                     .files
@@ -102,46 +165,355 @@ pub fn main() -> Result<()> {
                 std::fs::create_dir_all(ef_indexes_directory).with_context(|| {
                     format!("Could not create {}", ef_indexes_directory.display())
                 })?;
+                let written_key_indexes = WrittenKeyIndexes::load_or_default(ef_indexes_directory)?;
                 for file in table.files {
-                    let shared_pl = shared_pl.clone();
-                    tasks.push(tokio::task::spawn(async move {
-                        // Build index
-                        let ef_values = file
-                            .build_ef_index(key_column)
+                    let location = file.object_meta().location.to_string();
+                    let index_path = file.ef_index_path(key_column);
+                    let mut index_paths = vec![index_path.clone()];
+                    if build_key_filters {
+                        index_paths.push(key_filters_path(&index_path));
+                    }
+                    if !manifest.is_up_to_date(file.object_meta(), build_key_filters, &index_paths)
+                    {
+                        manifest.files.remove(&location);
+                        // Indexes written by db-build along the table can be used as-is,
+                        // unless the file was rewritten since
+                        let has_written_key_index = file
+                            .object_meta()
+                            .location
+                            .filename()
+                            .is_some_and(|file_name| {
+                                written_key_indexes.contains(file_name, key_column)
+                            })
+                            && std::fs::metadata(&index_path)
+                                .and_then(|metadata| metadata.modified())
+                                .is_ok_and(|modified| {
+                                    modified >= SystemTime::from(file.object_meta().last_modified)
+                                });
+                        if has_written_key_index && !build_key_filters {
+                            manifest.files.insert(
+                                location.clone(),
+                                IndexedFile::new(file.object_meta(), build_key_filters),
+                            );
+                        } else {
+                            jobs.push((file, key_column, !has_written_key_index));
+                        }
+                    }
+                    locations.insert(location);
+                }
+            }
+            // Forget files which are no longer in the database
+            manifest
+                .files
+                .retain(|location, _| locations.contains(location));
+            log::info!(
+                "{} files are already indexed, indexing {} files",
+                manifest.files.len(),
+                jobs.len()
+            );
+
+            let num_jobs = args
+                .index_jobs
+                .unwrap_or_else(|| std::thread::available_parallelism().map_or(1, |n| n.get()))
+                .max(1);
+            let memory_budget_mib = u32::try_from(args.index_memory_budget >> 20)
+                .unwrap_or(u32::MAX)
+                .max(1);
+            let memory_budget = Arc::new(Semaphore::new(memory_budget_mib as usize));
+
+            let mut pl = progress_logger!(
+                item_name = "file",
+                display_memory = true,
+                local_speed = true,
+                expected_updates = Some(jobs.len()),
+            );
+            pl.start("Building and writing indexes...");
+
+            let runtime = tokio::runtime::Handle::current();
+            let mut results = futures::stream::iter(jobs)
+                .map(|(file, key_column, build_ef_index)| {
+                    let store = Arc::clone(&store);
+                    let memory_budget = Arc::clone(&memory_budget);
+                    let runtime = runtime.clone();
+                    async move {
+                        let estimated_memory_mib =
+                            estimated_index_memory(&store, file.object_meta())
+                                .await?
+                                .div_ceil(1 << 20)
+                                .clamp(1, u64::from(memory_budget_mib));
+                        let _permit = memory_budget
+                            .acquire_many_owned(estimated_memory_mib as u32)
                             .await
-                            .context("Could not build Elias-Fano index")?;
+                            .expect("Memory budget semaphore was closed");
+                        // Decoding and building indexes is CPU-bound, so it runs on a
+                        // blocking thread instead of stalling the runtime's workers
+                        tokio::task::spawn_blocking(move || {
+                            runtime.block_on(async {
+                                let index_path = file.ef_index_path(key_column);
+                                if build_ef_index {
+                                    // Annotated to check db-build writes key indexes of the same
+                                    // type
+                                    let ef_values: KeyIndex = file
+                                        .build_ef_index(key_column)
+                                        .await
+                                        .context("Could not build Elias-Fano index")?;
+                                    // Replaces the index built from a previous version of the file,
+                                    // if any
+                                    write_atomically(&index_path, |tmp_path| {
+                                        let mut ef_file = std::fs::File::create_new(tmp_path)
+                                            .with_context(|| {
+                                                format!("Could not create {}", tmp_path.display())
+                                            })?;
+                                        unsafe { ef_values.serialize(&mut ef_file) }.with_context(
+                                            || {
+                                                format!(
+                                                    "Could not serialize {} index to {}",
+                                                    file.object_meta().location,
+                                                    tmp_path.display()
+                                                )
+                                            },
+                                        )?;
+                                        Ok(())
+                                    })?;
+                                }
 
-                        // Write index to disk
-                        let index_path = file.ef_index_path(key_column);
-                        let mut ef_file =
-                            std::fs::File::create_new(&index_path).with_context(|| {
-                                format!("Could not create {}", index_path.display())
+                                if build_key_filters {
+                                    let key_filters = FileKeyFilters::build(
+                                        &store,
+                                        file.object_meta().clone(),
+                                        key_column,
+                                    )
+                                    .await
+                                    .context("Could not build key filters")?;
+                                    write_atomically(&key_filters_path(&index_path), |tmp_path| {
+                                        key_filters.write(tmp_path)
+                                    })?;
+                                }
+                                anyhow::Ok(())
                             })?;
-                        unsafe { ef_values.serialize(&mut ef_file) }.with_context(|| {
-                            format!(
-                                "Could not serialize {} index to {}",
-                                file.object_meta().location,
-                                index_path.display()
-                            )
-                        })?;
-                        shared_pl.lock().unwrap().update();
-                        Ok(())
-                    }));
+                            Ok((
+                                file.object_meta().location.to_string(),
+                                IndexedFile::new(file.object_meta(), build_key_filters),
+                            ))
+                        })
+                        .await
+                        .expect("Could not join task")
+                    }
+                })
+                .buffer_unordered(num_jobs);
+
+            // Save progress regularly, so an interrupted run can be resumed
+            let mut last_manifest_write = Instant::now();
+            let mut result = Ok(());
+            while let Some(file_result) = results.next().await {
+                match file_result {
+                    Ok((location, indexed_file)) => {
+                        manifest.files.insert(location, indexed_file);
+                        pl.update();
+                    }
+                    Err(e) => {
+                        result = Err(e);
+                        break;
+                    }
+                }
+                if last_manifest_write.elapsed() >= MANIFEST_WRITE_INTERVAL {
+                    manifest.write(&manifest_path)?;
+                    last_manifest_write = Instant::now();
                 }
             }
+            drop(results);
+            manifest.write(&manifest_path)?;
+            result?;
+            pl.done();
 
-            tasks
-                .into_iter()
-                .collect::<JoinSet<_>>()
-                .join_all()
-                .await
-                .into_iter()
-                .collect::<Result<Result<Vec<_>>, tokio::task::JoinError>>()
-                .expect("Could not join task")?;
+            if let Some(database_path) = database_path.clone().filter(|_| args.reverse_indexes) {
+                for (table_name, key_column, value_column) in REVERSE_INDEXES {
+                    let table_path = database_path.join(table_name);
+                    let output = reverse_index_path(&indexes, table_name, key_column);
+                    let num_chunks = args.reverse_index_chunks;
+                    tokio::task::spawn_blocking(move || {
+                        let num_keys =
+                            swh_provenance_db_build::adjacency::num_keys_from_statistics(
+                                &table_path,
+                                key_column,
+                            )?;
+                        let mut pl = progress_logger!(display_memory = true, local_speed = true);
+                        swh_provenance_db_build::adjacency::build_from_parquet(
+                            &table_path,
+                            key_column,
+                            value_column,
+                            num_keys,
+                            num_chunks,
+                            output,
+                            &mut pl,
+                        )
+                        .with_context(|| {
+                            format!("Could not build index of {table_name} by {key_column}")
+                        })
+                    })
+                    .await
+                    .expect("Could not join task")?;
+                }
+            }
 
-            shared_pl.lock().unwrap().done();
+            if let Some(database_path) = database_path.filter(|_| args.cardinality_indexes) {
+                let indexes = indexes.clone();
+                let num_chunks = args.reverse_index_chunks;
+                let sketch_threshold = args.sketch_threshold;
+                tokio::task::spawn_blocking(move || {
+                    build_cardinality_indexes(
+                        &database_path,
+                        &indexes,
+                        num_chunks,
+                        sketch_threshold,
+                    )
+                })
+                .await
+                .expect("Could not join task")
+                .context("Could not build cardinality indexes")?;
+            }
 
             log::info!("Index built.");
             Ok(())
         })
 }
+
+/// Returns an estimate of the number of bytes needed to build the indexes of a file, from
+/// the number of rows in its footer
+async fn estimated_index_memory(
+    store: &Arc<dyn ObjectStore>,
+    object_meta: &ObjectMeta,
+) -> Result<u64> {
+    let location = &object_meta.location;
+    let builder = ParquetRecordBatchStreamBuilder::new(ParquetObjectReader::new(
+        Arc::clone(store),
+        object_meta.clone(),
+    ))
+    .await
+    .with_context(|| format!("Could not open {location}"))?;
+    let num_rows = u64::try_from(builder.metadata().file_metadata().num_rows())
+        .with_context(|| format!("{location} has a negative number of rows"))?;
+    Ok(num_rows * ESTIMATED_INDEX_BYTES_PER_ROW)
+}
+
+/// Writes manifests of [`MANIFEST_TABLES`], counts values of each key of [`KEY_COUNTS`]
+/// tables, aggregates counts of frontier_directories_in_revisions by content, then builds
+/// sketches of contents in at least `sketch_threshold` revisions/releases
+fn build_cardinality_indexes(
+    database_path: &Path,
+    indexes: &Path,
+    num_chunks: usize,
+    sketch_threshold: u64,
+) -> Result<()> {
+    use swh_provenance_db_build::adjacency::{num_keys_from_statistics, Adjacency};
+    use swh_provenance_db_build::key_counts::{
+        count_from_parquet, count_join_from_parquet, KeyCounts,
+    };
+    use swh_provenance_db_build::manifest::TableManifest;
+    use swh_provenance_db_build::sketches::{build_content_sketches, hot_contents};
+
+    for table_name in MANIFEST_TABLES {
+        let table_path = database_path.join(table_name);
+        if !table_path.exists() {
+            // earliest_occurrences is optional
+            continue;
+        }
+        let manifest = TableManifest::from_parquet(&table_path)
+            .with_context(|| format!("Could not build manifest of {table_name}"))?;
+        log::info!(
+            "{table_name} has {} rows in {} files",
+            manifest.num_rows(),
+            manifest.files.len()
+        );
+        manifest.write(&manifest_path(indexes, table_name))?;
+    }
+
+    let mut pl = progress_logger!(display_memory = true, local_speed = true);
+
+    for (table_name, key_column, value_column) in KEY_COUNTS {
+        let table_path = database_path.join(table_name);
+        let num_keys = num_keys_from_statistics(&table_path, key_column)?;
+        let metadata = count_from_parquet(
+            &table_path,
+            key_column,
+            value_column,
+            num_keys,
+            num_chunks,
+            key_counts_path(indexes, table_name, key_column),
+            &mut pl,
+        )
+        .with_context(|| {
+            format!("Could not count {value_column} of each {key_column} in {table_name}")
+        })?;
+        log::info!(
+            "In {table_name}, half of {key_column}s have at most {} {value_column}s, \
+            99% at most {}, and all at most {}",
+            metadata.quantile(0.5),
+            metadata.quantile(0.99),
+            metadata.quantile(1.),
+        );
+    }
+
+    let c_in_r_path = database_path.join("contents_in_revisions_without_frontiers");
+    let c_in_d_path = database_path.join("contents_in_frontier_directories");
+    let d_in_r_path = database_path.join("frontier_directories_in_revisions");
+
+    let d_in_r_counts = KeyCounts::load(&key_counts_path(
+        indexes,
+        "frontier_directories_in_revisions",
+        "dir",
+    ))?;
+    count_join_from_parquet(
+        &c_in_d_path,
+        "cnt",
+        "dir",
+        &d_in_r_counts,
+        num_keys_from_statistics(&c_in_d_path, "cnt")?,
+        num_chunks,
+        joined_key_counts_path(indexes),
+        &mut pl,
+    )
+    .context("Could not count revisions/releases of contents through frontier directories")?;
+
+    let contents = hot_contents(
+        &KeyCounts::load(&key_counts_path(
+            indexes,
+            "contents_in_revisions_without_frontiers",
+            "cnt",
+        ))?,
+        &KeyCounts::load(&joined_key_counts_path(indexes))?,
+        sketch_threshold,
+    );
+    log::info!(
+        "{} contents are in at least {sketch_threshold} revisions/releases",
+        contents.len()
+    );
+
+    // Origins of revisions/releases are looked up in the table built for the 'adjacency'
+    // tier of revisions_in_origins, if any
+    let r_in_o_path = indexes.join("revisions_in_origins.csr");
+    let r_in_o = if r_in_o_path.exists() {
+        Some(
+            Adjacency::load(&r_in_o_path)
+                .with_context(|| format!("Could not load {}", r_in_o_path.display()))?,
+        )
+    } else {
+        log::warn!(
+            "{} does not exist, not building sketches of origins",
+            r_in_o_path.display()
+        );
+        None
+    };
+    let origin_sketches_path = r_in_o.as_ref().map(|_| origin_sketches_path(indexes));
+    build_content_sketches(
+        &c_in_r_path,
+        &c_in_d_path,
+        &d_in_r_path,
+        r_in_o.as_ref(),
+        &contents,
+        &anchor_sketches_path(indexes),
+        origin_sketches_path.as_deref(),
+        &mut pl,
+    )
+    .context("Could not build sketches")
+}
@@ -0,0 +1,82 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Tables in compressed sparse row format, see
+//! [`TableTier::Adjacency`](super::tiers::TableTier::Adjacency)
+
+use std::path::Path;
+use std::sync::Arc;
+
+use anyhow::{ensure, Context, Result};
+use parquet_aramid::arrow::array::*;
+use parquet_aramid::arrow::datatypes::*;
+use swh_provenance_db_build::adjacency::Adjacency;
+
+use super::DirectLookup;
+
+/// Wrapper for [`Adjacency`] returning rows in the same schema as the Parquet table
+/// it was built from
+pub struct AdjacencyTable {
+    schema: SchemaRef,
+    adjacency: Adjacency,
+}
+
+impl AdjacencyTable {
+    /// Mmaps the table at the given path, and checks it was built from the expected columns
+    pub fn load(path: &Path, key_column: &'static str, value_column: &'static str) -> Result<Self> {
+        let adjacency = Adjacency::load(path)?;
+        let metadata = adjacency.metadata();
+        ensure!(
+            metadata.key_column == key_column && metadata.value_column == value_column,
+            "{} maps {} to {}, expected {} to {}",
+            path.display(),
+            metadata.key_column,
+            metadata.value_column,
+            key_column,
+            value_column
+        );
+        log::info!(
+            "Loaded {} ({} rows)",
+            path.display(),
+            adjacency.metadata().num_rows
+        );
+        Ok(AdjacencyTable {
+            schema: Arc::new(Schema::new(vec![
+                Field::new(key_column, DataType::UInt64, false),
+                Field::new(value_column, DataType::UInt64, false),
+            ])),
+            adjacency,
+        })
+    }
+}
+
+impl DirectLookup for AdjacencyTable {
+    fn lookup(&self, keys: &[u64], limit: Option<usize>) -> Result<RecordBatch> {
+        let mut remaining_rows = limit.unwrap_or(usize::MAX);
+        let mut key_builder = UInt64Builder::new();
+        let mut value_builder = UInt64Builder::new();
+        for &key in keys {
+            if remaining_rows == 0 {
+                break;
+            }
+            let Ok(node) = usize::try_from(key) else {
+                continue;
+            };
+            for value in self.adjacency.values(node).take(remaining_rows) {
+                key_builder.append_value(key);
+                value_builder.append_value(value);
+                remaining_rows -= 1;
+            }
+        }
+        RecordBatch::try_new(
+            Arc::clone(&self.schema),
+            vec![
+                Arc::new(key_builder.finish()),
+                Arc::new(value_builder.finish()),
+            ],
+        )
+        .context("Could not build RecordBatch from adjacency table")
+    }
+}
@@ -0,0 +1,151 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Optional indexes to count revisions/releases and origins of contents without reading
+//! the tables, also used to plan queries.
+//!
+//! They are built by `swh-provenance-index --cardinality-indexes`, see
+//! [`swh_provenance_db_build::key_counts`], [`swh_provenance_db_build::sketches`], and
+//! [`swh_provenance_db_build::manifest`].
+
+use std::collections::HashMap;
+use std::path::{Path, PathBuf};
+
+use anyhow::{ensure, Context, Result};
+use swh_provenance_db_build::key_counts::KeyCounts;
+use swh_provenance_db_build::manifest::TableManifest;
+use swh_provenance_db_build::sketches::Sketches;
+
+/// `(table_name, key_column, value_column)` of each table whose values are counted
+pub const KEY_COUNTS: [(&str, &str, &str); 4] = [
+    ("contents_in_revisions_without_frontiers", "cnt", "revrel"),
+    ("contents_in_frontier_directories", "cnt", "dir"),
+    ("frontier_directories_in_revisions", "dir", "revrel"),
+    ("revisions_in_origins", "revrel", "ori"),
+];
+
+/// Tables whose number of rows per file is recorded in a [`TableManifest`]
+pub const MANIFEST_TABLES: [&str; 5] = [
+    "contents_in_revisions_without_frontiers",
+    "contents_in_frontier_directories",
+    "frontier_directories_in_revisions",
+    "revisions_in_origins",
+    "earliest_occurrences",
+];
+
+/// Returns the path of the counts of values of `table_name` by `key_column`
+pub fn key_counts_path(base_ef_indexes_path: &Path, table_name: &str, key_column: &str) -> PathBuf {
+    base_ef_indexes_path.join(format!("{table_name}.by_{key_column}.counts"))
+}
+
+/// Returns the path of the number of revisions/releases each content is in through
+/// frontier directories, see [`count_join_from_parquet`]
+///
+/// [`count_join_from_parquet`]: swh_provenance_db_build::key_counts::count_join_from_parquet
+pub fn joined_key_counts_path(base_ef_indexes_path: &Path) -> PathBuf {
+    base_ef_indexes_path
+        .join("contents_in_frontier_directories.by_cnt.frontier_directories_in_revisions.counts")
+}
+
+/// Returns the path of the manifest of `table_name`
+pub fn manifest_path(base_ef_indexes_path: &Path, table_name: &str) -> PathBuf {
+    base_ef_indexes_path.join(format!("{table_name}.manifest.json"))
+}
+
+/// Returns the path of the sketches of revisions/releases of frequent contents
+pub fn anchor_sketches_path(base_ef_indexes_path: &Path) -> PathBuf {
+    base_ef_indexes_path.join("anchors_of_contents.hll")
+}
+
+/// Returns the path of the sketches of origins of frequent contents
+pub fn origin_sketches_path(base_ef_indexes_path: &Path) -> PathBuf {
+    base_ef_indexes_path.join("origins_of_contents.hll")
+}
+
+/// Cardinality indexes which were built
+#[derive(Default)]
+pub struct CardinalityIndexes {
+    /// Number of revisions/releases each content is in, outside frontier directories
+    pub c_in_r: Option<KeyCounts>,
+    /// Number of frontier directories each content is in
+    pub c_in_d: Option<KeyCounts>,
+    /// Number of revisions/releases each frontier directory is in
+    pub d_in_r: Option<KeyCounts>,
+    /// Number of revisions/releases each content is in through a frontier directory,
+    /// counting revisions/releases once per frontier directory
+    pub c_in_d_in_r: Option<KeyCounts>,
+    /// Number of origins each revision/release is in
+    pub r_in_o: Option<KeyCounts>,
+    /// Sketches of the revisions/releases of frequent contents
+    pub anchor_sketches: Option<Sketches>,
+    /// Sketches of the origins of frequent contents
+    pub origin_sketches: Option<Sketches>,
+    /// Manifests of [`MANIFEST_TABLES`], by table name
+    pub manifests: HashMap<&'static str, TableManifest>,
+}
+
+impl CardinalityIndexes {
+    /// Mmaps or reads cardinality indexes from `base_ef_indexes_path`, ignoring those which
+    /// were not built
+    pub fn load(base_ef_indexes_path: &Path) -> Result<Self> {
+        let load_key_counts = |path: PathBuf, key_column: &str| -> Result<Option<KeyCounts>> {
+            if !path.exists() {
+                return Ok(None);
+            }
+            let key_counts = KeyCounts::load(&path)
+                .with_context(|| format!("Could not load {}", path.display()))?;
+            ensure!(
+                key_counts.metadata().key_column == key_column,
+                "{} is indexed by {}, expected {}",
+                path.display(),
+                key_counts.metadata().key_column,
+                key_column,
+            );
+            log::info!("Loaded {}", path.display());
+            Ok(Some(key_counts))
+        };
+        let load_sketches = |path: PathBuf| -> Result<Option<Sketches>> {
+            if !path.exists() {
+                return Ok(None);
+            }
+            let sketches = Sketches::load(&path)
+                .with_context(|| format!("Could not load {}", path.display()))?;
+            log::info!(
+                "Loaded {} ({} sketches)",
+                path.display(),
+                sketches.metadata().num_keys
+            );
+            Ok(Some(sketches))
+        };
+
+        let mut manifests = HashMap::new();
+        for table_name in MANIFEST_TABLES {
+            let path = manifest_path(base_ef_indexes_path, table_name);
+            if path.exists() {
+                manifests.insert(table_name, TableManifest::load(&path)?);
+                log::info!("Loaded {}", path.display());
+            }
+        }
+
+        let load_table_key_counts =
+            |(table_name, key_column, _value_column): (&str, &str, &str)| {
+                load_key_counts(
+                    key_counts_path(base_ef_indexes_path, table_name, key_column),
+                    key_column,
+                )
+            };
+        let [c_in_r, c_in_d, d_in_r, r_in_o] = KEY_COUNTS;
+        Ok(CardinalityIndexes {
+            c_in_r: load_table_key_counts(c_in_r)?,
+            c_in_d: load_table_key_counts(c_in_d)?,
+            d_in_r: load_table_key_counts(d_in_r)?,
+            c_in_d_in_r: load_key_counts(joined_key_counts_path(base_ef_indexes_path), "cnt")?,
+            r_in_o: load_table_key_counts(r_in_o)?,
+            anchor_sketches: load_sketches(anchor_sketches_path(base_ef_indexes_path))?,
+            origin_sketches: load_sketches(origin_sketches_path(base_ef_indexes_path))?,
+            manifests,
+        })
+    }
+}
@@ -0,0 +1,130 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Manifest of the Elias-Fano indexes and key filters written by `swh-provenance-index`,
+//! so it only rebuilds those of Parquet files which are new or changed when it is rerun.
+//!
+//! Files are identified by their size, modification time and checksum as reported by the
+//! object store, which avoids reading whole files to find out whether they changed.
+
+use std::collections::BTreeMap;
+use std::fs::File;
+use std::io::{BufReader, BufWriter, Write};
+use std::path::{Path, PathBuf};
+
+use anyhow::{Context, Result};
+use object_store::ObjectMeta;
+use serde_derive::{Deserialize, Serialize};
+
+/// Incremented whenever indexes built by previous versions must be rebuilt
+pub const INDEX_VERSION: u32 = 2;
+
+/// Returns the path of the manifest of all the Elias-Fano indexes in `base_ef_indexes_path`
+pub fn index_manifest_path(base_ef_indexes_path: &Path) -> PathBuf {
+    base_ef_indexes_path.join("ef_indexes.manifest.json")
+}
+
+/// Parquet file whose indexes were built
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+pub struct IndexedFile {
+    pub size: usize,
+    /// Milliseconds since the epoch
+    pub last_modified: i64,
+    /// ETag of the file: a digest of its content on S3, and derived from its inode,
+    /// modification time and size on local filesystems
+    pub checksum: Option<String>,
+    pub index_version: u32,
+    /// Whether key filters were built along the Elias-Fano index
+    pub key_filters: bool,
+}
+
+impl IndexedFile {
+    pub fn new(object_meta: &ObjectMeta, key_filters: bool) -> Self {
+        IndexedFile {
+            size: object_meta.size,
+            last_modified: object_meta.last_modified.timestamp_millis(),
+            checksum: object_meta.e_tag.clone(),
+            index_version: INDEX_VERSION,
+            key_filters,
+        }
+    }
+}
+
+#[derive(Debug, Clone, Default, PartialEq, Eq, Serialize, Deserialize)]
+pub struct IndexManifest {
+    /// Indexed files, by location in their object store
+    pub files: BTreeMap<String, IndexedFile>,
+}
+
+impl IndexManifest {
+    /// Reads the manifest at `path`, or returns an empty one if it does not exist
+    pub fn load_or_default(path: &Path) -> Result<Self> {
+        if !path.exists() {
+            return Ok(Self::default());
+        }
+        let file =
+            File::open(path).with_context(|| format!("Could not open {}", path.display()))?;
+        serde_json::from_reader(BufReader::new(file))
+            .with_context(|| format!("Could not parse {}", path.display()))
+    }
+
+    /// Replaces the manifest at `path`, if any
+    pub fn write(&self, path: &Path) -> Result<()> {
+        write_atomically(path, |tmp_path| {
+            let file = File::create_new(tmp_path)
+                .with_context(|| format!("Could not create {}", tmp_path.display()))?;
+            let mut writer = BufWriter::new(file);
+            serde_json::to_writer_pretty(&mut writer, self)
+                .with_context(|| format!("Could not write {}", tmp_path.display()))?;
+            writer
+                .flush()
+                .with_context(|| format!("Could not write {}", tmp_path.display()))
+        })
+    }
+
+    /// Returns whether the indexes of the file were built from its current version by
+    /// this version of `swh-provenance-index`, and still exist
+    pub fn is_up_to_date(
+        &self,
+        object_meta: &ObjectMeta,
+        key_filters: bool,
+        index_paths: &[PathBuf],
+    ) -> bool {
+        let Some(indexed_file) = self.files.get(object_meta.location.as_ref()) else {
+            return false;
+        };
+        let current = IndexedFile::new(object_meta, key_filters);
+        indexed_file.size == current.size
+            && indexed_file.last_modified == current.last_modified
+            && indexed_file.checksum == current.checksum
+            && indexed_file.index_version == current.index_version
+            && (indexed_file.key_filters || !key_filters)
+            && index_paths.iter().all(|path| path.exists())
+    }
+}
+
+/// Calls `write` with a temporary path, then moves it to `path`, so an interrupted run
+/// never leaves a partially written file at `path`
+pub fn write_atomically(path: &Path, write: impl FnOnce(&Path) -> Result<()>) -> Result<()> {
+    let mut tmp_file_name = path.file_name().expect("path has no file name").to_owned();
+    tmp_file_name.push(".tmp");
+    let tmp_path = path.with_file_name(tmp_file_name);
+    // Left over by an interrupted run
+    match std::fs::remove_file(&tmp_path) {
+        Ok(()) => (),
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => (),
+        Err(e) => {
+            return Err(e).with_context(|| format!("Could not remove {}", tmp_path.display()))
+        }
+    }
+    write(&tmp_path)?;
+    std::fs::rename(&tmp_path, path).with_context(|| {
+        format!(
+            "Could not move {} to {}",
+            tmp_path.display(),
+            path.display()
+        )
+    })
+}
@@ -0,0 +1,314 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Binary fuse filters of the keys in each row group of a Parquet file.
+//!
+//! They are written by `swh-provenance-index` next to the Elias-Fano index of each file,
+//! and replace Parquet's built-in Bloom filters: they have a ~0.4% false positive rate
+//! with about 9 bits per key, where a Bloom filter needs about 12 bits per key.
+
+use std::collections::HashMap;
+use std::fs::File;
+use std::io::{BufReader, BufWriter};
+use std::path::{Path, PathBuf};
+use std::sync::Arc;
+
+use anyhow::{anyhow, Context, Result};
+use futures::stream::FuturesUnordered;
+use futures::StreamExt;
+use object_store::{ObjectMeta, ObjectStore};
+use parquet_aramid::arrow::array::*;
+use parquet_aramid::arrow::datatypes::*;
+use parquet_aramid::parquet::arrow::async_reader::ParquetObjectReader;
+use parquet_aramid::parquet::arrow::ParquetRecordBatchStreamBuilder;
+use parquet_aramid::parquet::file::metadata::ParquetMetaData;
+use parquet_aramid::parquet::file::statistics::Statistics;
+use parquet_aramid::Table;
+use serde_derive::{Deserialize, Serialize};
+use xorf::{BinaryFuse8, Filter};
+
+use crate::queries::projection_mask;
+
+/// Identifies a Parquet file from its metadata, as [`Configurator`] does not get its path.
+///
+/// Contains the shape of each row group, which is almost always enough to tell apart files
+/// with a single row group, even when they have the same number of rows.
+///
+/// [`Configurator`]: parquet_aramid::config::Configurator
+type FileIdentity = Vec<RowGroupIdentity>;
+
+#[derive(Debug, Clone, PartialEq, Eq, Hash, Serialize, Deserialize)]
+struct RowGroupIdentity {
+    num_rows: i64,
+    /// Offset of the first column chunk
+    offset: u64,
+    total_byte_size: i64,
+    compressed_size: i64,
+    /// Smallest and largest key, from the statistics of the key column
+    key_range: Option<(i64, i64)>,
+}
+
+fn file_identity(metadata: &ParquetMetaData, key_column: &str) -> FileIdentity {
+    let key_column_index = metadata
+        .file_metadata()
+        .schema_descr()
+        .columns()
+        .iter()
+        .position(|column| column.name() == key_column);
+    metadata
+        .row_groups()
+        .iter()
+        .map(|row_group| RowGroupIdentity {
+            num_rows: row_group.num_rows(),
+            offset: row_group
+                .columns()
+                .first()
+                .map(|column| column.byte_range().0)
+                .unwrap_or(0),
+            total_byte_size: row_group.total_byte_size(),
+            compressed_size: row_group.compressed_size(),
+            key_range: key_column_index.and_then(|column_index| {
+                match row_group.column(column_index).statistics() {
+                    Some(Statistics::Int64(statistics)) => {
+                        match (statistics.min_opt(), statistics.max_opt()) {
+                            (Some(&min), Some(&max)) => Some((min, max)),
+                            _ => None,
+                        }
+                    }
+                    _ => None,
+                }
+            }),
+        })
+        .collect()
+}
+
+/// Returns the path of the key filters of a file, given the path of its Elias-Fano index
+pub fn key_filters_path(ef_index_path: &Path) -> PathBuf {
+    ef_index_path.with_extension("bfuse")
+}
+
+/// Filters of the keys in each row group of a Parquet file
+#[derive(Serialize, Deserialize)]
+pub struct FileKeyFilters {
+    identity: FileIdentity,
+    /// `None` for empty row groups and row groups whose filter could not be built,
+    /// which are always read
+    row_groups: Vec<Option<BinaryFuse8>>,
+}
+
+impl FileKeyFilters {
+    /// Reads the key column of a Parquet file and builds a filter for each of its row groups
+    pub async fn build(
+        store: &Arc<dyn ObjectStore>,
+        object_meta: ObjectMeta,
+        key_column: &str,
+    ) -> Result<Self> {
+        let location = object_meta.location.clone();
+        let builder = ParquetRecordBatchStreamBuilder::new(ParquetObjectReader::new(
+            Arc::clone(store),
+            object_meta,
+        ))
+        .await
+        .with_context(|| format!("Could not open {location}"))?;
+        let identity = file_identity(builder.metadata(), key_column);
+        let row_group_sizes: Vec<usize> = builder
+            .metadata()
+            .row_groups()
+            .iter()
+            .map(|row_group| usize::try_from(row_group.num_rows()))
+            .collect::<Result<_, _>>()
+            .context("Negative number of rows")?;
+        let projection = projection_mask(builder.parquet_schema(), [key_column])?;
+        let mut batches = builder
+            .with_projection(projection)
+            .build()
+            .with_context(|| format!("Could not read {location}"))?;
+
+        let mut row_groups = Vec::with_capacity(row_group_sizes.len());
+        let mut keys = Vec::new();
+        let mut row_group_sizes = row_group_sizes.into_iter();
+        let mut remaining_rows = row_group_sizes.next().unwrap_or(0);
+        while let Some(batch) = batches.next().await {
+            let batch = batch.with_context(|| format!("Could not read batch from {location}"))?;
+            let mut column: &[u64] = batch
+                .column_by_name(key_column)
+                .with_context(|| format!("Could not get '{key_column}' column from {location}"))?
+                .as_primitive_opt::<UInt64Type>()
+                .with_context(|| format!("'{key_column}' column of {location} is not UInt64Array"))?
+                .values();
+            while !column.is_empty() {
+                // Batches usually do not span multiple row groups, but we don't need to rely
+                // on it.
+                let (row_group_keys, rest) = column.split_at(remaining_rows.min(column.len()));
+                keys.extend_from_slice(row_group_keys);
+                remaining_rows -= row_group_keys.len();
+                column = rest;
+                while remaining_rows == 0 && row_groups.len() < identity.len() {
+                    row_groups.push(build_filter(&mut keys, &location));
+                    remaining_rows = row_group_sizes.next().unwrap_or(0);
+                }
+            }
+        }
+        while row_groups.len() < identity.len() {
+            // Trailing empty row groups
+            row_groups.push(build_filter(&mut keys, &location));
+        }
+
+        Ok(FileKeyFilters {
+            identity,
+            row_groups,
+        })
+    }
+
+    pub fn write(&self, path: &Path) -> Result<()> {
+        let file = File::create_new(path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        bincode::serialize_into(BufWriter::new(file), self)
+            .with_context(|| format!("Could not write {}", path.display()))
+    }
+
+    pub fn read(path: &Path) -> Result<Self> {
+        let file =
+            File::open(path).with_context(|| format!("Could not open {}", path.display()))?;
+        bincode::deserialize_from(BufReader::new(file))
+            .with_context(|| format!("Could not read {}", path.display()))
+    }
+}
+
+fn build_filter(keys: &mut Vec<u64>, location: &object_store::path::Path) -> Option<BinaryFuse8> {
+    if keys.is_empty() {
+        return None;
+    }
+    keys.sort_unstable();
+    keys.dedup();
+    let filter = BinaryFuse8::try_from(keys.as_slice())
+        .map_err(|e| anyhow!("{e}"))
+        .with_context(|| format!("Could not build key filter for a row group of {location}"));
+    keys.clear();
+    match filter {
+        Ok(filter) => Some(filter),
+        Err(e) => {
+            log::warn!("{e:#}");
+            None
+        }
+    }
+}
+
+/// Key filters of every file of a table
+#[derive(Default)]
+pub struct TableKeyFilters {
+    key_column: String,
+    files: HashMap<FileIdentity, FileKeyFilters>,
+}
+
+impl TableKeyFilters {
+    /// Reads the key filters of each file of the table, if they were built.
+    ///
+    /// Files without key filters are read as if the table had none, and so are files whose
+    /// key filters were built from another version of the file, or whose identity is
+    /// shared with another file of the table (as the filters could not be told apart).
+    pub async fn load(
+        table: &Table,
+        store: &Arc<dyn ObjectStore>,
+        key_column: &str,
+    ) -> Result<Self> {
+        let mut footers = table
+            .files
+            .iter()
+            .map(|file| async move {
+                let location = &file.object_meta().location;
+                let builder = ParquetRecordBatchStreamBuilder::new(ParquetObjectReader::new(
+                    Arc::clone(store),
+                    file.object_meta().clone(),
+                ))
+                .await
+                .with_context(|| format!("Could not open {location}"))?;
+                anyhow::Ok((file, file_identity(builder.metadata(), key_column)))
+            })
+            .collect::<FuturesUnordered<_>>();
+        let mut identities = Vec::with_capacity(table.files.len());
+        while let Some(footer) = footers.next().await {
+            identities.push(footer?);
+        }
+
+        let mut num_files_with_identity: HashMap<&FileIdentity, usize> = HashMap::new();
+        for (_, identity) in &identities {
+            *num_files_with_identity.entry(identity).or_default() += 1;
+        }
+
+        let mut files = HashMap::new();
+        let mut num_missing = 0;
+        let mut num_skipped = 0;
+        for (file, identity) in &identities {
+            let location = &file.object_meta().location;
+            let path = key_filters_path(&file.ef_index_path(key_column));
+            if !path.exists() {
+                num_missing += 1;
+                continue;
+            }
+            if num_files_with_identity[identity] > 1 {
+                log::warn!(
+                    "{location} has the same identity as another file, ignoring {}",
+                    path.display()
+                );
+                num_skipped += 1;
+                continue;
+            }
+            let file_key_filters = match FileKeyFilters::read(&path) {
+                Ok(file_key_filters) => file_key_filters,
+                Err(e) => {
+                    log::warn!("{e:#}, ignoring it");
+                    num_skipped += 1;
+                    continue;
+                }
+            };
+            if file_key_filters.identity != *identity {
+                log::warn!(
+                    "{} was not built from the current version of {location}, ignoring it",
+                    path.display()
+                );
+                num_skipped += 1;
+                continue;
+            }
+            files.insert(identity.clone(), file_key_filters);
+        }
+        if num_missing > 0 || num_skipped > 0 {
+            log::warn!(
+                "{num_missing} files of {} have no key filters and {num_skipped} have unusable ones, run swh-provenance-index to build them",
+                table.path()
+            );
+        }
+        Ok(TableKeyFilters {
+            key_column: key_column.to_owned(),
+            files,
+        })
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.files.is_empty()
+    }
+
+    /// Returns the indices of row groups of the file with the given metadata which may
+    /// contain any of the `keys`, or `None` if the file has no key filters.
+    pub fn row_groups_for_keys(
+        &self,
+        metadata: &ParquetMetaData,
+        keys: &[u64],
+    ) -> Option<Vec<usize>> {
+        let file_key_filters = self.files.get(&file_identity(metadata, &self.key_column))?;
+        Some(
+            file_key_filters
+                .row_groups
+                .iter()
+                .enumerate()
+                .filter(|(_, filter)| match filter {
+                    Some(filter) => keys.iter().any(|key| filter.contains(key)),
+                    None => true,
+                })
+                .map(|(row_group_index, _)| row_group_index)
+                .collect(),
+        )
+    }
+}
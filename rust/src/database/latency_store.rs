@@ -0,0 +1,142 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! [`ObjectStore`] wrapper adding latency to every read, to benchmark local databases as if
+//! they were on a remote store
+
+use std::fmt;
+use std::ops::Range;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+use std::time::Duration;
+
+use bytes::Bytes;
+use futures::stream::BoxStream;
+use object_store::path::Path;
+use object_store::util::{coalesce_ranges, OBJECT_STORE_COALESCE_DEFAULT};
+use object_store::{
+    GetOptions, GetResult, ListResult, MultipartUpload, ObjectMeta, ObjectStore, PutMultipartOpts,
+    PutOptions, PutPayload, PutResult,
+};
+
+/// Wrapper for an [`ObjectStore`] that sleeps for a fixed duration before every read.
+///
+/// [`ObjectStore::get_ranges`] is implemented like remote stores do, ie. with one request
+/// per group of nearby ranges, instead of forwarding it to the inner store (which, for
+/// [`LocalFileSystem`](object_store::local::LocalFileSystem), would read all ranges at once).
+pub struct LatencyObjectStore {
+    inner: Arc<dyn ObjectStore>,
+    latency: Duration,
+    requests: AtomicU64,
+}
+
+impl LatencyObjectStore {
+    pub fn new(inner: Arc<dyn ObjectStore>, latency: Duration) -> Self {
+        Self {
+            inner,
+            latency,
+            requests: AtomicU64::new(0),
+        }
+    }
+
+    /// Returns the number of reads performed so far
+    pub fn requests(&self) -> u64 {
+        self.requests.load(Ordering::Relaxed)
+    }
+
+    async fn round_trip(&self) {
+        self.requests.fetch_add(1, Ordering::Relaxed);
+        tokio::time::sleep(self.latency).await;
+    }
+}
+
+impl fmt::Display for LatencyObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "LatencyObjectStore({:?}, {})", self.latency, self.inner)
+    }
+}
+
+impl fmt::Debug for LatencyObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.debug_struct("LatencyObjectStore")
+            .field("inner", &self.inner)
+            .field("latency", &self.latency)
+            .field("requests", &self.requests)
+            .finish()
+    }
+}
+
+#[async_trait::async_trait]
+impl ObjectStore for LatencyObjectStore {
+    async fn put_opts(
+        &self,
+        location: &Path,
+        payload: PutPayload,
+        opts: PutOptions,
+    ) -> object_store::Result<PutResult> {
+        self.inner.put_opts(location, payload, opts).await
+    }
+
+    async fn put_multipart_opts(
+        &self,
+        location: &Path,
+        opts: PutMultipartOpts,
+    ) -> object_store::Result<Box<dyn MultipartUpload>> {
+        self.inner.put_multipart_opts(location, opts).await
+    }
+
+    async fn get_opts(
+        &self,
+        location: &Path,
+        options: GetOptions,
+    ) -> object_store::Result<GetResult> {
+        self.round_trip().await;
+        self.inner.get_opts(location, options).await
+    }
+
+    async fn get_range(&self, location: &Path, range: Range<usize>) -> object_store::Result<Bytes> {
+        self.round_trip().await;
+        self.inner.get_range(location, range).await
+    }
+
+    async fn get_ranges(
+        &self,
+        location: &Path,
+        ranges: &[Range<usize>],
+    ) -> object_store::Result<Vec<Bytes>> {
+        coalesce_ranges(
+            ranges,
+            |range| self.get_range(location, range),
+            OBJECT_STORE_COALESCE_DEFAULT,
+        )
+        .await
+    }
+
+    async fn head(&self, location: &Path) -> object_store::Result<ObjectMeta> {
+        self.round_trip().await;
+        self.inner.head(location).await
+    }
+
+    async fn delete(&self, location: &Path) -> object_store::Result<()> {
+        self.inner.delete(location).await
+    }
+
+    fn list(&self, prefix: Option<&Path>) -> BoxStream<'_, object_store::Result<ObjectMeta>> {
+        self.inner.list(prefix)
+    }
+
+    async fn list_with_delimiter(&self, prefix: Option<&Path>) -> object_store::Result<ListResult> {
+        self.round_trip().await;
+        self.inner.list_with_delimiter(prefix).await
+    }
+
+    async fn copy(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.inner.copy(from, to).await
+    }
+
+    async fn copy_if_not_exists(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.inner.copy_if_not_exists(from, to).await
+    }
+}
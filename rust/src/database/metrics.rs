@@ -11,6 +11,11 @@ use parquet_aramid::metrics::Timing;
 pub struct TableScanMetrics {
     pub rows_pruned_by_row_filter: AtomicU64,
     pub rows_selected_by_row_filter: AtomicU64,
+    pub row_groups_pruned_by_key_filter: AtomicU64,
+    pub row_groups_selected_by_key_filter: AtomicU64,
+    pub rows_pruned_by_date_filter: AtomicU64,
+    pub row_groups_pruned_by_date_statistics: AtomicU64,
+    pub rows_pruned_by_date_page_index: AtomicU64,
 
     pub row_filter_eval_time: Timing,
     pub row_filter_eval_loop_time: Timing,
@@ -26,6 +31,27 @@ impl std::ops::AddAssign<&Self> for TableScanMetrics {
             rhs.rows_selected_by_row_filter.load(Ordering::SeqCst),
             Ordering::SeqCst,
         );
+        self.row_groups_pruned_by_key_filter.fetch_add(
+            rhs.row_groups_pruned_by_key_filter.load(Ordering::SeqCst),
+            Ordering::SeqCst,
+        );
+        self.row_groups_selected_by_key_filter.fetch_add(
+            rhs.row_groups_selected_by_key_filter.load(Ordering::SeqCst),
+            Ordering::SeqCst,
+        );
+        self.rows_pruned_by_date_filter.fetch_add(
+            rhs.rows_pruned_by_date_filter.load(Ordering::SeqCst),
+            Ordering::SeqCst,
+        );
+        self.row_groups_pruned_by_date_statistics.fetch_add(
+            rhs.row_groups_pruned_by_date_statistics
+                .load(Ordering::SeqCst),
+            Ordering::SeqCst,
+        );
+        self.rows_pruned_by_date_page_index.fetch_add(
+            rhs.rows_pruned_by_date_page_index.load(Ordering::SeqCst),
+            Ordering::SeqCst,
+        );
 
         self.row_filter_eval_time
             .add(rhs.row_filter_eval_time.get());
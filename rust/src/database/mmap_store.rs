@@ -0,0 +1,214 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! [`ObjectStore`] for local databases, serving byte ranges directly from memory mappings
+
+use std::collections::HashMap;
+use std::fmt;
+use std::ops::Range;
+use std::sync::RwLock;
+
+use bytes::Bytes;
+use futures::stream::BoxStream;
+use mmap_rs::{Mmap, MmapFlags, MmapOptions};
+use object_store::local::LocalFileSystem;
+use object_store::path::Path;
+use object_store::{
+    GetOptions, GetResult, ListResult, MultipartUpload, ObjectMeta, ObjectStore, PutMultipartOpts,
+    PutOptions, PutPayload, PutResult,
+};
+
+const STORE_NAME: &str = "MmapObjectStore";
+
+/// Owner of a memory mapping, so it can be wrapped in [`Bytes`]
+struct MmapOwner(Mmap);
+
+impl AsRef<[u8]> for MmapOwner {
+    fn as_ref(&self) -> &[u8] {
+        self.0.as_slice()
+    }
+}
+
+/// Wrapper for [`LocalFileSystem`] that mmaps each file the first time a range of it is read,
+/// then serves ranges as zero-copy slices of that mapping.
+///
+/// This saves a `pread` syscall and a buffer allocation + copy for every page read by
+/// Parquet readers, which make up a noticeable part of small point queries.
+///
+/// Files are assumed not to change while the store is in use (which is the case for
+/// provenance databases, as they are read-only).
+/// Writes and listings are forwarded to the underlying [`LocalFileSystem`].
+pub struct MmapObjectStore {
+    inner: LocalFileSystem,
+    mmaps: RwLock<HashMap<Path, Bytes>>,
+}
+
+impl MmapObjectStore {
+    /// Returns a store rooted at `/`, like the one returned by [`object_store::parse_url`]
+    /// for `file://` URLs.
+    pub fn new() -> Self {
+        Self {
+            inner: LocalFileSystem::new(),
+            mmaps: RwLock::new(HashMap::new()),
+        }
+    }
+
+    /// Returns the whole content of the file at `location`, mmapping it if needed
+    fn mmap(&self, location: &Path) -> object_store::Result<Bytes> {
+        if let Some(bytes) = self.mmaps.read().unwrap().get(location) {
+            return Ok(bytes.clone());
+        }
+
+        let path = self.inner.path_to_filesystem(location)?;
+        let file = std::fs::File::open(&path).map_err(generic_error)?;
+        let len = file.metadata().map_err(generic_error)?.len();
+        let bytes = if len == 0 {
+            // mmap does not support empty mappings
+            Bytes::new()
+        } else {
+            let mmap = unsafe {
+                MmapOptions::new(usize::try_from(len).expect("file size overflowed usize"))
+                    .map_err(generic_error)?
+                    // Parquet readers jump between the footer, page indexes and pages
+                    // of a few columns; read-ahead would mostly fetch unneeded pages.
+                    .with_flags(MmapFlags::RANDOM_ACCESS)
+                    .with_file(&file, 0)
+                    .map()
+                    .map_err(generic_error)?
+            };
+            Bytes::from_owner(MmapOwner(mmap))
+        };
+        log::debug!("Mmapped {} ({} bytes)", path.display(), len);
+
+        // Another thread may have mmapped the same file concurrently; if so, use its mapping
+        // and drop ours.
+        Ok(self
+            .mmaps
+            .write()
+            .unwrap()
+            .entry(location.clone())
+            .or_insert(bytes)
+            .clone())
+    }
+
+    fn slice(
+        &self,
+        location: &Path,
+        file: &Bytes,
+        range: Range<usize>,
+    ) -> object_store::Result<Bytes> {
+        if range.start > range.end || range.end > file.len() {
+            return Err(generic_error(format!(
+                "Range {}..{} is out of bounds for {} ({} bytes)",
+                range.start,
+                range.end,
+                location,
+                file.len()
+            )));
+        }
+        Ok(file.slice(range))
+    }
+}
+
+impl Default for MmapObjectStore {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+fn generic_error(
+    e: impl Into<Box<dyn std::error::Error + Send + Sync + 'static>>,
+) -> object_store::Error {
+    object_store::Error::Generic {
+        store: STORE_NAME,
+        source: e.into(),
+    }
+}
+
+impl fmt::Display for MmapObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "{STORE_NAME}({})", self.inner)
+    }
+}
+
+impl fmt::Debug for MmapObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.debug_struct(STORE_NAME)
+            .field("inner", &self.inner)
+            .field("num_mmaps", &self.mmaps.read().unwrap().len())
+            .finish()
+    }
+}
+
+#[async_trait::async_trait]
+impl ObjectStore for MmapObjectStore {
+    async fn put_opts(
+        &self,
+        location: &Path,
+        payload: PutPayload,
+        opts: PutOptions,
+    ) -> object_store::Result<PutResult> {
+        self.inner.put_opts(location, payload, opts).await
+    }
+
+    async fn put_multipart_opts(
+        &self,
+        location: &Path,
+        opts: PutMultipartOpts,
+    ) -> object_store::Result<Box<dyn MultipartUpload>> {
+        self.inner.put_multipart_opts(location, opts).await
+    }
+
+    async fn get_opts(
+        &self,
+        location: &Path,
+        options: GetOptions,
+    ) -> object_store::Result<GetResult> {
+        self.inner.get_opts(location, options).await
+    }
+
+    async fn get_range(&self, location: &Path, range: Range<usize>) -> object_store::Result<Bytes> {
+        let file = self.mmap(location)?;
+        self.slice(location, &file, range)
+    }
+
+    async fn get_ranges(
+        &self,
+        location: &Path,
+        ranges: &[Range<usize>],
+    ) -> object_store::Result<Vec<Bytes>> {
+        let file = self.mmap(location)?;
+        ranges
+            .iter()
+            .map(|range| self.slice(location, &file, range.clone()))
+            .collect()
+    }
+
+    async fn head(&self, location: &Path) -> object_store::Result<ObjectMeta> {
+        self.inner.head(location).await
+    }
+
+    async fn delete(&self, location: &Path) -> object_store::Result<()> {
+        self.mmaps.write().unwrap().remove(location);
+        self.inner.delete(location).await
+    }
+
+    fn list(&self, prefix: Option<&Path>) -> BoxStream<'_, object_store::Result<ObjectMeta>> {
+        self.inner.list(prefix)
+    }
+
+    async fn list_with_delimiter(&self, prefix: Option<&Path>) -> object_store::Result<ListResult> {
+        self.inner.list_with_delimiter(prefix).await
+    }
+
+    async fn copy(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.mmaps.write().unwrap().remove(to);
+        self.inner.copy(from, to).await
+    }
+
+    async fn copy_if_not_exists(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.inner.copy_if_not_exists(from, to).await
+    }
+}
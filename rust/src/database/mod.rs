@@ -5,14 +5,89 @@
 
 //! Parquet backend for the Provenance service
 
+use std::collections::HashMap;
 use std::path::Path;
 use std::sync::Arc;
 
 use anyhow::{Context, Result};
+use futures::StreamExt;
+use object_store::ObjectStore;
+use parquet_aramid::arrow::array::RecordBatch;
 use parquet_aramid::Table;
 use url::Url;
 
+pub mod adjacency;
+pub mod cardinality;
+pub mod index_manifest;
+pub mod key_filters;
+pub mod latency_store;
 pub(crate) mod metrics;
+pub mod mmap_store;
+pub mod read_planner;
+pub mod resident;
+pub mod reverse_indexes;
+pub mod tiers;
+
+use adjacency::AdjacencyTable;
+use cardinality::CardinalityIndexes;
+use key_filters::TableKeyFilters;
+use read_planner::{ReadPlannerConfig, ReadPlannerObjectStore};
+use resident::ResidentTable;
+use reverse_indexes::ReverseIndexes;
+use tiers::{TableAccesses, TableTier, TierConfig, TABLE_NAMES};
+
+/// Wraps a store in a [`ReadPlannerObjectStore`] configured to prefetch value columns of
+/// the database at `path` when their key columns are read.
+pub fn with_read_planner(
+    store: Arc<dyn ObjectStore>,
+    path: &object_store::path::Path,
+    config: ReadPlannerConfig,
+) -> ReadPlannerObjectStore {
+    ReadPlannerObjectStore::new(store, config)
+        .with_prefetch_rule(
+            path.child("contents_in_frontier_directories"),
+            "cnt",
+            &["dir"],
+        )
+        .with_prefetch_rule(
+            path.child("frontier_directories_in_revisions"),
+            "dir",
+            &["revrel"],
+        )
+        .with_prefetch_rule(
+            path.child("contents_in_revisions_without_frontiers"),
+            "cnt",
+            &["revrel"],
+        )
+        .with_prefetch_rule(path.child("revisions_in_origins"), "revrel", &["ori"])
+}
+
+/// Table which can be queried by key without scanning Parquet pages
+pub trait DirectLookup: Send + Sync {
+    /// Returns rows matching any of the `keys` (which must be sorted), up to `limit` rows
+    fn lookup(&self, keys: &[u64], limit: Option<usize>) -> Result<RecordBatch>;
+}
+
+/// Filters of keys in each row group of each table, see [`key_filters`]
+#[derive(Default)]
+pub struct KeyFilterTables {
+    pub c_in_d: Option<Arc<TableKeyFilters>>,
+    pub d_in_r: Option<Arc<TableKeyFilters>>,
+    pub c_in_r: Option<Arc<TableKeyFilters>>,
+    pub r_in_o: Option<Arc<TableKeyFilters>>,
+    pub earliest_occurrences: Option<Arc<TableKeyFilters>>,
+    pub paths: Option<Arc<TableKeyFilters>>,
+}
+
+/// Tables read through [`DirectLookup`] instead of their [`Table`], because their tier is
+/// [`TableTier::Resident`] or [`TableTier::Adjacency`]
+#[derive(Default)]
+pub struct DirectLookupTables {
+    pub c_in_d: Option<Box<dyn DirectLookup>>,
+    pub d_in_r: Option<Box<dyn DirectLookup>>,
+    pub c_in_r: Option<Box<dyn DirectLookup>>,
+    pub r_in_o: Option<Box<dyn DirectLookup>>,
+}
 
 pub struct ProvenanceDatabase {
     pub url: Url,
@@ -20,31 +95,185 @@ pub struct ProvenanceDatabase {
     pub d_in_r: Table,
     pub c_in_r: Table,
     pub r_in_o: Table,
+    /// Earliest revision/release of each content, only present in databases built with
+    /// `earliest-occurrences`
+    pub earliest_occurrences: Option<Table>,
+    /// Paths referred to by the 'path_id' column of c_in_d, d_in_r and c_in_r, which
+    /// have no 'path' column in databases built with `--paths-out`
+    pub paths: Option<Table>,
+    /// Stores tables are read from, in the order of [`TABLE_NAMES`]
+    pub stores: [Arc<dyn ObjectStore>; 4],
+    pub direct_lookup: DirectLookupTables,
+    pub key_filters: KeyFilterTables,
+    pub reverse_indexes: ReverseIndexes,
+    pub cardinality_indexes: CardinalityIndexes,
+    pub accesses: Arc<TableAccesses>,
 }
 
 impl ProvenanceDatabase {
     pub async fn new(base_url: Url, base_ef_indexes_path: &Path) -> Result<Self> {
+        Self::new_with_config(
+            base_url,
+            base_ef_indexes_path,
+            &ReadPlannerConfig::default(),
+            &TierConfig::default(),
+        )
+        .await
+    }
+
+    /// Opens the database at the given URL, reading each table according to its tier.
+    ///
+    /// By default, tables of local databases (`file://` URLs) are read through
+    /// [`mmap_store::MmapObjectStore`], and tables of remote databases through
+    /// [`ReadPlannerObjectStore`].
+    pub async fn new_with_config(
+        base_url: Url,
+        base_ef_indexes_path: &Path,
+        read_planner_config: &ReadPlannerConfig,
+        tier_config: &TierConfig,
+    ) -> Result<Self> {
         let (store, path) = object_store::parse_url(&base_url)
             .with_context(|| format!("Invalid provenance database URL: {base_url}"))?;
-        let store = store.into();
+        let (mmap_store, object_store, default_tier): (
+            Option<Arc<dyn ObjectStore>>,
+            Arc<dyn ObjectStore>,
+            _,
+        ) = if base_url.scheme() == "file" {
+            (
+                Some(Arc::new(mmap_store::MmapObjectStore::new())),
+                store.into(),
+                TableTier::Mmap,
+            )
+        } else {
+            (
+                None,
+                Arc::new(with_read_planner(
+                    store.into(),
+                    &path,
+                    read_planner_config.clone(),
+                )),
+                TableTier::ObjectStore,
+            )
+        };
+
+        let stores = TABLE_NAMES.map(|table_name| -> Result<Arc<dyn ObjectStore>> {
+            match tier_config
+                .explicit_tier(table_name)
+                .unwrap_or(default_tier)
+            {
+                TableTier::Mmap => mmap_store.clone().with_context(|| {
+                    format!("Cannot mmap {table_name}, as {base_url} is not a file:// URL")
+                }),
+                TableTier::ObjectStore => Ok(Arc::clone(&object_store)),
+                // Only used to load the table (or its Elias-Fano index)
+                TableTier::Resident | TableTier::Adjacency => Ok(mmap_store
+                    .clone()
+                    .unwrap_or_else(|| Arc::clone(&object_store))),
+            }
+        });
+        let [c_in_d_store, d_in_r_store, c_in_r_store, r_in_o_store] = stores;
+        let stores = [c_in_d_store?, d_in_r_store?, c_in_r_store?, r_in_o_store?];
+
+        let mut db =
+            Self::from_stores(base_url, stores.clone(), path, base_ef_indexes_path).await?;
+        db.load_direct_lookup_tables(tier_config, default_tier, &stores, base_ef_indexes_path)
+            .await?;
+        Ok(db)
+    }
+
+    /// Opens the database at `path` in the given `store`. `base_url` is only informative.
+    pub async fn from_store(
+        base_url: Url,
+        store: Arc<dyn ObjectStore>,
+        path: object_store::path::Path,
+        base_ef_indexes_path: &Path,
+    ) -> Result<Self> {
+        Self::from_stores(
+            base_url,
+            [
+                Arc::clone(&store),
+                Arc::clone(&store),
+                Arc::clone(&store),
+                store,
+            ],
+            path,
+            base_ef_indexes_path,
+        )
+        .await
+    }
+
+    /// Same as [`Self::from_store`], but each table is read from its own store, in the
+    /// order of [`TABLE_NAMES`].
+    ///
+    /// The optional `earliest_occurrences` table is read from the same store as
+    /// `contents_in_revisions_without_frontiers`, and the optional `paths` table from the
+    /// same store as `contents_in_frontier_directories`.
+    pub async fn from_stores(
+        base_url: Url,
+        stores: [Arc<dyn ObjectStore>; 4],
+        path: object_store::path::Path,
+        base_ef_indexes_path: &Path,
+    ) -> Result<Self> {
+        let [c_in_d_store, d_in_r_store, c_in_r_store, r_in_o_store] = stores.clone();
+
+        let earliest_occurrences_path = path.child("earliest_occurrences");
+        let earliest_occurrences = match c_in_r_store
+            .list(Some(&earliest_occurrences_path))
+            .next()
+            .await
+            .transpose()
+            .with_context(|| format!("Could not list {earliest_occurrences_path}"))?
+        {
+            Some(_) => Some(
+                Table::new(
+                    Arc::clone(&c_in_r_store),
+                    earliest_occurrences_path,
+                    base_ef_indexes_path.join("earliest_occurrences"),
+                )
+                .await
+                .context("Could not initialize 'earliest_occurrences' table")?,
+            ),
+            None => None,
+        };
+
+        let paths_path = path.child("paths");
+        let paths = match c_in_d_store
+            .list(Some(&paths_path))
+            .next()
+            .await
+            .transpose()
+            .with_context(|| format!("Could not list {paths_path}"))?
+        {
+            Some(_) => Some(
+                Table::new(
+                    Arc::clone(&c_in_d_store),
+                    paths_path,
+                    base_ef_indexes_path.join("paths"),
+                )
+                .await
+                .context("Could not initialize 'paths' table")?,
+            ),
+            None => None,
+        };
+
         let (c_in_d, d_in_r, c_in_r, r_in_o) = futures::join!(
             Table::new(
-                Arc::clone(&store),
+                c_in_d_store,
                 path.child("contents_in_frontier_directories"),
                 base_ef_indexes_path.join("contents_in_frontier_directories"),
             ),
             Table::new(
-                Arc::clone(&store),
+                d_in_r_store,
                 path.child("frontier_directories_in_revisions"),
                 base_ef_indexes_path.join("frontier_directories_in_revisions"),
             ),
             Table::new(
-                Arc::clone(&store),
+                c_in_r_store,
                 path.child("contents_in_revisions_without_frontiers"),
                 base_ef_indexes_path.join("contents_in_revisions_without_frontiers"),
             ),
             Table::new(
-                Arc::clone(&store),
+                r_in_o_store,
                 path.child("revisions_in_origins"),
                 base_ef_indexes_path.join("revisions_in_origins"),
             ),
@@ -56,9 +285,163 @@ impl ProvenanceDatabase {
             d_in_r: d_in_r.context("Could not initialize 'd_in_r' table")?,
             c_in_r: c_in_r.context("Could not initialize 'c_in_r' table")?,
             r_in_o: r_in_o.context("Could not initialize 'r_in_o' table")?,
+            earliest_occurrences,
+            paths,
+            stores,
+            direct_lookup: DirectLookupTables::default(),
+            key_filters: KeyFilterTables::default(),
+            reverse_indexes: ReverseIndexes::default(),
+            cardinality_indexes: CardinalityIndexes::default(),
+            accesses: Arc::new(TableAccesses::default()),
         })
     }
 
+    /// Assigns a tier to tables which have no explicit tier in `tier_config`, then loads
+    /// resident tables in RAM and mmaps adjacency tables (from `base_ef_indexes_path`).
+    ///
+    /// `stores` are the stores to load each table from, in the order of [`TABLE_NAMES`].
+    async fn load_direct_lookup_tables(
+        &mut self,
+        tier_config: &TierConfig,
+        default_tier: TableTier,
+        stores: &[Arc<dyn ObjectStore>; 4],
+        base_ef_indexes_path: &Path,
+    ) -> Result<()> {
+        let tables = [&self.c_in_d, &self.d_in_r, &self.c_in_r, &self.r_in_o];
+
+        // Reading footers of all files may take a while on remote stores, so only do it
+        // for tables which may be resident.
+        let mut resident_sizes = HashMap::new();
+        for ((table_name, table), store) in std::iter::zip(TABLE_NAMES, tables).zip(stores) {
+            let may_be_resident = match tier_config.explicit_tier(table_name) {
+                Some(tier) => tier == TableTier::Resident,
+                None => tier_config.memory_budget > 0,
+            };
+            if may_be_resident {
+                let num_rows = ResidentTable::num_rows(table, store)
+                    .await
+                    .with_context(|| format!("Could not count rows in {table_name}"))?;
+                resident_sizes.insert(table_name, ResidentTable::estimated_size(num_rows));
+            }
+        }
+
+        let tiers = tier_config.assign(&resident_sizes, default_tier);
+        let load = |table_index: usize, key_column, value_column| {
+            let table_name = TABLE_NAMES[table_index];
+            let table = tables[table_index];
+            let store = &stores[table_index];
+            let tier = tiers[table_name];
+            async move {
+                log::info!("Table {table_name} has tier {tier:?}");
+                let direct_lookup: Box<dyn DirectLookup> = match tier {
+                    TableTier::Mmap | TableTier::ObjectStore => return Ok(None),
+                    TableTier::Resident => {
+                        let resident_table =
+                            ResidentTable::load(table, store, key_column, value_column)
+                                .await
+                                .with_context(|| format!("Could not load {table_name} in RAM"))?;
+                        log::info!(
+                            "Loaded {table_name} in RAM ({} bytes)",
+                            resident_table.size()
+                        );
+                        Box::new(resident_table)
+                    }
+                    TableTier::Adjacency => {
+                        let path = base_ef_indexes_path.join(format!("{table_name}.csr"));
+                        Box::new(
+                            AdjacencyTable::load(&path, key_column, value_column).with_context(
+                                || format!("Could not load {table_name} from {}", path.display()),
+                            )?,
+                        )
+                    }
+                };
+                anyhow::Ok(Some(direct_lookup))
+            }
+        };
+        let (c_in_d, d_in_r, c_in_r, r_in_o) = futures::join!(
+            load(0, "cnt", "dir"),
+            load(1, "dir", "revrel"),
+            load(2, "cnt", "revrel"),
+            load(3, "revrel", "ori"),
+        );
+        self.direct_lookup = DirectLookupTables {
+            c_in_d: c_in_d?,
+            d_in_r: d_in_r?,
+            c_in_r: c_in_r?,
+            r_in_o: r_in_o?,
+        };
+        Ok(())
+    }
+
+    /// Loads key filters written by `swh-provenance-index` next to Elias-Fano indexes,
+    /// after checking they match the footer of their Parquet file
+    pub async fn load_key_filters(&mut self) -> Result<()> {
+        let load = |table: Option<_>, store_index: usize, key_column, table_name| {
+            let store = &self.stores[store_index];
+            async move {
+                let Some(table) = table else {
+                    return Ok(None);
+                };
+                let key_filters = TableKeyFilters::load(table, store, key_column)
+                    .await
+                    .with_context(|| {
+                        format!("Could not load key filters for '{table_name}' table")
+                    })?;
+                anyhow::Ok((!key_filters.is_empty()).then(|| Arc::new(key_filters)))
+            }
+        };
+        let (c_in_d, d_in_r, c_in_r, r_in_o, earliest_occurrences, paths) = futures::join!(
+            load(
+                Some(&self.c_in_d),
+                0,
+                "cnt",
+                "contents_in_frontier_directories"
+            ),
+            load(
+                Some(&self.d_in_r),
+                1,
+                "dir",
+                "frontier_directories_in_revisions"
+            ),
+            load(
+                Some(&self.c_in_r),
+                2,
+                "cnt",
+                "contents_in_revisions_without_frontiers"
+            ),
+            load(Some(&self.r_in_o), 3, "revrel", "revisions_in_origins"),
+            load(
+                self.earliest_occurrences.as_ref(),
+                2,
+                "cnt",
+                "earliest_occurrences"
+            ),
+            load(self.paths.as_ref(), 0, "path_id", "paths"),
+        );
+        self.key_filters = KeyFilterTables {
+            c_in_d: c_in_d?,
+            d_in_r: d_in_r?,
+            c_in_r: c_in_r?,
+            r_in_o: r_in_o?,
+            earliest_occurrences: earliest_occurrences?,
+            paths: paths?,
+        };
+        Ok(())
+    }
+
+    /// Loads reverse indexes written by `swh-provenance-index --reverse-indexes`, if any
+    pub fn load_reverse_indexes(&mut self, base_ef_indexes_path: &Path) -> Result<()> {
+        self.reverse_indexes = ReverseIndexes::load(base_ef_indexes_path)?;
+        Ok(())
+    }
+
+    /// Loads cardinality indexes written by `swh-provenance-index --cardinality-indexes`,
+    /// if any
+    pub fn load_cardinality_indexes(&mut self, base_ef_indexes_path: &Path) -> Result<()> {
+        self.cardinality_indexes = CardinalityIndexes::load(base_ef_indexes_path)?;
+        Ok(())
+    }
+
     pub fn mmap_ef_indexes(&self) -> Result<()> {
         std::thread::scope(|s| {
             let c_in_d = std::thread::Builder::new()
@@ -77,6 +460,18 @@ impl ProvenanceDatabase {
                 .name("load_index_r_in_o".to_string())
                 .spawn_scoped(s, || self.r_in_o.mmap_ef_index("revrel"))
                 .expect("could not spawn load_index_r_in_o");
+            let earliest_occurrences = self.earliest_occurrences.as_ref().map(|table| {
+                std::thread::Builder::new()
+                    .name("load_index_earliest_occurrences".to_string())
+                    .spawn_scoped(s, || table.mmap_ef_index("cnt"))
+                    .expect("could not spawn load_index_earliest_occurrences")
+            });
+            let paths = self.paths.as_ref().map(|table| {
+                std::thread::Builder::new()
+                    .name("load_index_paths".to_string())
+                    .spawn_scoped(s, || table.mmap_ef_index("path_id"))
+                    .expect("could not spawn load_index_paths")
+            });
 
             c_in_d
                 .join()
@@ -93,6 +488,18 @@ impl ProvenanceDatabase {
                 .join()
                 .expect("could not join c_in_r")
                 .context("Could not mmap index for 'revisions_in_origins' table")?;
+            if let Some(earliest_occurrences) = earliest_occurrences {
+                earliest_occurrences
+                    .join()
+                    .expect("could not join earliest_occurrences")
+                    .context("Could not mmap index for 'earliest_occurrences' table")?;
+            }
+            if let Some(paths) = paths {
+                paths
+                    .join()
+                    .expect("could not join paths")
+                    .context("Could not mmap index for 'paths' table")?;
+            }
             Ok(())
         })
     }
@@ -0,0 +1,814 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! [`ObjectStore`] wrapper reducing the number of round trips needed by point queries
+//! against remote databases.
+//!
+//! A single query on a table issues several small byte-range reads per file: key column
+//! pages (to evaluate the row filter), then value column pages of the selected rows.
+//! Against a remote store, each of these is a round trip, which dominates the latency of
+//! point queries. [`ReadPlannerObjectStore`]:
+//!
+//! 1. merges ranges requested together when they are at most
+//!    [`ReadPlannerConfig::coalesce_gap`] bytes apart,
+//! 2. as soon as pages of the key column of a row group are fetched, fetches the matching
+//!    pages of the value column(s) in the background, so they are already available (or
+//!    in flight) when the Parquet reader asks for them after evaluating the row filter,
+//! 3. caps the number of concurrent requests to the underlying store.
+//!
+//! Value pages are fetched as soon as key pages are, rather than after the row filter finds
+//! a match, because Elias-Fano indexes already restrict reads to row groups which very likely
+//! contain a matching row; this overlaps the second round trip with the first one.
+//!
+//! The layout of row groups (ie. where key and value column chunks are) is learned from
+//! the Parquet footers that go through this store when tables are opened.
+
+use std::collections::{BTreeMap, HashMap, VecDeque};
+use std::fmt;
+use std::ops::Range;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, RwLock};
+
+use anyhow::{Context, Result};
+use bytes::Bytes;
+use futures::future::{BoxFuture, FutureExt, Shared};
+use futures::stream::BoxStream;
+use futures::StreamExt;
+use object_store::path::Path;
+use object_store::{
+    GetOptions, GetResult, ListResult, MultipartUpload, ObjectMeta, ObjectStore, PutMultipartOpts,
+    PutOptions, PutPayload, PutResult,
+};
+use parquet_aramid::parquet::file::metadata::{
+    ParquetMetaData, ParquetMetaDataReader, RowGroupMetaData,
+};
+use tokio::sync::Semaphore;
+
+const STORE_NAME: &str = "ReadPlannerObjectStore";
+
+/// Size of the Parquet footer: 4 bytes for the metadata length, then the `PAR1` magic
+const FOOTER_SIZE: usize = 8;
+const PARQUET_MAGIC: &[u8; 4] = b"PAR1";
+
+/// Tuning of [`ReadPlannerObjectStore`]
+#[derive(clap::Args, Debug, Clone)]
+pub struct ReadPlannerConfig {
+    #[arg(long = "read-coalesce-gap", default_value_t = 64 * 1024)]
+    /// Maximum number of unrequested bytes between two ranges read together from the
+    /// remote store, for them to be merged into a single request
+    pub coalesce_gap: usize,
+    #[arg(long = "read-prefetch-size", default_value_t = 1024 * 1024)]
+    /// Maximum number of bytes of each value column chunk to prefetch when key pages of
+    /// the same row group are read. 0 disables prefetching.
+    pub prefetch_size: usize,
+    #[arg(long = "read-prefetch-cache-size", default_value_t = 256 * 1024 * 1024)]
+    /// Maximum number of prefetched bytes to keep in memory
+    pub prefetch_cache_size: usize,
+    #[arg(long = "max-concurrent-reads", default_value_t = 64)]
+    /// Maximum number of concurrent requests to the remote store
+    pub max_concurrent_requests: usize,
+}
+
+impl Default for ReadPlannerConfig {
+    fn default() -> Self {
+        Self {
+            coalesce_gap: 64 * 1024,
+            prefetch_size: 1024 * 1024,
+            prefetch_cache_size: 256 * 1024 * 1024,
+            max_concurrent_requests: 64,
+        }
+    }
+}
+
+#[derive(Debug, Default)]
+pub struct ReadPlannerMetrics {
+    /// Number of ranges requested by readers
+    pub ranges_requested: AtomicU64,
+    /// Number of requested ranges which were merged into another request
+    pub ranges_coalesced: AtomicU64,
+    /// Number of requested ranges served from prefetched data
+    pub prefetch_hits: AtomicU64,
+    /// Number of requests sent to the underlying store, including prefetches
+    pub requests: AtomicU64,
+    /// Number of requests sent to the underlying store to prefetch data
+    pub prefetch_requests: AtomicU64,
+    /// Number of bytes requested from the underlying store, including prefetches
+    pub bytes_fetched: AtomicU64,
+}
+
+/// Which value columns to prefetch when the key column of a table is read
+#[derive(Debug, Clone)]
+struct PrefetchRule {
+    /// Path of the table, files in that directory are subject to this rule
+    table: Path,
+    key_column: String,
+    value_columns: Vec<String>,
+}
+
+/// Byte ranges of the key column chunk and of the value column chunks of a row group
+#[derive(Debug)]
+struct RowGroupLayout {
+    key: Range<usize>,
+    values: Vec<Range<usize>>,
+}
+
+#[derive(Debug)]
+struct FileLayout {
+    row_groups: Vec<RowGroupLayout>,
+}
+
+impl FileLayout {
+    fn new(metadata: &ParquetMetaData, rule: &PrefetchRule) -> Result<Self> {
+        let schema = metadata.file_metadata().schema_descr();
+        let column_index = |name: &str| {
+            schema
+                .columns()
+                .iter()
+                .position(|column| column.name() == name)
+                .with_context(|| format!("No column named {name}"))
+        };
+        let key_column = column_index(&rule.key_column)?;
+        let value_columns = rule
+            .value_columns
+            .iter()
+            .map(|name| column_index(name))
+            .collect::<Result<Vec<_>>>()?;
+        let chunk_range = |row_group: &RowGroupMetaData, column: usize| {
+            let (start, len) = row_group.column(column).byte_range();
+            let start = usize::try_from(start).expect("column chunk offset overflowed usize");
+            let len = usize::try_from(len).expect("column chunk length overflowed usize");
+            start..(start + len)
+        };
+        Ok(FileLayout {
+            row_groups: metadata
+                .row_groups()
+                .iter()
+                .map(|row_group| RowGroupLayout {
+                    key: chunk_range(row_group, key_column),
+                    values: value_columns
+                        .iter()
+                        .map(|&column| chunk_range(row_group, column))
+                        .collect(),
+                })
+                .collect(),
+        })
+    }
+
+    /// Returns the ranges to prefetch when `requested` is read.
+    ///
+    /// If a value column chunk is larger than `max_len`, only the part likely to hold the
+    /// same rows as the requested key pages is returned, assuming rows have roughly
+    /// constant size within a column chunk.
+    fn prefetch_ranges<'a>(
+        &'a self,
+        requested: &'a Range<usize>,
+        max_len: usize,
+    ) -> impl Iterator<Item = Range<usize>> + 'a {
+        self.row_groups
+            .iter()
+            .filter(move |row_group| {
+                row_group.key.start < requested.end && requested.start < row_group.key.end
+            })
+            .flat_map(move |row_group| {
+                let key = &row_group.key;
+                let fraction =
+                    (requested.start.max(key.start) - key.start) as f64 / (key.len().max(1) as f64);
+                row_group.values.iter().map(move |value| {
+                    if value.len() <= max_len {
+                        value.clone()
+                    } else {
+                        let center = value.start + (fraction * value.len() as f64) as usize;
+                        let start = center
+                            .saturating_sub(max_len / 2)
+                            .clamp(value.start, value.end - max_len);
+                        start..(start + max_len)
+                    }
+                })
+            })
+    }
+}
+
+type SharedFetch = Shared<BoxFuture<'static, Result<Bytes, Arc<object_store::Error>>>>;
+
+/// A range that was (or is being) prefetched
+struct PrefetchedSpan {
+    data: SharedFetch,
+    /// Tells this span apart from spans of the same range inserted before or after it
+    id: u64,
+}
+
+/// Prefetched spans of each file, by `(start, end)`, evicted in the order they were
+/// inserted
+#[derive(Default)]
+struct PrefetchCache {
+    spans: HashMap<Path, BTreeMap<(usize, usize), PrefetchedSpan>>,
+    insertion_order: VecDeque<(Path, Range<usize>, u64)>,
+    total_bytes: usize,
+    /// Length of the longest span ever inserted, so lookups only look at spans starting
+    /// at most this many bytes before the requested range
+    max_span_len: usize,
+    next_id: u64,
+}
+
+impl PrefetchCache {
+    /// Returns the range and data of a span containing `range`, if any
+    fn get(&self, location: &Path, range: &Range<usize>) -> Option<(Range<usize>, &SharedFetch)> {
+        if range.len() > self.max_span_len {
+            return None;
+        }
+        let min_start = range.end.saturating_sub(self.max_span_len);
+        self.spans
+            .get(location)?
+            .range((min_start, 0)..=(range.start, usize::MAX))
+            .rev()
+            .find(|((_, end), _)| range.end <= *end)
+            .map(|(&(start, end), span)| (start..end, &span.data))
+    }
+
+    /// Adds a span, then evicts the oldest spans until they fit in `max_bytes`. Returns
+    /// the id of the new span.
+    fn insert(
+        &mut self,
+        location: &Path,
+        range: Range<usize>,
+        data: SharedFetch,
+        max_bytes: usize,
+    ) -> u64 {
+        let id = self.next_id;
+        self.next_id += 1;
+        self.remove(location, &range, None);
+        self.total_bytes += range.len();
+        self.max_span_len = self.max_span_len.max(range.len());
+        self.spans
+            .entry(location.clone())
+            .or_default()
+            .insert((range.start, range.end), PrefetchedSpan { data, id });
+        self.insertion_order
+            .push_back((location.clone(), range, id));
+        while self.total_bytes > max_bytes {
+            let Some((location, range, id)) = self.insertion_order.pop_front() else {
+                break;
+            };
+            self.remove(&location, &range, Some(id));
+        }
+        id
+    }
+
+    /// Removes the span of the given range, if it has the given id (or any id if `None`)
+    fn remove(&mut self, location: &Path, range: &Range<usize>, id: Option<u64>) {
+        let Some(file_spans) = self.spans.get_mut(location) else {
+            return;
+        };
+        let key = (range.start, range.end);
+        if file_spans
+            .get(&key)
+            .is_some_and(|span| id.is_none_or(|id| span.id == id))
+        {
+            file_spans.remove(&key);
+            self.total_bytes -= range.len();
+            if file_spans.is_empty() {
+                self.spans.remove(location);
+            }
+        }
+    }
+}
+
+/// Wrapper for an [`ObjectStore`] that coalesces, prefetches, and throttles range reads.
+///
+/// See the [module-level documentation](self).
+pub struct ReadPlannerObjectStore {
+    inner: Arc<dyn ObjectStore>,
+    config: ReadPlannerConfig,
+    semaphore: Arc<Semaphore>,
+    rules: Vec<PrefetchRule>,
+    file_sizes: RwLock<HashMap<Path, usize>>,
+    metadata_lengths: RwLock<HashMap<Path, usize>>,
+    layouts: RwLock<HashMap<Path, FileLayout>>,
+    cache: Arc<Mutex<PrefetchCache>>,
+    metrics: Arc<ReadPlannerMetrics>,
+}
+
+impl ReadPlannerObjectStore {
+    pub fn new(inner: Arc<dyn ObjectStore>, config: ReadPlannerConfig) -> Self {
+        Self {
+            inner,
+            semaphore: Arc::new(Semaphore::new(config.max_concurrent_requests.max(1))),
+            config,
+            rules: Vec::new(),
+            file_sizes: RwLock::new(HashMap::new()),
+            metadata_lengths: RwLock::new(HashMap::new()),
+            layouts: RwLock::new(HashMap::new()),
+            cache: Arc::new(Mutex::new(PrefetchCache::default())),
+            metrics: Arc::new(ReadPlannerMetrics::default()),
+        }
+    }
+
+    /// Prefetch pages of `value_columns` when pages of `key_column` are read from
+    /// Parquet files in the `table` directory.
+    ///
+    /// Must be called before the table is opened, so the layout of its files is learned
+    /// from their footers.
+    pub fn with_prefetch_rule(
+        mut self,
+        table: Path,
+        key_column: &str,
+        value_columns: &[&str],
+    ) -> Self {
+        self.rules.push(PrefetchRule {
+            table,
+            key_column: key_column.to_owned(),
+            value_columns: value_columns.iter().map(|&name| name.to_owned()).collect(),
+        });
+        self
+    }
+
+    pub fn metrics(&self) -> &ReadPlannerMetrics {
+        &self.metrics
+    }
+
+    /// Returns a future reading the given range from the underlying store, once a request
+    /// slot is available.
+    ///
+    /// The future is lazy: it needs to be either awaited or spawned.
+    fn fetch(&self, location: &Path, range: Range<usize>) -> SharedFetch {
+        let inner = Arc::clone(&self.inner);
+        let semaphore = Arc::clone(&self.semaphore);
+        let metrics = Arc::clone(&self.metrics);
+        let location = location.clone();
+        async move {
+            let _permit = semaphore
+                .acquire_owned()
+                .await
+                .expect("ReadPlannerObjectStore semaphore was closed");
+            metrics.requests.fetch_add(1, Ordering::Relaxed);
+            metrics.bytes_fetched.fetch_add(
+                u64::try_from(range.len()).expect("range length overflowed u64"),
+                Ordering::Relaxed,
+            );
+            inner.get_range(&location, range).await.map_err(Arc::new)
+        }
+        .boxed()
+        .shared()
+    }
+
+    /// Starts fetching value pages matching the key pages in `ranges`, if any
+    fn prefetch(&self, location: &Path, ranges: &[Range<usize>]) {
+        if self.config.prefetch_size == 0 {
+            return;
+        }
+        let Ok(runtime) = tokio::runtime::Handle::try_current() else {
+            return;
+        };
+        let to_prefetch: Vec<_> = {
+            let layouts = self.layouts.read().unwrap();
+            let Some(layout) = layouts.get(location) else {
+                return;
+            };
+            ranges
+                .iter()
+                .flat_map(|range| layout.prefetch_ranges(range, self.config.prefetch_size))
+                .collect()
+        };
+
+        let mut cache = self.cache.lock().unwrap();
+        for range in to_prefetch {
+            if cache.get(location, &range).is_some() {
+                continue;
+            }
+            self.metrics
+                .prefetch_requests
+                .fetch_add(1, Ordering::Relaxed);
+            let data = self.fetch(location, range.clone());
+            let id = cache.insert(
+                location,
+                range.clone(),
+                data.clone(),
+                self.config.prefetch_cache_size,
+            );
+            // Drive the request to completion even if no reader ends up awaiting it, and
+            // don't serve later reads from it if it failed (eg. a timeout)
+            let shared_cache = Arc::clone(&self.cache);
+            let location = location.clone();
+            runtime.spawn(async move {
+                if let Err(e) = data.await {
+                    log::debug!("Could not prefetch {range:?} from {location}: {e}");
+                    shared_cache
+                        .lock()
+                        .unwrap()
+                        .remove(&location, &range, Some(id));
+                }
+            });
+        }
+    }
+
+    /// Learns the layout of Parquet files from their footers, as they are read by
+    /// [`Table::new`](parquet_aramid::Table::new).
+    fn observe(&self, location: &Path, range: &Range<usize>, bytes: &Bytes) {
+        if self.config.prefetch_size == 0
+            || bytes.len() != range.len()
+            || self.layouts.read().unwrap().contains_key(location)
+        {
+            return;
+        }
+        let Some(rule) = self
+            .rules
+            .iter()
+            .find(|rule| location.prefix_matches(&rule.table))
+        else {
+            return;
+        };
+        let Some(&file_size) = self.file_sizes.read().unwrap().get(location) else {
+            return;
+        };
+
+        // The last 8 bytes of the file give the length of the metadata, which is read
+        // either in the same request or in the next one.
+        if range.end == file_size && bytes.len() >= FOOTER_SIZE && bytes.ends_with(PARQUET_MAGIC) {
+            let length_bytes = &bytes[bytes.len() - FOOTER_SIZE..bytes.len() - 4];
+            let metadata_length =
+                u32::from_le_bytes(length_bytes.try_into().expect("Unexpected slice length"));
+            self.metadata_lengths.write().unwrap().insert(
+                location.clone(),
+                usize::try_from(metadata_length).expect("metadata length overflowed usize"),
+            );
+        }
+        let Some(&metadata_length) = self.metadata_lengths.read().unwrap().get(location) else {
+            return;
+        };
+        let Some(metadata_start) = file_size.checked_sub(FOOTER_SIZE + metadata_length) else {
+            return;
+        };
+        let metadata_end = file_size - FOOTER_SIZE;
+        if range.start > metadata_start || range.end < metadata_end {
+            return;
+        }
+
+        let layout = ParquetMetaDataReader::decode_metadata(
+            &bytes[metadata_start - range.start..metadata_end - range.start],
+        )
+        .context("Could not decode metadata")
+        .and_then(|metadata| FileLayout::new(&metadata, rule));
+        match layout {
+            Ok(layout) => {
+                self.layouts
+                    .write()
+                    .unwrap()
+                    .insert(location.clone(), layout);
+            }
+            Err(e) => log::warn!("Not prefetching from {location}: {e:#}"),
+        }
+    }
+
+    fn observe_object_meta(&self, meta: &ObjectMeta) {
+        self.file_sizes
+            .write()
+            .unwrap()
+            .insert(meta.location.clone(), meta.size);
+    }
+
+    async fn read_ranges(
+        &self,
+        location: &Path,
+        ranges: &[Range<usize>],
+    ) -> object_store::Result<Vec<Bytes>> {
+        self.metrics.ranges_requested.fetch_add(
+            u64::try_from(ranges.len()).expect("number of ranges overflowed u64"),
+            Ordering::Relaxed,
+        );
+
+        // For each range in `ranges`, the index in `fetches` of the request it will be
+        // sliced from
+        let mut sources = vec![usize::MAX; ranges.len()];
+        // Requests to await, and whether they are new (as opposed to prefetched)
+        let mut fetches: Vec<(Range<usize>, SharedFetch, bool)> = Vec::new();
+
+        // Serve what we can from prefetched data
+        let mut missing = Vec::new();
+        {
+            let cache = self.cache.lock().unwrap();
+            for (i, range) in ranges.iter().enumerate() {
+                match cache.get(location, range) {
+                    Some((span_range, data)) => {
+                        self.metrics.prefetch_hits.fetch_add(1, Ordering::Relaxed);
+                        sources[i] = fetches.len();
+                        fetches.push((span_range, data.clone(), false));
+                    }
+                    None => missing.push(i),
+                }
+            }
+        }
+
+        // Merge the other ones when they are close enough to each other
+        missing.sort_unstable_by_key(|&i| (ranges[i].start, ranges[i].end));
+        let mut merged: Option<Range<usize>> = None;
+        for &i in &missing {
+            let range = &ranges[i];
+            match &mut merged {
+                Some(merged)
+                    if range.start <= merged.end.saturating_add(self.config.coalesce_gap) =>
+                {
+                    self.metrics
+                        .ranges_coalesced
+                        .fetch_add(1, Ordering::Relaxed);
+                    merged.end = merged.end.max(range.end);
+                }
+                _ => {
+                    if let Some(merged) = merged.take() {
+                        let data = self.fetch(location, merged.clone());
+                        fetches.push((merged, data, true));
+                    }
+                    merged = Some(range.clone());
+                }
+            }
+            sources[i] = fetches.len();
+        }
+        if let Some(merged) = merged {
+            let data = self.fetch(location, merged.clone());
+            fetches.push((merged, data, true));
+        }
+
+        self.prefetch(location, ranges);
+
+        let results =
+            futures::future::try_join_all(fetches.iter().map(|(range, data, is_new)| async move {
+                match data.clone().await {
+                    // The prefetch failed after this read found it in the cache, so it was
+                    // not dropped from the cache in time; read it again.
+                    Err(_) if !is_new => self.fetch(location, range.clone()).await,
+                    result => result,
+                }
+            }))
+            .await
+            .map_err(|e| Arc::try_unwrap(e).unwrap_or_else(generic_error))?;
+
+        for ((range, _, is_new), bytes) in std::iter::zip(&fetches, &results) {
+            if *is_new {
+                self.observe(location, range, bytes);
+            }
+        }
+
+        std::iter::zip(ranges, sources)
+            .map(|(range, source)| {
+                let (fetched_range, _, _) = &fetches[source];
+                let bytes = &results[source];
+                let start = range.start - fetched_range.start;
+                let end = range.end - fetched_range.start;
+                if range.start > range.end || end > bytes.len() {
+                    return Err(generic_error(format!(
+                        "Range {}..{} is out of bounds for {} ({} bytes available from offset {})",
+                        range.start,
+                        range.end,
+                        location,
+                        bytes.len(),
+                        fetched_range.start,
+                    )));
+                }
+                Ok(bytes.slice(start..end))
+            })
+            .collect()
+    }
+}
+
+fn generic_error(
+    e: impl Into<Box<dyn std::error::Error + Send + Sync + 'static>>,
+) -> object_store::Error {
+    object_store::Error::Generic {
+        store: STORE_NAME,
+        source: e.into(),
+    }
+}
+
+impl fmt::Display for ReadPlannerObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "{STORE_NAME}({})", self.inner)
+    }
+}
+
+impl fmt::Debug for ReadPlannerObjectStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.debug_struct(STORE_NAME)
+            .field("inner", &self.inner)
+            .field("config", &self.config)
+            .field("rules", &self.rules)
+            .field("metrics", &self.metrics)
+            .finish()
+    }
+}
+
+#[async_trait::async_trait]
+impl ObjectStore for ReadPlannerObjectStore {
+    async fn put_opts(
+        &self,
+        location: &Path,
+        payload: PutPayload,
+        opts: PutOptions,
+    ) -> object_store::Result<PutResult> {
+        self.inner.put_opts(location, payload, opts).await
+    }
+
+    async fn put_multipart_opts(
+        &self,
+        location: &Path,
+        opts: PutMultipartOpts,
+    ) -> object_store::Result<Box<dyn MultipartUpload>> {
+        self.inner.put_multipart_opts(location, opts).await
+    }
+
+    async fn get_opts(
+        &self,
+        location: &Path,
+        options: GetOptions,
+    ) -> object_store::Result<GetResult> {
+        let _permit = self
+            .semaphore
+            .acquire()
+            .await
+            .expect("ReadPlannerObjectStore semaphore was closed");
+        self.metrics.requests.fetch_add(1, Ordering::Relaxed);
+        let result = self.inner.get_opts(location, options).await?;
+        self.observe_object_meta(&result.meta);
+        Ok(result)
+    }
+
+    async fn get_range(&self, location: &Path, range: Range<usize>) -> object_store::Result<Bytes> {
+        Ok(self
+            .read_ranges(location, std::slice::from_ref(&range))
+            .await?
+            .pop()
+            .expect("read_ranges returned no range"))
+    }
+
+    async fn get_ranges(
+        &self,
+        location: &Path,
+        ranges: &[Range<usize>],
+    ) -> object_store::Result<Vec<Bytes>> {
+        self.read_ranges(location, ranges).await
+    }
+
+    async fn head(&self, location: &Path) -> object_store::Result<ObjectMeta> {
+        let meta = self.inner.head(location).await?;
+        self.observe_object_meta(&meta);
+        Ok(meta)
+    }
+
+    async fn delete(&self, location: &Path) -> object_store::Result<()> {
+        self.inner.delete(location).await
+    }
+
+    fn list(&self, prefix: Option<&Path>) -> BoxStream<'_, object_store::Result<ObjectMeta>> {
+        self.inner
+            .list(prefix)
+            .inspect(|meta| {
+                if let Ok(meta) = meta {
+                    self.observe_object_meta(meta)
+                }
+            })
+            .boxed()
+    }
+
+    async fn list_with_delimiter(&self, prefix: Option<&Path>) -> object_store::Result<ListResult> {
+        let result = self.inner.list_with_delimiter(prefix).await?;
+        result
+            .objects
+            .iter()
+            .for_each(|meta| self.observe_object_meta(meta));
+        Ok(result)
+    }
+
+    async fn copy(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.inner.copy(from, to).await
+    }
+
+    async fn copy_if_not_exists(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+        self.inner.copy_if_not_exists(from, to).await
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::sync::atomic::AtomicBool;
+
+    use object_store::memory::InMemory;
+    use object_store::GetRange;
+
+    use super::*;
+
+    /// Fails the first read starting at `fail_at`, then forwards all reads to `inner`
+    #[derive(Debug)]
+    struct FailOnceObjectStore {
+        inner: InMemory,
+        fail_at: usize,
+        failed: AtomicBool,
+    }
+
+    impl fmt::Display for FailOnceObjectStore {
+        fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+            write!(f, "FailOnceObjectStore({})", self.inner)
+        }
+    }
+
+    #[async_trait::async_trait]
+    impl ObjectStore for FailOnceObjectStore {
+        async fn put_opts(
+            &self,
+            location: &Path,
+            payload: PutPayload,
+            opts: PutOptions,
+        ) -> object_store::Result<PutResult> {
+            self.inner.put_opts(location, payload, opts).await
+        }
+
+        async fn put_multipart_opts(
+            &self,
+            location: &Path,
+            opts: PutMultipartOpts,
+        ) -> object_store::Result<Box<dyn MultipartUpload>> {
+            self.inner.put_multipart_opts(location, opts).await
+        }
+
+        async fn get_opts(
+            &self,
+            location: &Path,
+            options: GetOptions,
+        ) -> object_store::Result<GetResult> {
+            if matches!(&options.range, Some(GetRange::Bounded(range)) if range.start == self.fail_at)
+                && !self.failed.swap(true, Ordering::Relaxed)
+            {
+                return Err(generic_error("transient error"));
+            }
+            self.inner.get_opts(location, options).await
+        }
+
+        async fn delete(&self, location: &Path) -> object_store::Result<()> {
+            self.inner.delete(location).await
+        }
+
+        fn list(&self, prefix: Option<&Path>) -> BoxStream<'_, object_store::Result<ObjectMeta>> {
+            self.inner.list(prefix)
+        }
+
+        async fn list_with_delimiter(
+            &self,
+            prefix: Option<&Path>,
+        ) -> object_store::Result<ListResult> {
+            self.inner.list_with_delimiter(prefix).await
+        }
+
+        async fn copy(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+            self.inner.copy(from, to).await
+        }
+
+        async fn copy_if_not_exists(&self, from: &Path, to: &Path) -> object_store::Result<()> {
+            self.inner.copy_if_not_exists(from, to).await
+        }
+    }
+
+    #[tokio::test]
+    async fn test_failed_prefetch_is_not_cached() -> Result<()> {
+        let location = Path::from("table/file.parquet");
+        let content: Vec<u8> = (0..=255).collect();
+        let inner = FailOnceObjectStore {
+            inner: InMemory::new(),
+            fail_at: 100,
+            failed: AtomicBool::new(false),
+        };
+        inner
+            .put(&location, PutPayload::from(content.clone()))
+            .await?;
+
+        let store = ReadPlannerObjectStore::new(Arc::new(inner), ReadPlannerConfig::default());
+        // As if learned from the footer: reading the key column chunk prefetches the value
+        // column chunk
+        store.layouts.write().unwrap().insert(
+            location.clone(),
+            FileLayout {
+                row_groups: vec![RowGroupLayout {
+                    key: 0..10,
+                    values: vec![100..200],
+                }],
+            },
+        );
+
+        assert_eq!(store.get_range(&location, 0..10).await?, content[0..10]);
+        // Let the prefetch fail
+        tokio::time::sleep(std::time::Duration::from_millis(100)).await;
+        assert_eq!(
+            store.get_range(&location, 100..200).await?,
+            content[100..200]
+        );
+        assert_eq!(store.metrics().prefetch_hits.load(Ordering::Relaxed), 0);
+
+        // Succeeds this time
+        assert_eq!(store.get_range(&location, 0..10).await?, content[0..10]);
+        assert_eq!(
+            store.get_range(&location, 120..150).await?,
+            content[120..150]
+        );
+        assert_eq!(store.metrics().prefetch_hits.load(Ordering::Relaxed), 1);
+
+        Ok(())
+    }
+}
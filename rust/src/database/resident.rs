@@ -0,0 +1,168 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Tables fully decoded in RAM, see [`TableTier::Resident`](super::tiers::TableTier::Resident)
+
+use std::sync::Arc;
+
+use anyhow::{Context, Result};
+use futures::stream::FuturesUnordered;
+use futures::StreamExt;
+use object_store::{ObjectMeta, ObjectStore};
+use parquet_aramid::arrow::array::*;
+use parquet_aramid::arrow::datatypes::*;
+use parquet_aramid::parquet::arrow::async_reader::ParquetObjectReader;
+use parquet_aramid::parquet::arrow::ParquetRecordBatchStreamBuilder;
+use parquet_aramid::Table;
+
+use super::DirectLookup;
+use crate::queries::projection_mask;
+
+/// Key and value columns of a table, sorted by key
+pub struct ResidentTable {
+    schema: SchemaRef,
+    rows: Vec<(u64, u64)>,
+}
+
+impl ResidentTable {
+    /// Returns the total number of rows in the table, from the metadata of its files
+    pub async fn num_rows(table: &Table, store: &Arc<dyn ObjectStore>) -> Result<u64> {
+        let mut num_rows = 0;
+        let mut files = table
+            .files
+            .iter()
+            .map(|file| open_file(store, file.object_meta().clone()))
+            .collect::<FuturesUnordered<_>>();
+        while let Some(builder) = files.next().await {
+            let file_num_rows = builder?.metadata().file_metadata().num_rows();
+            num_rows += u64::try_from(file_num_rows).context("Negative number of rows")?;
+        }
+        Ok(num_rows)
+    }
+
+    /// Returns the estimated number of bytes needed to load a table with `num_rows` rows
+    pub fn estimated_size(num_rows: u64) -> u64 {
+        num_rows * std::mem::size_of::<(u64, u64)>() as u64
+    }
+
+    /// Reads and decodes the key and value columns of all the files of the table
+    pub async fn load(
+        table: &Table,
+        store: &Arc<dyn ObjectStore>,
+        key_column: &'static str,
+        value_column: &'static str,
+    ) -> Result<Self> {
+        let mut rows = Vec::new();
+        let mut files = table
+            .files
+            .iter()
+            .map(|file| read_file(store, file.object_meta().clone(), key_column, value_column))
+            .collect::<FuturesUnordered<_>>();
+        while let Some(file_rows) = files.next().await {
+            rows.extend(file_rows?);
+        }
+        rows.sort_unstable();
+        rows.shrink_to_fit();
+
+        Ok(ResidentTable {
+            schema: Arc::new(Schema::new(vec![
+                Field::new(key_column, DataType::UInt64, false),
+                Field::new(value_column, DataType::UInt64, false),
+            ])),
+            rows,
+        })
+    }
+
+    /// Returns the number of bytes of RAM used by this table
+    pub fn size(&self) -> usize {
+        self.rows.capacity() * std::mem::size_of::<(u64, u64)>()
+    }
+}
+
+impl DirectLookup for ResidentTable {
+    fn lookup(&self, keys: &[u64], limit: Option<usize>) -> Result<RecordBatch> {
+        let mut remaining_rows = limit.unwrap_or(usize::MAX);
+        let mut key_builder = UInt64Builder::new();
+        let mut value_builder = UInt64Builder::new();
+        for &key in keys {
+            if remaining_rows == 0 {
+                break;
+            }
+            let start = self.rows.partition_point(|&(row_key, _)| row_key < key);
+            for &(row_key, value) in self.rows[start..]
+                .iter()
+                .take_while(|&&(row_key, _)| row_key == key)
+                .take(remaining_rows)
+            {
+                key_builder.append_value(row_key);
+                value_builder.append_value(value);
+                remaining_rows -= 1;
+            }
+        }
+        RecordBatch::try_new(
+            Arc::clone(&self.schema),
+            vec![
+                Arc::new(key_builder.finish()),
+                Arc::new(value_builder.finish()),
+            ],
+        )
+        .context("Could not build RecordBatch from resident table")
+    }
+}
+
+async fn open_file(
+    store: &Arc<dyn ObjectStore>,
+    object_meta: ObjectMeta,
+) -> Result<ParquetRecordBatchStreamBuilder<ParquetObjectReader>> {
+    let location = object_meta.location.clone();
+    ParquetRecordBatchStreamBuilder::new(ParquetObjectReader::new(Arc::clone(store), object_meta))
+        .await
+        .with_context(|| format!("Could not open {location}"))
+}
+
+async fn read_file(
+    store: &Arc<dyn ObjectStore>,
+    object_meta: ObjectMeta,
+    key_column: &'static str,
+    value_column: &'static str,
+) -> Result<Vec<(u64, u64)>> {
+    let location = object_meta.location.clone();
+    let builder = open_file(store, object_meta).await?;
+    let num_rows = usize::try_from(builder.metadata().file_metadata().num_rows())
+        .context("Negative number of rows")?;
+    let projection = projection_mask(builder.parquet_schema(), [key_column, value_column])?;
+    let mut batches = builder
+        .with_projection(projection)
+        .build()
+        .with_context(|| format!("Could not read {location}"))?;
+
+    let mut rows = Vec::with_capacity(num_rows);
+    while let Some(batch) = batches.next().await {
+        let batch = batch.with_context(|| format!("Could not read batch from {location}"))?;
+        rows.extend(std::iter::zip(
+            u64_column(&batch, key_column, &location)?
+                .values()
+                .iter()
+                .copied(),
+            u64_column(&batch, value_column, &location)?
+                .values()
+                .iter()
+                .copied(),
+        ));
+    }
+    Ok(rows)
+}
+
+fn u64_column<'a>(
+    batch: &'a RecordBatch,
+    name: &str,
+    location: &object_store::path::Path,
+) -> Result<&'a UInt64Array> {
+    batch
+        .column_by_name(name)
+        .with_context(|| format!("Could not get '{name}' column from {location}"))?
+        .as_primitive_opt::<UInt64Type>()
+        .with_context(|| format!("'{name}' column of {location} is not UInt64Array"))
+}
@@ -0,0 +1,79 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Optional indexes of tables by their value column, to list what an origin, revision,
+//! release, or frontier directory contains without scanning whole tables.
+//!
+//! They are built by `swh-provenance-index --reverse-indexes` in the compressed sparse row
+//! format of [`swh_provenance_db_build::adjacency`].
+
+use std::path::{Path, PathBuf};
+
+use anyhow::{ensure, Context, Result};
+use swh_provenance_db_build::adjacency::Adjacency;
+
+/// `(table_name, key_column, value_column)` of each reverse index
+pub const REVERSE_INDEXES: [(&str, &str, &str); 4] = [
+    ("contents_in_revisions_without_frontiers", "revrel", "cnt"),
+    ("frontier_directories_in_revisions", "revrel", "dir"),
+    ("contents_in_frontier_directories", "dir", "cnt"),
+    ("revisions_in_origins", "ori", "revrel"),
+];
+
+/// Returns the path of the index of `table_name` by `key_column`
+pub fn reverse_index_path(
+    base_ef_indexes_path: &Path,
+    table_name: &str,
+    key_column: &str,
+) -> PathBuf {
+    base_ef_indexes_path.join(format!("{table_name}.by_{key_column}.csr"))
+}
+
+/// Reverse indexes which were built, see [`REVERSE_INDEXES`]
+#[derive(Default)]
+pub struct ReverseIndexes {
+    /// Contents in each revision or release, not counting contents of frontier directories
+    pub cnt_in_revrel: Option<Adjacency>,
+    /// Frontier directories in each revision or release
+    pub dir_in_revrel: Option<Adjacency>,
+    /// Contents in each frontier directory
+    pub cnt_in_dir: Option<Adjacency>,
+    /// Revisions and releases in each origin
+    pub revrel_in_ori: Option<Adjacency>,
+}
+
+impl ReverseIndexes {
+    /// Mmaps reverse indexes from `base_ef_indexes_path`, ignoring those which were not built
+    pub fn load(base_ef_indexes_path: &Path) -> Result<Self> {
+        let [cnt_in_revrel, dir_in_revrel, cnt_in_dir, revrel_in_ori] = REVERSE_INDEXES.map(
+            |(table_name, key_column, value_column)| -> Result<Option<Adjacency>> {
+                let path = reverse_index_path(base_ef_indexes_path, table_name, key_column);
+                if !path.exists() {
+                    return Ok(None);
+                }
+                let adjacency = Adjacency::load(&path)
+                    .with_context(|| format!("Could not load {}", path.display()))?;
+                let metadata = adjacency.metadata();
+                ensure!(
+                    metadata.key_column == key_column && metadata.value_column == value_column,
+                    "{} maps {} to {}, expected {} to {}",
+                    path.display(),
+                    metadata.key_column,
+                    metadata.value_column,
+                    key_column,
+                    value_column
+                );
+                log::info!("Loaded {} ({} rows)", path.display(), metadata.num_rows);
+                Ok(Some(adjacency))
+            },
+        );
+        Ok(ReverseIndexes {
+            cnt_in_revrel: cnt_in_revrel?,
+            dir_in_revrel: dir_in_revrel?,
+            cnt_in_dir: cnt_in_dir?,
+            revrel_in_ori: revrel_in_ori?,
+        })
+    }
+}
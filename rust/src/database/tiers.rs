@@ -0,0 +1,181 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Choice of how each table of the database is read ("tier").
+//!
+//! Tables differ widely in size and access rate: `revisions_in_origins` is small and read
+//! by every successful query, while `contents_in_frontier_directories` is huge. Tiers allow
+//! keeping small hot tables decoded in RAM, and reading other tables from mmapped files or
+//! through the object store API.
+
+use std::collections::HashMap;
+use std::path::Path;
+use std::sync::atomic::{AtomicU64, Ordering};
+
+use anyhow::{ensure, Context, Result};
+use serde_derive::{Deserialize, Serialize};
+
+/// Name of the tables in a provenance database, ie. the name of their directory
+pub const TABLE_NAMES: [&str; 4] = [
+    "contents_in_frontier_directories",
+    "frontier_directories_in_revisions",
+    "contents_in_revisions_without_frontiers",
+    "revisions_in_origins",
+];
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
+#[serde(rename_all = "kebab-case")]
+pub enum TableTier {
+    /// Key and value columns are decoded into RAM when the database is opened, so queries
+    /// do not read or decode any Parquet page
+    Resident,
+    /// Parquet files are mmapped (only available for `file://` databases)
+    Mmap,
+    /// Parquet files are read through the object store API, ie. with `pread` for `file://`
+    /// databases and HTTP requests for remote ones
+    ObjectStore,
+    /// Key and value columns are read from a compressed sparse row file built with
+    /// `build-adjacency` and mmapped, so queries do not read or decode any Parquet page
+    /// (never assigned automatically, as it needs to be built beforehand)
+    Adjacency,
+}
+
+/// Configuration of the tier of each table, usually read from a JSON file like:
+///
+/// ```json
+/// {
+///     "tables": {"contents_in_frontier_directories": "mmap"},
+///     "memory_budget": 10000000000,
+///     "access_frequencies": {"revisions_in_origins": 1000, "frontier_directories_in_revisions": 800}
+/// }
+/// ```
+///
+/// Tables with no explicit tier in `tables` are assigned one by [`TierConfig::assign`].
+#[derive(Debug, Clone, Default, Deserialize)]
+#[serde(deny_unknown_fields)]
+pub struct TierConfig {
+    /// Tier of each table, by table name
+    #[serde(default)]
+    pub tables: HashMap<String, TableTier>,
+    /// Maximum number of bytes of RAM used by resident tables
+    #[serde(default)]
+    pub memory_budget: u64,
+    /// Relative number of accesses to each table, as written by
+    /// [`TableAccesses::write_json`]. Missing tables are assumed to be never accessed,
+    /// unless this is empty, in which case all tables are assumed to be accessed equally.
+    #[serde(default)]
+    pub access_frequencies: HashMap<String, u64>,
+}
+
+impl TierConfig {
+    pub fn from_path(path: &Path) -> Result<Self> {
+        let file = std::fs::File::open(path)
+            .with_context(|| format!("Could not open {}", path.display()))?;
+        let config: Self = serde_json::from_reader(std::io::BufReader::new(file))
+            .with_context(|| format!("Could not parse {}", path.display()))?;
+        for table_name in config.tables.keys().chain(config.access_frequencies.keys()) {
+            ensure!(
+                TABLE_NAMES.contains(&table_name.as_str()),
+                "Unknown table {table_name:?} in {}, expected one of {}",
+                path.display(),
+                TABLE_NAMES.join(", ")
+            );
+        }
+        Ok(config)
+    }
+
+    /// Returns the tier explicitly configured for this table, if any
+    pub fn explicit_tier(&self, table_name: &str) -> Option<TableTier> {
+        self.tables.get(table_name).copied()
+    }
+
+    /// Returns the tier of every table.
+    ///
+    /// Tables without an explicit tier are made resident by decreasing order of
+    /// accesses per byte, as long as they fit in what remains of the memory budget after
+    /// explicitly resident tables; other tables get `default_tier`.
+    ///
+    /// `resident_sizes` is the estimated RAM needed by each table to be resident.
+    pub fn assign(
+        &self,
+        resident_sizes: &HashMap<&'static str, u64>,
+        default_tier: TableTier,
+    ) -> HashMap<&'static str, TableTier> {
+        let mut tiers = HashMap::new();
+        let mut remaining_budget = self.memory_budget;
+        let mut candidates = Vec::new();
+        for table_name in TABLE_NAMES {
+            match self.explicit_tier(table_name) {
+                Some(tier) => {
+                    if tier == TableTier::Resident {
+                        remaining_budget = remaining_budget
+                            .saturating_sub(resident_sizes.get(table_name).copied().unwrap_or(0));
+                    }
+                    tiers.insert(table_name, tier);
+                }
+                None => {
+                    let accesses = if self.access_frequencies.is_empty() {
+                        1
+                    } else {
+                        self.access_frequencies
+                            .get(table_name)
+                            .copied()
+                            .unwrap_or(0)
+                    };
+                    let size = resident_sizes.get(table_name).copied().unwrap_or(u64::MAX);
+                    candidates.push((table_name, accesses, size));
+                }
+            }
+        }
+
+        // Greedily pick the tables with the most accesses per byte
+        candidates.sort_by(|(_, accesses1, size1), (_, accesses2, size2)| {
+            let density1 = *accesses1 as f64 / (*size1).max(1) as f64;
+            let density2 = *accesses2 as f64 / (*size2).max(1) as f64;
+            density2.total_cmp(&density1)
+        });
+        for (table_name, accesses, size) in candidates {
+            let tier = if accesses > 0 && size <= remaining_budget {
+                remaining_budget -= size;
+                TableTier::Resident
+            } else {
+                default_tier
+            };
+            tiers.insert(table_name, tier);
+        }
+
+        tiers
+    }
+}
+
+/// Counts accesses to each table, to be used as [`TierConfig::access_frequencies`]
+#[derive(Debug, Default)]
+pub struct TableAccesses {
+    pub c_in_d: AtomicU64,
+    pub d_in_r: AtomicU64,
+    pub c_in_r: AtomicU64,
+    pub r_in_o: AtomicU64,
+}
+
+impl TableAccesses {
+    /// Returns the number of accesses to each table, by table name
+    pub fn snapshot(&self) -> HashMap<&'static str, u64> {
+        let [c_in_d, d_in_r, c_in_r, r_in_o] = TABLE_NAMES;
+        HashMap::from([
+            (c_in_d, self.c_in_d.load(Ordering::Relaxed)),
+            (d_in_r, self.d_in_r.load(Ordering::Relaxed)),
+            (c_in_r, self.c_in_r.load(Ordering::Relaxed)),
+            (r_in_o, self.r_in_o.load(Ordering::Relaxed)),
+        ])
+    }
+
+    /// Writes [`Self::snapshot`] as a JSON object to the given path
+    pub fn write_json(&self, path: &Path) -> Result<()> {
+        let file = std::fs::File::create(path)
+            .with_context(|| format!("Could not create {}", path.display()))?;
+        serde_json::to_writer_pretty(std::io::BufWriter::new(file), &self.snapshot())
+            .with_context(|| format!("Could not write {}", path.display()))
+    }
+}
@@ -0,0 +1,90 @@
+// Copyright (C) 2026  The Software Heritage developers
+// See the AUTHORS file at the top-level directory of this distribution
+// License: GNU General Public License version 3, or any later version
+// See top-level LICENSE file for more information
+
+//! Deadlines of queries, so work for requests whose client gave up is abandoned instead
+//! of competing with other requests.
+//!
+//! The deadline of a request is set with [`with_deadline`] for the duration of a future,
+//! and is implicitly checked by table scans: they return [`DeadlineExceeded`] instead of
+//! starting after the deadline, and stop between batches once it is reached. As scans are
+//! cancelled by dropping them, this also stops their reads in progress.
+
+use std::future::Future;
+
+use futures::{Stream, StreamExt};
+use thiserror::Error;
+use tokio::time::Instant;
+
+tokio::task_local! {
+    static DEADLINE: Instant;
+}
+
+/// Returned (possibly wrapped in an [`anyhow::Error`]) by queries which ran past their
+/// deadline
+#[derive(Error, Debug, Clone, Copy, PartialEq, Eq)]
+#[error("Deadline exceeded")]
+pub struct DeadlineExceeded;
+
+/// Returns whether an error returned by a query was caused by its deadline
+pub fn is_deadline_exceeded(error: &anyhow::Error) -> bool {
+    error.downcast_ref::<DeadlineExceeded>().is_some()
+}
+
+/// Runs `future` with the given deadline (or none)
+pub async fn with_deadline<F: Future>(deadline: Option<Instant>, future: F) -> F::Output {
+    match deadline {
+        Some(deadline) => DEADLINE.scope(deadline, future).await,
+        None => future.await,
+    }
+}
+
+/// Returns the deadline set by [`with_deadline`] for the current task, if any
+pub fn current() -> Option<Instant> {
+    DEADLINE.try_with(|deadline| *deadline).ok()
+}
+
+/// Returns [`DeadlineExceeded`] if the current deadline is already reached
+pub fn check() -> Result<(), DeadlineExceeded> {
+    match current() {
+        Some(deadline) if deadline <= Instant::now() => Err(DeadlineExceeded),
+        _ => Ok(()),
+    }
+}
+
+/// Awaits `future`, unless the current deadline is reached first, in which case `future`
+/// is dropped
+pub async fn or_deadline<F: Future>(future: F) -> Result<F::Output, DeadlineExceeded> {
+    or_deadline_at(current(), future).await
+}
+
+async fn or_deadline_at<F: Future>(
+    deadline: Option<Instant>,
+    future: F,
+) -> Result<F::Output, DeadlineExceeded> {
+    match deadline {
+        Some(deadline) => tokio::time::timeout_at(deadline, future)
+            .await
+            .map_err(|_| DeadlineExceeded),
+        None => Ok(future.await),
+    }
+}
+
+/// Returns the items of `stream` until the current deadline, then [`DeadlineExceeded`] and
+/// stops, dropping `stream`
+pub fn until_deadline<T, S>(stream: S) -> impl Stream<Item = anyhow::Result<T>>
+where
+    S: Stream<Item = anyhow::Result<T>>,
+{
+    // Read the deadline now, as the stream may be polled from another task
+    let deadline = current();
+    futures::stream::unfold(Some(Box::pin(stream)), move |stream| async move {
+        let mut stream = stream?;
+        match or_deadline_at(deadline, stream.next()).await {
+            Ok(Some(item)) => Some((item, Some(stream))),
+            Ok(None) => None,
+            Err(e) => Some((Err(e.into()), None)),
+        }
+    })
+}
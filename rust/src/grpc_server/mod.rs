@@ -3,28 +3,121 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
+use std::pin::Pin;
 use std::sync::Arc;
+use std::time::Duration;
 
 use anyhow::Result;
 use futures::stream::FuturesUnordered;
 use futures::StreamExt;
 use sentry::integrations::anyhow::capture_anyhow;
+use tokio::time::Instant;
 use tonic::transport::Server;
 use tonic::{Request, Response};
 use tonic_middleware::MiddlewareFor;
 use tracing::{instrument, Level};
 
 use swh_graph::graph::SwhGraphWithProperties;
+use swh_graph::SWHID;
 
 use crate::database::ProvenanceDatabase;
+use crate::deadline::{self, with_deadline};
 use crate::proto;
 use crate::proto::provenance_service_server::ProvenanceServiceServer;
-use crate::queries::{ProvenanceClientError, ProvenanceQueryError, ProvenanceService};
+use crate::queries::{
+    AuthorDateRange, CountMode, LookupMode, ProvenanceClientError, ProvenanceQueryError,
+    ProvenanceService, QueryConfig,
+};
 
 pub type NodeId = u64;
 
+/// Default value of `max_results` in `FindCoOccurrences`
+const DEFAULT_MAX_CO_OCCURRENCES: usize = 100;
+
+/// Queries stop this fraction of their timeout before the client's deadline, so results
+/// computed until then have time to reach the client
+const DEADLINE_MARGIN_DIVISOR: u32 = 10;
+
 mod metrics;
 
+/// Services of the databases served by the process, which share the same graph
+pub struct ProvenanceServices<
+    G: SwhGraphWithProperties<
+            Maps: swh_graph::properties::Maps,
+            Strings: swh_graph::properties::Strings,
+        > + Send
+        + Sync
+        + 'static,
+> {
+    /// Names of the databases, in the same order as `services`
+    names: Vec<String>,
+    /// Service of each database; the first one is queried by requests naming none
+    services: Vec<Arc<ProvenanceService<G>>>,
+}
+
+impl<
+        G: SwhGraphWithProperties<
+                Maps: swh_graph::properties::Maps,
+                Strings: swh_graph::properties::Strings,
+            > + Send
+            + Sync
+            + 'static,
+    > ProvenanceServices<G>
+{
+    /// Returns the indices in `services` of the databases named in a request, in order
+    fn resolve(&self, databases: &[String]) -> Result<Vec<usize>, tonic::Status> {
+        if databases.is_empty() {
+            return Ok(vec![0]);
+        }
+        databases
+            .iter()
+            .map(|database| {
+                self.names
+                    .iter()
+                    .position(|name| name == database)
+                    .ok_or_else(|| {
+                        tonic::Status::invalid_argument(format!(
+                            "Unknown database {database:?}, expected one of {:?}",
+                            self.names
+                        ))
+                    })
+            })
+            .collect()
+    }
+
+    /// Returns the service of the single database named in a request
+    fn service(&self, databases: &[String]) -> Result<&Arc<ProvenanceService<G>>, tonic::Status> {
+        match self.resolve(databases)?[..] {
+            [index] => Ok(&self.services[index]),
+            _ => Err(tonic::Status::invalid_argument(
+                "This method accepts a single database",
+            )),
+        }
+    }
+
+    /// Calls [`ProvenanceService::where_is_one_by_mode`] on each of the given databases in
+    /// order, until one has an anchor for the node
+    async fn where_is_one_by_mode(
+        &self,
+        databases: &[usize],
+        swhid: &str,
+        dates: AuthorDateRange,
+        mode: LookupMode,
+    ) -> Result<proto::WhereIsOneResult, ProvenanceQueryError> {
+        let mut result = None;
+        for &index in databases {
+            let (_metrics, database_result) = self.services[index]
+                .where_is_one_by_mode(swhid, dates, mode)
+                .await?;
+            if database_result.anchor.is_some() {
+                return Ok(database_result);
+            }
+            result = Some(database_result);
+        }
+        Ok(result.expect("No database to query"))
+    }
+}
+
 pub struct ProvenanceServiceWrapper<
     G: SwhGraphWithProperties<
             Maps: swh_graph::properties::Maps,
@@ -32,7 +125,7 @@ pub struct ProvenanceServiceWrapper<
         > + Send
         + Sync
         + 'static,
->(Arc<ProvenanceService<G>>);
+>(Arc<ProvenanceServices<G>>);
 
 impl<
         G: SwhGraphWithProperties<
@@ -43,8 +136,29 @@ impl<
             + 'static,
     > ProvenanceServiceWrapper<G>
 {
-    pub fn new(db: ProvenanceDatabase, graph: G) -> Self {
-        Self(Arc::new(ProvenanceService { db, graph }))
+    /// Serves the given databases, by name, over the same graph. Requests which do not
+    /// name a database query the first one.
+    pub fn new(
+        databases: Vec<(String, ProvenanceDatabase)>,
+        graph: G,
+        config: QueryConfig,
+    ) -> Self {
+        assert!(!databases.is_empty(), "No database to serve");
+        let graph = Arc::new(graph);
+        let (names, services) = databases
+            .into_iter()
+            .map(|(name, db)| {
+                (
+                    name,
+                    Arc::new(ProvenanceService {
+                        db,
+                        graph: Arc::clone(&graph),
+                        config: config.clone(),
+                    }),
+                )
+            })
+            .unzip();
+        Self(Arc::new(ProvenanceServices { names, services }))
     }
 }
 
@@ -79,24 +193,26 @@ impl<
     ) -> TonicResult<proto::WhereIsOneResult> {
         tracing::info!("{:?}", request.get_ref());
 
-        match self.0.where_is_one(&request.into_inner().swhid).await {
-            Ok((_metrics, result)) => Ok(Response::new(result)),
-            Err(ProvenanceQueryError::ClientError(ProvenanceClientError::Swhid(e))) => {
-                use swh_graph::properties::NodeIdFromSwhidError::*;
-                match e {
-                    InvalidSwhid(e) => Err(tonic::Status::invalid_argument(e.to_string())),
-                    UnknownSwhid(e) => Err(tonic::Status::not_found(e.to_string())),
-                    InternalError(e) => {
-                        tracing::error!("{:?}", e);
-                        Err(tonic::Status::internal(e.to_string()))
-                    }
-                }
-            }
-            Err(ProvenanceQueryError::ServerError(e)) => {
-                tracing::error!("{:?}", e);
-                capture_anyhow(&e); // redundant with tracing::error!
-                Err(tonic::Status::internal(e.to_string()))
-            }
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        let dates = AuthorDateRange {
+            after: request.after,
+            before: request.before,
+        };
+        let databases = self.0.resolve(&request.databases)?;
+        match with_deadline(
+            deadline,
+            self.0.where_is_one_by_mode(
+                &databases,
+                &request.swhid,
+                dates,
+                lookup_mode(request.mode()),
+            ),
+        )
+        .await
+        {
+            Ok(result) => Ok(Response::new(result)),
+            Err(e) => Err(query_error_to_status(e)),
         }
     }
 
@@ -115,16 +231,47 @@ impl<
 
         let whereis_service = self.clone(); // Need to clone because we return from this function
                                             // before the work is done
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        let dates = AuthorDateRange {
+            after: request.after,
+            before: request.before,
+        };
+        let mode = lookup_mode(request.mode());
+        let databases: Arc<[usize]> = self.0.resolve(&request.databases)?.into();
         Ok(Response::new(Box::new(
             request
-                .into_inner()
                 .swhid
                 .into_iter()
                 .map(move |swhid| {
                     let whereis_service: ProvenanceServiceWrapper<G> = whereis_service.clone(); // ditto
+                    let databases = Arc::clone(&databases);
                     async move {
-                        match whereis_service.0.where_is_one(&swhid).await {
-                            Ok((_metrics, result)) => Ok(Some(result)),
+                        // Stop waiting for the lookup at the deadline, even if it is not
+                        // reading a table
+                        let result = with_deadline(
+                            deadline,
+                            deadline::or_deadline(
+                                whereis_service
+                                    .0
+                                    .where_is_one_by_mode(&databases, &swhid, dates, mode),
+                            ),
+                        )
+                        .await
+                        .unwrap_or_else(|e| Err(ProvenanceQueryError::ServerError(e.into())));
+                        match result {
+                            Ok(result) => Ok(Some(result)),
+                            // Return other nodes' results instead of failing the whole
+                            // stream
+                            Err(ProvenanceQueryError::ServerError(e))
+                                if deadline::is_deadline_exceeded(&e) =>
+                            {
+                                Ok(Some(proto::WhereIsOneResult {
+                                    swhid,
+                                    timed_out: true,
+                                    ..Default::default()
+                                }))
+                            }
                             Err(ProvenanceQueryError::ClientError(
                                 ProvenanceClientError::Swhid(e),
                             )) => {
@@ -148,11 +295,7 @@ impl<
                                     }
                                 }
                             }
-                            Err(ProvenanceQueryError::ServerError(e)) => {
-                                tracing::error!("{:?}", e);
-                                capture_anyhow(&e); // redundant with tracing::error!
-                                Err(tonic::Status::internal(e.to_string()))
-                            }
+                            Err(e) => Err(query_error_to_status(e)),
                         }
                     }
                 })
@@ -160,6 +303,283 @@ impl<
                 .filter_map(|item| std::future::ready(item.transpose())), // Remove Ok(None) items
         )))
     }
+
+    type WhereAreOneInOriginStream =
+        Pin<Box<dyn futures::Stream<Item = Result<proto::WhereIsOneResult, tonic::Status>> + Send>>;
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn where_are_one_in_origin(
+        &self,
+        request: Request<proto::WhereAreOneInOriginRequest>,
+    ) -> TonicResult<Self::WhereAreOneInOriginStream> {
+        tracing::info!("{:?}", request.get_ref());
+
+        use proto::where_are_one_in_origin_request::Origin;
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        let origin_swhid = match request.origin {
+            Some(Origin::OriginUrl(url)) => SWHID::from_origin_url(url).to_string(),
+            Some(Origin::OriginSwhid(swhid)) => swhid,
+            None => {
+                return Err(tonic::Status::invalid_argument(
+                    "Either origin_url or origin_swhid must be provided",
+                ))
+            }
+        };
+
+        let dates = AuthorDateRange {
+            after: request.after,
+            before: request.before,
+        };
+        match with_deadline(
+            deadline,
+            self.0.service(&request.databases)?.where_are_one_in_origin(
+                &request.swhid,
+                &origin_swhid,
+                dates,
+            ),
+        )
+        .await
+        {
+            Ok(results) => Ok(Response::new(Box::pin(futures::stream::iter(
+                results.into_iter().map(Ok::<_, tonic::Status>),
+            )))),
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+
+    type FindCoOccurrencesStream =
+        Pin<Box<dyn futures::Stream<Item = Result<proto::CoOccurrence, tonic::Status>> + Send>>;
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn find_co_occurrences(
+        &self,
+        request: Request<proto::FindCoOccurrencesRequest>,
+    ) -> TonicResult<Self::FindCoOccurrencesStream> {
+        tracing::info!("{:?}", request.get_ref());
+
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        let min_contents = request
+            .min_contents
+            .map(|min_contents| usize::try_from(min_contents).unwrap_or(usize::MAX));
+        let max_results = request
+            .max_results
+            .map(|max_results| usize::try_from(max_results).unwrap_or(usize::MAX))
+            .unwrap_or(DEFAULT_MAX_CO_OCCURRENCES);
+
+        match with_deadline(
+            deadline,
+            self.0.service(&request.databases)?.find_co_occurrences(
+                &request.swhid,
+                min_contents,
+                max_results,
+            ),
+        )
+        .await
+        {
+            Ok(results) => Ok(Response::new(Box::pin(futures::stream::iter(
+                results.into_iter().map(Ok::<_, tonic::Status>),
+            )))),
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+
+    type ListContainedInStream =
+        Pin<Box<dyn futures::Stream<Item = Result<proto::ContainedContent, tonic::Status>> + Send>>;
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn list_contained_in(
+        &self,
+        request: Request<proto::ListContainedInRequest>,
+    ) -> TonicResult<Self::ListContainedInStream> {
+        tracing::info!("{:?}", request.get_ref());
+
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        match with_deadline(
+            deadline,
+            self.0
+                .service(&request.databases)?
+                .list_contained_in(&request.swhid),
+        )
+        .await
+        {
+            Ok(contents) => Ok(Response::new(Box::pin(
+                contents.map(Ok::<_, tonic::Status>),
+            ))),
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+
+    type WhereAreAllStream =
+        Pin<Box<dyn futures::Stream<Item = Result<proto::Occurrence, tonic::Status>> + Send>>;
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn where_are_all(
+        &self,
+        request: Request<proto::WhereAreAllRequest>,
+    ) -> TonicResult<Self::WhereAreAllStream> {
+        tracing::info!("{:?}", request.get_ref());
+
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        let max_results = match request.max_results {
+            Some(0) => {
+                return Err(tonic::Status::invalid_argument(
+                    "max_results must be positive",
+                ))
+            }
+            max_results => {
+                max_results.map(|max_results| usize::try_from(max_results).unwrap_or(usize::MAX))
+            }
+        };
+
+        let dates = AuthorDateRange {
+            after: request.after,
+            before: request.before,
+        };
+        match with_deadline(
+            deadline,
+            self.0.service(&request.databases)?.where_are_all(
+                &request.swhid,
+                max_results,
+                request.page_token.as_deref(),
+                dates,
+            ),
+        )
+        .await
+        {
+            Ok(occurrences) => {
+                Ok(Response::new(Box::pin(occurrences.map(|occurrence| {
+                    occurrence.map_err(query_error_to_status)
+                }))))
+            }
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn count_anchors(
+        &self,
+        request: Request<proto::CountRequest>,
+    ) -> TonicResult<proto::Count> {
+        tracing::info!("{:?}", request.get_ref());
+
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        match with_deadline(
+            deadline,
+            self.0
+                .service(&request.databases)?
+                .count_anchors(&request.swhid, count_mode(request.mode())),
+        )
+        .await
+        {
+            Ok(count) => Ok(Response::new(count)),
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+
+    #[instrument(skip(self, request), err(level = Level::INFO))]
+    async fn count_origins(
+        &self,
+        request: Request<proto::CountRequest>,
+    ) -> TonicResult<proto::Count> {
+        tracing::info!("{:?}", request.get_ref());
+
+        let deadline = request_deadline(&request);
+        let request = request.into_inner();
+        match with_deadline(
+            deadline,
+            self.0
+                .service(&request.databases)?
+                .count_origins(&request.swhid, count_mode(request.mode())),
+        )
+        .await
+        {
+            Ok(count) => Ok(Response::new(count)),
+            Err(e) => Err(query_error_to_status(e)),
+        }
+    }
+}
+
+fn lookup_mode(mode: proto::LookupMode) -> LookupMode {
+    match mode {
+        proto::LookupMode::Any => LookupMode::Any,
+        proto::LookupMode::Earliest => LookupMode::Earliest,
+    }
+}
+
+fn count_mode(mode: proto::CountMode) -> CountMode {
+    match mode {
+        proto::CountMode::Exact => CountMode::Exact,
+        proto::CountMode::Approximate => CountMode::Approximate,
+    }
+}
+
+/// Returns the deadline of a request, from its `grpc-timeout` header, minus a margin to send
+/// results
+fn request_deadline<T>(request: &Request<T>) -> Option<Instant> {
+    let timeout = request.metadata().get("grpc-timeout")?.to_str().ok()?;
+    let Some(timeout) = parse_grpc_timeout(timeout) else {
+        tracing::warn!("Invalid grpc-timeout: {timeout:?}");
+        return None;
+    };
+    Instant::now().checked_add(timeout - timeout / DEADLINE_MARGIN_DIVISOR)
+}
+
+/// Parses the value of a `grpc-timeout` header, as specified in
+/// <https://github.com/grpc/grpc/blob/master/doc/PROTOCOL-HTTP2.md>
+fn parse_grpc_timeout(value: &str) -> Option<Duration> {
+    if !(2..=9).contains(&value.len()) || !value.is_ascii() {
+        return None;
+    }
+    let (amount, unit) = value.split_at(value.len() - 1);
+    if !amount.bytes().all(|byte| byte.is_ascii_digit()) {
+        return None;
+    }
+    let amount: u64 = amount.parse().ok()?;
+    Some(match unit {
+        "H" => Duration::from_secs(amount * 3600),
+        "M" => Duration::from_secs(amount * 60),
+        "S" => Duration::from_secs(amount),
+        "m" => Duration::from_millis(amount),
+        "u" => Duration::from_micros(amount),
+        "n" => Duration::from_nanos(amount),
+        _ => return None,
+    })
+}
+
+/// Converts an error returned by [`ProvenanceService`] to a gRPC status, reporting server
+/// errors to Sentry
+fn query_error_to_status(e: ProvenanceQueryError) -> tonic::Status {
+    match e {
+        ProvenanceQueryError::ClientError(ProvenanceClientError::Swhid(e)) => {
+            use swh_graph::properties::NodeIdFromSwhidError::*;
+            match e {
+                InvalidSwhid(e) => tonic::Status::invalid_argument(e.to_string()),
+                UnknownSwhid(e) => tonic::Status::not_found(e.to_string()),
+                InternalError(e) => {
+                    tracing::error!("{:?}", e);
+                    tonic::Status::internal(e.to_string())
+                }
+            }
+        }
+        ProvenanceQueryError::ClientError(
+            e @ (ProvenanceClientError::NotAnAnchor(_)
+            | ProvenanceClientError::NotAnOrigin(_)
+            | ProvenanceClientError::InvalidPageToken(_)),
+        ) => tonic::Status::invalid_argument(e.to_string()),
+        ProvenanceQueryError::ClientError(e @ ProvenanceClientError::TooManyAnchors(..)) => {
+            tonic::Status::resource_exhausted(e.to_string())
+        }
+        ProvenanceQueryError::ServerError(e) if deadline::is_deadline_exceeded(&e) => {
+            tonic::Status::deadline_exceeded(e.to_string())
+        }
+        ProvenanceQueryError::ServerError(e) => {
+            tracing::error!("{:?}", e);
+            capture_anyhow(&e); // redundant with tracing::error!
+            tonic::Status::internal(e.to_string())
+        }
+        ProvenanceQueryError::MissingIndex(e) => tonic::Status::failed_precondition(e),
+    }
 }
 
 type TonicResult<T> = Result<tonic::Response<T>, tonic::Status>;
@@ -172,8 +592,9 @@ pub async fn serve<
         + Sync
         + 'static,
 >(
-    db: ProvenanceDatabase,
+    databases: Vec<(String, ProvenanceDatabase)>,
     graph: G,
+    config: QueryConfig,
     bind_addr: std::net::SocketAddr,
     statsd_client: cadence::StatsdClient,
 ) -> Result<(), tonic::transport::Error> {
@@ -189,7 +610,7 @@ pub async fn serve<
         Server::builder().layer(::sentry::integrations::tower::NewSentryLayer::new_from_top());
     builder
         .add_service(MiddlewareFor::new(
-            ProvenanceServiceServer::new(ProvenanceServiceWrapper::new(db, graph)),
+            ProvenanceServiceServer::new(ProvenanceServiceWrapper::new(databases, graph, config)),
             metrics::MetricsMiddleware::new(statsd_client),
         ))
         .add_service(health_service)
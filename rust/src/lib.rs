@@ -6,6 +6,7 @@
 #![doc = include_str!("../README.md")]
 
 pub mod database;
+pub mod deadline;
 mod graph;
 #[cfg(feature = "grpc-server")]
 pub mod grpc_server;
@@ -3,12 +3,14 @@
 // License: GNU General Public License version 3, or any later version
 // See top-level LICENSE file for more information
 
+use std::cmp::Reverse;
+use std::collections::{BinaryHeap, HashMap};
 use std::sync::atomic::Ordering;
 use std::sync::Arc;
 
 use anyhow::{bail, ensure, Context, Result};
 use futures::stream::FuturesUnordered;
-use futures::{Stream, StreamExt};
+use futures::{SinkExt, Stream, StreamExt};
 use itertools::Itertools;
 use parquet_aramid::config::Configurator;
 use parquet_aramid::metrics::TableScanInitMetrics;
@@ -17,23 +19,32 @@ use parquet_aramid::{
     arrow,
     arrow::array::*,
     arrow::datatypes::*,
-    parquet::arrow::arrow_reader::{ArrowPredicate, RowFilter},
+    parquet::arrow::arrow_reader::{ArrowPredicate, RowFilter, RowSelection, RowSelector},
     parquet::arrow::async_reader::AsyncFileReader,
     parquet::arrow::{ParquetRecordBatchStreamBuilder, ProjectionMask},
+    parquet::file::metadata::ParquetMetaData,
+    parquet::file::page_index::index::Index,
+    parquet::file::statistics::Statistics,
     parquet::schema::types::SchemaDescriptor,
 };
 use swh_graph::graph::SwhGraphWithProperties;
 use swh_graph::properties::NodeIdFromSwhidError;
-use swh_graph::{StrSWHIDDeserializationError, SWHID};
+use swh_graph::{NodeType, StrSWHIDDeserializationError, SWHID};
 use thiserror::Error;
 use tracing::{instrument, span_enabled, Level};
 
+use crate::database::key_filters::TableKeyFilters;
 use crate::database::metrics::TableScanMetrics;
+use crate::database::DirectLookup;
 use crate::database::ProvenanceDatabase;
+use crate::deadline;
 use crate::proto;
 
 pub type NodeId = u64;
 
+/// Number of occurrences [`ProvenanceService::where_are_all`] reads ahead of the client
+const OCCURRENCES_BUFFER_SIZE: usize = 1024;
+
 #[derive(Default, Debug)]
 pub struct Metrics {
     c_in_r_init: TableScanInitMetrics,
@@ -44,6 +55,250 @@ pub struct Metrics {
     d_in_r_scan: TableScanMetrics,
     r_in_o_init: TableScanInitMetrics,
     r_in_o_scan: TableScanMetrics,
+    earliest_init: TableScanInitMetrics,
+    earliest_scan: TableScanMetrics,
+}
+
+/// How [`ProvenanceService::count_anchors`] and [`ProvenanceService::count_origins`] count
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum CountMode {
+    /// Returns the exact number of distinct revisions/releases or origins, using
+    /// [cardinality indexes](crate::database::cardinality) only when they give it directly
+    Exact,
+    /// Returns an estimate from [cardinality indexes](crate::database::cardinality) when
+    /// available, without reading tables
+    Approximate,
+}
+
+/// Which revision/release [`ProvenanceService::where_is_one_by_mode`] returns
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum LookupMode {
+    /// Any revision/release containing the content, see [`ProvenanceService::where_is_one`]
+    Any,
+    /// The earliest revision/release containing the content, see
+    /// [`ProvenanceService::where_is_earliest`]
+    Earliest,
+}
+
+/// Bounds on the author date of revisions/releases returned by queries, in seconds since
+/// the epoch
+#[derive(Debug, Default, Clone, Copy, PartialEq, Eq)]
+pub struct AuthorDateRange {
+    /// Only return revisions/releases authored at or after this date
+    pub after: Option<i64>,
+    /// Only return revisions/releases authored strictly before this date
+    pub before: Option<i64>,
+}
+
+impl AuthorDateRange {
+    pub fn is_unbounded(&self) -> bool {
+        self.after.is_none() && self.before.is_none()
+    }
+
+    pub fn contains(&self, date: i64) -> bool {
+        self.after.map_or(true, |after| date >= after)
+            && self.before.map_or(true, |before| date < before)
+    }
+
+    /// Returns whether any date between `min` and `max` (inclusive) is in the range
+    pub fn overlaps(&self, min: i64, max: i64) -> bool {
+        self.after.map_or(true, |after| max >= after)
+            && self.before.map_or(true, |before| min < before)
+    }
+}
+
+/// Restricts rows of a table to those whose `column` (of author dates) is in `range`
+#[derive(Debug, Clone, Copy)]
+struct DateFilter {
+    column: &'static str,
+    range: AuthorDateRange,
+}
+
+/// Returns the filters to apply on c_in_r to restrict it to revisions/releases in `dates`
+fn c_in_r_date_filters(dates: AuthorDateRange) -> Vec<DateFilter> {
+    if dates.is_unbounded() {
+        return Vec::new();
+    }
+    vec![DateFilter {
+        column: "revrel_author_date",
+        range: dates,
+    }]
+}
+
+/// Returns the filters to apply on d_in_r to restrict it to revisions/releases in `dates`.
+///
+/// A frontier directory's `dir_max_author_date` is the latest of the earliest author dates
+/// of its contents, so it is a lower bound of the author date of every revision/release
+/// containing it. Its rows can therefore be skipped as a whole when it is not before
+/// `dates.before`; and as it is constant for each directory, its statistics prune many more
+/// pages and row groups than those of `revrel_author_date`.
+fn d_in_r_date_filters(dates: AuthorDateRange) -> Vec<DateFilter> {
+    let mut filters = Vec::new();
+    if dates.before.is_some() {
+        filters.push(DateFilter {
+            column: "dir_max_author_date",
+            range: AuthorDateRange {
+                after: None,
+                before: dates.before,
+            },
+        });
+    }
+    if !dates.is_unbounded() {
+        filters.push(DateFilter {
+            column: "revrel_author_date",
+            range: dates,
+        });
+    }
+    filters
+}
+
+/// Maximum number of frontier directories [`ProvenanceService::where_is_one`] reads from
+/// c_in_d when dates are unbounded: as every frontier directory is in a revision/release,
+/// the first one is enough, and a few more make up for inconsistencies between tables
+const UNBOUNDED_C_IN_D_LIMIT: usize = 16;
+/// Maximum number of frontier directories looked up by a single d_in_r query
+const D_IN_R_MAX_BATCH_DIRS: usize = 1024;
+/// Maximum number of revisions/releases (from cardinality indexes) of the frontier
+/// directories looked up by a single d_in_r query
+const D_IN_R_MAX_BATCH_REVRELS: u64 = 1 << 16;
+/// Maximum number of concurrent d_in_r queries for a single content
+const D_IN_R_MAX_CONCURRENCY: usize = 8;
+/// Maximum number of d_in_r files read at the same time for a single content, as each
+/// d_in_r query may read all of them
+const D_IN_R_MAX_FILES_IN_FLIGHT: usize = 256;
+
+/// Tuning of queries run by [`ProvenanceService`]
+#[derive(clap::Args, Debug, Clone)]
+pub struct QueryConfig {
+    #[arg(long, default_value_t = 1_000_000)]
+    /// Maximum number of revisions/releases each content of a `FindCoOccurrences` request
+    /// may be in. As all of them are held in memory, requests with a content in more (from
+    /// cardinality indexes, or as they are read) are rejected.
+    pub max_co_occurrence_anchors: usize,
+}
+
+impl Default for QueryConfig {
+    fn default() -> Self {
+        Self {
+            max_co_occurrence_anchors: 1_000_000,
+        }
+    }
+}
+
+/// Statistics of a content used to plan queries, from
+/// [cardinality indexes](crate::database::cardinality); each is `None` when the index it
+/// comes from was not built
+#[derive(Debug, Default, Clone, Copy, PartialEq, Eq)]
+pub struct ContentStatistics {
+    /// Number of revisions/releases of the content in c_in_r
+    pub c_in_r_revrels: Option<u64>,
+    /// Number of frontier directories of the content in c_in_d
+    pub c_in_d_dirs: Option<u64>,
+    /// Sum of the number of revisions/releases of these frontier directories in d_in_r
+    pub c_in_d_in_r_revrels: Option<u64>,
+    /// Number of non-empty files of d_in_r
+    pub d_in_r_files: Option<usize>,
+}
+
+/// Tables [`ProvenanceService::where_is_one`] looks up a content in
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum WhereIsOneSource {
+    /// contents_in_revisions_without_frontiers
+    ContentsInRevisions,
+    /// contents_in_frontier_directories, then frontier_directories_in_revisions
+    ThroughFrontierDirectories,
+}
+
+/// How [`ProvenanceService::where_is_one`] reads tables for a given content
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct WhereIsOnePlan {
+    /// Tables to look up, in order, until one of them has a result
+    pub sources: Vec<WhereIsOneSource>,
+    /// Maximum number of rows to read from c_in_d
+    pub c_in_d_limit: Option<usize>,
+    /// Maximum number of frontier directories in each d_in_r query
+    pub d_in_r_batch_dirs: usize,
+    /// Maximum number of revisions/releases of the frontier directories in each d_in_r
+    /// query, when cardinality indexes give it
+    pub d_in_r_batch_revrels: u64,
+    /// Maximum number of concurrent d_in_r queries
+    pub d_in_r_concurrency: usize,
+}
+
+impl WhereIsOnePlan {
+    /// Plans a lookup of a content with the given statistics.
+    ///
+    /// Sources known to have no row for the content are skipped. When `dates` is
+    /// unbounded, c_in_r goes first as any of its rows is a result, and only a few frontier
+    /// directories are read then looked up together. Otherwise, both sources may have to be
+    /// read in full, so the one with the fewest revisions/releases goes first; and frontier
+    /// directories are looked up in batches of bounded size, with a concurrency which grows
+    /// with the number of batches (up to a limit), so contents in millions of frontier
+    /// directories do not take millions of round-trips nor hog all reads.
+    ///
+    /// Without statistics, frontier directories are looked up one at a time.
+    pub fn new(stats: &ContentStatistics, dates: AuthorDateRange) -> Self {
+        let has_rows = |count: Option<u64>| count != Some(0);
+        let mut sources = Vec::with_capacity(2);
+        if has_rows(stats.c_in_r_revrels) {
+            sources.push(WhereIsOneSource::ContentsInRevisions);
+        }
+        if has_rows(stats.c_in_d_dirs) && has_rows(stats.c_in_d_in_r_revrels) {
+            sources.push(WhereIsOneSource::ThroughFrontierDirectories);
+        }
+
+        if dates.is_unbounded() {
+            return WhereIsOnePlan {
+                sources,
+                c_in_d_limit: Some(UNBOUNDED_C_IN_D_LIMIT),
+                d_in_r_batch_dirs: UNBOUNDED_C_IN_D_LIMIT,
+                d_in_r_batch_revrels: u64::MAX,
+                d_in_r_concurrency: 1,
+            };
+        }
+
+        if let (Some(c_in_r_revrels), Some(c_in_d_in_r_revrels)) =
+            (stats.c_in_r_revrels, stats.c_in_d_in_r_revrels)
+        {
+            if c_in_d_in_r_revrels < c_in_r_revrels {
+                sources.reverse();
+            }
+        }
+
+        let Some(c_in_d_dirs) = stats.c_in_d_dirs else {
+            return WhereIsOnePlan {
+                sources,
+                c_in_d_limit: None,
+                d_in_r_batch_dirs: 1,
+                d_in_r_batch_revrels: u64::MAX,
+                d_in_r_concurrency: 1,
+            };
+        };
+        let num_batches = c_in_d_dirs
+            .div_ceil(D_IN_R_MAX_BATCH_DIRS as u64)
+            .max(
+                stats
+                    .c_in_d_in_r_revrels
+                    .unwrap_or(0)
+                    .div_ceil(D_IN_R_MAX_BATCH_REVRELS),
+            )
+            .max(1);
+        let max_concurrency = match stats.d_in_r_files {
+            Some(files) => {
+                (D_IN_R_MAX_FILES_IN_FLIGHT / files.max(1)).clamp(1, D_IN_R_MAX_CONCURRENCY)
+            }
+            None => D_IN_R_MAX_CONCURRENCY,
+        };
+        WhereIsOnePlan {
+            sources,
+            c_in_d_limit: None,
+            d_in_r_batch_dirs: D_IN_R_MAX_BATCH_DIRS,
+            d_in_r_batch_revrels: D_IN_R_MAX_BATCH_REVRELS,
+            d_in_r_concurrency: usize::try_from(num_batches)
+                .unwrap_or(usize::MAX)
+                .min(max_concurrency),
+        }
+    }
 }
 
 #[derive(Error, Debug)]
@@ -51,6 +306,14 @@ pub struct Metrics {
 pub enum ProvenanceClientError {
     #[error("{0}")]
     Swhid(#[from] NodeIdFromSwhidError<StrSWHIDDeserializationError>),
+    #[error("{0} is not a revision or release")]
+    NotAnAnchor(String),
+    #[error("{0} is not an origin")]
+    NotAnOrigin(String),
+    #[error("Invalid page token: {0}")]
+    InvalidPageToken(String),
+    #[error("{0} is in more than {1} revisions/releases")]
+    TooManyAnchors(String, usize),
 }
 
 #[derive(Error, Debug)]
@@ -59,11 +322,13 @@ pub enum ProvenanceQueryError {
     ClientError(#[from] ProvenanceClientError),
     #[error("Server error: {0}")]
     ServerError(#[from] anyhow::Error),
+    #[error("Missing index: {0}")]
+    MissingIndex(String),
 }
 
 /// Given a Parquet schema and a list of columns, returns a [`ProjectionMask`] that can be passed
 /// to [`parquet`] to select which columns to read.
-fn projection_mask(
+pub(crate) fn projection_mask(
     schema: &SchemaDescriptor,
     columns: impl IntoIterator<Item = impl AsRef<str>>,
 ) -> Result<ProjectionMask> {
@@ -86,13 +351,32 @@ fn projection_mask(
 /// `keys` must be sorted.
 ///
 /// `limit` is per-file, so it is an upper bound to the number of results.
-#[instrument(skip(table, expected_schema, key_column, value_column), fields(table=%table.path()))]
+///
+/// Only the key and value columns are read, along with `extra_columns` (eg. 'path').
+///
+/// Only rows matching all the `date_filters` are returned. They are evaluated in the row
+/// filter after the keys, and used to skip row groups and pages whose statistics show they
+/// have no matching rows.
+///
+/// If `direct_lookup` is provided and no `extra_columns` or `date_filters` are requested, it
+/// is used instead of reading from `table`. Otherwise, `key_filters` (if any) are used to skip
+/// row groups which do not contain any of the keys.
+///
+/// Fails with [`DeadlineExceeded`](deadline::DeadlineExceeded) if the
+/// [current deadline](deadline) is reached, and the stream stops with that error when it
+/// is reached while reading.
+#[allow(clippy::too_many_arguments)]
+#[instrument(skip(table, direct_lookup, key_filters, expected_schema, key_column, value_column, extra_columns), fields(table=%table.path()))]
 async fn query_x_in_y_table<'a>(
     table: &'a Table,
+    direct_lookup: Option<&'a dyn DirectLookup>,
+    key_filters: Option<Arc<TableKeyFilters>>,
     expected_schema: Arc<Schema>,
     table_name: &'static str,
     key_column: &'static str,
     value_column: &'static str,
+    extra_columns: &'static [&'static str],
+    date_filters: Vec<DateFilter>,
     keys: Arc<[u64]>,
     limit: Option<usize>,
 ) -> Result<(
@@ -100,8 +384,29 @@ async fn query_x_in_y_table<'a>(
     Arc<TableScanMetrics>,
     impl Stream<Item = Result<RecordBatch>> + Send + 'a,
 )> {
+    deadline::check()?;
     let metrics = Arc::new(TableScanMetrics::default());
 
+    // Direct lookup tables only have the key and value columns
+    if let Some(direct_lookup) =
+        direct_lookup.filter(|_| extra_columns.is_empty() && date_filters.is_empty())
+    {
+        let batch = direct_lookup
+            .lookup(&keys, limit)
+            .with_context(|| format!("Could not look up keys in {table_name} table"))?;
+        metrics.rows_selected_by_row_filter.fetch_add(
+            u64::try_from(batch.num_rows()).expect("number of rows overflows u64"),
+            Ordering::Relaxed,
+        );
+        // Like Parquet readers, return no batch at all instead of an empty one
+        let stream = futures::stream::iter((batch.num_rows() > 0).then_some(Ok(batch)));
+        return Ok((
+            TableScanInitMetrics::default(),
+            metrics,
+            deadline::until_deadline(stream.left_stream()),
+        ));
+    }
+
     /// Used to filter out rows that do not match the key early, ie. before deserializing the values
     struct Predicate {
         projection: ProjectionMask,
@@ -176,15 +481,53 @@ async fn query_x_in_y_table<'a>(
         }
     }
 
+    /// Used to filter out rows whose author date is out of range, after [`Predicate`]
+    struct DatePredicate {
+        projection: ProjectionMask,
+        filter: DateFilter,
+        metrics: Arc<TableScanMetrics>,
+    }
+
+    impl ArrowPredicate for DatePredicate {
+        fn projection(&self) -> &ProjectionMask {
+            &self.projection
+        }
+
+        fn evaluate(
+            &mut self,
+            batch: RecordBatch,
+        ) -> Result<BooleanArray, arrow::error::ArrowError> {
+            let _guard = self.metrics.row_filter_eval_time.timer();
+            let dates = batch
+                .column_by_name(self.filter.column)
+                .expect("Missing date column")
+                .as_primitive_opt::<TimestampSecondType>()
+                .expect("date column is not a TimestampSecondArray");
+            let matches: BooleanArray = dates
+                .values()
+                .iter()
+                .map(|&date| Some(self.filter.range.contains(date)))
+                .collect();
+            self.metrics.rows_pruned_by_date_filter.fetch_add(
+                u64::try_from(matches.false_count()).expect("number of rows overflows u64"),
+                Ordering::Relaxed,
+            );
+            Ok(matches)
+        }
+    }
+
     /// Configures a [`ParquetRecordBatchStreamBuilder`] to read only columns we are interested in,
-    /// only rows matching the given keys, and with a limited number of results.
+    /// only rows matching the given keys and dates, and with a limited number of results.
     struct ProvenanceConfigurator {
         expected_schema: Arc<Schema>,
         table_name: &'static str,
         key_column: &'static str,
         value_column: &'static str,
+        extra_columns: &'static [&'static str],
+        date_filters: Vec<DateFilter>,
         keys: Arc<[u64]>,
         limit: Option<usize>,
+        key_filters: Option<Arc<TableKeyFilters>>,
         metrics: Arc<TableScanMetrics>,
     }
     impl Configurator for ProvenanceConfigurator {
@@ -212,18 +555,108 @@ async fn query_x_in_y_table<'a>(
                 self.expected_schema.fields()
             );
 
-            // Only read these two columns (ie. not 'revrel_author_date' or 'path')
+            // Only read these two columns (ie. not 'revrel_author_date' or 'path'), unless
+            // more were requested
             let projection = projection_mask(
                 reader_builder.parquet_schema(),
-                [self.key_column, self.value_column],
+                [self.key_column, self.value_column]
+                    .into_iter()
+                    .chain(self.extra_columns.iter().copied()),
             )
             .with_context(|| format!("Could not project {} table for reading", self.table_name))?;
             reader_builder = reader_builder.with_projection(projection);
 
+            // Skip row groups which certainly do not contain any of the keys
+            let mut row_groups = None;
+            if let Some(key_filters) = &self.key_filters {
+                if let Some(selected_row_groups) =
+                    key_filters.row_groups_for_keys(reader_builder.metadata(), &self.keys)
+                {
+                    let num_row_groups = reader_builder.metadata().num_row_groups();
+                    self.metrics.row_groups_pruned_by_key_filter.fetch_add(
+                        u64::try_from(num_row_groups - selected_row_groups.len())
+                            .expect("number of row groups overflows u64"),
+                        Ordering::Relaxed,
+                    );
+                    self.metrics.row_groups_selected_by_key_filter.fetch_add(
+                        u64::try_from(selected_row_groups.len())
+                            .expect("number of row groups overflows u64"),
+                        Ordering::Relaxed,
+                    );
+                    row_groups = Some(selected_row_groups);
+                }
+            }
+
+            // Skip row groups, then pages, whose dates are all out of range
+            let mut row_selection = None;
+            if !self.date_filters.is_empty() {
+                let metadata = Arc::clone(reader_builder.metadata());
+                let date_columns = self
+                    .date_filters
+                    .iter()
+                    .map(|filter| {
+                        let column_index = metadata
+                            .file_metadata()
+                            .schema_descr()
+                            .columns()
+                            .iter()
+                            .position(|column| column.name() == filter.column)
+                            .with_context(|| {
+                                format!("Missing column {} in table", filter.column)
+                            })?;
+                        Ok((column_index, filter.range))
+                    })
+                    .collect::<Result<Vec<_>>>()?;
+                let mut selected_row_groups =
+                    row_groups.unwrap_or_else(|| (0..metadata.num_row_groups()).collect());
+                let num_row_groups = selected_row_groups.len();
+                selected_row_groups.retain(|&row_group_index| {
+                    date_columns.iter().all(|&(column_index, range)| {
+                        row_group_may_match_dates(&metadata, row_group_index, column_index, range)
+                    })
+                });
+                self.metrics.row_groups_pruned_by_date_statistics.fetch_add(
+                    u64::try_from(num_row_groups - selected_row_groups.len())
+                        .expect("number of row groups overflows u64"),
+                    Ordering::Relaxed,
+                );
+                for &(column_index, range) in &date_columns {
+                    if let Some(selection) =
+                        select_pages_by_dates(&metadata, &selected_row_groups, column_index, range)
+                    {
+                        row_selection = Some(match row_selection {
+                            None => selection,
+                            Some(row_selection) => selection.intersection(&row_selection),
+                        });
+                    }
+                }
+                if let Some(row_selection) = &row_selection {
+                    let num_rows: usize = selected_row_groups
+                        .iter()
+                        .map(|&row_group_index| {
+                            usize::try_from(metadata.row_group(row_group_index).num_rows())
+                                .expect("Negative number of rows")
+                        })
+                        .sum();
+                    self.metrics.rows_pruned_by_date_page_index.fetch_add(
+                        u64::try_from(num_rows - row_selection.row_count())
+                            .expect("number of rows overflows u64"),
+                        Ordering::Relaxed,
+                    );
+                }
+                row_groups = Some(selected_row_groups);
+            }
+            if let Some(row_groups) = row_groups {
+                reader_builder = reader_builder.with_row_groups(row_groups);
+            }
+            if let Some(row_selection) = row_selection {
+                reader_builder = reader_builder.with_row_selection(row_selection);
+            }
+
             // Further configure the reader builders to only return rows that
-            // actually contain one of the keys in the input; then build readers and stream
-            // their results.
-            let row_filter = RowFilter::new(vec![Box::new(Predicate {
+            // actually contain one of the keys in the input, and whose dates are in range;
+            // then build readers and stream their results.
+            let mut predicates: Vec<Box<dyn ArrowPredicate>> = vec![Box::new(Predicate {
                 // Don't read the other columns yet, we don't need them for filtering
                 projection: projection_mask(reader_builder.parquet_schema(), [self.key_column])
                     .with_context(|| {
@@ -232,8 +665,18 @@ async fn query_x_in_y_table<'a>(
                 key_column: self.key_column,
                 keys: Arc::clone(&self.keys),
                 metrics: Arc::clone(&self.metrics),
-            })]);
-            reader_builder = reader_builder.with_row_filter(row_filter);
+            })];
+            for &filter in &self.date_filters {
+                predicates.push(Box::new(DatePredicate {
+                    projection: projection_mask(reader_builder.parquet_schema(), [filter.column])
+                        .with_context(|| {
+                        format!("Could not project {} table for filtering", self.table_name)
+                    })?,
+                    filter,
+                    metrics: Arc::clone(&self.metrics),
+                }));
+            }
+            reader_builder = reader_builder.with_row_filter(RowFilter::new(predicates));
 
             // Limit the number of results to return
             if let Some(limit) = self.limit {
@@ -247,26 +690,347 @@ async fn query_x_in_y_table<'a>(
     let scan_metrics = Arc::clone(&metrics);
 
     // Get a stream of batches of rows
-    let (scan_init_metrics, stream) = table
-        // Get Parquet reader builders configured to only read pages that *probably* contain
-        // one of the keys in the query, using indices.
-        .stream_for_keys(
-            key_column,
-            &keys,
-            Arc::new(ProvenanceConfigurator {
-                expected_schema,
-                table_name,
+    let (scan_init_metrics, stream) = deadline::or_deadline(
+        table
+            // Get Parquet reader builders configured to only read pages that *probably*
+            // contain one of the keys in the query, using indices.
+            .stream_for_keys(
                 key_column,
-                value_column,
-                keys: Arc::clone(&keys),
-                limit,
-                metrics,
+                &keys,
+                Arc::new(ProvenanceConfigurator {
+                    expected_schema,
+                    table_name,
+                    key_column,
+                    value_column,
+                    extra_columns,
+                    date_filters,
+                    keys: Arc::clone(&keys),
+                    limit,
+                    key_filters,
+                    metrics,
+                }),
+            ),
+    )
+    .await?
+    .context("Could not start reading from table")?;
+
+    Ok((
+        scan_init_metrics,
+        scan_metrics,
+        deadline::until_deadline(stream.right_stream()),
+    ))
+}
+
+/// Returns whether a row group may have values of a column of author dates in `range`,
+/// according to its statistics
+fn row_group_may_match_dates(
+    metadata: &ParquetMetaData,
+    row_group_index: usize,
+    column_index: usize,
+    range: AuthorDateRange,
+) -> bool {
+    match metadata
+        .row_group(row_group_index)
+        .column(column_index)
+        .statistics()
+    {
+        Some(Statistics::Int64(statistics)) => match (statistics.min_opt(), statistics.max_opt()) {
+            (Some(&min), Some(&max)) => range.overlaps(min, max),
+            _ => true,
+        },
+        _ => true,
+    }
+}
+
+/// Returns the rows of the given row groups in pages which may have values of a column of
+/// author dates in `range`, or `None` if the file has no page index.
+///
+/// Pages without statistics are selected.
+fn select_pages_by_dates(
+    metadata: &ParquetMetaData,
+    row_groups: &[usize],
+    column_index: usize,
+    range: AuthorDateRange,
+) -> Option<RowSelection> {
+    let (Some(page_statistics), Some(page_locations)) =
+        (metadata.column_index(), metadata.offset_index())
+    else {
+        return None;
+    };
+    let mut selectors = Vec::new();
+    for &row_group_index in row_groups {
+        let num_rows = usize::try_from(metadata.row_group(row_group_index).num_rows())
+            .expect("Negative number of rows");
+        let locations = page_locations
+            .get(row_group_index)?
+            .get(column_index)?
+            .page_locations();
+        let pages = match page_statistics.get(row_group_index)?.get(column_index)? {
+            Index::INT64(index) if index.indexes.len() == locations.len() => &index.indexes,
+            _ => {
+                // No statistics for this column chunk
+                selectors.push(RowSelector::select(num_rows));
+                continue;
+            }
+        };
+        for (i, (page, location)) in std::iter::zip(pages, locations).enumerate() {
+            let first_row = usize::try_from(location.first_row_index).ok()?;
+            let end_row = match locations.get(i + 1) {
+                Some(next_location) => usize::try_from(next_location.first_row_index).ok()?,
+                None => num_rows,
+            };
+            let may_match = match (page.min(), page.max()) {
+                (Some(&min), Some(&max)) => range.overlaps(min, max),
+                _ => true,
+            };
+            selectors.push(if may_match {
+                RowSelector::select(end_row - first_row)
+            } else {
+                RowSelector::skip(end_row - first_row)
+            });
+        }
+    }
+    Some(RowSelection::from(selectors))
+}
+
+/// Returns the values of a column of node ids of a batch
+fn node_id_column<'a>(batch: &'a RecordBatch, column: &str) -> Result<&'a [NodeId]> {
+    let values: &[NodeId] = batch
+        .column_by_name(column)
+        .with_context(|| format!("Could not get '{column}' column from batch"))?
+        .as_primitive_opt::<UInt64Type>()
+        .with_context(|| format!("'{column}' column is not UInt64Array"))?
+        .values();
+    Ok(values)
+}
+
+/// Returns the values of a column of author dates of a batch, as seconds since the epoch
+fn author_date_column<'a>(batch: &'a RecordBatch, column: &str) -> Result<&'a [i64]> {
+    let values: &[i64] = batch
+        .column_by_name(column)
+        .with_context(|| format!("Could not get '{column}' column from batch"))?
+        .as_primitive_opt::<TimestampSecondType>()
+        .with_context(|| format!("'{column}' column is not TimestampSecondArray"))?
+        .values();
+    Ok(values)
+}
+
+/// Returns the 'path' column of a batch
+fn path_column(batch: &RecordBatch) -> Result<&BinaryArray> {
+    batch
+        .column_by_name("path")
+        .context("Could not get 'path' column from batch")?
+        .as_binary_opt::<i32>()
+        .context("'path' column is not BinaryArray")
+}
+
+/// Returns the 'path_id' column of a batch
+fn path_id_column(batch: &RecordBatch) -> Result<&[u64]> {
+    let values: &[u64] = batch
+        .column_by_name("path_id")
+        .context("Could not get 'path_id' column from batch")?
+        .as_primitive_opt::<UInt64Type>()
+        .context("'path_id' column is not UInt64Array")?
+        .values();
+    Ok(values)
+}
+
+/// Returns the field of the column of paths of c_in_d, d_in_r and c_in_r: 'path_id' if
+/// their paths are interned in the `paths` table, 'path' otherwise
+fn path_field(interned_paths: bool) -> Field {
+    if interned_paths {
+        Field::new("path_id", DataType::UInt64, false)
+    } else {
+        Field::new("path", DataType::Binary, false)
+    }
+}
+
+/// Returns the field of a column of author dates, as written by `swh-provenance-db-build`
+fn author_date_field(name: &str) -> Field {
+    Field::new(
+        name,
+        DataType::Timestamp(TimeUnit::Second, Some("UTC".into())),
+        false,
+    )
+}
+
+/// Position of an occurrence in the results of [`ProvenanceService::where_are_all`], which
+/// are ordered by source table, then anchor, then path when paginated.
+#[derive(Debug, Clone, PartialEq, Eq, PartialOrd, Ord)]
+pub struct OccurrenceKey {
+    /// 0 for occurrences from c_in_r, 1 for occurrences from c_in_d ⋈ d_in_r
+    source: u8,
+    anchor: NodeId,
+    path: Vec<u8>,
+}
+
+impl OccurrenceKey {
+    /// Encodes the key as an opaque token, to be passed back by clients to resume after it
+    pub fn to_page_token(&self) -> String {
+        let path: String = self.path.iter().map(|byte| format!("{byte:02x}")).collect();
+        format!("{}:{}:{}", self.source, self.anchor, path)
+    }
+
+    /// Decodes a token returned by [`Self::to_page_token`]
+    pub fn from_page_token(token: &str) -> Result<Self, ProvenanceClientError> {
+        let invalid = || ProvenanceClientError::InvalidPageToken(token.to_owned());
+        let mut parts = token.splitn(3, ':');
+        let (Some(source), Some(anchor), Some(path)) = (parts.next(), parts.next(), parts.next())
+        else {
+            return Err(invalid());
+        };
+        if path.len() % 2 != 0 || !path.is_ascii() {
+            return Err(invalid());
+        }
+        Ok(OccurrenceKey {
+            source: source.parse().map_err(|_| invalid())?,
+            anchor: anchor.parse().map_err(|_| invalid())?,
+            path: (0..path.len())
+                .step_by(2)
+                .map(|i| u8::from_str_radix(&path[i..i + 2], 16))
+                .collect::<Result<_, _>>()
+                .map_err(|_| invalid())?,
+        })
+    }
+}
+
+/// Collects occurrences found by [`ProvenanceService::where_are_all`] which come after
+/// the requested page token.
+///
+/// Unpaginated occurrences are returned as soon as they are read; paginated occurrences are
+/// kept in a bounded heap of the smallest keys, as the tables are not read in key order.
+struct OccurrenceCollector {
+    after: Option<OccurrenceKey>,
+    /// `max_results` and the `max_results + 1` smallest occurrences, if paginated
+    page: Option<(usize, BinaryHeap<(OccurrenceKey, i64)>)>,
+    /// Occurrences to return, if not paginated
+    ready: Vec<(OccurrenceKey, i64)>,
+}
+
+impl OccurrenceCollector {
+    fn new(after: Option<OccurrenceKey>, max_results: Option<usize>) -> Self {
+        OccurrenceCollector {
+            after,
+            page: max_results.map(|max_results| {
+                (
+                    max_results,
+                    BinaryHeap::with_capacity(max_results.saturating_add(1).min(1024)),
+                )
             }),
-        )
-        .await
-        .context("Could not start reading from table")?;
+            ready: Vec::new(),
+        }
+    }
+
+    /// Returns whether occurrences from the given source table may be collected
+    fn wants_source(&self, source: u8) -> bool {
+        if self
+            .after
+            .as_ref()
+            .is_some_and(|after| after.source > source)
+        {
+            return false;
+        }
+        match &self.page {
+            // The heap is full and all its occurrences are from earlier tables
+            Some((max_results, heap)) if heap.len() > *max_results => heap
+                .peek()
+                .is_some_and(|(largest, _)| largest.source >= source),
+            _ => true,
+        }
+    }
+
+    fn push(&mut self, key: OccurrenceKey, author_date: i64) {
+        if self.after.as_ref().is_some_and(|after| &key <= after) {
+            return;
+        }
+        match &mut self.page {
+            None => self.ready.push((key, author_date)),
+            Some((max_results, heap)) => {
+                if heap.len() <= *max_results {
+                    heap.push((key, author_date));
+                } else if heap.peek().is_some_and(|(largest, _)| &key < largest) {
+                    heap.pop();
+                    heap.push((key, author_date));
+                }
+            }
+        }
+    }
 
-    Ok((scan_init_metrics, scan_metrics, stream))
+    /// Returns unpaginated occurrences collected since the last call
+    fn take_ready(&mut self) -> Vec<(OccurrenceKey, i64)> {
+        std::mem::take(&mut self.ready)
+    }
+
+    /// Returns the remaining occurrences, and the key to resume after if there are more
+    fn finish(mut self) -> (Vec<(OccurrenceKey, i64)>, Option<OccurrenceKey>) {
+        match self.page {
+            None => (self.take_ready(), None),
+            Some((max_results, heap)) => {
+                let has_more = heap.len() > max_results;
+                let mut occurrences = heap.into_sorted_vec();
+                occurrences.dedup_by(|(key1, _), (key2, _)| key1 == key2);
+                occurrences.truncate(max_results);
+                let next = if has_more {
+                    occurrences.last().map(|(key, _)| key.clone())
+                } else {
+                    None
+                };
+                (occurrences, next)
+            }
+        }
+    }
+}
+
+/// Given sorted and deduplicated lists of node ids, returns the `max_results` node ids which
+/// are in the most of them (and in at least `min_count`), along with the number of lists they
+/// are in, by decreasing number of lists then increasing node id.
+///
+/// This is a k-way merge, so it runs in `O(n log k)` for `k` lists with `n` node ids in total,
+/// and only keeps the best `max_results` node ids seen so far in memory.
+fn count_co_occurrences(
+    posting_lists: &[Vec<NodeId>],
+    min_count: usize,
+    max_results: usize,
+) -> Vec<(NodeId, usize)> {
+    // Next node id of each list, with the index of the list and of that node id in it
+    let mut heads: BinaryHeap<Reverse<(NodeId, usize, usize)>> = posting_lists
+        .iter()
+        .enumerate()
+        .filter_map(|(list_index, list)| Some(Reverse((*list.first()?, list_index, 0))))
+        .collect();
+    // Min-heap of the best node ids so far, so the worst one is popped when it overflows
+    let mut best: BinaryHeap<Reverse<(usize, Reverse<NodeId>)>> =
+        BinaryHeap::with_capacity(max_results.saturating_add(1).min(OCCURRENCES_BUFFER_SIZE));
+    let mut keep = |node_id: NodeId, count: usize| {
+        if count >= min_count {
+            best.push(Reverse((count, Reverse(node_id))));
+            if best.len() > max_results {
+                best.pop();
+            }
+        }
+    };
+    let mut current: Option<(NodeId, usize)> = None;
+    while let Some(Reverse((node_id, list_index, position))) = heads.pop() {
+        match &mut current {
+            Some((current_node_id, count)) if *current_node_id == node_id => *count += 1,
+            _ => {
+                if let Some((current_node_id, count)) = current {
+                    keep(current_node_id, count);
+                }
+                current = Some((node_id, 1));
+            }
+        }
+        if let Some(&next_node_id) = posting_lists[list_index].get(position + 1) {
+            heads.push(Reverse((next_node_id, list_index, position + 1)));
+        }
+    }
+    if let Some((current_node_id, count)) = current {
+        keep(current_node_id, count);
+    }
+    best.into_sorted_vec()
+        .into_iter()
+        .map(|Reverse((count, Reverse(node_id)))| (node_id, count))
+        .collect()
 }
 
 /// Reads a stream of [`RecordBatch`], and stops once `limit` rows were obtained.
@@ -304,7 +1068,9 @@ pub struct ProvenanceService<
         + 'static,
 > {
     pub db: ProvenanceDatabase,
-    pub graph: G,
+    /// Shared by the services of all databases served by a process
+    pub graph: Arc<G>,
+    pub config: QueryConfig,
 }
 
 impl<
@@ -389,7 +1155,6 @@ impl<
     }
 
     /// Given content [`NodeId`]s, returns a stream of records from the contents-in-revision table
-    #[instrument(skip(self))]
     pub async fn query_c_in_r(
         &self,
         node_ids: Arc<[NodeId]>,
@@ -398,21 +1163,47 @@ impl<
         TableScanInitMetrics,
         Arc<TableScanMetrics>,
         impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
+    )> {
+        self.query_c_in_r_with_columns(node_ids, limit, &[], AuthorDateRange::default())
+            .await
+    }
+
+    /// Same as [`Self::query_c_in_r`], but also reads the `extra_columns` (among
+    /// 'revrel_author_date' and 'path', or 'path_id' if the database has a `paths` table),
+    /// and only returns revisions/releases authored in
+    /// `dates`
+    #[instrument(skip(self))]
+    pub async fn query_c_in_r_with_columns(
+        &self,
+        node_ids: Arc<[NodeId]>,
+        limit: Option<usize>,
+        extra_columns: &'static [&'static str],
+        dates: AuthorDateRange,
+    ) -> Result<(
+        TableScanInitMetrics,
+        Arc<TableScanMetrics>,
+        impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
     )> {
         tracing::debug!("Looking up c_in_r");
+        self.db.accesses.c_in_r.fetch_add(1, Ordering::Relaxed);
 
         // Start reading from the table
         let schema = Arc::new(Schema::new(vec![
             Field::new("cnt", DataType::UInt64, false),
             Field::new("revrel", DataType::UInt64, false),
-            Field::new("path", DataType::Binary, false),
+            author_date_field("revrel_author_date"),
+            path_field(self.db.paths.is_some()),
         ]));
         let (scan_init_metrics, scan_metrics, c_in_r_stream) = query_x_in_y_table(
             &self.db.c_in_r,
+            self.db.direct_lookup.c_in_r.as_deref(),
+            self.db.key_filters.c_in_r.clone(),
             schema,
-            "c_in_d", // table name, for error messages
+            "c_in_r", // table name, for error messages
             "cnt",
             "revrel",
+            extra_columns,
+            c_in_r_date_filters(dates),
             node_ids,
             limit,
         )
@@ -424,16 +1215,19 @@ impl<
         Ok((scan_init_metrics, scan_metrics, c_in_r_stream))
     }
 
-    /// Given a content [`NodeId`], returns some records from the contents-in-revision table
+    /// Given a content [`NodeId`], returns some records from the contents-in-revision table,
+    /// of revisions/releases authored in `dates`
     #[instrument(skip(self))]
     pub async fn query_c_in_r_one(
         &self,
         node_id: NodeId,
+        dates: AuthorDateRange,
     ) -> Result<(TableScanInitMetrics, TableScanMetrics, Vec<RecordBatch>)> {
         let limit = 1;
 
-        let (scan_init_metrics, scan_metrics, c_in_r_stream) =
-            self.query_c_in_r(Arc::new([node_id]), Some(limit)).await?;
+        let (scan_init_metrics, scan_metrics, c_in_r_stream) = self
+            .query_c_in_r_with_columns(Arc::new([node_id]), Some(limit), &[], dates)
+            .await?;
 
         // Read batches of rows, stopping after the first one
         let batches = consume_batch_stream(c_in_r_stream, limit).await?;
@@ -448,7 +1242,6 @@ impl<
     }
 
     /// Given content [`NodeId`]s, returns a stream of records from the contents-in-directory table
-    #[instrument(skip(self))]
     pub async fn query_c_in_d(
         &self,
         node_ids: Arc<[NodeId]>,
@@ -456,23 +1249,44 @@ impl<
         TableScanInitMetrics,
         Arc<TableScanMetrics>,
         impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
+    )> {
+        self.query_c_in_d_with_columns(node_ids, None, &[]).await
+    }
+
+    /// Same as [`Self::query_c_in_d`], but also reads the `extra_columns` (ie. 'path', or
+    /// 'path_id' if the database has a `paths` table), and stops after `limit` rows
+    #[instrument(skip(self))]
+    pub async fn query_c_in_d_with_columns(
+        &self,
+        node_ids: Arc<[NodeId]>,
+        limit: Option<usize>,
+        extra_columns: &'static [&'static str],
+    ) -> Result<(
+        TableScanInitMetrics,
+        Arc<TableScanMetrics>,
+        impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
     )> {
         tracing::debug!("Looking up c_in_d");
+        self.db.accesses.c_in_d.fetch_add(1, Ordering::Relaxed);
 
         // Start reading from the table
         let schema = Arc::new(Schema::new(vec![
             Field::new("cnt", DataType::UInt64, false),
             Field::new("dir", DataType::UInt64, false),
-            Field::new("path", DataType::Binary, false),
+            path_field(self.db.paths.is_some()),
         ]));
         let (scan_init_metrics, scan_metrics, c_in_d_stream) = query_x_in_y_table(
             &self.db.c_in_d,
+            self.db.direct_lookup.c_in_d.as_deref(),
+            self.db.key_filters.c_in_d.clone(),
             schema,
             "c_in_d", // table name, for error messages
             "cnt",
             "dir",
+            extra_columns,
+            Vec::new(), // no dates
             node_ids,
-            None, // no limit
+            limit,
         )
         .await
         .context("Could not query c_in_d")?;
@@ -483,7 +1297,6 @@ impl<
     }
 
     /// Given directory [`NodeId`]s, returns some records from the directory-in-revision table
-    #[instrument(skip(self))]
     pub async fn query_d_in_r(
         &self,
         node_ids: Arc<[NodeId]>,
@@ -492,21 +1305,48 @@ impl<
         TableScanInitMetrics,
         Arc<TableScanMetrics>,
         impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
+    )> {
+        self.query_d_in_r_with_columns(node_ids, limit, &[], AuthorDateRange::default())
+            .await
+    }
+
+    /// Same as [`Self::query_d_in_r`], but also reads the `extra_columns` (among
+    /// 'dir_max_author_date', 'revrel_author_date' and 'path', or 'path_id' if the
+    /// database has a `paths` table), and only returns revisions/releases authored in
+    /// `dates`
+    #[instrument(skip(self))]
+    pub async fn query_d_in_r_with_columns(
+        &self,
+        node_ids: Arc<[NodeId]>,
+        limit: Option<usize>,
+        extra_columns: &'static [&'static str],
+        dates: AuthorDateRange,
+    ) -> Result<(
+        TableScanInitMetrics,
+        Arc<TableScanMetrics>,
+        impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
     )> {
         tracing::debug!("Looking up d_in_r");
+        self.db.accesses.d_in_r.fetch_add(1, Ordering::Relaxed);
 
         // Start reading from the table
         let schema = Arc::new(Schema::new(vec![
             Field::new("dir", DataType::UInt64, false),
+            author_date_field("dir_max_author_date"),
             Field::new("revrel", DataType::UInt64, false),
-            Field::new("path", DataType::Binary, false),
+            author_date_field("revrel_author_date"),
+            path_field(self.db.paths.is_some()),
         ]));
         let (scan_init_metrics, scan_metrics, d_in_r_stream) = query_x_in_y_table(
             &self.db.d_in_r,
+            self.db.direct_lookup.d_in_r.as_deref(),
+            self.db.key_filters.d_in_r.clone(),
             schema,
             "d_in_r", // table name, for error messages
             "dir",
             "revrel",
+            extra_columns,
+            d_in_r_date_filters(dates),
             node_ids,
             limit,
         )
@@ -518,16 +1358,19 @@ impl<
         Ok((scan_init_metrics, scan_metrics, d_in_r_stream))
     }
 
-    /// Given a directory [`NodeId`], returns some records from the directory-in-revision table
+    /// Given a directory [`NodeId`], returns some records from the directory-in-revision
+    /// table, of revisions/releases authored in `dates`
     #[instrument(skip(self))]
     pub async fn query_d_in_r_one(
         &self,
         node_id: NodeId,
+        dates: AuthorDateRange,
     ) -> Result<(TableScanInitMetrics, TableScanMetrics, Vec<RecordBatch>)> {
         let limit = 1;
 
-        let (scan_init_metrics, scan_metrics, d_in_r_stream) =
-            self.query_d_in_r(Arc::new([node_id]), Some(limit)).await?;
+        let (scan_init_metrics, scan_metrics, d_in_r_stream) = self
+            .query_d_in_r_with_columns(Arc::new([node_id]), Some(limit), &[], dates)
+            .await?;
 
         // Read batches of rows, stopping after the first one
         let batches = consume_batch_stream(d_in_r_stream, limit).await?;
@@ -541,6 +1384,38 @@ impl<
         Ok((scan_init_metrics, scan_metrics, batches))
     }
 
+    /// Given directory [`NodeId`]s, returns any revision/release authored in `dates` which
+    /// contains one of them
+    #[instrument(skip(self))]
+    pub async fn query_d_in_r_any(
+        &self,
+        mut node_ids: Vec<NodeId>,
+        dates: AuthorDateRange,
+    ) -> Result<(TableScanInitMetrics, TableScanMetrics, Option<NodeId>)> {
+        let limit = 1;
+        node_ids.sort_unstable();
+        node_ids.dedup();
+
+        let (scan_init_metrics, scan_metrics, d_in_r_stream) = self
+            .query_d_in_r_with_columns(node_ids.into(), Some(limit), &[], dates)
+            .await?;
+
+        // Read batches of rows, stopping after the first one
+        let batches = consume_batch_stream(d_in_r_stream, limit).await?;
+        tracing::trace!("Got d_in_r_batches");
+        let mut revrel = None;
+        for batch in &batches {
+            if let Some(&first_revrel) = node_id_column(batch, "revrel")?.first() {
+                revrel = Some(first_revrel);
+                break;
+            }
+        }
+        let scan_metrics =
+            Arc::try_unwrap(scan_metrics).expect("Dangling reference to scan_metrics");
+        tracing::debug!("Scan metrics: {:#?}", scan_metrics);
+        Ok((scan_init_metrics, scan_metrics, revrel))
+    }
+
     /// Given a revision/release [`NodeId`]s, returns some records from the revisions-in-origins table
     #[instrument(skip(self))]
     pub async fn query_r_in_o(
@@ -553,6 +1428,7 @@ impl<
         impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
     )> {
         tracing::debug!("Looking up r_in_o");
+        self.db.accesses.r_in_o.fetch_add(1, Ordering::Relaxed);
 
         // Start reading from the table
         let schema = Arc::new(Schema::new(vec![
@@ -561,10 +1437,14 @@ impl<
         ]));
         let (scan_init_metrics, scan_metrics, r_in_o_stream) = query_x_in_y_table(
             &self.db.r_in_o,
+            self.db.direct_lookup.r_in_o.as_deref(),
+            self.db.key_filters.r_in_o.clone(),
             schema,
             "r_in_o", // table name, for error messages
             "revrel",
             "ori",
+            &[],        // no extra columns
+            Vec::new(), // no dates
             node_ids,
             limit,
         )
@@ -576,22 +1456,156 @@ impl<
         Ok((scan_init_metrics, scan_metrics, r_in_o_stream))
     }
 
-    /// Returns the URL of an origin that contains the given revision/release
-    pub async fn get_origin(&self, revrel: usize, metrics: &mut Metrics) -> Result<Option<String>> {
-        let (r_in_o_scan_init_metric, r_in_o_scan_metrics, mut r_in_o_batches) = self
-            .query_r_in_o(
-                Arc::new([u64::try_from(revrel).expect("node id overflowed u64")]),
-                Some(1),
-            )
-            .await?;
-        metrics.r_in_o_init += r_in_o_scan_init_metric;
-        let origin = match r_in_o_batches.next().await {
-            Some(Ok(batch)) => {
-                let oris = batch
-                    .column_by_name("ori")
-                    .context("Could not get 'ori' column from batch")?
-                    .as_primitive_opt::<UInt64Type>()
-                    .context("'ori' column is not UInt64Array")?;
+    /// Given content [`NodeId`]s, returns a stream of records from the earliest-occurrences
+    /// table, which must be present
+    #[instrument(skip(self))]
+    pub async fn query_earliest_occurrences(
+        &self,
+        node_ids: Arc<[NodeId]>,
+    ) -> Result<(
+        TableScanInitMetrics,
+        Arc<TableScanMetrics>,
+        impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
+    )> {
+        tracing::debug!("Looking up earliest_occurrences");
+        let table = self
+            .db
+            .earliest_occurrences
+            .as_ref()
+            .context("Database has no earliest_occurrences table")?;
+
+        // Start reading from the table
+        let schema = Arc::new(Schema::new(vec![
+            Field::new("cnt", DataType::UInt64, false),
+            Field::new("revrel", DataType::UInt64, false),
+            author_date_field("revrel_author_date"),
+            Field::new("ori", DataType::UInt64, true),
+        ]));
+        let (scan_init_metrics, scan_metrics, earliest_stream) = query_x_in_y_table(
+            table,
+            None, // never resident
+            self.db.key_filters.earliest_occurrences.clone(),
+            schema,
+            "earliest_occurrences", // table name, for error messages
+            "cnt",
+            "revrel",
+            &["revrel_author_date", "ori"],
+            Vec::new(), // no dates, there is a single row per content anyway
+            node_ids,
+            None, // no limit
+        )
+        .await
+        .context("Could not query earliest_occurrences")?;
+        tracing::trace!("Got earliest_stream");
+        tracing::debug!("Scan init metrics: {:#?}", scan_init_metrics);
+
+        Ok((scan_init_metrics, scan_metrics, earliest_stream))
+    }
+
+    /// Given path ids, returns a stream of records from the paths table, which must be
+    /// present
+    #[instrument(skip(self))]
+    pub async fn query_paths(
+        &self,
+        path_ids: Arc<[u64]>,
+    ) -> Result<(
+        TableScanInitMetrics,
+        Arc<TableScanMetrics>,
+        impl Stream<Item = Result<RecordBatch>> + use<'_, G>,
+    )> {
+        tracing::debug!("Looking up paths");
+        let table = self
+            .db
+            .paths
+            .as_ref()
+            .context("Database has no paths table")?;
+
+        // Start reading from the table
+        let schema = Arc::new(Schema::new(vec![
+            Field::new("path_id", DataType::UInt64, false),
+            Field::new("path", DataType::Binary, false),
+        ]));
+        let (scan_init_metrics, scan_metrics, paths_stream) = query_x_in_y_table(
+            table,
+            None, // never resident
+            self.db.key_filters.paths.clone(),
+            schema,
+            "paths", // table name, for error messages
+            "path_id",
+            "path",
+            &[],
+            Vec::new(), // no dates, paths are not dated
+            path_ids,
+            None, // no limit
+        )
+        .await
+        .context("Could not query paths")?;
+        tracing::trace!("Got paths_stream");
+        tracing::debug!("Scan init metrics: {:#?}", scan_init_metrics);
+
+        Ok((scan_init_metrics, scan_metrics, paths_stream))
+    }
+
+    /// Returns the path of each of the given path ids which is in the paths table
+    pub async fn resolve_paths(&self, path_ids: &[u64]) -> Result<HashMap<u64, Vec<u8>>> {
+        let mut path_ids = path_ids.to_vec();
+        path_ids.sort_unstable();
+        path_ids.dedup();
+        let mut paths = HashMap::with_capacity(path_ids.len());
+        if path_ids.is_empty() {
+            return Ok(paths);
+        }
+        let (_scan_init_metrics, _scan_metrics, mut paths_batches) =
+            self.query_paths(path_ids.into()).await?;
+        while let Some(batch) = paths_batches.next().await {
+            let batch = batch?;
+            let batch_paths = path_column(&batch)?;
+            for (i, &path_id) in path_id_column(&batch)?.iter().enumerate() {
+                paths.insert(path_id, batch_paths.value(i).to_vec());
+            }
+        }
+        Ok(paths)
+    }
+
+    /// Returns the paths of the rows of a batch of c_in_r, c_in_d or d_in_r, read from
+    /// its 'path' column, or resolved from its 'path_id' column if the database has a
+    /// `paths` table
+    async fn batch_paths(&self, batch: &RecordBatch) -> Result<Vec<Vec<u8>>> {
+        if self.db.paths.is_none() {
+            return Ok(path_column(batch)?
+                .iter()
+                .map(|path| path.unwrap_or_default().to_vec())
+                .collect());
+        }
+        let path_ids = path_id_column(batch)?;
+        let paths = self.resolve_paths(path_ids).await?;
+        path_ids
+            .iter()
+            .map(|path_id| {
+                paths
+                    .get(path_id)
+                    .cloned()
+                    .with_context(|| format!("Unknown path id {path_id}"))
+            })
+            .collect()
+    }
+
+    /// Returns the URL of an origin that contains the given revision/release
+    pub async fn get_origin(&self, revrel: usize, metrics: &mut Metrics) -> Result<Option<String>> {
+        let (r_in_o_scan_init_metric, r_in_o_scan_metrics, mut r_in_o_batches) = self
+            .query_r_in_o(
+                Arc::new([u64::try_from(revrel).expect("node id overflowed u64")]),
+                Some(1),
+            )
+            .await?;
+        metrics.r_in_o_init += r_in_o_scan_init_metric;
+        let origin = match r_in_o_batches.next().await {
+            Some(Ok(batch)) => {
+                let oris = batch
+                    .column_by_name("ori")
+                    .context("Could not get 'ori' column from batch")?
+                    .as_primitive_opt::<UInt64Type>()
+                    .context("'ori' column is not UInt64Array")?;
                 match oris.values().first() {
                     // pick any of the origins
                     Some(&ori) => self
@@ -615,11 +1629,30 @@ impl<
         Ok(origin)
     }
 
-    /// Given a content SWHID, returns any of the revision/release that SWHID is in.
+    /// Returns statistics of a content from cardinality indexes, to plan queries
+    pub fn content_statistics(&self, node_id: NodeId) -> ContentStatistics {
+        let indexes = &self.db.cardinality_indexes;
+        let cnt = usize::try_from(node_id).expect("node id overflowed usize");
+        ContentStatistics {
+            c_in_r_revrels: indexes.c_in_r.as_ref().map(|counts| counts.count(cnt)),
+            c_in_d_dirs: indexes.c_in_d.as_ref().map(|counts| counts.count(cnt)),
+            c_in_d_in_r_revrels: indexes.c_in_d_in_r.as_ref().map(|counts| counts.count(cnt)),
+            d_in_r_files: indexes
+                .manifests
+                .get("frontier_directories_in_revisions")
+                .map(|manifest| manifest.num_nonempty_files()),
+        }
+    }
+
+    /// Given a content SWHID, returns any of the revision/release authored in `dates` that
+    /// SWHID is in.
+    ///
+    /// Tables are read as planned by [`WhereIsOnePlan`] from the content's statistics.
     #[instrument(skip(self))]
     pub async fn where_is_one(
         &self,
         swhid: &str,
+        dates: AuthorDateRange,
     ) -> Result<(Metrics, proto::WhereIsOneResult), ProvenanceQueryError> {
         let mut metrics = Metrics::default();
         let node_id = self
@@ -632,96 +1665,24 @@ impl<
             tracing::trace!("Query node id: {}", node_id)
         }
 
-        let (scan_init_metrics, scan_metrics, c_in_r_batches) =
-            self.query_c_in_r_one(node_id).await?;
-        metrics.c_in_r_init = scan_init_metrics;
-        metrics.c_in_r_scan = scan_metrics;
+        let plan = WhereIsOnePlan::new(&self.content_statistics(node_id), dates);
+        tracing::debug!("Plan: {:?}", plan);
 
-        // Translate results' node ids to SWHIDs
-        // Note: c_in_r_batches may have more than one row; the above filter only guarantees there
-        // is at most one RecordBatch.
-        let mut anchors = self.swhid(c_in_r_batches, "cnt", "revrel").await?;
-
-        // And return the first result
-        if let Some((cnt, revrel)) = anchors.pop() {
-            let origin = match revrel {
-                Some((revrel_id, _revrel_swhid)) => {
-                    self.get_origin(
-                        usize::try_from(revrel_id).expect("node id overflowed usize"),
-                        &mut metrics,
-                    )
-                    .await?
+        for &source in &plan.sources {
+            let revrel = match source {
+                WhereIsOneSource::ContentsInRevisions => {
+                    self.where_is_one_in_c_in_r(node_id, dates, &mut metrics)
+                        .await?
+                }
+                WhereIsOneSource::ThroughFrontierDirectories => {
+                    tracing::debug!("Looking up c_in_d + d_in_r");
+                    self.where_is_one_through_frontiers(node_id, dates, &plan, &mut metrics)
+                        .await?
                 }
-                None => None,
             };
-            return Ok((
-                metrics,
-                proto::WhereIsOneResult {
-                    swhid: cnt.to_string(),
-                    anchor: revrel.map(|(_revrel_id, revrel_swhid)| revrel_swhid.to_string()),
-                    origin,
-                },
-            ));
-        }
-
-        tracing::debug!("Looking up c_in_d + d_in_r");
-        // First look up the list of directories
-        let (c_in_d_scan_init_metrics, c_in_d_scan_metrics, mut c_in_d_batches) =
-            self.query_c_in_d(Arc::new([node_id])).await?;
-        metrics.c_in_d_init = c_in_d_scan_init_metrics;
-        while let Some(c_in_d_batch) = c_in_d_batches.next().await {
-            let c_in_d_batch = c_in_d_batch?;
-            let dirs = c_in_d_batch
-                .column_by_name("dir")
-                .context("Could not get 'dir' column from batch")?
-                .as_primitive_opt::<UInt64Type>()
-                .context("'dir' column is not UInt64Array")?;
-            // For each directory...
-            for dir in dirs {
-                let dir = dir.expect("'dir' is null");
-                // ...query the list of revisions this directory is in
-                let (scan_init_metrics, scan_metrics, d_in_r_batches) =
-                    self.query_d_in_r_one(dir).await?;
-                metrics.d_in_r_init += scan_init_metrics;
-                metrics.d_in_r_scan += scan_metrics;
-
-                // Join the single content with the results from d_in_r.
-                // XXX: This is going to be more complicated when this function adds support for
-                // multiple contents at once!
-                let Some(d_in_r_batch) = d_in_r_batches.into_iter().next() else {
-                    // Shouldn't happen
-                    tracing::error!(
-                        "Directory {} is in no revision?!",
-                        self.graph
-                            .properties()
-                            .swhid(dir.try_into().expect("Node id overflowed usize"))
-                    );
-                    continue;
-                };
-
-                let Some(&revrel) = d_in_r_batch
-                    .column_by_name("revrel")
-                    .context("Could not get 'revrel' column from batch")?
-                    .as_primitive_opt::<UInt64Type>()
-                    .context("Could not cast 'revrel' column as UInt64Array")?
-                    .values()
-                    // pick any of the revrels
-                    .first()
-                else {
-                    // Shouldn't happen
-                    tracing::error!(
-                        "d_in_r_batch for directory {} is empty",
-                        self.graph
-                            .properties()
-                            .swhid(dir.try_into().expect("Node id overflowed usize"))
-                    );
-                    continue;
-                };
+            if let Some(revrel) = revrel {
                 let revrel = usize::try_from(revrel).expect("node id overflowed usize");
-
                 let origin = self.get_origin(revrel, &mut metrics).await?;
-
-                metrics.c_in_d_scan += c_in_d_scan_metrics;
                 return Ok((
                     metrics,
                     proto::WhereIsOneResult {
@@ -732,11 +1693,12 @@ impl<
                             .to_string(),
                         anchor: Some(self.graph.properties().swhid(revrel).to_string()),
                         origin,
+                        author_date: None,
+                        timed_out: false,
                     },
                 ));
             }
         }
-        metrics.c_in_d_scan += c_in_d_scan_metrics;
 
         // No result
         Ok((
@@ -747,4 +1709,1044 @@ impl<
             },
         ))
     }
+
+    /// Returns any revision/release authored in `dates` which contains the content outside
+    /// frontier directories
+    async fn where_is_one_in_c_in_r(
+        &self,
+        node_id: NodeId,
+        dates: AuthorDateRange,
+        metrics: &mut Metrics,
+    ) -> Result<Option<NodeId>> {
+        let (scan_init_metrics, scan_metrics, c_in_r_batches) =
+            self.query_c_in_r_one(node_id, dates).await?;
+        metrics.c_in_r_init = scan_init_metrics;
+        metrics.c_in_r_scan = scan_metrics;
+
+        // Note: c_in_r_batches may have more than one row; the limit only guarantees there
+        // is at most one RecordBatch.
+        for batch in &c_in_r_batches {
+            if let Some(&revrel) = node_id_column(batch, "revrel")?.first() {
+                return Ok(Some(revrel));
+            }
+        }
+        Ok(None)
+    }
+
+    /// Returns any revision/release authored in `dates` which contains the content through
+    /// a frontier directory, looking up frontier directories in d_in_r in batches as
+    /// planned.
+    ///
+    /// If the first frontier directories read from c_in_d (up to the plan's
+    /// `c_in_d_limit`) are in no revision/release, all of them are read again.
+    async fn where_is_one_through_frontiers(
+        &self,
+        node_id: NodeId,
+        dates: AuthorDateRange,
+        plan: &WhereIsOnePlan,
+        metrics: &mut Metrics,
+    ) -> Result<Option<NodeId>> {
+        let (revrel, num_dirs) = self
+            .where_is_one_through_some_frontiers(node_id, dates, plan, plan.c_in_d_limit, metrics)
+            .await?;
+        if revrel.is_some() || num_dirs == 0 || plan.c_in_d_limit.is_none() {
+            return Ok(revrel);
+        }
+        // eg. frontier directories whose revisions/releases were not archived
+        tracing::debug!("No revision/release in the first {num_dirs} frontier directories");
+        let (revrel, _num_dirs) = self
+            .where_is_one_through_some_frontiers(node_id, dates, plan, None, metrics)
+            .await?;
+        Ok(revrel)
+    }
+
+    /// Same as [`Self::where_is_one_through_frontiers`], but reads at most `c_in_d_limit`
+    /// rows from c_in_d, and also returns the number of frontier directories looked up
+    async fn where_is_one_through_some_frontiers(
+        &self,
+        node_id: NodeId,
+        dates: AuthorDateRange,
+        plan: &WhereIsOnePlan,
+        c_in_d_limit: Option<usize>,
+        metrics: &mut Metrics,
+    ) -> Result<(Option<NodeId>, usize)> {
+        let d_in_r_counts = self.db.cardinality_indexes.d_in_r.as_ref();
+
+        // First look up the list of directories...
+        let (c_in_d_scan_init_metrics, c_in_d_scan_metrics, mut c_in_d_batches) = self
+            .query_c_in_d_with_columns(Arc::new([node_id]), c_in_d_limit, &[])
+            .await?;
+        metrics.c_in_d_init += c_in_d_scan_init_metrics;
+
+        // ... then the revisions/releases of batches of directories, stopping at the first
+        // batch with one
+        let mut record_d_in_r_result = |(scan_init_metrics, scan_metrics, revrel): (
+            TableScanInitMetrics,
+            TableScanMetrics,
+            Option<NodeId>,
+        )| {
+            metrics.d_in_r_init += scan_init_metrics;
+            metrics.d_in_r_scan += scan_metrics;
+            revrel
+        };
+        let mut d_in_r_queries = FuturesUnordered::new();
+        let mut dirs = Vec::new();
+        let mut dirs_revrels = 0u64;
+        let mut num_dirs = 0usize;
+        let mut revrel = None;
+        'c_in_d: while let Some(c_in_d_batch) = c_in_d_batches.next().await {
+            for &dir in node_id_column(&c_in_d_batch?, "dir")? {
+                let dir_revrels = d_in_r_counts.map_or(1, |counts| {
+                    counts.count(usize::try_from(dir).expect("node id overflowed usize"))
+                });
+                if dir_revrels == 0 {
+                    continue;
+                }
+                dirs.push(dir);
+                dirs_revrels = dirs_revrels.saturating_add(dir_revrels);
+                num_dirs += 1;
+                if dirs.len() >= plan.d_in_r_batch_dirs || dirs_revrels >= plan.d_in_r_batch_revrels
+                {
+                    d_in_r_queries.push(self.query_d_in_r_any(std::mem::take(&mut dirs), dates));
+                    dirs_revrels = 0;
+                    if d_in_r_queries.len() >= plan.d_in_r_concurrency {
+                        if let Some(result) = d_in_r_queries.next().await {
+                            revrel = record_d_in_r_result(result?);
+                            if revrel.is_some() {
+                                break 'c_in_d;
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        if revrel.is_none() && !dirs.is_empty() {
+            d_in_r_queries.push(self.query_d_in_r_any(dirs, dates));
+        }
+        while revrel.is_none() {
+            let Some(result) = d_in_r_queries.next().await else {
+                break;
+            };
+            revrel = record_d_in_r_result(result?);
+        }
+        metrics.c_in_d_scan += c_in_d_scan_metrics;
+
+        if revrel.is_none() && num_dirs > 0 && dates.is_unbounded() && c_in_d_limit.is_none() {
+            // Shouldn't happen
+            tracing::error!(
+                "Frontier directories of {} are in no revision?!",
+                self.graph
+                    .properties()
+                    .swhid(usize::try_from(node_id).expect("node id overflowed usize"))
+            );
+        }
+        Ok((revrel, num_dirs))
+    }
+
+    /// Calls [`Self::where_is_one`] or [`Self::where_is_earliest`], depending on `mode`
+    pub async fn where_is_one_by_mode(
+        &self,
+        swhid: &str,
+        dates: AuthorDateRange,
+        mode: LookupMode,
+    ) -> Result<(Metrics, proto::WhereIsOneResult), ProvenanceQueryError> {
+        match mode {
+            LookupMode::Any => self.where_is_one(swhid, dates).await,
+            LookupMode::Earliest => self.where_is_earliest(swhid, dates).await,
+        }
+    }
+
+    /// Given a content SWHID, returns the earliest revision/release authored in `dates` that
+    /// SWHID is in, with its author date.
+    ///
+    /// This is a single lookup in the earliest_occurrences table, unless the database has
+    /// none, or `dates.after` is later than the content's first occurrence: then all
+    /// occurrences of the content in `dates` are read to find the earliest one.
+    ///
+    /// Revisions/releases with the same author date are ordered by node id.
+    #[instrument(skip(self))]
+    pub async fn where_is_earliest(
+        &self,
+        swhid: &str,
+        dates: AuthorDateRange,
+    ) -> Result<(Metrics, proto::WhereIsOneResult), ProvenanceQueryError> {
+        let mut metrics = Metrics::default();
+        let node_id = self
+            .node_id(&[swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+
+        let mut earliest = None;
+        if self.db.earliest_occurrences.is_some() {
+            let (scan_init_metrics, scan_metrics, batches) =
+                self.query_earliest_occurrences(Arc::new([node_id])).await?;
+            metrics.earliest_init = scan_init_metrics;
+            let batches = consume_batch_stream(batches, 1).await?;
+            metrics.earliest_scan =
+                Arc::try_unwrap(scan_metrics).expect("Dangling reference to scan_metrics");
+            let row = batches
+                .iter()
+                .find(|batch| batch.num_rows() > 0)
+                .map(|batch| -> Result<_> {
+                    let oris = batch
+                        .column_by_name("ori")
+                        .context("Could not get 'ori' column from batch")?
+                        .as_primitive_opt::<UInt64Type>()
+                        .context("'ori' column is not UInt64Array")?;
+                    Ok((
+                        author_date_column(batch, "revrel_author_date")?[0],
+                        node_id_column(batch, "revrel")?[0],
+                        oris.is_valid(0).then(|| oris.value(0)),
+                    ))
+                })
+                .transpose()?;
+            match row {
+                // Content is in no revision/release
+                None => {}
+                Some((author_date, revrel, ori)) if dates.contains(author_date) => {
+                    earliest = Some((author_date, revrel, ori));
+                }
+                // All occurrences are after 'before'
+                Some((author_date, _, _)) if !dates.overlaps(author_date, i64::MAX) => {}
+                // The first occurrence is before 'after', look for the first one after it
+                Some(_) => {
+                    earliest = self
+                        .scan_earliest_occurrence(node_id, dates, &mut metrics)
+                        .await?
+                        .map(|(author_date, revrel)| (author_date, revrel, None));
+                }
+            }
+        } else {
+            earliest = self
+                .scan_earliest_occurrence(node_id, dates, &mut metrics)
+                .await?
+                .map(|(author_date, revrel)| (author_date, revrel, None));
+        }
+
+        let Some((author_date, revrel, ori)) = earliest else {
+            return Ok((
+                metrics,
+                proto::WhereIsOneResult {
+                    swhid: swhid.to_string(),
+                    ..Default::default()
+                },
+            ));
+        };
+        let revrel = usize::try_from(revrel).expect("node id overflowed usize");
+        let origin = match ori {
+            Some(ori) => self
+                .graph
+                .properties()
+                .message(usize::try_from(ori).expect("node id overflowed usize"))
+                .map(|url| String::from_utf8_lossy(&url).into()),
+            None => self.get_origin(revrel, &mut metrics).await?,
+        };
+        Ok((
+            metrics,
+            proto::WhereIsOneResult {
+                swhid: self
+                    .graph
+                    .properties()
+                    .swhid(usize::try_from(node_id).expect("node id overflowed usize"))
+                    .to_string(),
+                anchor: Some(self.graph.properties().swhid(revrel).to_string()),
+                origin,
+                author_date: Some(author_date),
+                timed_out: false,
+            },
+        ))
+    }
+
+    /// Reads all occurrences of a content in revisions/releases authored in `dates`, and
+    /// returns the author date and node id of the earliest revision/release
+    async fn scan_earliest_occurrence(
+        &self,
+        node_id: NodeId,
+        dates: AuthorDateRange,
+        metrics: &mut Metrics,
+    ) -> Result<Option<(i64, NodeId)>> {
+        let mut earliest: Option<(i64, NodeId)> = None;
+        let mut update = |batch: &RecordBatch| -> Result<()> {
+            for (&revrel, &author_date) in std::iter::zip(
+                node_id_column(batch, "revrel")?,
+                author_date_column(batch, "revrel_author_date")?,
+            ) {
+                if earliest.map_or(true, |earliest| (author_date, revrel) < earliest) {
+                    earliest = Some((author_date, revrel));
+                }
+            }
+            Ok(())
+        };
+
+        let (scan_init_metrics, scan_metrics, mut c_in_r_batches) = self
+            .query_c_in_r_with_columns(Arc::new([node_id]), None, &["revrel_author_date"], dates)
+            .await?;
+        metrics.c_in_r_init += scan_init_metrics;
+        while let Some(batch) = c_in_r_batches.next().await {
+            update(&batch?)?;
+        }
+        drop(c_in_r_batches);
+        metrics.c_in_r_scan +=
+            Arc::try_unwrap(scan_metrics).expect("Dangling reference to scan_metrics");
+
+        let (scan_init_metrics, scan_metrics, mut c_in_d_batches) =
+            self.query_c_in_d(Arc::new([node_id])).await?;
+        metrics.c_in_d_init += scan_init_metrics;
+        let mut dirs = Vec::new();
+        while let Some(batch) = c_in_d_batches.next().await {
+            dirs.extend_from_slice(node_id_column(&batch?, "dir")?);
+        }
+        drop(c_in_d_batches);
+        metrics.c_in_d_scan +=
+            Arc::try_unwrap(scan_metrics).expect("Dangling reference to scan_metrics");
+        dirs.sort_unstable();
+        dirs.dedup();
+
+        if !dirs.is_empty() {
+            let (scan_init_metrics, scan_metrics, mut d_in_r_batches) = self
+                .query_d_in_r_with_columns(dirs.into(), None, &["revrel_author_date"], dates)
+                .await?;
+            metrics.d_in_r_init += scan_init_metrics;
+            while let Some(batch) = d_in_r_batches.next().await {
+                update(&batch?)?;
+            }
+            drop(d_in_r_batches);
+            metrics.d_in_r_scan +=
+                Arc::try_unwrap(scan_metrics).expect("Dangling reference to scan_metrics");
+        }
+
+        Ok(earliest)
+    }
+
+    /// Given a revision or release SWHID, returns all the contents it contains, using
+    /// [reverse indexes](crate::database::reverse_indexes).
+    ///
+    /// Contents are returned once for each frontier directory they are in, in addition to
+    /// once if they are reachable without going through any frontier directory.
+    #[instrument(skip(self))]
+    pub async fn list_contained_in(
+        self: &Arc<Self>,
+        swhid: &str,
+    ) -> Result<impl Stream<Item = proto::ContainedContent> + Send + 'static, ProvenanceQueryError>
+    {
+        let reverse_indexes = &self.db.reverse_indexes;
+        let (Some(cnt_in_revrel), Some(dir_in_revrel), Some(_)) = (
+            &reverse_indexes.cnt_in_revrel,
+            &reverse_indexes.dir_in_revrel,
+            &reverse_indexes.cnt_in_dir,
+        ) else {
+            return Err(ProvenanceQueryError::MissingIndex(
+                "reverse indexes were not built, see swh-provenance-index --reverse-indexes"
+                    .to_owned(),
+            ));
+        };
+
+        let node_id = self
+            .node_id(&[swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+        let node_id = usize::try_from(node_id).expect("node id overflowed usize");
+        match self.graph.properties().node_type(node_id) {
+            NodeType::Revision | NodeType::Release => (),
+            _ => return Err(ProvenanceClientError::NotAnAnchor(swhid.to_owned()).into()),
+        }
+
+        // The values of a single key are small enough to be collected, so the returned
+        // stream does not borrow from the database.
+        let contents: Vec<u64> = cnt_in_revrel.values(node_id).collect();
+        let frontier_directories: Vec<u64> = dir_in_revrel.values(node_id).collect();
+        tracing::debug!(
+            "{swhid} has {} contents outside frontier directories and {} frontier directories",
+            contents.len(),
+            frontier_directories.len()
+        );
+
+        let service = Arc::clone(self);
+        let contents_in_frontier_directories = futures::stream::iter(frontier_directories)
+            .flat_map(move |dir| {
+                let contents: Vec<u64> = service
+                    .db
+                    .reverse_indexes
+                    .cnt_in_dir
+                    .as_ref()
+                    .expect("cnt_in_dir reverse index is missing")
+                    .values(usize::try_from(dir).expect("node id overflowed usize"))
+                    .collect();
+                futures::stream::iter(contents.into_iter().map(move |cnt| (cnt, Some(dir))))
+            });
+
+        let service = Arc::clone(self);
+        Ok(
+            futures::stream::iter(contents.into_iter().map(|cnt| (cnt, None)))
+                .chain(contents_in_frontier_directories)
+                .map(move |(cnt, dir)| {
+                    let swhid = |node_id: u64| {
+                        service
+                            .graph
+                            .properties()
+                            .swhid(usize::try_from(node_id).expect("node id overflowed usize"))
+                            .to_string()
+                    };
+                    proto::ContainedContent {
+                        swhid: swhid(cnt),
+                        frontier_directory: dir.map(swhid),
+                    }
+                }),
+        )
+    }
+
+    /// Given content SWHIDs and the SWHID of an origin, returns for each content a
+    /// revision/release of that origin which contains it, if any.
+    ///
+    /// Unknown contents are omitted from the result.
+    ///
+    /// Revisions/releases of the origin are listed from its
+    /// [reverse index](crate::database::reverse_indexes), then semi-joined with the
+    /// revisions/releases of the contents from c_in_r, then from c_in_d and d_in_r for
+    /// contents which were not found in c_in_r.
+    #[instrument(skip(self, swhids))]
+    pub async fn where_are_one_in_origin(
+        &self,
+        swhids: &[String],
+        origin_swhid: &str,
+        dates: AuthorDateRange,
+    ) -> Result<Vec<proto::WhereIsOneResult>, ProvenanceQueryError> {
+        let Some(revrel_in_ori) = &self.db.reverse_indexes.revrel_in_ori else {
+            return Err(ProvenanceQueryError::MissingIndex(
+                "reverse indexes were not built, see swh-provenance-index --reverse-indexes"
+                    .to_owned(),
+            ));
+        };
+
+        let ori = self
+            .node_id(&[origin_swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+        let ori = usize::try_from(ori).expect("node id overflowed usize");
+        if self.graph.properties().node_type(ori) != NodeType::Origin {
+            return Err(ProvenanceClientError::NotAnOrigin(origin_swhid.to_owned()).into());
+        }
+        let origin_url = self
+            .graph
+            .properties()
+            .message(ori)
+            .map(|url| String::from_utf8_lossy(&url).into_owned());
+
+        let mut node_ids = Vec::with_capacity(swhids.len());
+        for swhid in swhids {
+            match self.node_id(&[swhid]).await {
+                Ok(ids) => node_ids.extend(ids),
+                Err(ProvenanceClientError::Swhid(NodeIdFromSwhidError::UnknownSwhid(_))) => (),
+                Err(e) => return Err(e.into()),
+            }
+        }
+        node_ids.sort_unstable();
+        node_ids.dedup();
+
+        // Sorted, as all values of a key in reverse indexes
+        let origin_revrels: Vec<NodeId> = revrel_in_ori.values(ori).collect();
+        tracing::debug!(
+            "{origin_swhid} has {} revisions/releases",
+            origin_revrels.len()
+        );
+        let in_origin = |revrel: &NodeId| origin_revrels.binary_search(revrel).is_ok();
+
+        // content -> revision/release in the origin
+        let mut anchors = HashMap::<NodeId, NodeId>::new();
+
+        // Semi-join with contents-in-revisions
+        if !node_ids.is_empty() && !origin_revrels.is_empty() {
+            let (_scan_init_metrics, _scan_metrics, mut c_in_r_batches) = self
+                .query_c_in_r_with_columns(node_ids.clone().into(), None, &[], dates)
+                .await?;
+            while let Some(batch) = c_in_r_batches.next().await {
+                let batch = batch?;
+                for (&cnt, revrel) in std::iter::zip(
+                    node_id_column(&batch, "cnt")?,
+                    node_id_column(&batch, "revrel")?,
+                ) {
+                    if in_origin(revrel) {
+                        anchors.entry(cnt).or_insert(*revrel);
+                    }
+                }
+            }
+        }
+
+        // Semi-join remaining contents with contents-in-directories ⋈ directories-in-revisions
+        let remaining_node_ids: Vec<NodeId> = node_ids
+            .iter()
+            .copied()
+            .filter(|cnt| !anchors.contains_key(cnt))
+            .collect();
+        if !remaining_node_ids.is_empty() && !origin_revrels.is_empty() {
+            let mut dir_contents = HashMap::<NodeId, Vec<NodeId>>::new();
+            let (_scan_init_metrics, _scan_metrics, mut c_in_d_batches) =
+                self.query_c_in_d(remaining_node_ids.into()).await?;
+            while let Some(batch) = c_in_d_batches.next().await {
+                let batch = batch?;
+                for (&cnt, &dir) in std::iter::zip(
+                    node_id_column(&batch, "cnt")?,
+                    node_id_column(&batch, "dir")?,
+                ) {
+                    dir_contents.entry(dir).or_default().push(cnt);
+                }
+            }
+
+            let mut dirs: Vec<NodeId> = dir_contents.keys().copied().collect();
+            dirs.sort_unstable();
+            if !dirs.is_empty() {
+                let (_scan_init_metrics, _scan_metrics, mut d_in_r_batches) = self
+                    .query_d_in_r_with_columns(dirs.into(), None, &[], dates)
+                    .await?;
+                while let Some(batch) = d_in_r_batches.next().await {
+                    let batch = batch?;
+                    for (dir, revrel) in std::iter::zip(
+                        node_id_column(&batch, "dir")?,
+                        node_id_column(&batch, "revrel")?,
+                    ) {
+                        if in_origin(revrel) {
+                            for &cnt in dir_contents.get(dir).into_iter().flatten() {
+                                anchors.entry(cnt).or_insert(*revrel);
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
+        let swhid = |node_id: NodeId| {
+            self.graph
+                .properties()
+                .swhid(usize::try_from(node_id).expect("node id overflowed usize"))
+                .to_string()
+        };
+        Ok(node_ids
+            .into_iter()
+            .map(|cnt| {
+                let anchor = anchors.get(&cnt).copied();
+                proto::WhereIsOneResult {
+                    swhid: swhid(cnt),
+                    anchor: anchor.map(&swhid),
+                    origin: anchor.and(origin_url.clone()),
+                    author_date: None,
+                    timed_out: false,
+                }
+            })
+            .collect())
+    }
+
+    /// Given content [`NodeId`]s (which must be sorted), returns the sorted list of
+    /// revisions/releases each of them is in, from c_in_r and c_in_d ⋈ d_in_r
+    ///
+    /// Fails with [`ProvenanceClientError::TooManyAnchors`] as soon as more than
+    /// `max_anchors` rows are read for a content, if set.
+    #[instrument(skip(self, node_ids))]
+    async fn anchor_posting_lists(
+        &self,
+        node_ids: &[NodeId],
+        max_anchors: Option<usize>,
+    ) -> Result<HashMap<NodeId, Vec<NodeId>>, ProvenanceQueryError> {
+        let mut posting_lists = HashMap::<NodeId, Vec<NodeId>>::new();
+        if node_ids.is_empty() {
+            return Ok(posting_lists);
+        }
+        let max_anchors = max_anchors.unwrap_or(usize::MAX);
+        let mut push = |cnt: NodeId, revrel: NodeId| {
+            let posting_list = posting_lists.entry(cnt).or_default();
+            if posting_list.len() >= max_anchors {
+                return Err(ProvenanceClientError::TooManyAnchors(
+                    self.graph
+                        .properties()
+                        .swhid(usize::try_from(cnt).expect("node id overflowed usize"))
+                        .to_string(),
+                    max_anchors,
+                ));
+            }
+            posting_list.push(revrel);
+            Ok(())
+        };
+
+        let (_scan_init_metrics, _scan_metrics, mut c_in_r_batches) =
+            self.query_c_in_r(node_ids.into(), None).await?;
+        while let Some(batch) = c_in_r_batches.next().await {
+            let batch = batch?;
+            for (&cnt, &revrel) in std::iter::zip(
+                node_id_column(&batch, "cnt")?,
+                node_id_column(&batch, "revrel")?,
+            ) {
+                push(cnt, revrel)?;
+            }
+        }
+
+        let mut dir_contents = HashMap::<NodeId, Vec<NodeId>>::new();
+        let (_scan_init_metrics, _scan_metrics, mut c_in_d_batches) =
+            self.query_c_in_d(node_ids.into()).await?;
+        while let Some(batch) = c_in_d_batches.next().await {
+            let batch = batch?;
+            for (&cnt, &dir) in std::iter::zip(
+                node_id_column(&batch, "cnt")?,
+                node_id_column(&batch, "dir")?,
+            ) {
+                dir_contents.entry(dir).or_default().push(cnt);
+            }
+        }
+        let mut dirs: Vec<NodeId> = dir_contents.keys().copied().collect();
+        dirs.sort_unstable();
+        if !dirs.is_empty() {
+            let (_scan_init_metrics, _scan_metrics, mut d_in_r_batches) =
+                self.query_d_in_r(dirs.into(), None).await?;
+            while let Some(batch) = d_in_r_batches.next().await {
+                let batch = batch?;
+                for (dir, &revrel) in std::iter::zip(
+                    node_id_column(&batch, "dir")?,
+                    node_id_column(&batch, "revrel")?,
+                ) {
+                    for &cnt in dir_contents.get(dir).into_iter().flatten() {
+                        push(cnt, revrel)?;
+                    }
+                }
+            }
+        }
+
+        for posting_list in posting_lists.values_mut() {
+            posting_list.sort_unstable();
+            posting_list.dedup();
+        }
+        Ok(posting_lists)
+    }
+
+    /// Given content SWHIDs, returns the revisions/releases which contain at least
+    /// `min_contents` of them (all of them if `None`), along with the number of contents
+    /// they contain, by decreasing number of contents.
+    ///
+    /// Unknown contents are counted as if they were in no revision/release. Fails with
+    /// [`ProvenanceClientError::TooManyAnchors`] if a content is in more than
+    /// [`QueryConfig::max_co_occurrence_anchors`] revisions/releases.
+    #[instrument(skip(self, swhids))]
+    pub async fn find_co_occurrences(
+        &self,
+        swhids: &[String],
+        min_contents: Option<usize>,
+        max_results: usize,
+    ) -> Result<Vec<proto::CoOccurrence>, ProvenanceQueryError> {
+        let mut node_ids = Vec::with_capacity(swhids.len());
+        let mut num_unknown_contents = 0;
+        for swhid in swhids {
+            match self.node_id(&[swhid]).await {
+                Ok(ids) => node_ids.extend(ids),
+                Err(ProvenanceClientError::Swhid(NodeIdFromSwhidError::UnknownSwhid(_))) => {
+                    num_unknown_contents += 1
+                }
+                Err(e) => return Err(e.into()),
+            }
+        }
+        node_ids.sort_unstable();
+        node_ids.dedup();
+        let min_contents = min_contents
+            .unwrap_or(node_ids.len() + num_unknown_contents)
+            .max(1);
+
+        // Reject contents known to be in too many revisions/releases before reading any
+        let max_anchors = self.config.max_co_occurrence_anchors;
+        for &node_id in &node_ids {
+            let statistics = self.content_statistics(node_id);
+            let num_anchors = statistics
+                .c_in_r_revrels
+                .zip(statistics.c_in_d_in_r_revrels)
+                .map(|(c_in_r_revrels, c_in_d_in_r_revrels)| c_in_r_revrels + c_in_d_in_r_revrels);
+            if num_anchors.is_some_and(|num_anchors| {
+                usize::try_from(num_anchors).map_or(true, |num_anchors| num_anchors > max_anchors)
+            }) {
+                return Err(ProvenanceClientError::TooManyAnchors(
+                    self.graph
+                        .properties()
+                        .swhid(usize::try_from(node_id).expect("node id overflowed usize"))
+                        .to_string(),
+                    max_anchors,
+                )
+                .into());
+            }
+        }
+
+        let posting_lists: Vec<_> = self
+            .anchor_posting_lists(&node_ids, Some(max_anchors))
+            .await?
+            .into_values()
+            .collect();
+        tracing::debug!(
+            "Got {} posting lists with {} anchors in total",
+            posting_lists.len(),
+            posting_lists.iter().map(Vec::len).sum::<usize>()
+        );
+
+        Ok(
+            count_co_occurrences(&posting_lists, min_contents, max_results)
+                .into_iter()
+                .map(|(anchor, count)| proto::CoOccurrence {
+                    anchor: self
+                        .graph
+                        .properties()
+                        .swhid(usize::try_from(anchor).expect("node id overflowed usize"))
+                        .to_string(),
+                    num_contents: u64::try_from(count).expect("count overflowed u64"),
+                })
+                .collect(),
+        )
+    }
+
+    /// Given a content SWHID, returns all the revisions/releases it is in, with its path in
+    /// them and their author date, from c_in_r and c_in_d ⋈ d_in_r.
+    ///
+    /// Occurrences are streamed in arbitrary order as tables are read, unless `max_results`
+    /// is set: then only the first `max_results` occurrences in [`OccurrenceKey`] order are
+    /// returned, and the last one has a `next_page_token` if there are more. Either way,
+    /// only occurrences after `page_token` and in revisions/releases authored in `dates` are
+    /// returned.
+    #[instrument(skip(self))]
+    pub async fn where_are_all(
+        self: &Arc<Self>,
+        swhid: &str,
+        max_results: Option<usize>,
+        page_token: Option<&str>,
+        dates: AuthorDateRange,
+    ) -> Result<
+        impl Stream<Item = Result<proto::Occurrence, ProvenanceQueryError>> + Send + 'static,
+        ProvenanceQueryError,
+    > {
+        let after = page_token.map(OccurrenceKey::from_page_token).transpose()?;
+        let node_id = self
+            .node_id(&[swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+
+        let (mut tx, rx) = futures::channel::mpsc::channel(OCCURRENCES_BUFFER_SIZE);
+        let service = Arc::clone(self);
+        let collector = OccurrenceCollector::new(after, max_results);
+        // The task outlives this call, so it needs the deadline explicitly
+        let request_deadline = deadline::current();
+        tokio::spawn(deadline::with_deadline(request_deadline, async move {
+            if let Err(e) = service
+                .send_all_occurrences(node_id, dates, collector, &mut tx)
+                .await
+            {
+                // Ignore errors, the client may be gone already
+                let _ = tx.send(Err(e)).await;
+            }
+        }));
+        Ok(rx)
+    }
+
+    /// Reads all occurrences of a content and sends those picked by the `collector`
+    #[instrument(skip(self, collector, tx))]
+    async fn send_all_occurrences(
+        &self,
+        node_id: NodeId,
+        dates: AuthorDateRange,
+        mut collector: OccurrenceCollector,
+        tx: &mut futures::channel::mpsc::Sender<Result<proto::Occurrence, ProvenanceQueryError>>,
+    ) -> Result<(), ProvenanceQueryError> {
+        let (path_columns, dated_path_columns): (&'static [&str], &'static [&str]) =
+            if self.db.paths.is_some() {
+                (&["path_id"], &["revrel_author_date", "path_id"])
+            } else {
+                (&["path"], &["revrel_author_date", "path"])
+            };
+
+        if collector.wants_source(0) {
+            let (_scan_init_metrics, _scan_metrics, mut c_in_r_batches) = self
+                .query_c_in_r_with_columns(Arc::new([node_id]), None, dated_path_columns, dates)
+                .await?;
+            while let Some(batch) = c_in_r_batches.next().await {
+                let batch = batch?;
+                let paths = self.batch_paths(&batch).await?;
+                for ((&anchor, &author_date), path) in std::iter::zip(
+                    node_id_column(&batch, "revrel")?,
+                    author_date_column(&batch, "revrel_author_date")?,
+                )
+                .zip(paths)
+                {
+                    collector.push(
+                        OccurrenceKey {
+                            source: 0,
+                            anchor,
+                            path,
+                        },
+                        author_date,
+                    );
+                }
+                if !self
+                    .send_occurrences(tx, collector.take_ready(), None)
+                    .await
+                {
+                    return Ok(()); // client is gone
+                }
+            }
+        }
+
+        if collector.wants_source(1) {
+            // Paths of the content in each frontier directory. Unlike occurrences, there
+            // are few enough of them to be collected, and they are needed for the join.
+            let mut dir_paths = HashMap::<NodeId, Vec<Vec<u8>>>::new();
+            let (_scan_init_metrics, _scan_metrics, mut c_in_d_batches) = self
+                .query_c_in_d_with_columns(Arc::new([node_id]), None, path_columns)
+                .await?;
+            while let Some(batch) = c_in_d_batches.next().await {
+                let batch = batch?;
+                let paths = self.batch_paths(&batch).await?;
+                for (&dir, path) in node_id_column(&batch, "dir")?.iter().zip(paths) {
+                    dir_paths.entry(dir).or_default().push(path);
+                }
+            }
+
+            let mut dirs: Vec<NodeId> = dir_paths.keys().copied().collect();
+            dirs.sort_unstable();
+            if !dirs.is_empty() {
+                let (_scan_init_metrics, _scan_metrics, mut d_in_r_batches) = self
+                    .query_d_in_r_with_columns(dirs.into(), None, dated_path_columns, dates)
+                    .await?;
+                while let Some(batch) = d_in_r_batches.next().await {
+                    let batch = batch?;
+                    let paths = self.batch_paths(&batch).await?;
+                    for (((dir, &anchor), &author_date), dir_path) in std::iter::zip(
+                        std::iter::zip(
+                            node_id_column(&batch, "dir")?,
+                            node_id_column(&batch, "revrel")?,
+                        ),
+                        author_date_column(&batch, "revrel_author_date")?,
+                    )
+                    .zip(paths)
+                    {
+                        // Directory paths end with a '/', or are empty for root directories
+                        for path_in_dir in dir_paths.get(dir).into_iter().flatten() {
+                            collector.push(
+                                OccurrenceKey {
+                                    source: 1,
+                                    anchor,
+                                    path: [dir_path.as_slice(), path_in_dir.as_slice()].concat(),
+                                },
+                                author_date,
+                            );
+                        }
+                    }
+                    if !self
+                        .send_occurrences(tx, collector.take_ready(), None)
+                        .await
+                    {
+                        return Ok(()); // client is gone
+                    }
+                }
+            }
+        }
+
+        let (occurrences, next) = collector.finish();
+        self.send_occurrences(tx, occurrences, next).await;
+        Ok(())
+    }
+
+    /// Sends occurrences to the client, with `next` as page token of the last one.
+    ///
+    /// Returns `false` if the client is gone.
+    async fn send_occurrences(
+        &self,
+        tx: &mut futures::channel::mpsc::Sender<Result<proto::Occurrence, ProvenanceQueryError>>,
+        occurrences: Vec<(OccurrenceKey, i64)>,
+        next: Option<OccurrenceKey>,
+    ) -> bool {
+        let num_occurrences = occurrences.len();
+        for (i, (key, author_date)) in occurrences.into_iter().enumerate() {
+            let occurrence = proto::Occurrence {
+                anchor: self
+                    .graph
+                    .properties()
+                    .swhid(usize::try_from(key.anchor).expect("node id overflowed usize"))
+                    .to_string(),
+                path: key.path,
+                author_date,
+                next_page_token: next
+                    .as_ref()
+                    .filter(|_| i + 1 == num_occurrences)
+                    .map(OccurrenceKey::to_page_token),
+            };
+            if tx.send(Ok(occurrence)).await.is_err() {
+                return false;
+            }
+        }
+        true
+    }
+
+    /// Given a content [`NodeId`], returns the sorted list of revisions/releases it is in
+    async fn anchors(&self, node_id: NodeId) -> Result<Vec<NodeId>, ProvenanceQueryError> {
+        Ok(self
+            .anchor_posting_lists(&[node_id], None)
+            .await?
+            .remove(&node_id)
+            .unwrap_or_default())
+    }
+
+    /// Given a content SWHID, returns the number of revisions/releases it is in.
+    ///
+    /// In [`CountMode::Approximate`], frequent contents are counted from their sketch, and
+    /// others from per-key counts, which count revisions/releases once for each frontier
+    /// directory they contain the content in (so they may overestimate).
+    #[instrument(skip(self))]
+    pub async fn count_anchors(
+        &self,
+        swhid: &str,
+        mode: CountMode,
+    ) -> Result<proto::Count, ProvenanceQueryError> {
+        let node_id = self
+            .node_id(&[swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+        let indexes = &self.db.cardinality_indexes;
+
+        if mode == CountMode::Approximate {
+            if let Some(sketch) = indexes
+                .anchor_sketches
+                .as_ref()
+                .and_then(|sketches| sketches.get(node_id))
+            {
+                return Ok(proto::Count {
+                    count: sketch.estimate().round() as u64,
+                    exact: false,
+                });
+            }
+        }
+
+        if let (Some(c_in_r_counts), Some(c_in_d_in_r_counts)) =
+            (&indexes.c_in_r, &indexes.c_in_d_in_r)
+        {
+            let cnt = usize::try_from(node_id).expect("node id overflowed usize");
+            let outside_frontiers = c_in_r_counts.count(cnt);
+            let through_frontiers = c_in_d_in_r_counts.count(cnt);
+            if through_frontiers == 0 {
+                // Counts of c_in_r are counts of distinct revisions/releases
+                return Ok(proto::Count {
+                    count: outside_frontiers,
+                    exact: true,
+                });
+            }
+            if mode == CountMode::Approximate {
+                return Ok(proto::Count {
+                    count: outside_frontiers + through_frontiers,
+                    exact: false,
+                });
+            }
+        }
+
+        let anchors = self.anchors(node_id).await?;
+        Ok(proto::Count {
+            count: u64::try_from(anchors.len()).expect("count overflowed u64"),
+            exact: true,
+        })
+    }
+
+    /// Given a content SWHID, returns the number of origins it is in.
+    ///
+    /// In [`CountMode::Approximate`], frequent contents are counted from their sketch.
+    /// Others can only be counted by reading their revisions/releases, so they fail with
+    /// [`ProvenanceQueryError::MissingIndex`] unless cardinality indexes show they are in
+    /// none.
+    #[instrument(skip(self))]
+    pub async fn count_origins(
+        &self,
+        swhid: &str,
+        mode: CountMode,
+    ) -> Result<proto::Count, ProvenanceQueryError> {
+        let node_id = self
+            .node_id(&[swhid])
+            .await?
+            .pop()
+            .expect("node_id returned empty Ok result");
+        let indexes = &self.db.cardinality_indexes;
+
+        if mode == CountMode::Approximate {
+            if let Some(sketch) = indexes
+                .origin_sketches
+                .as_ref()
+                .and_then(|sketches| sketches.get(node_id))
+            {
+                return Ok(proto::Count {
+                    count: sketch.estimate().round() as u64,
+                    exact: false,
+                });
+            }
+            if let (Some(c_in_r_counts), Some(c_in_d_in_r_counts)) =
+                (&indexes.c_in_r, &indexes.c_in_d_in_r)
+            {
+                let cnt = usize::try_from(node_id).expect("node id overflowed usize");
+                if c_in_r_counts.count(cnt) == 0 && c_in_d_in_r_counts.count(cnt) == 0 {
+                    return Ok(proto::Count {
+                        count: 0,
+                        exact: true,
+                    });
+                }
+            }
+            return Err(ProvenanceQueryError::MissingIndex(format!(
+                "{swhid} has no sketch of origins, see swh-provenance-index --cardinality-indexes, or count in exact mode"
+            )));
+        }
+
+        let anchors = self.anchors(node_id).await?;
+        if anchors.is_empty() {
+            return Ok(proto::Count {
+                count: 0,
+                exact: true,
+            });
+        }
+
+        if let (Some(r_in_o_counts), &[anchor]) = (&indexes.r_in_o, anchors.as_slice()) {
+            // Counts of r_in_o are counts of distinct origins, so they are exact for a
+            // single revision/release
+            return Ok(proto::Count {
+                count: r_in_o_counts
+                    .count(usize::try_from(anchor).expect("node id overflowed usize")),
+                exact: true,
+            });
+        }
+
+        let mut origins = Vec::new();
+        let (_scan_init_metrics, _scan_metrics, mut r_in_o_batches) =
+            self.query_r_in_o(anchors.into(), None).await?;
+        while let Some(batch) = r_in_o_batches.next().await {
+            origins.extend_from_slice(node_id_column(&batch?, "ori")?);
+        }
+        origins.sort_unstable();
+        origins.dedup();
+        Ok(proto::Count {
+            count: u64::try_from(origins.len()).expect("count overflowed u64"),
+            exact: true,
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_count_co_occurrences() {
+        let posting_lists = vec![vec![1, 3, 5, 7], vec![3, 4, 7], vec![2, 3, 7, 8], vec![8]];
+        assert_eq!(
+            count_co_occurrences(&posting_lists, 1, usize::MAX),
+            vec![(3, 3), (7, 3), (8, 2), (1, 1), (2, 1), (4, 1), (5, 1)]
+        );
+        assert_eq!(
+            count_co_occurrences(&posting_lists, 2, usize::MAX),
+            vec![(3, 3), (7, 3), (8, 2)]
+        );
+        // Only the best ones are kept, ties broken by node id
+        assert_eq!(count_co_occurrences(&posting_lists, 1, 1), vec![(3, 3)]);
+        assert_eq!(
+            count_co_occurrences(&posting_lists, 1, 3),
+            vec![(3, 3), (7, 3), (8, 2)]
+        );
+        assert_eq!(count_co_occurrences(&posting_lists, 1, 0), vec![]);
+        assert_eq!(count_co_occurrences(&posting_lists, 4, usize::MAX), vec![]);
+    }
 }
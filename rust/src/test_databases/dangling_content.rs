@@ -14,21 +14,27 @@ use sux::prelude::BitVec;
 use sux::traits::BitVecOpsMut;
 use swh_graph::graph::*;
 use swh_graph::graph_builder::BuiltGraph;
-use swh_graph::swhid;
+use swh_graph::{swhid, SWHID};
 
 use swh_provenance_db_build::filters::NodeFilter;
 use swh_provenance_db_build::x_in_y_dataset::{
     cnt_in_dir_schema, cnt_in_dir_writer_properties, cnt_in_revrel_schema,
     cnt_in_revrel_writer_properties, dir_in_revrel_schema, dir_in_revrel_writer_properties,
-    revrel_in_ori_schema, revrel_in_ori_writer_properties,
+    revrel_in_ori_schema, revrel_in_ori_writer_properties, CntInDirTableBuilder,
+    CntInRevrelTableBuilder, DirInRevrelTableBuilder,
 };
 
-/// Builds a small graph where one content is in no revision
+/// Builds a small graph where one content is in no revision, and another is in more
+/// frontier directories which are in no revision than `WhereIsOne` reads at first
 ///
 /// ```text
-/// rev0 -> dir1 -> cnt3
+/// rev0 -> dir1 -> cnt2
+///                  ^
+/// dir5 ----------- +
+/// ...              |
+/// dir21 ---------- +
 ///
-/// dir4 -> cnt5
+/// dir3 -> cnt4
 /// ```
 pub fn gen_graph() -> BuiltGraph {
     use swh_graph::graph_builder::GraphBuilder;
@@ -65,9 +71,23 @@ pub fn gen_graph() -> BuiltGraph {
         .is_skipped_content(false)
         .content_length(1337)
         .done();
+    // Frontier directories whose revisions were not archived, written to c_in_d before
+    // dir1 as they have larger ids
+    let dangling_dirs: Vec<NodeId> = (5..=21)
+        .map(|i| {
+            let swhid: SWHID = format!("swh:1:dir:{i:040}")
+                .as_str()
+                .try_into()
+                .expect("invalid SWHID");
+            builder.node(swhid).unwrap().done()
+        })
+        .collect();
     builder.arc(0, 1);
     builder.dir_arc(1, 2, Permission::Content, b"README.md".to_vec());
     builder.dir_arc(3, 4, Permission::Content, b"parser.c".to_vec());
+    for dir in dangling_dirs {
+        builder.dir_arc(dir, 2, Permission::Content, b"README.md".to_vec());
+    }
     builder.done().expect("Could not build graph")
 }
 
@@ -77,13 +97,8 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
 
     // Build a placedholder for max_leaf_timestamps.bin, which normally contains
     // {dir: max(min(timestamp(rev) for rev in ancestors(cnt)) for cnt in descendants(dir))},
-    let max_timestamps = [
-        i64::MIN,
-        1, // swh:1:dir:0000000000000000000000000000000000000001
-        i64::MIN,
-        i64::MIN, // swh:1:dir:0000000000000000000000000000000000000003
-        i64::MIN,
-    ];
+    let mut max_timestamps = vec![i64::MIN; graph.num_nodes()];
+    max_timestamps[1] = 1; // swh:1:dir:0000000000000000000000000000000000000001
 
     // Build set of frontier directories, which would be stored in frontier_directories/*.parquet
     // in the real pipeline
@@ -92,6 +107,10 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         let node_id = graph.properties().node_id(swhid).expect("unknown SWHID");
         frontier_directories.set(node_id, true);
     }
+    for node_id in 5..graph.num_nodes() {
+        // Dangling directories from gen_graph()
+        frontier_directories.set(node_id, true);
+    }
 
     // contents-in-revisions
     let c_in_r = path.join("contents_in_revisions_without_frontiers");
@@ -100,14 +119,19 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         cnt_in_revrel_writer_properties(&graph).build(),
     );
     create_dir_all(&c_in_r).with_context(|| format!("Could not create {}", c_in_r.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(c_in_r, c_in_r_schema)
-        .context("Could not create contents_in_revisions_without_frontiers writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<CntInRevrelTableBuilder>>::with_schema(
+        c_in_r,
+        c_in_r_schema,
+    )
+    .context("Could not create contents_in_revisions_without_frontiers writer")?;
     swh_provenance_db_build::contents_in_revisions::write_revisions_from_contents(
         &graph,
         NodeFilter::All,
         None, // reachable nodes
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate contents_in_revisions_without_frontiers")?;
 
@@ -118,12 +142,17 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         cnt_in_dir_writer_properties(&graph).build(),
     );
     create_dir_all(&c_in_d).with_context(|| format!("Could not create {}", c_in_d.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(c_in_d, c_in_d_schema)
-        .context("Could not create contents_in_frontier_directories writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<CntInDirTableBuilder>>::with_schema(
+        c_in_d,
+        c_in_d_schema,
+    )
+    .context("Could not create contents_in_frontier_directories writer")?;
     swh_provenance_db_build::contents_in_directories::write_directories_from_contents(
         &graph,
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate contents_in_frontier_directories")?;
 
@@ -134,8 +163,11 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         dir_in_revrel_writer_properties(&graph).build(),
     );
     create_dir_all(&d_in_r).with_context(|| format!("Could not create {}", d_in_r.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(d_in_r, d_in_r_schema)
-        .context("Could not create frontier_directories_in_revisions writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<DirInRevrelTableBuilder>>::with_schema(
+        d_in_r,
+        d_in_r_schema,
+    )
+    .context("Could not create frontier_directories_in_revisions writer")?;
     swh_provenance_db_build::directories_in_revisions::write_revisions_from_frontier_directories(
         &graph,
         &max_timestamps[..],
@@ -143,6 +175,8 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         None, // reachable nodes
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate frontier_directories_in_revisions")?;
 
@@ -155,7 +189,7 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
     create_dir_all(&r_in_o).with_context(|| format!("Could not create {}", r_in_o.display()))?;
     let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(r_in_o, r_in_o_schema)
         .context("Could not create revisions_in_origins writer")?;
-    swh_provenance_db_build::revisions_in_origins::main(&graph, NodeFilter::All, writer)
+    swh_provenance_db_build::revisions_in_origins::main(&graph, NodeFilter::All, writer, None)
         .context("Could not generate frontier_directories_in_revisions")?;
 
     let graph_path = path.join("graph.json");
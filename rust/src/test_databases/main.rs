@@ -15,12 +15,15 @@ use sux::traits::BitVecOpsMut;
 use swh_graph::graph::*;
 use swh_graph::graph_builder::BuiltGraph;
 use swh_graph::swhid;
+use swh_graph::NodeType;
 
 use swh_provenance_db_build::filters::NodeFilter;
 use swh_provenance_db_build::x_in_y_dataset::{
     cnt_in_dir_schema, cnt_in_dir_writer_properties, cnt_in_revrel_schema,
     cnt_in_revrel_writer_properties, dir_in_revrel_schema, dir_in_revrel_writer_properties,
-    revrel_in_ori_schema, revrel_in_ori_writer_properties,
+    earliest_occurrences_schema, earliest_occurrences_writer_properties, revrel_in_ori_schema,
+    revrel_in_ori_writer_properties, CntInDirTableBuilder, CntInRevrelTableBuilder,
+    DirInRevrelTableBuilder,
 };
 
 pub fn gen_graph() -> BuiltGraph {
@@ -210,6 +213,32 @@ pub fn gen_graph() -> BuiltGraph {
     builder.done().expect("Could not build graph")
 }
 
+/// Returns what compute-earliest-timestamps would write for the given graph, with
+/// [`NodeFilter::All`]:
+/// {node: min(timestamp(rev) for rev in ancestors(node))}
+fn gen_earliest_timestamps(graph: &BuiltGraph) -> Vec<i64> {
+    let mut timestamps = vec![i64::MIN; graph.num_nodes()];
+    for revrel in 0..graph.num_nodes() {
+        let Some(revrel_timestamp) = graph.properties().author_timestamp(revrel) else {
+            continue;
+        };
+        let mut stack = vec![revrel];
+        while let Some(node) = stack.pop() {
+            for succ in graph.successors(node) {
+                if matches!(
+                    graph.properties().node_type(succ),
+                    NodeType::Directory | NodeType::Content
+                ) && (timestamps[succ] == i64::MIN || timestamps[succ] > revrel_timestamp)
+                {
+                    timestamps[succ] = revrel_timestamp;
+                    stack.push(succ);
+                }
+            }
+        }
+    }
+    timestamps
+}
+
 pub fn gen_database(path: PathBuf) -> Result<()> {
     let graph = gen_graph();
 
@@ -260,14 +289,19 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         cnt_in_revrel_writer_properties(&graph).build(),
     );
     create_dir_all(&c_in_r).with_context(|| format!("Could not create {}", c_in_r.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(c_in_r, c_in_r_schema)
-        .context("Could not create contents_in_revisions_without_frontiers writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<CntInRevrelTableBuilder>>::with_schema(
+        c_in_r,
+        c_in_r_schema,
+    )
+    .context("Could not create contents_in_revisions_without_frontiers writer")?;
     swh_provenance_db_build::contents_in_revisions::write_revisions_from_contents(
         &graph,
         NodeFilter::All,
         None, // reachable nodes
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate contents_in_revisions_without_frontiers")?;
 
@@ -278,12 +312,17 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         cnt_in_dir_writer_properties(&graph).build(),
     );
     create_dir_all(&c_in_d).with_context(|| format!("Could not create {}", c_in_d.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(c_in_d, c_in_d_schema)
-        .context("Could not create contents_in_frontier_directories writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<CntInDirTableBuilder>>::with_schema(
+        c_in_d,
+        c_in_d_schema,
+    )
+    .context("Could not create contents_in_frontier_directories writer")?;
     swh_provenance_db_build::contents_in_directories::write_directories_from_contents(
         &graph,
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate contents_in_frontier_directories")?;
 
@@ -294,8 +333,11 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         dir_in_revrel_writer_properties(&graph).build(),
     );
     create_dir_all(&d_in_r).with_context(|| format!("Could not create {}", d_in_r.display()))?;
-    let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(d_in_r, d_in_r_schema)
-        .context("Could not create frontier_directories_in_revisions writer")?;
+    let writer = ParallelDatasetWriter::<ParquetTableWriter<DirInRevrelTableBuilder>>::with_schema(
+        d_in_r,
+        d_in_r_schema,
+    )
+    .context("Could not create frontier_directories_in_revisions writer")?;
     swh_provenance_db_build::directories_in_revisions::write_revisions_from_frontier_directories(
         &graph,
         &max_timestamps[..],
@@ -303,6 +345,8 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
         None, // reachable nodes
         &frontier_directories,
         writer,
+        &(),  // paths are not interned
+        None, // key index
     )
     .context("Could not generate frontier_directories_in_revisions")?;
 
@@ -315,9 +359,29 @@ pub fn gen_database(path: PathBuf) -> Result<()> {
     create_dir_all(&r_in_o).with_context(|| format!("Could not create {}", r_in_o.display()))?;
     let writer = ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(r_in_o, r_in_o_schema)
         .context("Could not create revisions_in_origins writer")?;
-    swh_provenance_db_build::revisions_in_origins::main(&graph, NodeFilter::All, writer)
+    swh_provenance_db_build::revisions_in_origins::main(&graph, NodeFilter::All, writer, None)
         .context("Could not generate frontier_directories_in_revisions")?;
 
+    // earliest-occurrences
+    let earliest = path.join("earliest_occurrences");
+    let earliest_schema = (
+        Arc::new(earliest_occurrences_schema()),
+        earliest_occurrences_writer_properties(&graph).build(),
+    );
+    create_dir_all(&earliest)
+        .with_context(|| format!("Could not create {}", earliest.display()))?;
+    let writer =
+        ParallelDatasetWriter::<ParquetTableWriter<_>>::with_schema(earliest, earliest_schema)
+            .context("Could not create earliest_occurrences writer")?;
+    let earliest_timestamps = gen_earliest_timestamps(&graph);
+    swh_provenance_db_build::earliest_occurrences::write_earliest_occurrences(
+        &graph,
+        &earliest_timestamps[..],
+        NodeFilter::All,
+        writer,
+    )
+    .context("Could not generate earliest_occurrences")?;
+
     let graph_path = path.join("graph.json");
     let file = std::fs::File::create(&graph_path)
         .with_context(|| format!("Could not create {}", graph_path.display()))?;
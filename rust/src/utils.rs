@@ -12,6 +12,8 @@ use swh_graph::graph::SwhGraphWithProperties;
 use swh_graph::properties;
 use swh_graph::SwhGraphProperties;
 
+use crate::database::read_planner::ReadPlannerConfig;
+use crate::database::tiers::TierConfig;
 use crate::database::ProvenanceDatabase;
 use crate::graph::MockSwhGraph;
 
@@ -47,12 +49,26 @@ pub fn load_graph_properties(
 pub async fn load_database(
     database_url: url::Url,
     indexes_path: PathBuf,
+    read_planner_config: ReadPlannerConfig,
+    tier_config: TierConfig,
 ) -> Result<ProvenanceDatabase> {
-    let db = ProvenanceDatabase::new(database_url, &indexes_path)
-        .await
-        .context("Could not initialize provenance database")?;
+    let mut db = ProvenanceDatabase::new_with_config(
+        database_url,
+        &indexes_path,
+        &read_planner_config,
+        &tier_config,
+    )
+    .await
+    .context("Could not initialize provenance database")?;
     db.mmap_ef_indexes()
         .context("Could not mmap Elias-Fano indexes")?;
+    db.load_key_filters()
+        .await
+        .context("Could not load key filters")?;
+    db.load_reverse_indexes(&indexes_path)
+        .context("Could not load reverse indexes")?;
+    db.load_cardinality_indexes(&indexes_path)
+        .context("Could not load cardinality indexes")?;
     log::info!("Database loaded");
     Ok(db)
 }
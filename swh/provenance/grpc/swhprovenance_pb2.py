@@ -25,19 +25,41 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\'swh/provenance/grpc/swhprovenance.proto\x12\x0eswh.provenance\x1a google/protobuf/field_mask.proto\"Z\n\x11WhereIsOneRequest\x12-\n\x04mask\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.FieldMaskH\x00\x88\x01\x01\x12\r\n\x05swhid\x18\x02 \x01(\tB\x07\n\x05_mask\"[\n\x12WhereAreOneRequest\x12-\n\x04mask\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.FieldMaskH\x00\x88\x01\x01\x12\r\n\x05swhid\x18\x02 \x03(\tB\x07\n\x05_mask\"a\n\x10WhereIsOneResult\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\x13\n\x06\x61nchor\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x13\n\x06origin\x18\x03 \x01(\tH\x01\x88\x01\x01\x42\t\n\x07_anchorB\t\n\x07_origin2\xbd\x01\n\x11ProvenanceService\x12Q\n\nWhereIsOne\x12!.swh.provenance.WhereIsOneRequest\x1a .swh.provenance.WhereIsOneResult\x12U\n\x0bWhereAreOne\x12\".swh.provenance.WhereAreOneRequest\x1a .swh.provenance.WhereIsOneResult0\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\'swh/provenance/grpc/swhprovenance.proto\x12\x0eswh.provenance\x1a google/protobuf/field_mask.proto\"\xd5\x01\n\x11WhereIsOneRequest\x12-\n\x04mask\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.FieldMaskH\x00\x88\x01\x01\x12\r\n\x05swhid\x18\x02 \x01(\t\x12\x12\n\x05\x61\x66ter\x18\x03 \x01(\x03H\x01\x88\x01\x01\x12\x13\n\x06\x62\x65\x66ore\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12(\n\x04mode\x18\x05 \x01(\x0e\x32\x1a.swh.provenance.LookupMode\x12\x11\n\tdatabases\x18\x06 \x03(\tB\x07\n\x05_maskB\x08\n\x06_afterB\t\n\x07_before\"\xd6\x01\n\x12WhereAreOneRequest\x12-\n\x04mask\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.FieldMaskH\x00\x88\x01\x01\x12\r\n\x05swhid\x18\x02 \x03(\t\x12\x12\n\x05\x61\x66ter\x18\x03 \x01(\x03H\x01\x88\x01\x01\x12\x13\n\x06\x62\x65\x66ore\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12(\n\x04mode\x18\x05 \x01(\x0e\x32\x1a.swh.provenance.LookupMode\x12\x11\n\tdatabases\x18\x06 \x03(\tB\x07\n\x05_maskB\x08\n\x06_afterB\t\n\x07_before\"\xb4\x01\n\x1aWhereAreOneInOriginRequest\x12\r\n\x05swhid\x18\x01 \x03(\t\x12\x14\n\norigin_url\x18\x02 \x01(\tH\x00\x12\x16\n\x0corigin_swhid\x18\x03 \x01(\tH\x00\x12\x12\n\x05\x61\x66ter\x18\x04 \x01(\x03H\x01\x88\x01\x01\x12\x13\n\x06\x62\x65\x66ore\x18\x05 \x01(\x03H\x02\x88\x01\x01\x12\x11\n\tdatabases\x18\x06 \x03(\tB\x08\n\x06originB\x08\n\x06_afterB\t\n\x07_before\"\x9e\x01\n\x10WhereIsOneResult\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\x13\n\x06\x61nchor\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x13\n\x06origin\x18\x03 \x01(\tH\x01\x88\x01\x01\x12\x18\n\x0b\x61uthor_date\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12\x11\n\ttimed_out\x18\x05 \x01(\x08\x42\t\n\x07_anchorB\t\n\x07_originB\x0e\n\x0c_author_date\":\n\x16ListContainedInRequest\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\x11\n\tdatabases\x18\x02 \x03(\t\"Y\n\x10\x43ontainedContent\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\x1f\n\x12\x66rontier_directory\x18\x02 \x01(\tH\x00\x88\x01\x01\x42\x15\n\x13_frontier_directory\"\x92\x01\n\x18\x46indCoOccurrencesRequest\x12\r\n\x05swhid\x18\x01 \x03(\t\x12\x19\n\x0cmin_contents\x18\x02 \x01(\x04H\x00\x88\x01\x01\x12\x18\n\x0bmax_results\x18\x03 \x01(\x04H\x01\x88\x01\x01\x12\x11\n\tdatabases\x18\x04 \x03(\tB\x0f\n\r_min_contentsB\x0e\n\x0c_max_results\"4\n\x0c\x43oOccurrence\x12\x0e\n\x06\x61nchor\x18\x01 \x01(\t\x12\x14\n\x0cnum_contents\x18\x02 \x01(\x04\"\xc6\x01\n\x12WhereAreAllRequest\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\x18\n\x0bmax_results\x18\x02 \x01(\x04H\x00\x88\x01\x01\x12\x17\n\npage_token\x18\x03 \x01(\tH\x01\x88\x01\x01\x12\x12\n\x05\x61\x66ter\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12\x13\n\x06\x62\x65\x66ore\x18\x05 \x01(\x03H\x03\x88\x01\x01\x12\x11\n\tdatabases\x18\x06 \x03(\tB\x0e\n\x0c_max_resultsB\r\n\x0b_page_tokenB\x08\n\x06_afterB\t\n\x07_before\"q\n\nOccurrence\x12\x0e\n\x06\x61nchor\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\x0c\x12\x13\n\x0b\x61uthor_date\x18\x03 \x01(\x03\x12\x1c\n\x0fnext_page_token\x18\x04 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_next_page_token\"Y\n\x0c\x43ountRequest\x12\r\n\x05swhid\x18\x01 \x01(\t\x12\'\n\x04mode\x18\x02 \x01(\x0e\x32\x19.swh.provenance.CountMode\x12\x11\n\tdatabases\x18\x03 \x03(\t\"%\n\x05\x43ount\x12\r\n\x05\x63ount\x18\x01 \x01(\x04\x12\r\n\x05\x65xact\x18\x02 \x01(\x08*;\n\nLookupMode\x12\x13\n\x0fLOOKUP_MODE_ANY\x10\x00\x12\x18\n\x14LOOKUP_MODE_EARLIEST\x10\x01*=\n\tCountMode\x12\x14\n\x10\x43OUNT_MODE_EXACT\x10\x00\x12\x1a\n\x16\x43OUNT_MODE_APPROXIMATE\x10\x01\x32\xbd\x05\n\x11ProvenanceService\x12Q\n\nWhereIsOne\x12!.swh.provenance.WhereIsOneRequest\x1a .swh.provenance.WhereIsOneResult\x12U\n\x0bWhereAreOne\x12\".swh.provenance.WhereAreOneRequest\x1a .swh.provenance.WhereIsOneResult0\x01\x12\x65\n\x13WhereAreOneInOrigin\x12*.swh.provenance.WhereAreOneInOriginRequest\x1a .swh.provenance.WhereIsOneResult0\x01\x12]\n\x0fListContainedIn\x12&.swh.provenance.ListContainedInRequest\x1a .swh.provenance.ContainedContent0\x01\x12]\n\x11\x46indCoOccurrences\x12(.swh.provenance.FindCoOccurrencesRequest\x1a\x1c.swh.provenance.CoOccurrence0\x01\x12O\n\x0bWhereAreAll\x12\".swh.provenance.WhereAreAllRequest\x1a\x1a.swh.provenance.Occurrence0\x01\x12\x43\n\x0c\x43ountAnchors\x12\x1c.swh.provenance.CountRequest\x1a\x15.swh.provenance.Count\x12\x43\n\x0c\x43ountOrigins\x12\x1c.swh.provenance.CountRequest\x1a\x15.swh.provenance.Countb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'swh.provenance.grpc.swhprovenance_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_WHEREISONEREQUEST']._serialized_start=93
-  _globals['_WHEREISONEREQUEST']._serialized_end=183
-  _globals['_WHEREAREONEREQUEST']._serialized_start=185
-  _globals['_WHEREAREONEREQUEST']._serialized_end=276
-  _globals['_WHEREISONERESULT']._serialized_start=278
-  _globals['_WHEREISONERESULT']._serialized_end=375
-  _globals['_PROVENANCESERVICE']._serialized_start=378
-  _globals['_PROVENANCESERVICE']._serialized_end=567
+  _globals['_LOOKUPMODE']._serialized_start=1670
+  _globals['_LOOKUPMODE']._serialized_end=1729
+  _globals['_COUNTMODE']._serialized_start=1731
+  _globals['_COUNTMODE']._serialized_end=1792
+  _globals['_WHEREISONEREQUEST']._serialized_start=94
+  _globals['_WHEREISONEREQUEST']._serialized_end=307
+  _globals['_WHEREAREONEREQUEST']._serialized_start=310
+  _globals['_WHEREAREONEREQUEST']._serialized_end=524
+  _globals['_WHEREAREONEINORIGINREQUEST']._serialized_start=527
+  _globals['_WHEREAREONEINORIGINREQUEST']._serialized_end=707
+  _globals['_WHEREISONERESULT']._serialized_start=710
+  _globals['_WHEREISONERESULT']._serialized_end=868
+  _globals['_LISTCONTAINEDINREQUEST']._serialized_start=870
+  _globals['_LISTCONTAINEDINREQUEST']._serialized_end=928
+  _globals['_CONTAINEDCONTENT']._serialized_start=930
+  _globals['_CONTAINEDCONTENT']._serialized_end=1019
+  _globals['_FINDCOOCCURRENCESREQUEST']._serialized_start=1022
+  _globals['_FINDCOOCCURRENCESREQUEST']._serialized_end=1168
+  _globals['_COOCCURRENCE']._serialized_start=1170
+  _globals['_COOCCURRENCE']._serialized_end=1222
+  _globals['_WHEREAREALLREQUEST']._serialized_start=1225
+  _globals['_WHEREAREALLREQUEST']._serialized_end=1423
+  _globals['_OCCURRENCE']._serialized_start=1425
+  _globals['_OCCURRENCE']._serialized_end=1538
+  _globals['_COUNTREQUEST']._serialized_start=1540
+  _globals['_COUNTREQUEST']._serialized_end=1629
+  _globals['_COUNT']._serialized_start=1631
+  _globals['_COUNT']._serialized_end=1668
+  _globals['_PROVENANCESERVICE']._serialized_start=1795
+  _globals['_PROVENANCESERVICE']._serialized_end=2496
 # @@protoc_insertion_point(module_scope)
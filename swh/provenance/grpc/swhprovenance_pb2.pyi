@@ -8,38 +8,130 @@ from google.protobuf import descriptor as _descriptor
 from google.protobuf import field_mask_pb2 as _field_mask_pb2
 from google.protobuf import message as _message
 from google.protobuf.internal import containers as _containers
+from google.protobuf.internal import enum_type_wrapper as _enum_type_wrapper
 import builtins as _builtins
+import sys
 import typing as _typing
-from typing import TypeAlias as _TypeAlias
+
+if sys.version_info >= (3, 11):
+    from typing import TypeAlias as _TypeAlias, Never as _Never
+else:
+    from typing_extensions import TypeAlias as _TypeAlias, Never as _Never
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
+class _LookupMode:
+    ValueType = _typing.NewType("ValueType", _builtins.int)
+    V: _TypeAlias = ValueType  # noqa: Y015
+
+class _LookupModeEnumTypeWrapper(_enum_type_wrapper._EnumTypeWrapper[_LookupMode.ValueType], _builtins.type):
+    DESCRIPTOR: _descriptor.EnumDescriptor
+    LOOKUP_MODE_ANY: _LookupMode.ValueType  # 0
+    """Return any revision/release containing the node"""
+    LOOKUP_MODE_EARLIEST: _LookupMode.ValueType  # 1
+    """Return the earliest revision/release containing the node, with its author date.
+    This is a single lookup in databases with an earliest_occurrences table, and a scan
+    of all occurrences of the node otherwise, or when `after` is later than the node's
+    first occurrence.
+    """
+
+class LookupMode(_LookupMode, metaclass=_LookupModeEnumTypeWrapper): ...
+
+LOOKUP_MODE_ANY: LookupMode.ValueType  # 0
+"""Return any revision/release containing the node"""
+LOOKUP_MODE_EARLIEST: LookupMode.ValueType  # 1
+"""Return the earliest revision/release containing the node, with its author date.
+This is a single lookup in databases with an earliest_occurrences table, and a scan
+of all occurrences of the node otherwise, or when `after` is later than the node's
+first occurrence.
+"""
+Global___LookupMode: _TypeAlias = LookupMode  # noqa: Y015
+
+class _CountMode:
+    ValueType = _typing.NewType("ValueType", _builtins.int)
+    V: _TypeAlias = ValueType  # noqa: Y015
+
+class _CountModeEnumTypeWrapper(_enum_type_wrapper._EnumTypeWrapper[_CountMode.ValueType], _builtins.type):
+    DESCRIPTOR: _descriptor.EnumDescriptor
+    COUNT_MODE_EXACT: _CountMode.ValueType  # 0
+    """Count distinct revisions/releases or origins by reading them, unless cardinality
+    indexes (built by `swh-provenance-index --cardinality-indexes`) give the exact count
+    directly
+    """
+    COUNT_MODE_APPROXIMATE: _CountMode.ValueType  # 1
+    """Estimate from cardinality indexes when they are available, without reading
+    revisions/releases or origins. Estimates may be larger than the exact count.
+    """
+
+class CountMode(_CountMode, metaclass=_CountModeEnumTypeWrapper): ...
+
+COUNT_MODE_EXACT: CountMode.ValueType  # 0
+"""Count distinct revisions/releases or origins by reading them, unless cardinality
+indexes (built by `swh-provenance-index --cardinality-indexes`) give the exact count
+directly
+"""
+COUNT_MODE_APPROXIMATE: CountMode.ValueType  # 1
+"""Estimate from cardinality indexes when they are available, without reading
+revisions/releases or origins. Estimates may be larger than the exact count.
+"""
+Global___CountMode: _TypeAlias = CountMode  # noqa: Y015
+
 @_typing.final
 class WhereIsOneRequest(_message.Message):
     DESCRIPTOR: _descriptor.Descriptor
 
     MASK_FIELD_NUMBER: _builtins.int
     SWHID_FIELD_NUMBER: _builtins.int
+    AFTER_FIELD_NUMBER: _builtins.int
+    BEFORE_FIELD_NUMBER: _builtins.int
+    MODE_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
     swhid: _builtins.str
     """Core SWHID of the node to lookup"""
+    after: _builtins.int
+    """Only return revisions/releases authored at or after this date, in seconds since the
+    epoch
+    """
+    before: _builtins.int
+    """Only return revisions/releases authored strictly before this date, in seconds since
+    the epoch
+    """
+    mode: Global___LookupMode.ValueType
     @_builtins.property
     def mask(self) -> _field_mask_pb2.FieldMask:
         """FieldMask of which fields are to be returned (e.g., "swhid,anchor,origin").
         By default, all fields are returned.
         """
 
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
     def __init__(
         self,
         *,
         mask: _field_mask_pb2.FieldMask | None = ...,
         swhid: _builtins.str = ...,
+        after: _builtins.int | None = ...,
+        before: _builtins.int | None = ...,
+        mode: Global___LookupMode.ValueType = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
     ) -> None: ...
-    _HasFieldArgType: _TypeAlias = _typing.Literal["_mask", b"_mask", "mask", b"mask"]  # noqa: Y015
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_mask", b"_mask", "after", b"after", "before", b"before", "mask", b"mask"]  # noqa: Y015
     def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
-    _ClearFieldArgType: _TypeAlias = _typing.Literal["_mask", b"_mask", "mask", b"mask", "swhid", b"swhid"]  # noqa: Y015
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_mask", b"_mask", "after", b"after", "before", b"before", "databases", b"databases", "mask", b"mask", "mode", b"mode", "swhid", b"swhid"]  # noqa: Y015
     def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__after: _TypeAlias = _typing.Literal["after"]  # noqa: Y015
+    _WhichOneofArgType__after: _TypeAlias = _typing.Literal["_after", b"_after"]  # noqa: Y015
+    _WhichOneofReturnType__before: _TypeAlias = _typing.Literal["before"]  # noqa: Y015
+    _WhichOneofArgType__before: _TypeAlias = _typing.Literal["_before", b"_before"]  # noqa: Y015
     _WhichOneofReturnType__mask: _TypeAlias = _typing.Literal["mask"]  # noqa: Y015
     _WhichOneofArgType__mask: _TypeAlias = _typing.Literal["_mask", b"_mask"]  # noqa: Y015
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__after) -> _WhichOneofReturnType__after | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__before) -> _WhichOneofReturnType__before | None: ...
+    @_typing.overload
     def WhichOneof(self, oneof_group: _WhichOneofArgType__mask) -> _WhichOneofReturnType__mask | None: ...
 
 Global___WhereIsOneRequest: _TypeAlias = WhereIsOneRequest  # noqa: Y015
@@ -50,6 +142,19 @@ class WhereAreOneRequest(_message.Message):
 
     MASK_FIELD_NUMBER: _builtins.int
     SWHID_FIELD_NUMBER: _builtins.int
+    AFTER_FIELD_NUMBER: _builtins.int
+    BEFORE_FIELD_NUMBER: _builtins.int
+    MODE_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    after: _builtins.int
+    """Only return revisions/releases authored at or after this date, in seconds since the
+    epoch
+    """
+    before: _builtins.int
+    """Only return revisions/releases authored strictly before this date, in seconds since
+    the epoch
+    """
+    mode: Global___LookupMode.ValueType
     @_builtins.property
     def mask(self) -> _field_mask_pb2.FieldMask:
         """FieldMask of which fields are to be returned (e.g., "swhid,anchor,origin").
@@ -60,22 +165,98 @@ class WhereAreOneRequest(_message.Message):
     def swhid(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
         """Core SWHIDs of the nodes to lookup"""
 
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
     def __init__(
         self,
         *,
         mask: _field_mask_pb2.FieldMask | None = ...,
         swhid: _abc.Iterable[_builtins.str] | None = ...,
+        after: _builtins.int | None = ...,
+        before: _builtins.int | None = ...,
+        mode: Global___LookupMode.ValueType = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
     ) -> None: ...
-    _HasFieldArgType: _TypeAlias = _typing.Literal["_mask", b"_mask", "mask", b"mask"]  # noqa: Y015
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_mask", b"_mask", "after", b"after", "before", b"before", "mask", b"mask"]  # noqa: Y015
     def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
-    _ClearFieldArgType: _TypeAlias = _typing.Literal["_mask", b"_mask", "mask", b"mask", "swhid", b"swhid"]  # noqa: Y015
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_mask", b"_mask", "after", b"after", "before", b"before", "databases", b"databases", "mask", b"mask", "mode", b"mode", "swhid", b"swhid"]  # noqa: Y015
     def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__after: _TypeAlias = _typing.Literal["after"]  # noqa: Y015
+    _WhichOneofArgType__after: _TypeAlias = _typing.Literal["_after", b"_after"]  # noqa: Y015
+    _WhichOneofReturnType__before: _TypeAlias = _typing.Literal["before"]  # noqa: Y015
+    _WhichOneofArgType__before: _TypeAlias = _typing.Literal["_before", b"_before"]  # noqa: Y015
     _WhichOneofReturnType__mask: _TypeAlias = _typing.Literal["mask"]  # noqa: Y015
     _WhichOneofArgType__mask: _TypeAlias = _typing.Literal["_mask", b"_mask"]  # noqa: Y015
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__after) -> _WhichOneofReturnType__after | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__before) -> _WhichOneofReturnType__before | None: ...
+    @_typing.overload
     def WhichOneof(self, oneof_group: _WhichOneofArgType__mask) -> _WhichOneofReturnType__mask | None: ...
 
 Global___WhereAreOneRequest: _TypeAlias = WhereAreOneRequest  # noqa: Y015
 
+@_typing.final
+class WhereAreOneInOriginRequest(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    ORIGIN_URL_FIELD_NUMBER: _builtins.int
+    ORIGIN_SWHID_FIELD_NUMBER: _builtins.int
+    AFTER_FIELD_NUMBER: _builtins.int
+    BEFORE_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    origin_url: _builtins.str
+    """URL of the origin"""
+    origin_swhid: _builtins.str
+    """SWHID of the origin (swh:1:ori:...)"""
+    after: _builtins.int
+    """Only return revisions/releases authored at or after this date, in seconds since the
+    epoch
+    """
+    before: _builtins.int
+    """Only return revisions/releases authored strictly before this date, in seconds since
+    the epoch
+    """
+    @_builtins.property
+    def swhid(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Core SWHIDs of the nodes to lookup"""
+
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
+    def __init__(
+        self,
+        *,
+        swhid: _abc.Iterable[_builtins.str] | None = ...,
+        origin_url: _builtins.str = ...,
+        origin_swhid: _builtins.str = ...,
+        after: _builtins.int | None = ...,
+        before: _builtins.int | None = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "after", b"after", "before", b"before", "origin", b"origin", "origin_swhid", b"origin_swhid", "origin_url", b"origin_url"]  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "after", b"after", "before", b"before", "databases", b"databases", "origin", b"origin", "origin_swhid", b"origin_swhid", "origin_url", b"origin_url", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__after: _TypeAlias = _typing.Literal["after"]  # noqa: Y015
+    _WhichOneofArgType__after: _TypeAlias = _typing.Literal["_after", b"_after"]  # noqa: Y015
+    _WhichOneofReturnType__before: _TypeAlias = _typing.Literal["before"]  # noqa: Y015
+    _WhichOneofArgType__before: _TypeAlias = _typing.Literal["_before", b"_before"]  # noqa: Y015
+    _WhichOneofReturnType_origin: _TypeAlias = _typing.Literal["origin_url", "origin_swhid"]  # noqa: Y015
+    _WhichOneofArgType_origin: _TypeAlias = _typing.Literal["origin", b"origin"]  # noqa: Y015
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__after) -> _WhichOneofReturnType__after | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__before) -> _WhichOneofReturnType__before | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType_origin) -> _WhichOneofReturnType_origin | None: ...
+
+Global___WhereAreOneInOriginRequest: _TypeAlias = WhereAreOneInOriginRequest  # noqa: Y015
+
 @_typing.final
 class WhereIsOneResult(_message.Message):
     DESCRIPTOR: _descriptor.Descriptor
@@ -83,30 +264,319 @@ class WhereIsOneResult(_message.Message):
     SWHID_FIELD_NUMBER: _builtins.int
     ANCHOR_FIELD_NUMBER: _builtins.int
     ORIGIN_FIELD_NUMBER: _builtins.int
+    AUTHOR_DATE_FIELD_NUMBER: _builtins.int
+    TIMED_OUT_FIELD_NUMBER: _builtins.int
     swhid: _builtins.str
     """Core SWHID of the node whose lookup was requested"""
     anchor: _builtins.str
     """Core SWHID of a revision or release that contains the above node"""
     origin: _builtins.str
     """URL of an origin that contains the anchor"""
+    author_date: _builtins.int
+    """Author date of the anchor, in seconds since the epoch. Only set in
+    LOOKUP_MODE_EARLIEST.
+    """
+    timed_out: _builtins.bool
+    """Set by WhereAreOne on nodes whose lookup did not complete before the request's
+    deadline. Their anchor and origin are empty, but they may have some.
+    """
     def __init__(
         self,
         *,
         swhid: _builtins.str = ...,
         anchor: _builtins.str | None = ...,
         origin: _builtins.str | None = ...,
+        author_date: _builtins.int | None = ...,
+        timed_out: _builtins.bool = ...,
     ) -> None: ...
-    _HasFieldArgType: _TypeAlias = _typing.Literal["_anchor", b"_anchor", "_origin", b"_origin", "anchor", b"anchor", "origin", b"origin"]  # noqa: Y015
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_anchor", b"_anchor", "_author_date", b"_author_date", "_origin", b"_origin", "anchor", b"anchor", "author_date", b"author_date", "origin", b"origin"]  # noqa: Y015
     def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
-    _ClearFieldArgType: _TypeAlias = _typing.Literal["_anchor", b"_anchor", "_origin", b"_origin", "anchor", b"anchor", "origin", b"origin", "swhid", b"swhid"]  # noqa: Y015
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_anchor", b"_anchor", "_author_date", b"_author_date", "_origin", b"_origin", "anchor", b"anchor", "author_date", b"author_date", "origin", b"origin", "swhid", b"swhid", "timed_out", b"timed_out"]  # noqa: Y015
     def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
     _WhichOneofReturnType__anchor: _TypeAlias = _typing.Literal["anchor"]  # noqa: Y015
     _WhichOneofArgType__anchor: _TypeAlias = _typing.Literal["_anchor", b"_anchor"]  # noqa: Y015
+    _WhichOneofReturnType__author_date: _TypeAlias = _typing.Literal["author_date"]  # noqa: Y015
+    _WhichOneofArgType__author_date: _TypeAlias = _typing.Literal["_author_date", b"_author_date"]  # noqa: Y015
     _WhichOneofReturnType__origin: _TypeAlias = _typing.Literal["origin"]  # noqa: Y015
     _WhichOneofArgType__origin: _TypeAlias = _typing.Literal["_origin", b"_origin"]  # noqa: Y015
     @_typing.overload
     def WhichOneof(self, oneof_group: _WhichOneofArgType__anchor) -> _WhichOneofReturnType__anchor | None: ...
     @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__author_date) -> _WhichOneofReturnType__author_date | None: ...
+    @_typing.overload
     def WhichOneof(self, oneof_group: _WhichOneofArgType__origin) -> _WhichOneofReturnType__origin | None: ...
 
 Global___WhereIsOneResult: _TypeAlias = WhereIsOneResult  # noqa: Y015
+
+@_typing.final
+class ListContainedInRequest(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    swhid: _builtins.str
+    """Core SWHID of the revision or release whose contents to list"""
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
+    def __init__(
+        self,
+        *,
+        swhid: _builtins.str = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _Never  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["databases", b"databases", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    def WhichOneof(self, oneof_group: _Never) -> None: ...
+
+Global___ListContainedInRequest: _TypeAlias = ListContainedInRequest  # noqa: Y015
+
+@_typing.final
+class ContainedContent(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    FRONTIER_DIRECTORY_FIELD_NUMBER: _builtins.int
+    swhid: _builtins.str
+    """Core SWHID of a content in the requested revision or release"""
+    frontier_directory: _builtins.str
+    """Core SWHID of the frontier directory of the revision/release which contains the above
+    content, if it is not directly reachable from the revision/release without going
+    through a frontier directory
+    """
+    def __init__(
+        self,
+        *,
+        swhid: _builtins.str = ...,
+        frontier_directory: _builtins.str | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_frontier_directory", b"_frontier_directory", "frontier_directory", b"frontier_directory"]  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_frontier_directory", b"_frontier_directory", "frontier_directory", b"frontier_directory", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__frontier_directory: _TypeAlias = _typing.Literal["frontier_directory"]  # noqa: Y015
+    _WhichOneofArgType__frontier_directory: _TypeAlias = _typing.Literal["_frontier_directory", b"_frontier_directory"]  # noqa: Y015
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__frontier_directory) -> _WhichOneofReturnType__frontier_directory | None: ...
+
+Global___ContainedContent: _TypeAlias = ContainedContent  # noqa: Y015
+
+@_typing.final
+class FindCoOccurrencesRequest(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    MIN_CONTENTS_FIELD_NUMBER: _builtins.int
+    MAX_RESULTS_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    min_contents: _builtins.int
+    """Minimum number of the above contents a revision/release must contain to be returned.
+    Defaults to all of them.
+    """
+    max_results: _builtins.int
+    """Maximum number of revisions/releases to return. Defaults to 100."""
+    @_builtins.property
+    def swhid(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Core SWHIDs of the contents to lookup"""
+
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
+    def __init__(
+        self,
+        *,
+        swhid: _abc.Iterable[_builtins.str] | None = ...,
+        min_contents: _builtins.int | None = ...,
+        max_results: _builtins.int | None = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_max_results", b"_max_results", "_min_contents", b"_min_contents", "max_results", b"max_results", "min_contents", b"min_contents"]  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_max_results", b"_max_results", "_min_contents", b"_min_contents", "databases", b"databases", "max_results", b"max_results", "min_contents", b"min_contents", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__max_results: _TypeAlias = _typing.Literal["max_results"]  # noqa: Y015
+    _WhichOneofArgType__max_results: _TypeAlias = _typing.Literal["_max_results", b"_max_results"]  # noqa: Y015
+    _WhichOneofReturnType__min_contents: _TypeAlias = _typing.Literal["min_contents"]  # noqa: Y015
+    _WhichOneofArgType__min_contents: _TypeAlias = _typing.Literal["_min_contents", b"_min_contents"]  # noqa: Y015
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__max_results) -> _WhichOneofReturnType__max_results | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__min_contents) -> _WhichOneofReturnType__min_contents | None: ...
+
+Global___FindCoOccurrencesRequest: _TypeAlias = FindCoOccurrencesRequest  # noqa: Y015
+
+@_typing.final
+class CoOccurrence(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    ANCHOR_FIELD_NUMBER: _builtins.int
+    NUM_CONTENTS_FIELD_NUMBER: _builtins.int
+    anchor: _builtins.str
+    """Core SWHID of a revision or release"""
+    num_contents: _builtins.int
+    """Number of the requested contents the above revision/release contains"""
+    def __init__(
+        self,
+        *,
+        anchor: _builtins.str = ...,
+        num_contents: _builtins.int = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _Never  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["anchor", b"anchor", "num_contents", b"num_contents"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    def WhichOneof(self, oneof_group: _Never) -> None: ...
+
+Global___CoOccurrence: _TypeAlias = CoOccurrence  # noqa: Y015
+
+@_typing.final
+class WhereAreAllRequest(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    MAX_RESULTS_FIELD_NUMBER: _builtins.int
+    PAGE_TOKEN_FIELD_NUMBER: _builtins.int
+    AFTER_FIELD_NUMBER: _builtins.int
+    BEFORE_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    swhid: _builtins.str
+    """Core SWHID of the content to lookup"""
+    max_results: _builtins.int
+    """Maximum number of occurrences to return. Defaults to all of them."""
+    page_token: _builtins.str
+    """`next_page_token` of the last occurrence returned by a previous request, to resume
+    after it
+    """
+    after: _builtins.int
+    """Only return revisions/releases authored at or after this date, in seconds since the
+    epoch
+    """
+    before: _builtins.int
+    """Only return revisions/releases authored strictly before this date, in seconds since
+    the epoch
+    """
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
+    def __init__(
+        self,
+        *,
+        swhid: _builtins.str = ...,
+        max_results: _builtins.int | None = ...,
+        page_token: _builtins.str | None = ...,
+        after: _builtins.int | None = ...,
+        before: _builtins.int | None = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_max_results", b"_max_results", "_page_token", b"_page_token", "after", b"after", "before", b"before", "max_results", b"max_results", "page_token", b"page_token"]  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_after", b"_after", "_before", b"_before", "_max_results", b"_max_results", "_page_token", b"_page_token", "after", b"after", "before", b"before", "databases", b"databases", "max_results", b"max_results", "page_token", b"page_token", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__after: _TypeAlias = _typing.Literal["after"]  # noqa: Y015
+    _WhichOneofArgType__after: _TypeAlias = _typing.Literal["_after", b"_after"]  # noqa: Y015
+    _WhichOneofReturnType__before: _TypeAlias = _typing.Literal["before"]  # noqa: Y015
+    _WhichOneofArgType__before: _TypeAlias = _typing.Literal["_before", b"_before"]  # noqa: Y015
+    _WhichOneofReturnType__max_results: _TypeAlias = _typing.Literal["max_results"]  # noqa: Y015
+    _WhichOneofArgType__max_results: _TypeAlias = _typing.Literal["_max_results", b"_max_results"]  # noqa: Y015
+    _WhichOneofReturnType__page_token: _TypeAlias = _typing.Literal["page_token"]  # noqa: Y015
+    _WhichOneofArgType__page_token: _TypeAlias = _typing.Literal["_page_token", b"_page_token"]  # noqa: Y015
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__after) -> _WhichOneofReturnType__after | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__before) -> _WhichOneofReturnType__before | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__max_results) -> _WhichOneofReturnType__max_results | None: ...
+    @_typing.overload
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__page_token) -> _WhichOneofReturnType__page_token | None: ...
+
+Global___WhereAreAllRequest: _TypeAlias = WhereAreAllRequest  # noqa: Y015
+
+@_typing.final
+class Occurrence(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    ANCHOR_FIELD_NUMBER: _builtins.int
+    PATH_FIELD_NUMBER: _builtins.int
+    AUTHOR_DATE_FIELD_NUMBER: _builtins.int
+    NEXT_PAGE_TOKEN_FIELD_NUMBER: _builtins.int
+    anchor: _builtins.str
+    """Core SWHID of a revision or release that contains the requested content"""
+    path: _builtins.bytes
+    """Path of the content in the above revision/release"""
+    author_date: _builtins.int
+    """Author date of the revision/release, in seconds since the epoch"""
+    next_page_token: _builtins.str
+    """Set on the last occurrence of a page, if there are more occurrences"""
+    def __init__(
+        self,
+        *,
+        anchor: _builtins.str = ...,
+        path: _builtins.bytes = ...,
+        author_date: _builtins.int = ...,
+        next_page_token: _builtins.str | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _typing.Literal["_next_page_token", b"_next_page_token", "next_page_token", b"next_page_token"]  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["_next_page_token", b"_next_page_token", "anchor", b"anchor", "author_date", b"author_date", "next_page_token", b"next_page_token", "path", b"path"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    _WhichOneofReturnType__next_page_token: _TypeAlias = _typing.Literal["next_page_token"]  # noqa: Y015
+    _WhichOneofArgType__next_page_token: _TypeAlias = _typing.Literal["_next_page_token", b"_next_page_token"]  # noqa: Y015
+    def WhichOneof(self, oneof_group: _WhichOneofArgType__next_page_token) -> _WhichOneofReturnType__next_page_token | None: ...
+
+Global___Occurrence: _TypeAlias = Occurrence  # noqa: Y015
+
+@_typing.final
+class CountRequest(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    SWHID_FIELD_NUMBER: _builtins.int
+    MODE_FIELD_NUMBER: _builtins.int
+    DATABASES_FIELD_NUMBER: _builtins.int
+    swhid: _builtins.str
+    """Core SWHID of the content to lookup"""
+    mode: Global___CountMode.ValueType
+    @_builtins.property
+    def databases(self) -> _containers.RepeatedScalarFieldContainer[_builtins.str]:
+        """Names of the databases to query, see ProvenanceService"""
+
+    def __init__(
+        self,
+        *,
+        swhid: _builtins.str = ...,
+        mode: Global___CountMode.ValueType = ...,
+        databases: _abc.Iterable[_builtins.str] | None = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _Never  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["databases", b"databases", "mode", b"mode", "swhid", b"swhid"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    def WhichOneof(self, oneof_group: _Never) -> None: ...
+
+Global___CountRequest: _TypeAlias = CountRequest  # noqa: Y015
+
+@_typing.final
+class Count(_message.Message):
+    DESCRIPTOR: _descriptor.Descriptor
+
+    COUNT_FIELD_NUMBER: _builtins.int
+    EXACT_FIELD_NUMBER: _builtins.int
+    count: _builtins.int
+    exact: _builtins.bool
+    """Whether the above count is exact, which it may be even in approximate mode"""
+    def __init__(
+        self,
+        *,
+        count: _builtins.int = ...,
+        exact: _builtins.bool = ...,
+    ) -> None: ...
+    _HasFieldArgType: _TypeAlias = _Never  # noqa: Y015
+    def HasField(self, field_name: _HasFieldArgType) -> _builtins.bool: ...
+    _ClearFieldArgType: _TypeAlias = _typing.Literal["count", b"count", "exact", b"exact"]  # noqa: Y015
+    def ClearField(self, field_name: _ClearFieldArgType) -> None: ...
+    def WhichOneof(self, oneof_group: _Never) -> None: ...
+
+Global___Count: _TypeAlias = Count  # noqa: Y015
@@ -26,7 +26,13 @@ if _version_not_supported:
 
 
 class ProvenanceServiceStub:
-    """Content Provenance service 
+    """Content Provenance service
+
+    A server may serve several databases (eg. built with different node filters) over the
+    same graph. Every request has a `databases` field with the names of the databases to
+    query, which defaults to the first database of the server. WhereIsOne and WhereAreOne
+    query them in order, until one has an anchor for the node; other methods accept a
+    single database. Unknown database names fail with INVALID_ARGUMENT. 
     """
 
     def __init__(self, channel):
@@ -45,14 +51,56 @@ class ProvenanceServiceStub:
                 request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreOneRequest.SerializeToString,
                 response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereIsOneResult.FromString,
                 _registered_method=True)
+        self.WhereAreOneInOrigin = channel.unary_stream(
+                '/swh.provenance.ProvenanceService/WhereAreOneInOrigin',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreOneInOriginRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereIsOneResult.FromString,
+                _registered_method=True)
+        self.ListContainedIn = channel.unary_stream(
+                '/swh.provenance.ProvenanceService/ListContainedIn',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ListContainedInRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ContainedContent.FromString,
+                _registered_method=True)
+        self.FindCoOccurrences = channel.unary_stream(
+                '/swh.provenance.ProvenanceService/FindCoOccurrences',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.FindCoOccurrencesRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CoOccurrence.FromString,
+                _registered_method=True)
+        self.WhereAreAll = channel.unary_stream(
+                '/swh.provenance.ProvenanceService/WhereAreAll',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreAllRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Occurrence.FromString,
+                _registered_method=True)
+        self.CountAnchors = channel.unary_unary(
+                '/swh.provenance.ProvenanceService/CountAnchors',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.FromString,
+                _registered_method=True)
+        self.CountOrigins = channel.unary_unary(
+                '/swh.provenance.ProvenanceService/CountOrigins',
+                request_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.SerializeToString,
+                response_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.FromString,
+                _registered_method=True)
 
 
 class ProvenanceServiceServicer:
-    """Content Provenance service 
+    """Content Provenance service
+
+    A server may serve several databases (eg. built with different node filters) over the
+    same graph. Every request has a `databases` field with the names of the databases to
+    query, which defaults to the first database of the server. WhereIsOne and WhereAreOne
+    query them in order, until one has an anchor for the node; other methods accept a
+    single database. Unknown database names fail with INVALID_ARGUMENT. 
     """
 
     def WhereIsOne(self, request, context):
-        """Given an object's SWHID, returns an origin and revision/release where it can be found 
+        """Given an object's SWHID, returns an origin and revision/release where it can be found.
+
+        This and the other lookup methods accept `after` and `before` bounds on the author
+        date of revisions/releases to return, eg. to find the provenance of an object as of
+        a given date.
+
+        In LOOKUP_MODE_EARLIEST, returns the earliest revision/release instead of any. 
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -62,7 +110,72 @@ class ProvenanceServiceServicer:
         """Given several objects' SWHIDs, returns an origin and revision/release for each of them
         where they can be found, in arbitrary order.
 
-        Nodes with no known provenance are returned with both their anchor and origin empty. 
+        Nodes with no known provenance are returned with both their anchor and origin empty.
+
+        If the request has a deadline, nodes whose lookup is not complete shortly before it
+        are returned with `timed_out` set, instead of failing the whole request. 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WhereAreOneInOrigin(self, request, context):
+        """Same as WhereAreOne, but only returns revisions/releases in the given origin.
+
+        Nodes which are not in that origin are returned with both their anchor and origin
+        empty. Unknown nodes are not returned. Requires reverse indexes (built by
+        `swh-provenance-index --reverse-indexes`), or fails with FAILED_PRECONDITION. 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListContainedIn(self, request, context):
+        """Given a revision or release's SWHID, returns all contents it contains, in arbitrary
+        order.
+
+        Contents in several frontier directories of the revision/release are returned once
+        for each of them. Requires reverse indexes (built by
+        `swh-provenance-index --reverse-indexes`), or fails with FAILED_PRECONDITION. 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def FindCoOccurrences(self, request, context):
+        """Given several contents' SWHIDs, returns the revisions/releases which contain at least
+        `min_contents` of them, by decreasing number of contents they contain. 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WhereAreAll(self, request, context):
+        """Given a content's SWHID, returns every revision/release it is in, with its path
+        in them.
+
+        Unless `max_results` is set, occurrences are streamed in arbitrary order. If it is,
+        they are sorted, and the last one has a `next_page_token` to pass in a new request
+        to get the next page, if there are more. 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CountAnchors(self, request, context):
+        """Given a content's SWHID, returns the number of revisions/releases it is in 
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CountOrigins(self, request, context):
+        """Given a content's SWHID, returns the number of origins it is in.
+
+        In exact mode, this reads all revisions/releases of the content, then all their
+        origins. In approximate mode, only contents with a sketch of their origins (built by
+        `swh-provenance-index --cardinality-indexes`) and contents in no revision/release
+        are counted; others fail with FAILED_PRECONDITION instead of reading tables. 
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -81,6 +194,36 @@ def add_ProvenanceServiceServicer_to_server(servicer, server):
                     request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreOneRequest.FromString,
                     response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereIsOneResult.SerializeToString,
             ),
+            'WhereAreOneInOrigin': grpc.unary_stream_rpc_method_handler(
+                    servicer.WhereAreOneInOrigin,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreOneInOriginRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereIsOneResult.SerializeToString,
+            ),
+            'ListContainedIn': grpc.unary_stream_rpc_method_handler(
+                    servicer.ListContainedIn,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ListContainedInRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ContainedContent.SerializeToString,
+            ),
+            'FindCoOccurrences': grpc.unary_stream_rpc_method_handler(
+                    servicer.FindCoOccurrences,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.FindCoOccurrencesRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CoOccurrence.SerializeToString,
+            ),
+            'WhereAreAll': grpc.unary_stream_rpc_method_handler(
+                    servicer.WhereAreAll,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreAllRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Occurrence.SerializeToString,
+            ),
+            'CountAnchors': grpc.unary_unary_rpc_method_handler(
+                    servicer.CountAnchors,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.SerializeToString,
+            ),
+            'CountOrigins': grpc.unary_unary_rpc_method_handler(
+                    servicer.CountOrigins,
+                    request_deserializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.FromString,
+                    response_serializer=swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'swh.provenance.ProvenanceService', rpc_method_handlers)
@@ -90,7 +233,13 @@ def add_ProvenanceServiceServicer_to_server(servicer, server):
 
  # This class is part of an EXPERIMENTAL API.
 class ProvenanceService:
-    """Content Provenance service 
+    """Content Provenance service
+
+    A server may serve several databases (eg. built with different node filters) over the
+    same graph. Every request has a `databases` field with the names of the databases to
+    query, which defaults to the first database of the server. WhereIsOne and WhereAreOne
+    query them in order, until one has an anchor for the node; other methods accept a
+    single database. Unknown database names fail with INVALID_ARGUMENT. 
     """
 
     @staticmethod
@@ -146,3 +295,165 @@ class ProvenanceService:
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def WhereAreOneInOrigin(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/WhereAreOneInOrigin',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreOneInOriginRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereIsOneResult.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ListContainedIn(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/ListContainedIn',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ListContainedInRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.ContainedContent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def FindCoOccurrences(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/FindCoOccurrences',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.FindCoOccurrencesRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CoOccurrence.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WhereAreAll(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/WhereAreAll',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.WhereAreAllRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Occurrence.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CountAnchors(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/CountAnchors',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CountOrigins(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/swh.provenance.ProvenanceService/CountOrigins',
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.CountRequest.SerializeToString,
+            swh_dot_provenance_dot_grpc_dot_swhprovenance__pb2.Count.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
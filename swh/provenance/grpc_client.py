@@ -16,9 +16,17 @@ logger = logging.getLogger(__name__)
 
 
 class GrpcProvenance:
-    def __init__(self, url: str):
+    def __init__(self, url: str, databases: Optional[List[str]] = None):
+        """
+        Args:
+            url: address of the gRPC server
+            databases: names of the databases of the server to query, in order; each
+              SWHID is looked up in the next one if it has no provenance in a database.
+              Defaults to the first database of the server.
+        """
         self._channel = grpc.insecure_channel(url)
         self._stub = ProvenanceServiceStub(self._channel)
+        self._databases = databases or []
 
     def check_config(self) -> bool:
         # if the constructor successfully connected, it means we are good
@@ -27,7 +35,9 @@ class GrpcProvenance:
     def whereis(self, *, swhid: CoreSWHID) -> Optional[QualifiedSWHID]:
         str_swhid = str(swhid)
         try:
-            result = self._stub.WhereIsOne(WhereIsOneRequest(swhid=str_swhid))
+            result = self._stub.WhereIsOne(
+                WhereIsOneRequest(swhid=str_swhid, databases=self._databases)
+            )
         except grpc.RpcError as exc:
             if exc.code() == grpc.StatusCode.NOT_FOUND:
                 logger.debug("Unknown SWHID: %s", swhid)
@@ -47,10 +57,15 @@ class GrpcProvenance:
         results: Dict[CoreSWHID, QualifiedSWHID] = {}
 
         for result in self._stub.WhereAreOne(
-            WhereAreOneRequest(swhid=list(map(str, swhids)))
+            WhereAreOneRequest(
+                swhid=list(map(str, swhids)), databases=self._databases
+            )
         ):
             assert result is not None
             swhid = CoreSWHID.from_string(result.swhid)
+            if result.timed_out:
+                logger.warning("Lookup of %s timed out", swhid)
+                continue
             results[swhid] = QualifiedSWHID(
                 object_type=swhid.object_type,
                 object_id=swhid.object_id,
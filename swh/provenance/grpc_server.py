@@ -56,10 +56,16 @@ def build_rust_grpc_server_cmdline(**config):
     cmd = [str(grpc_path)]
     logger.debug("Configuration: %r", config)
     cmd.extend(["--bind", f"[::]:{port}"])
-    cmd.extend(["--database", str(config["db"])])
+    # "db" and "indexes" are either a single URL/path, or a dict of URLs/paths of
+    # several databases by name
+    for option, key in [("--database", "db"), ("--indexes", "indexes")]:
+        value = config.get(key)
+        if isinstance(value, dict):
+            for name, item in value.items():
+                cmd.extend([option, f"{name}={item}"])
+        elif value is not None:
+            cmd.extend([option, str(value)])
     cmd.extend(["--graph", str(config["graph"])])
-    if "indexes" in config:
-        cmd.extend(["--indexes", str(config["indexes"])])
     if config.get("graph_format"):
         cmd.extend(["--graph-format", config["graph_format"]])
     print(f"Started GRPC using dataset from {grpc_path}")
@@ -597,13 +597,90 @@ class ListRevisionsInOrigins(luigi.Task):
             # fmt: on
 
 
+class ListEarliestOccurrences(luigi.Task):
+    """Creates a table of the earliest revision/release each content is in, with its
+    author date and one of its origins."""
+
+    local_export_path = luigi.PathParameter()
+    local_graph_path = luigi.PathParameter()
+    graph_name = luigi.StrParameter(default="graph")
+    provenance_dir = luigi.PathParameter()
+    provenance_node_filter = luigi.StrParameter(default="heads")
+
+    @property
+    def resources(self):
+        """Returns the value of ``self.max_ram_mb``
+        and declares the task uses every CPU available"""
+        import socket
+
+        hostname = socket.getfqdn()
+        # graph, plus two arrays of node ids
+        bytes_per_node = 8 + 8 + 8
+        return {
+            f"{socket.getfqdn()}_ram_mb": estimate_node_count(
+                self.local_graph_path, self.graph_name, "ori,snp,rel,rev,dir,cnt"
+            )
+            * bytes_per_node
+            / 1_000_000,
+            f"{hostname}_max_cpu": 1,
+        }
+
+    def requires(self) -> Dict[str, luigi.Task]:
+        """Returns :class:`LocalGraph` and :class:`ComputeEarliestTimestamps`
+        instances."""
+        kwargs = dict(
+            local_export_path=self.local_export_path,
+            local_graph_path=self.local_graph_path,
+            graph_name=self.graph_name,
+            provenance_dir=self.provenance_dir,
+            provenance_node_filter=self.provenance_node_filter,
+        )
+        return {
+            "graph": LocalGraph(local_graph_path=self.local_graph_path),
+            "earliest_timestamps": ComputeEarliestTimestamps(**kwargs),
+        }
+
+    def _output_path(self) -> Path:
+        return self.provenance_dir / "earliest_occurrences"
+
+    def output(self) -> luigi.LocalTarget:
+        """Returns {provenance_dir}/earliest_occurrences/"""
+        return luigi.LocalTarget(self._output_path())
+
+    def run(self) -> None:
+        """Runs ``earliest-occurrences`` from ``tools/provenance``"""
+        import multiprocessing
+
+        from swh.provenance.shell import Rust
+        from swh.provenance.utils import atomic_path
+
+        with atomic_path(self._output_path()) as output_dir:
+            # fmt: off
+            (
+                Rust(
+                    "earliest-occurrences",
+                    self.local_graph_path / self.graph_name,
+                    "--thread-buffer-size",
+                    str(100_000_000 // multiprocessing.cpu_count()),  # arbitrary value
+                    "--node-filter",
+                    self.provenance_node_filter,
+                    "--timestamps",
+                    self.input()["earliest_timestamps"]["bin_timestamps"],
+                    "--earliest-occurrences-out",
+                    output_dir,
+                )
+            ).run()
+            # fmt: on
+
+
 class UploadProvenanceDatabase(_ParquetToS3Task):
     """Uploads to S3 the result of:
     * :class:`ListProvenanceNodes`,
     * :class:`ListContentsInFrontierDirectories`,
     * :class:`ListContentsInRevisionsWithoutFrontier`,
-    * :class:`ListFrontierDirectoriesInRevisions`, and
-    * :class:`ListRevisionsInOrigins`,
+    * :class:`ListFrontierDirectoriesInRevisions`,
+    * :class:`ListRevisionsInOrigins`, and
+    * :class:`ListEarliestOccurrences`,
     """
 
     local_export_path = luigi.PathParameter()
@@ -639,6 +716,7 @@ class UploadProvenanceDatabase(_ParquetToS3Task):
             ),
             ListFrontierDirectoriesInRevisions(max_ram_mb=self.max_ram_mb, **kwargs),
             ListRevisionsInOrigins(**kwargs),
+            ListEarliestOccurrences(**kwargs),
         ]
 
     def _input_parquet_path(self) -> Path:
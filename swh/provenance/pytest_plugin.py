@@ -120,6 +120,10 @@ def provenance_database_and_graph(tmpdir_factory):
             f"{default_rust_executable_dir({})}/swh-provenance-index",
             "--database",
             f"file://{database_path}",
+            "--reverse-indexes",
+            "--cardinality-indexes",
+            "--sketch-threshold",
+            "2",
         ],
         check=True,
     )
@@ -136,7 +140,11 @@ def provenance_grpc_server_config(
         "provenance": {
             "cls": f"local_{provenance_grpc_backend_implementation}",
             "grpc_server": {
-                "db": f"file://{provenance_database_and_graph}",
+                # The same database twice, to test requests naming databases
+                "db": {
+                    "main": f"file://{provenance_database_and_graph}",
+                    "mirror": f"file://{provenance_database_and_graph}",
+                },
                 "graph": provenance_database_and_graph / "graph.json",
                 "graph_format": "json",
                 "debug": True,
@@ -3,7 +3,22 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
-from swh.provenance.grpc.swhprovenance_pb2 import WhereIsOneRequest, WhereIsOneResult
+import grpc
+import pytest
+
+from swh.provenance.grpc.swhprovenance_pb2 import (
+    ContainedContent,
+    CountMode,
+    CountRequest,
+    FindCoOccurrencesRequest,
+    ListContainedInRequest,
+    LookupMode,
+    WhereAreAllRequest,
+    WhereAreOneInOriginRequest,
+    WhereAreOneRequest,
+    WhereIsOneRequest,
+    WhereIsOneResult,
+)
 
 
 def test_grpc_whereis1(provenance_grpc_stub):
@@ -18,6 +33,79 @@ def test_grpc_whereis1(provenance_grpc_stub):
     )
 
 
+def test_grpc_whereare_with_deadline(provenance_grpc_stub):
+    swhids = [
+        "swh:1:cnt:0000000000000000000000000000000000000001",
+        "swh:1:cnt:0000000000000000000000000000000000000004",
+    ]
+    results = list(
+        provenance_grpc_stub.WhereAreOne(WhereAreOneRequest(swhid=swhids), timeout=60)
+    )
+    assert sorted(result.swhid for result in results) == swhids
+    assert all(result.anchor and not result.timed_out for result in results)
+
+
+@pytest.mark.parametrize("databases", [["main"], ["mirror"], ["mirror", "main"]])
+def test_grpc_whereis_databases(provenance_grpc_stub, databases):
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(
+            swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+            databases=databases,
+        )
+    )
+    assert result == WhereIsOneResult(
+        swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+        anchor="swh:1:rev:0000000000000000000000000000000000000003",
+        origin="https://example.com/swh/graph2",
+    )
+
+
+def test_grpc_whereare_databases_fallback(provenance_grpc_stub):
+    swhids = [
+        "swh:1:cnt:0000000000000000000000000000000000000001",
+        "swh:1:cnt:0000000000000000000000000000000000000004",
+    ]
+    results = list(
+        provenance_grpc_stub.WhereAreOne(
+            WhereAreOneRequest(swhid=swhids, databases=["main", "mirror"])
+        )
+    )
+    assert sorted(result.swhid for result in results) == swhids
+    assert all(result.anchor for result in results)
+
+    # Nothing was authored before 1970-01-01T00:00:01, so both databases are queried, and
+    # each node is still returned once
+    results = list(
+        provenance_grpc_stub.WhereAreOne(
+            WhereAreOneRequest(swhid=swhids, databases=["main", "mirror"], before=1)
+        )
+    )
+    assert sorted(results, key=lambda result: result.swhid) == [
+        WhereIsOneResult(swhid=swhid) for swhid in swhids
+    ]
+
+
+def test_grpc_unknown_database(provenance_grpc_stub):
+    with pytest.raises(grpc.RpcError) as exc_info:
+        provenance_grpc_stub.WhereIsOne(
+            WhereIsOneRequest(
+                swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+                databases=["main", "unknown"],
+            )
+        )
+    assert exc_info.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+    # other methods only accept a single database
+    with pytest.raises(grpc.RpcError) as exc_info:
+        provenance_grpc_stub.CountAnchors(
+            CountRequest(
+                swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+                databases=["main", "mirror"],
+            )
+        )
+    assert exc_info.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
 def test_grpc_whereis2(provenance_grpc_stub):
     # Uses c-in-d + d-in-r, as the only path from revisions to cnt:0004 is through dir:0006,
     # which is a frontier
@@ -36,3 +124,346 @@ def test_grpc_whereis2(provenance_grpc_stub):
             origin="https://example.com/swh/graph2",
         ),
     )
+
+
+def test_grpc_list_contained_in_without_frontier(provenance_grpc_stub):
+    # rev:0003's only content is not in a frontier directory
+    results = list(
+        provenance_grpc_stub.ListContainedIn(
+            ListContainedInRequest(
+                swhid="swh:1:rev:0000000000000000000000000000000000000003"
+            )
+        )
+    )
+    assert results == [
+        ContainedContent(swhid="swh:1:cnt:0000000000000000000000000000000000000001")
+    ]
+
+
+def test_grpc_list_contained_in_frontier(provenance_grpc_stub):
+    # cnt:0004 can only be reached from rev:0009 through frontier directories
+    results = list(
+        provenance_grpc_stub.ListContainedIn(
+            ListContainedInRequest(
+                swhid="swh:1:rev:0000000000000000000000000000000000000009"
+            )
+        )
+    )
+    cnt4_results = [
+        result
+        for result in results
+        if result.swhid == "swh:1:cnt:0000000000000000000000000000000000000004"
+    ]
+    assert cnt4_results
+    assert all(
+        result.frontier_directory
+        in (
+            "swh:1:dir:0000000000000000000000000000000000000006",
+            "swh:1:dir:0000000000000000000000000000000000000008",
+        )
+        for result in cnt4_results
+    )
+
+
+def test_grpc_list_contained_in_content(provenance_grpc_stub):
+    with pytest.raises(grpc.RpcError) as exc_info:
+        list(
+            provenance_grpc_stub.ListContainedIn(
+                ListContainedInRequest(
+                    swhid="swh:1:cnt:0000000000000000000000000000000000000001"
+                )
+            )
+        )
+    assert exc_info.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_grpc_where_are_one_in_origin(provenance_grpc_stub):
+    results = list(
+        provenance_grpc_stub.WhereAreOneInOrigin(
+            WhereAreOneInOriginRequest(
+                swhid=[
+                    "swh:1:cnt:0000000000000000000000000000000000000001",
+                    "swh:1:cnt:0000000000000000000000000000000000000014",
+                ],
+                origin_url="https://example.com/swh/graph",
+            )
+        )
+    )
+    results.sort(key=lambda result: result.swhid)
+    assert len(results) == 2
+    (cnt1_result, cnt14_result) = results
+
+    assert cnt1_result.swhid == "swh:1:cnt:0000000000000000000000000000000000000001"
+    assert cnt1_result.anchor in (
+        "swh:1:rev:0000000000000000000000000000000000000003",
+        "swh:1:rev:0000000000000000000000000000000000000009",
+        "swh:1:rel:0000000000000000000000000000000000000010",
+    )
+    assert cnt1_result.origin == "https://example.com/swh/graph"
+
+    # only reachable from rel:0021, which is not in that origin
+    assert cnt14_result == WhereIsOneResult(
+        swhid="swh:1:cnt:0000000000000000000000000000000000000014"
+    )
+
+
+def test_grpc_where_are_one_in_origin_by_swhid(provenance_grpc_stub):
+    results = list(
+        provenance_grpc_stub.WhereAreOneInOrigin(
+            WhereAreOneInOriginRequest(
+                swhid=["swh:1:cnt:0000000000000000000000000000000000000014"],
+                origin_swhid="swh:1:ori:8f50d3f60eae370ddbf85c86219c55108a350165",
+            )
+        )
+    )
+    assert len(results) == 1
+    assert results[0].anchor
+    assert results[0].origin == "https://example.com/swh/graph2"
+
+
+def test_grpc_find_co_occurrences(provenance_grpc_stub):
+    # Both contents are in dir:0008, which is the root directory of rev:0009
+    results = list(
+        provenance_grpc_stub.FindCoOccurrences(
+            FindCoOccurrencesRequest(
+                swhid=[
+                    "swh:1:cnt:0000000000000000000000000000000000000001",
+                    "swh:1:cnt:0000000000000000000000000000000000000004",
+                ],
+            )
+        )
+    )
+    assert "swh:1:rev:0000000000000000000000000000000000000009" in {
+        result.anchor for result in results
+    }
+    assert all(result.num_contents == 2 for result in results)
+
+
+def test_grpc_find_co_occurrences_min_contents(provenance_grpc_stub):
+    results = list(
+        provenance_grpc_stub.FindCoOccurrences(
+            FindCoOccurrencesRequest(
+                swhid=[
+                    "swh:1:cnt:0000000000000000000000000000000000000001",
+                    "swh:1:cnt:0000000000000000000000000000000000000004",
+                ],
+                min_contents=1,
+            )
+        )
+    )
+    anchors = {result.anchor: result.num_contents for result in results}
+    # rev:0003 only contains cnt:0001
+    assert anchors["swh:1:rev:0000000000000000000000000000000000000003"] == 1
+    assert anchors["swh:1:rev:0000000000000000000000000000000000000009"] == 2
+    # sorted by decreasing number of contents
+    assert [result.num_contents for result in results] == sorted(
+        (result.num_contents for result in results), reverse=True
+    )
+
+
+def test_grpc_where_are_all(provenance_grpc_stub):
+    results = list(
+        provenance_grpc_stub.WhereAreAll(
+            WhereAreAllRequest(
+                swhid="swh:1:cnt:0000000000000000000000000000000000000001"
+            )
+        )
+    )
+    anchors = {result.anchor for result in results}
+    # rev:0003 through dir:0002, and rev:0009 through the frontier directory dir:0008
+    assert "swh:1:rev:0000000000000000000000000000000000000003" in anchors
+    assert "swh:1:rev:0000000000000000000000000000000000000009" in anchors
+    assert all(result.path for result in results)
+    assert all(result.author_date for result in results)
+    assert not any(result.HasField("next_page_token") for result in results)
+
+
+def test_grpc_where_are_all_paginated(provenance_grpc_stub):
+    swhid = "swh:1:cnt:0000000000000000000000000000000000000001"
+    expected = sorted(
+        (result.anchor, result.path, result.author_date)
+        for result in provenance_grpc_stub.WhereAreAll(WhereAreAllRequest(swhid=swhid))
+    )
+    assert len(expected) > 1
+
+    results = []
+    page_token = None
+    while True:
+        page = list(
+            provenance_grpc_stub.WhereAreAll(
+                WhereAreAllRequest(swhid=swhid, max_results=1, page_token=page_token)
+            )
+        )
+        assert len(page) == 1
+        results.extend(page)
+        if not page[-1].HasField("next_page_token"):
+            break
+        page_token = page[-1].next_page_token
+
+    assert (
+        sorted((result.anchor, result.path, result.author_date) for result in results)
+        == expected
+    )
+
+
+def test_grpc_where_are_all_dates(provenance_grpc_stub):
+    swhid = "swh:1:cnt:0000000000000000000000000000000000000001"
+    occurrences = {
+        (result.anchor, result.path, result.author_date)
+        for result in provenance_grpc_stub.WhereAreAll(WhereAreAllRequest(swhid=swhid))
+    }
+    dates = sorted({author_date for (_, _, author_date) in occurrences})
+    assert len(dates) > 1
+
+    def where_are_all(**kwargs):
+        return {
+            (result.anchor, result.path, result.author_date)
+            for result in provenance_grpc_stub.WhereAreAll(
+                WhereAreAllRequest(swhid=swhid, **kwargs)
+            )
+        }
+
+    assert where_are_all(after=dates[0], before=dates[-1] + 1) == occurrences
+    assert where_are_all(before=dates[0]) == set()
+    assert where_are_all(after=dates[-1] + 1) == set()
+    assert where_are_all(after=dates[-1]) == {
+        occurrence for occurrence in occurrences if occurrence[2] == dates[-1]
+    }
+    assert where_are_all(before=dates[-1]) == {
+        occurrence for occurrence in occurrences if occurrence[2] < dates[-1]
+    }
+
+
+def test_grpc_whereis_dates(provenance_grpc_stub):
+    swhid = "swh:1:cnt:0000000000000000000000000000000000000001"
+    anchor_dates = {
+        result.anchor: result.author_date
+        for result in provenance_grpc_stub.WhereAreAll(WhereAreAllRequest(swhid=swhid))
+    }
+    dates = sorted(anchor_dates.values())
+
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(swhid=swhid, before=dates[0])
+    )
+    assert result == WhereIsOneResult(swhid=swhid)
+
+    # Only revisions/releases authored last remain
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(swhid=swhid, after=dates[-1])
+    )
+    assert anchor_dates[result.anchor] == dates[-1]
+
+
+@pytest.mark.parametrize(
+    "swhid",
+    [
+        # earliest occurrence through c-in-r only
+        "swh:1:cnt:0000000000000000000000000000000000000001",
+        # earliest occurrence through c-in-d + d-in-r
+        "swh:1:cnt:0000000000000000000000000000000000000004",
+    ],
+)
+def test_grpc_whereis_earliest(provenance_grpc_stub, swhid):
+    anchor_dates = {
+        result.anchor: result.author_date
+        for result in provenance_grpc_stub.WhereAreAll(WhereAreAllRequest(swhid=swhid))
+    }
+    earliest_date, earliest_anchor = min(
+        (date, anchor) for (anchor, date) in anchor_dates.items()
+    )
+
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(swhid=swhid, mode=LookupMode.LOOKUP_MODE_EARLIEST)
+    )
+    assert result.swhid == swhid
+    assert result.anchor == earliest_anchor
+    assert result.author_date == earliest_date
+    assert result.origin in (
+        "https://example.com/swh/graph",
+        "https://example.com/swh/graph2",
+    )
+
+    # All occurrences are later than 'before'
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(
+            swhid=swhid, before=earliest_date, mode=LookupMode.LOOKUP_MODE_EARLIEST
+        )
+    )
+    assert result == WhereIsOneResult(swhid=swhid)
+
+    # The first occurrence is before 'after', so the next one is returned instead
+    later_dates = sorted(date for date in anchor_dates.values() if date > earliest_date)
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(
+            swhid=swhid, after=earliest_date + 1, mode=LookupMode.LOOKUP_MODE_EARLIEST
+        )
+    )
+    if later_dates:
+        assert result.author_date == later_dates[0]
+        assert anchor_dates[result.anchor] == later_dates[0]
+    else:
+        assert result == WhereIsOneResult(swhid=swhid)
+
+
+def test_grpc_where_are_all_invalid_page_token(provenance_grpc_stub):
+    with pytest.raises(grpc.RpcError) as exc_info:
+        list(
+            provenance_grpc_stub.WhereAreAll(
+                WhereAreAllRequest(
+                    swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+                    page_token="not a token",
+                )
+            )
+        )
+    assert exc_info.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+@pytest.mark.parametrize(
+    "swhid",
+    [
+        "swh:1:cnt:0000000000000000000000000000000000000001",
+        "swh:1:cnt:0000000000000000000000000000000000000014",
+    ],
+)
+def test_grpc_count_anchors(provenance_grpc_stub, swhid):
+    anchors = {
+        result.anchor
+        for result in provenance_grpc_stub.WhereAreAll(WhereAreAllRequest(swhid=swhid))
+    }
+
+    exact = provenance_grpc_stub.CountAnchors(CountRequest(swhid=swhid))
+    assert exact.exact
+    assert exact.count == len(anchors)
+
+    approximate = provenance_grpc_stub.CountAnchors(
+        CountRequest(swhid=swhid, mode=CountMode.COUNT_MODE_APPROXIMATE)
+    )
+    assert abs(approximate.count - len(anchors)) <= 1
+
+
+def test_grpc_count_origins(provenance_grpc_stub):
+    # in both origins
+    count = provenance_grpc_stub.CountOrigins(
+        CountRequest(swhid="swh:1:cnt:0000000000000000000000000000000000000001")
+    )
+    assert count.exact
+    assert count.count == 2
+
+    # only reachable from rel:0021, which is only in origin graph2
+    count = provenance_grpc_stub.CountOrigins(
+        CountRequest(swhid="swh:1:cnt:0000000000000000000000000000000000000014")
+    )
+    assert count.exact
+    assert count.count == 1
+
+
+def test_grpc_count_origins_approximate_without_sketch(provenance_grpc_stub):
+    # The test database has no revisions_in_origins.csr, so no sketches of origins
+    with pytest.raises(grpc.RpcError) as exc_info:
+        provenance_grpc_stub.CountOrigins(
+            CountRequest(
+                swhid="swh:1:cnt:0000000000000000000000000000000000000001",
+                mode=CountMode.COUNT_MODE_APPROXIMATE,
+            )
+        )
+    assert exc_info.value.code() == grpc.StatusCode.FAILED_PRECONDITION
@@ -9,6 +9,7 @@ import pytest
 
 from swh.model.swhids import CoreSWHID, QualifiedSWHID
 from swh.provenance import get_provenance
+from swh.provenance.grpc.swhprovenance_pb2 import WhereIsOneRequest, WhereIsOneResult
 from swh.provenance.grpc_server import default_rust_executable_dir
 
 # locally "redefine" all fixtures that depend on the session-scoped
@@ -77,3 +78,15 @@ def test_grpc_whereare_dangingl_content(provenance_grpc_server):
             "swh:1:cnt:0000000000000000000000000000000000000004"
         ),
     }
+
+
+def test_grpc_whereis1_after_dangling_frontier_directories(provenance_grpc_stub):
+    # The first frontier directories of this content in c_in_d are in no revision,
+    # so WhereIsOne has to read past them to find dir:0001
+    result = provenance_grpc_stub.WhereIsOne(
+        WhereIsOneRequest(swhid="swh:1:cnt:0000000000000000000000000000000000000002")
+    )
+    assert result == WhereIsOneResult(
+        swhid="swh:1:cnt:0000000000000000000000000000000000000002",
+        anchor="swh:1:rev:0000000000000000000000000000000000000000",
+    )
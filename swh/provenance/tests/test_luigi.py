@@ -21,6 +21,7 @@ from swh.provenance.luigi import (
     ListContentsInFrontierDirectories,
     ListContentsInRevisionsWithoutFrontier,
     ListDirectoryMaxLeafTimestamp,
+    ListEarliestOccurrences,
     ListFrontierDirectoriesInRevisions,
     ListProvenanceNodes,
     ListRevisionsInOrigins,
@@ -784,3 +785,87 @@ def test_listrevisionsinorigins(tmpdir, provenance_node_filter):
     expected_rows.sort(key=lambda d: tuple(sorted(d.items())))
 
     assert rows == expected_rows
+
+
+@pytest.mark.parametrize("provenance_node_filter", ["heads", "all"])
+def test_listearliestoccurrences(tmpdir, provenance_node_filter):
+    tmpdir = Path(tmpdir)
+    provenance_dir = tmpdir / "provenance"
+
+    # Generate the 'nodes' table
+    test_listprovenancenodes(tmpdir, provenance_node_filter)
+
+    # Generate the binary file, used as input by ListEarliestOccurrences
+    test_computeearliesttimestamps(tmpdir, provenance_node_filter)
+
+    task = ListEarliestOccurrences(
+        local_export_path=DATASET_DIR,
+        local_graph_path=DATASET_DIR / "compressed",
+        graph_name="example",
+        provenance_dir=provenance_dir,
+        provenance_node_filter=provenance_node_filter,
+    )
+
+    task.run()
+
+    ctx = datafusion.SessionContext()
+
+    ctx.register_dataset(
+        "nodes", pyarrow.dataset.dataset(provenance_dir / "nodes", format="parquet")
+    )
+    ctx.register_dataset(
+        "earliest",
+        pyarrow.dataset.dataset(
+            provenance_dir / "earliest_occurrences", format="parquet"
+        ),
+    )
+
+    rows = ctx.sql("""
+        SELECT
+            earliest.revrel_author_date AS author_date,
+            concat(
+                'swh:1:',
+                revrel_nodes.type,
+                ':',
+                encode(CAST(revrel_nodes.sha1_git AS bytea), 'hex')
+            ) AS revrel_SWHID,
+            concat(
+                'swh:1:',
+                cnt_nodes.type,
+                ':',
+                encode(CAST(cnt_nodes.sha1_git AS bytea), 'hex')
+            ) AS cntdir_SWHID,
+            concat(
+                'swh:1:',
+                ori_nodes.type,
+                ':',
+                encode(CAST(ori_nodes.sha1_git AS bytea), 'hex')
+            ) AS ori_SWHID
+        FROM earliest
+        LEFT JOIN nodes AS revrel_nodes ON (earliest.revrel=revrel_nodes.id)
+        LEFT JOIN nodes AS cnt_nodes ON (earliest.cnt=cnt_nodes.id)
+        LEFT JOIN nodes AS ori_nodes ON (earliest.ori=ori_nodes.id)
+        """).to_pylist()
+
+    # Any origin of the revision/release may be picked
+    revisions_in_origins = {
+        (row["revrel_swhid"], row["ori_swhid"])
+        for row in csv.DictReader(
+            io.StringIO(REVISIONS_IN_ORIGINS[provenance_node_filter])
+        )
+    }
+    for row in rows:
+        assert (row["revrel_SWHID"], row.pop("ori_SWHID")) in revisions_in_origins
+        row["author_date"] = row["author_date"].strftime("%Y-%m-%dT%H:%M:%S")
+
+    expected_rows = [
+        row
+        for row in csv.DictReader(
+            io.StringIO(EARLIEST_REVREL_FOR_CNTDIR[provenance_node_filter])
+        )
+        if row["cntdir_SWHID"].startswith("swh:1:cnt:")
+    ]
+    rows.sort(key=lambda d: tuple(sorted(d.items())))
+    expected_rows.sort(key=lambda d: tuple(sorted(d.items())))
+
+    assert rows == expected_rows